@@ -0,0 +1,188 @@
+import sys
+import os
+import time
+import argparse
+import threading
+import collections
+import jira_http_client
+import jira_reminder_ledger
+import jira_reminder_plan
+import jira_write_pool
+import auto_oosla_reminder_for_jira as oosla
+
+'''
+  Script Name : apply_reminder_plan.py
+  Purpose     : Adds the OOSLA reminder comments and watchers of a plan file written by auto_oosla_reminder_for_jira.py --plan in JIRA
+                It works as follows:
+                  1. Reads the plan(see jira_reminder_plan.py) and leaves out the entries recorded in <plan file>.applied journal by
+                     earlier apply runs and identical writes
+                  2. Groups the entries per JIRA, JIRAs are applied in priority order(P0 first, OOSLA before soon to be OOSLA) on the
+                     adaptive write pool, comment of a JIRA is added first and then its watchers in parallel
+                  3. Comment body is rendered again with JIRA age at apply time(age at plan time plus time since plan), so the
+                     hours/days in the comment are not stale, a JIRA which breached SLA since the plan gets the OOSLA comment
+                  4. With reminder ledger(when the plan was written with it), a comment is added only if it is still due and a watcher
+                     only if it is not added yet, so a run or apply between plan and apply does not add it twice
+                  5. Every applied entry is recorded in the applied journal right away, so a failed or killed apply can be re-run
+                     and only adds the remaining entries
+'''
+'''
+    Test this script in your test environment before using it in your production environment, make changes if required as per your environment setup etc
+'''
+
+'''
+    Usage:
+       python3 apply_reminder_plan.py [Plan File] [JIRA Username] [JIRA password] [--max-concurrency N] [--no-ledger]
+
+       Plan File         : <team>_reminder_plan.jsonl written by python3 auto_oosla_reminder_for_jira.py [Team Name] [JIRA Username] [JIRA password] --plan
+       --max-concurrency : max number of JIRA comment/watcher calls running at the same time, default is 8
+       --no-ledger       : add all the planned comments and watchers without checking reminder ledger(jira_reminder_ledger.db)
+                           ledger is never used for a plan written with --no-ledger
+
+       e.g. python3 apply_reminder_plan.py myteam_reminder_plan.jsonl jira_user jira_password
+'''
+
+# comment body and SLA state of a planned comment with JIRA age at apply time
+# entries of plans written without JIRA age are applied with their planned body
+def renderPlannedComment(commentEntry, plannedAt, teamName, applyTime=None):
+    if commentEntry.get("ageHours") is None:
+        return commentEntry["body"], commentEntry["state"]
+    jiraAge = commentEntry["ageHours"] + ((applyTime or time.time()) - plannedAt) / 3600
+    slaDict = {commentEntry["priority"]: commentEntry["slaHours"]}
+    return oosla.getOoslaReminderCommentOfType(commentEntry["issueType"], jiraAge, commentEntry["priority"], slaDict, teamName), oosla.getOoslaState(jiraAge, commentEntry["priority"], slaDict)
+
+# applies the issue batches of a plan and counts applied, skipped and failed writes
+class PlanApplier:
+    def __init__(self, jiraUser, jiraPwd, writePool, appliedJournal, reminderLedger=None, planHeader=None):
+        self.jiraUser = jiraUser
+        self.jiraPwd = jiraPwd
+        self.writePool = writePool
+        self.appliedJournal = appliedJournal
+        self.reminderLedger = reminderLedger
+        self.planHeader = planHeader or {}
+        # entries are applied from write pool threads
+        self.lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def countEntry(self, statName):
+        with self.lock:
+            self.stats[statName] += 1
+
+    # comment of a JIRA is added before its watchers, watchers of a JIRA are added in parallel
+    def applyIssueBatch(self, issueBatch):
+        issueKey, commentEntries, watcherEntries = issueBatch
+        for commentEntry in commentEntries:
+            self.applyComment(commentEntry)
+        apiURL = oosla.JIRA_ROOT_API_URL + "/issue/" + issueKey + "/watchers"
+        for watcherEntry in watcherEntries:
+            self.writePool.submit(self.applyWatcher, apiURL, watcherEntry)
+
+    def applyComment(self, commentEntry):
+        issueKey = commentEntry["key"]
+        jiraComment, slaState = renderPlannedComment(commentEntry, self.planHeader.get("plannedAt") or time.time(), self.planHeader.get("team"))
+        if self.reminderLedger and not self.reminderLedger.isReminderDue(issueKey, slaState, commentEntry["bucket"]):
+            print("\nJIRA ID : ", issueKey, " already reminded for " + slaState + " state, skipping planned comment")
+            self.countEntry("commentsSkipped")
+            return
+        print("\nJIRA ID : ", issueKey)
+        print(jiraComment)
+        if oosla.updateJiraComment(jiraComment, issueKey, self.jiraUser, self.jiraPwd) is None:
+            if self.reminderLedger:
+                self.reminderLedger.releaseReminder(issueKey, commentEntry["bucket"])
+            self.countEntry("failed")
+            return
+        if self.reminderLedger:
+            self.reminderLedger.recordReminder(issueKey, slaState, commentEntry["bucket"])
+        self.appliedJournal.recordApplied(commentEntry)
+        self.countEntry("comments")
+
+    def applyWatcher(self, apiURL, watcherEntry):
+        if self.reminderLedger and not self.reminderLedger.getMissingWatchers(watcherEntry["key"], [watcherEntry["watcher"]]):
+            self.countEntry("watchersSkipped")
+            return
+        if oosla.addWatcherInJira(apiURL, watcherEntry["watcher"], watcherEntry["key"], self.jiraUser, self.jiraPwd, self.reminderLedger) is None:
+            self.countEntry("failed")
+            return
+        self.appliedJournal.recordApplied(watcherEntry)
+        self.countEntry("watchers")
+
+    def printStats(self):
+        print("Planned writes applied   : " + str(self.stats["comments"]) + " comments, " + str(self.stats["watchers"]) + " watchers (failed: " + str(self.stats["failed"]) + ")")
+        print("Planned writes skipped   : " + str(self.stats["commentsSkipped"]) + " comments no longer due, " + str(self.stats["watchersSkipped"]) + " watchers already added")
+
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Add OOSLA reminder comments and watchers of a reminder plan in JIRA", add_help=False)
+    parser.add_argument('scriptArgs', nargs='*')
+    parser.add_argument('--max-concurrency', dest='maxConcurrency', type=int, default=jira_write_pool.DEFAULT_MAX_CONCURRENCY, help='Max number of JIRA comment/watcher calls running at the same time')
+    parser.add_argument('--no-ledger', dest='noLedger', action='store_true', help='Add planned comments and watchers without checking reminder ledger')
+    return parser.parse_args(scriptArgs)
+
+def validateScriptArgs(scriptArgs):
+    if scriptArgs and len(scriptArgs) == 3:
+        return "valid"
+    else:
+        return
+
+def printError(errorMessage):
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+    print(errorMessage)
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+
+def applyPlan(planFile, planHeader, planEntries, jiraUser, jiraPwd, scriptOptions):
+    appliedFile = jira_reminder_plan.getAppliedFile(planFile)
+    issueBatches, skipStats = jira_reminder_plan.getApplyBatches(planEntries, jira_reminder_plan.loadAppliedIds(appliedFile))
+    print("Plan " + planFile + " of team " + str(planHeader["team"]) + " : " + str(len(planEntries)) + " entries, " + str(skipStats["applied"]) + " already applied, "
+        + str(skipStats["duplicates"]) + " duplicates, " + str(len(issueBatches)) + " JIRAs to apply")
+    # ledger is used only when the plan was written with it, re-notify interval is the one of the plan run
+    reminderLedger = None
+    if planHeader.get("ledger") and not scriptOptions.noLedger:
+        reminderLedger = jira_reminder_ledger.JiraReminderLedger(renotifyHours = planHeader.get("renotifyHours") or jira_reminder_ledger.DEFAULT_RENOTIFY_HOURS)
+    writePool = jira_write_pool.AdaptiveWritePool(scriptOptions.maxConcurrency)
+    appliedJournal = jira_reminder_plan.AppliedJournal(appliedFile)
+    planApplier = PlanApplier(jiraUser, jiraPwd, writePool, appliedJournal, reminderLedger, planHeader)
+    try:
+        for issueBatch in issueBatches:
+            writePool.submit(planApplier.applyIssueBatch, issueBatch)
+        # wait for all the queued JIRA comment and watcher calls
+        writePool.close()
+    finally:
+        appliedJournal.close()
+        if reminderLedger:
+            reminderLedger.close()
+
+    print("\n++++++++++++++++++++++++++++++++++++ APPLY SUMMARY ++++++++++++++++++++++++++++++++++++")
+    print("Planned writes           : " + str(len(planEntries)) + " (already applied: " + str(skipStats["applied"]) + ", duplicates: " + str(skipStats["duplicates"]) + ")")
+    planApplier.printStats()
+    jira_http_client.printConnectionStats()
+    writePool.printStats()
+    if reminderLedger:
+        reminderLedger.printStats()
+    print("Applied journal          : " + appliedFile)
+    print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+    if planApplier.stats["failed"]:
+        print("Re-run the same command to apply the " + str(planApplier.stats["failed"]) + " failed writes, applied writes are skipped")
+    return planApplier
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    if validateScriptArgs(scriptOptions.scriptArgs):
+        planFile, jiraUser, jiraPwd = scriptOptions.scriptArgs
+        if not os.path.isfile(planFile):
+            printError("Plan file " + planFile + " not found, a plan is written only once its auto_oosla_reminder_for_jira.py --plan run is complete ..... exiting ....")
+            sys.exit(1)
+        try:
+            planHeader, planEntries = jira_reminder_plan.loadPlan(planFile)
+        except (ValueError, KeyError) as ex:
+            printError("Plan file " + planFile + " could not be read : " + str(ex))
+            sys.exit(1)
+        applyPlan(planFile, planHeader, planEntries, jiraUser, jiraPwd, scriptOptions)
+    else:
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        print("Invalid input parameters passed , kindly check and rerun ..... exiting ....")
+        print("Script to be run as:")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+        print("      python3 apply_reminder_plan.py [Plan File] [JIRA Username] [JIRA password] [--max-concurrency N] [--no-ledger]")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+
+if __name__ == "__main__":
+    scriptArgs = sys.argv[1:]
+    main(scriptArgs)
@@ -0,0 +1,331 @@
+import sys
+import os
+import glob
+import json
+import argparse
+import threading
+import concurrent.futures
+import jira_search
+import jira_sla_engine
+import jira_issue_record
+import jira_oosla_history
+import jira_oosla_report
+import jira_scan_snapshot
+import jira_reminder_ledger
+import jira_request_metrics
+import jira_write_pool
+import auto_oosla_reminder_for_jira as oosla
+
+'''
+  Script Name : auto_oosla_fleet_reminder_for_jira.py
+  Purpose     : Runs OOSLA reminders of all the onboarded teams(onboard/*.json) in one process
+                It works as follows:
+                  1. Loads every onboarding JSON file of onboard folder, team name is the file name without .json
+                  2. Computes the union of JIRA_PROJECTS of all the teams and scans every distinct project only once
+                     using the union of priorities and issue types of the teams sharing the project
+                  3. Fans every page of scan results out to each team sharing the project, filtered by the team's
+                     JIRA_TYPE and JIRA_PRIORITIES, exception_jira_list is applied while checking OOSLA
+                  4. Checks OOSLA and writes output files of the teams in parallel using a thread pool
+                     report files are same as the ones created by auto_oosla_reminder_for_jira.py for each team
+                  5. Reminders/watchers found by the teams in a page are merged per JIRA once all the teams are done with the page,
+                     a JIRA gets one write task with one reminder comment and the watchers of all the teams, the comment is the
+                     one of the team with the most severe SLA state(teams can have different SLA_OVERRIDES), first team in
+                     onboarding order among them, so a breach seen by any team is commented and recorded in the shared bucket
+                     a JIRA ticket is reminded only once per bucket and SLA state in a run
+'''
+'''
+    Test this script in your test environment before using it in your production environment, make changes if required as per your environment setup etc
+'''
+
+'''
+    Usage:
+       python3 auto_oosla_fleet_reminder_for_jira.py [JIRA Username] [JIRA password] [--max-concurrency N] [--team-workers N]
+                                                     [--renotify-hours N] [--no-ledger] [--legacy-output-files] [--history]
+                                                     [--snapshot]
+
+       --max-concurrency : max number of JIRA comment/watcher calls running at the same time across all teams, default is 8
+       --team-workers    : max number of teams processed at the same time, default is 4
+       --renotify-hours  : an unchanged JIRA ticket is reminded again only after these many hours, default is 168
+                           REMINDER_RENOTIFY_HOURS of onboarding JSON is not used in fleet mode as all the teams share one reminder ledger
+       --no-ledger       : add reminder comments and watchers on every run without checking reminder ledger(jira_reminder_ledger.db)
+       --legacy-output-files : also write one HTML table file per team, project and priority
+       --history         : record daily and weekly OOSLA counts of every team in jira_oosla_history.db, see query_oosla_history.py
+       --snapshot        : save checked JIRAs of every team in <team>_scan_snapshot_<time>.jsonl.gz, see simulate_sla_tables.py
+
+       JIRA_PRIORITY env variable limits the check to one priority for all the teams, same as auto_oosla_reminder_for_jira.py
+       teams sharing a project and priority share the reminder ledger bucket, so a JIRA ticket gets one reminder comment
+       per run and watchers of all the teams, with or without ledger
+       per endpoint metrics of the JIRA calls are written to fleet_jira_metrics.prom(Prometheus) and fleet_jira_metrics.json
+       in JIRA_METRICS_DIR env variable folder or current folder
+'''
+
+ONBOARD_FOLDER = "onboard"
+# reminder of the most severe SLA state of the teams sharing a JIRA is added
+SLA_STATE_SEVERITY = {
+    jira_sla_engine.STATE_SOON_TO_BE_OOSLA: 0,
+    jira_sla_engine.STATE_OOSLA: 1
+}
+DEFAULT_TEAM_WORKERS = 4
+
+# load all onboarding JSON files as {team name: team JSON object}, invalid files are reported and skipped
+def loadOnboardedTeams(onboardFolder=ONBOARD_FOLDER):
+    teamJsonObjects = {}
+    for teamJsonFile in sorted(glob.glob(os.path.join(onboardFolder, "*.json"))):
+        teamName = os.path.splitext(os.path.basename(teamJsonFile))[0]
+        try:
+            with open(teamJsonFile) as teamJsonContent:
+                teamJsonObjects[teamName] = json.load(teamJsonContent)
+        except ValueError as ex:
+            print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+            print("Team input JSON file " + teamJsonFile + " is not a valid JSON, skipping team " + teamName + " : " + str(ex))
+            print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+    return teamJsonObjects
+
+# priorities checked for a team, JIRA_PRIORITY env variable overrides priorities of all the teams
+def getTeamPriorities(inputTeamJsonObject):
+    readJiraPriorityFromEnv = os.environ.get('JIRA_PRIORITY')
+    if readJiraPriorityFromEnv:
+        return [readJiraPriorityFromEnv.upper()]
+    return [jiraPriority.upper() for jiraPriority in inputTeamJsonObject["JIRA_PRIORITIES"]]
+
+# issue type names of a team, issue types in onboarding JSON are JQL values e.g. "\"Security Defect\""
+def getTeamIssueTypeNames(inputTeamJsonObject):
+    return set(issueType.strip("\"") for issueType in inputTeamJsonObject.get("JIRA_TYPE") or [])
+
+# map every distinct project to names of the teams having it in JIRA_PROJECTS
+def getProjectTeams(teamJsonObjects):
+    projectTeams = {}
+    for teamName, inputTeamJsonObject in teamJsonObjects.items():
+        for jiraProject in inputTeamJsonObject["JIRA_PROJECTS"]:
+            projectTeams.setdefault(jiraProject, [])
+            if teamName not in projectTeams[jiraProject]:
+                projectTeams[jiraProject].append(teamName)
+    return projectTeams
+
+# JQL query of a shared project scan, issue type clause is left out when any team checks all issue types
+def getSharedProjectQueryString(jiraProject, teamNames, teamJsonObjects):
+    jiraPriorities = []
+    jiraIssueTypes = []
+    checkAllIssueTypes = False
+    for teamName in teamNames:
+        inputTeamJsonObject = teamJsonObjects[teamName]
+        jiraPriorities.extend(jiraPriority for jiraPriority in getTeamPriorities(inputTeamJsonObject) if jiraPriority not in jiraPriorities)
+        if not inputTeamJsonObject.get("JIRA_TYPE"):
+            checkAllIssueTypes = True
+        jiraIssueTypes.extend(issueType for issueType in inputTeamJsonObject.get("JIRA_TYPE") or [] if issueType not in jiraIssueTypes)
+    jiraPrioritySearchStrings = [oosla.getJiraPrioritySearchString(jiraPriority) for jiraPriority in jiraPriorities]
+    return oosla.getOpenJiraQueryString([jiraProject], jiraPrioritySearchStrings, None if checkAllIssueTypes else jiraIssueTypes)
+
+# union of JIRA fields read by the teams sharing a project
+def getSharedSearchFields(teamNames, teamJsonObjects):
+    searchFields = []
+    for teamName in teamNames:
+        searchFields.extend(searchField for searchField in oosla.getSearchFields(teamJsonObjects[teamName]) if searchField not in searchFields)
+    return searchFields
+
+# reminders and watchers found by the teams sharing a project scan, merged into one write task per JIRA of a page
+# (JIRA key, bucket) reminded and (JIRA key, watcher) added are kept for the whole scan, so a JIRA seen by teams on different
+# pages(results shifting while paging) is not reminded twice either, unless a later team finds a more severe SLA state
+class SharedPageWrites:
+    def __init__(self, teamNames):
+        self.teamOrder = dict((teamName, teamIndex) for teamIndex, teamName in enumerate(teamNames))
+        # teams add writes of a page from team worker threads
+        self.lock = threading.Lock()
+        self.pageIssueWrites = {}
+        # (JIRA key, bucket): severity of the SLA state reminded
+        self.remindedBuckets = {}
+        self.addedWatchers = set()
+        self.stats = {
+            "reminders": 0,
+            "remindersMerged": 0,
+            "watchersMerged": 0
+        }
+
+    def addIssue(self, bucketState, issue, jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT):
+        teamOrder = self.teamOrder[bucketState["teamName"]]
+        # most severe SLA state first, then onboarding order
+        reminderOrder = (-SLA_STATE_SEVERITY[oosla.getOoslaState(jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT)], teamOrder)
+        with self.lock:
+            issueWrite = self.pageIssueWrites.setdefault(issue.key, {"reminder": None, "teamWatchers": {}})
+            if issueWrite["reminder"] is None or reminderOrder < issueWrite["reminder"][0]:
+                issueWrite["reminder"] = (reminderOrder, issue, jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT, bucketState["reminderBucket"], bucketState["teamName"])
+            issueWrite["teamWatchers"][teamOrder] = bucketState["jiraWatchersList"]
+
+    # queue one write task per JIRA of the page, called once all the teams are done with the page
+    def submitPageWrites(self, jiraUser, jiraPwd, writePool, reminderLedger):
+        with self.lock:
+            pageIssueWrites = self.pageIssueWrites
+            self.pageIssueWrites = {}
+            for issueKey, issueWrite in pageIssueWrites.items():
+                reminderOrder, issue, jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT, reminderBucket, teamName = issueWrite["reminder"]
+                stateSeverity = -reminderOrder[0]
+                watcherList = []
+                for teamWatcherList in [issueWrite["teamWatchers"][teamIndex] for teamIndex in sorted(issueWrite["teamWatchers"])]:
+                    for watcher in teamWatcherList:
+                        if (issueKey, watcher) in self.addedWatchers:
+                            self.stats["watchersMerged"] += 1
+                            continue
+                        self.addedWatchers.add((issueKey, watcher))
+                        watcherList.append(watcher)
+                self.stats["remindersMerged"] += len(issueWrite["teamWatchers"]) - 1
+                if self.remindedBuckets.get((issueKey, reminderBucket), -1) >= stateSeverity:
+                    self.stats["remindersMerged"] += 1
+                    if watcherList and writePool:
+                        writePool.submit(addSharedWatchers, issue, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger)
+                    elif watcherList:
+                        addSharedWatchers(issue, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, None, reminderLedger)
+                    continue
+                self.remindedBuckets[(issueKey, reminderBucket)] = stateSeverity
+                self.stats["reminders"] += 1
+                oosla.addOOSLAReminderAndWatchers(issue, jiraAgeInHours, jiraPriority, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger, reminderBucket, teamName)
+
+# watchers of a JIRA already reminded in this scan, with reminder ledger only watchers not added earlier are added
+def addSharedWatchers(issue, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger):
+    if reminderLedger:
+        watcherList = reminderLedger.getMissingWatchers(issue.key, watcherList)
+    oosla.addWatchersInJira(watcherList, issue.key, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger)
+
+# check a page of shared scan results for one team, issues not matching the team's issue types and priorities are left out
+def processTeamPage(teamBucketStates, issueTypeNames, pageIssues, jiraUser, jiraPwd, writePool, reminderLedger):
+    jiraPriorities = list(teamBucketStates)
+    bucketedPageIssues = {}
+    for issue in pageIssues:
+        if issueTypeNames and issue.issueType not in issueTypeNames:
+            continue
+        jiraPriority = oosla.getIssuePriorityBucket(issue, jiraPriorities)
+        if jiraPriority is not None:
+            bucketedPageIssues.setdefault(jiraPriority, []).append(issue)
+    for jiraPriority, bucketIssues in bucketedPageIssues.items():
+        oosla.processJiraBucketPage(teamBucketStates[jiraPriority], bucketIssues, jiraUser, jiraPwd, writePool, reminderLedger)
+    return sum(len(bucketIssues) for bucketIssues in bucketedPageIssues.values())
+
+# scan a project once and check every page for all the teams sharing it in parallel
+# a team's report is only updated by the thread checking its page, so reports need no locking
+# returns merged writes of the scan for the fleet summary
+def scanSharedProject(jiraProject, teamNames, teamJsonObjects, jiraUser, jiraPwd, teamExecutor, teamReports, writePool=None, scanStats=None, reminderLedger=None, teamIssueCounts=None, legacyOutputFile=False, teamHistories=None, teamSnapshots=None):
+    queryString = getSharedProjectQueryString(jiraProject, teamNames, teamJsonObjects)
+    print("\nShared JIRA Query for teams " + ", ".join(teamNames) + ": " + queryString + "\n")
+    teamBucketStates = {}
+    teamIssueTypeNames = {}
+    pageWrites = SharedPageWrites(teamNames)
+    for teamName in teamNames:
+        teamBucketStates[teamName] = dict((jiraPriority, oosla.openJiraBucket(jiraProject, jiraPriority, teamJsonObjects[teamName], teamName, teamReports[teamName], legacyOutputFile, None, None, None, teamHistories[teamName] if teamHistories else None, teamSnapshots[teamName] if teamSnapshots else None, None, pageWrites)) for jiraPriority in getTeamPriorities(teamJsonObjects[teamName]))
+        teamIssueTypeNames[teamName] = getTeamIssueTypeNames(teamJsonObjects[teamName])
+
+    projectScanStats = {}
+    try:
+        for pageIssues in jira_search.iterJiraSearchPages(oosla.JIRA_API_URL, queryString, (jiraUser, jiraPwd), scanStats = projectScanStats, searchFields = getSharedSearchFields(teamNames, teamJsonObjects), issueFactory = jira_issue_record.IssueRecord.fromIssueDict):
+            # a team's buckets are used only by one thread at a time, next page is fanned out after all the teams are done with this page
+            teamPageChecks = dict((teamName, teamExecutor.submit(processTeamPage, teamBucketStates[teamName], teamIssueTypeNames[teamName], pageIssues, jiraUser, jiraPwd, writePool, reminderLedger)) for teamName in teamNames)
+            for teamName, teamPageCheck in teamPageChecks.items():
+                checkedIssues = teamPageCheck.result()
+                if teamIssueCounts is not None:
+                    teamIssueCounts[teamName] = teamIssueCounts.get(teamName, 0) + checkedIssues
+            pageWrites.submitPageWrites(jiraUser, jiraPwd, writePool, reminderLedger)
+    finally:
+        for teamName in teamNames:
+            for bucketState in teamBucketStates[teamName].values():
+                oosla.closeJiraBucket(bucketState)
+    jira_search.printScanStats(projectScanStats)
+    if scanStats is not None:
+        jira_search.mergeScanStats(scanStats, projectScanStats)
+    return pageWrites
+
+def printFleetSummary(teamJsonObjects, projectTeams, teamIssueCounts, sharedPageWrites=None):
+    print("\n++++++++++++++++++++++++++++++++++++ FLEET SUMMARY ++++++++++++++++++++++++++++++++++++")
+    teamProjectScans = sum(len(inputTeamJsonObject["JIRA_PROJECTS"]) for inputTeamJsonObject in teamJsonObjects.values())
+    print("Teams                    : " + str(len(teamJsonObjects)))
+    print("Project scans            : " + str(len(projectTeams)) + " shared scans instead of " + str(teamProjectScans) + " team scans")
+    if sharedPageWrites:
+        print("Shared JIRA writes       : " + str(sum(pageWrites.stats["reminders"] for pageWrites in sharedPageWrites)) + " reminders queued, " + str(sum(pageWrites.stats["remindersMerged"] for pageWrites in sharedPageWrites)) + " reminders and "
+            + str(sum(pageWrites.stats["watchersMerged"] for pageWrites in sharedPageWrites)) + " watchers merged across teams")
+    for teamName in teamJsonObjects:
+        print("Team " + teamName.ljust(20) + ": " + str(teamIssueCounts.get(teamName, 0)) + " issues checked")
+
+# split script args into positional args(JIRA user and password) and optional settings
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Add OOSLA reminders in JIRA tickets of all the onboarded teams", add_help=False)
+    parser.add_argument('scriptArgs', nargs='*')
+    parser.add_argument('--max-concurrency', dest='maxConcurrency', type=int, default=jira_write_pool.DEFAULT_MAX_CONCURRENCY, help='Max number of JIRA comment/watcher calls running at the same time')
+    parser.add_argument('--team-workers', dest='teamWorkers', type=int, default=DEFAULT_TEAM_WORKERS, help='Max number of teams processed at the same time')
+    parser.add_argument('--renotify-hours', dest='renotifyHours', type=int, default=jira_reminder_ledger.DEFAULT_RENOTIFY_HOURS, help='Hours after which an unchanged JIRA ticket is reminded again')
+    parser.add_argument('--no-ledger', dest='noLedger', action='store_true', help='Add reminders and watchers on every run without checking reminder ledger')
+    parser.add_argument('--legacy-output-files', dest='legacyOutputFiles', action='store_true', help='Also write one HTML output file per team, project and priority')
+    parser.add_argument('--history', dest='history', action='store_true', help='Record daily and weekly OOSLA counts of every team for trend reports')
+    parser.add_argument('--snapshot', dest='snapshot', action='store_true', help='Save checked JIRAs of every team in gzip JSON lines snapshots for SLA table simulations')
+    return parser.parse_args(scriptArgs)
+
+def validateScriptArgs(scriptArgs):
+    if scriptArgs and len(scriptArgs) == 2:
+        return "valid"
+    else:
+        return
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    scriptArgs = scriptOptions.scriptArgs
+    if validateScriptArgs(scriptArgs):
+        jiraUser = scriptArgs[0]
+        jiraPwd = scriptArgs[1]
+
+        teamJsonObjects = loadOnboardedTeams()
+        if not teamJsonObjects:
+            print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+            print("No valid team input JSON file found in " + ONBOARD_FOLDER + " folder, kindly check and rerun ..... exiting ....")
+            print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+            sys.exit(1)
+        projectTeams = getProjectTeams(teamJsonObjects)
+
+        # per endpoint metrics of all the JIRA calls of this run, calls are shared by teams so there is no team label
+        requestMetrics = jira_request_metrics.JiraRequestMetrics({"script": "auto_oosla_fleet_reminder_for_jira"}).start()
+        # bounded pool for JIRA comment and watcher calls shared by all the teams
+        writePool = jira_write_pool.AdaptiveWritePool(scriptOptions.maxConcurrency)
+        # ledger of reminders and watchers already added, so that unchanged JIRA tickets are not commented again
+        reminderLedger = None
+        if not scriptOptions.noLedger:
+            reminderLedger = jira_reminder_ledger.JiraReminderLedger(renotifyHours = scriptOptions.renotifyHours)
+        scanStats = {}
+        teamIssueCounts = {}
+        teamReports = dict((teamName, jira_oosla_report.OoslaReport(teamName, oosla.JIRA_BROWSE_URL)) for teamName in teamJsonObjects)
+        # daily and weekly counts of every team, shared project scans already fetch all open JIRAs
+        teamHistories = None
+        if scriptOptions.history:
+            teamHistories = dict((teamName, jira_oosla_history.OoslaHistory(teamName)) for teamName in teamJsonObjects)
+        teamSnapshots = None
+        if scriptOptions.snapshot:
+            teamSnapshots = dict((teamName, jira_scan_snapshot.ScanSnapshot(teamName, oosla.getTeamSlaTable(teamJsonObjects[teamName]))) for teamName in teamJsonObjects)
+        sharedPageWrites = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, scriptOptions.teamWorkers)) as teamExecutor:
+            for jiraProject, teamNames in projectTeams.items():
+                sharedPageWrites.append(scanSharedProject(jiraProject, teamNames, teamJsonObjects, jiraUser, jiraPwd, teamExecutor, teamReports, writePool, scanStats, reminderLedger, teamIssueCounts, scriptOptions.legacyOutputFiles, teamHistories, teamSnapshots))
+
+        # wait for all the queued JIRA comment and watcher calls
+        writePool.close()
+        if reminderLedger:
+            reminderLedger.close()
+        requestMetrics.stop()
+        for ooslaHistory in (teamHistories or {}).values():
+            ooslaHistory.recordRun()
+        for scanSnapshot in (teamSnapshots or {}).values():
+            print("Snapshot written to " + scanSnapshot.close())
+
+        # write consolidated report of every team
+        for teamReport in teamReports.values():
+            for reportFile in teamReport.writeReports():
+                print("Report written to " + reportFile)
+        for metricFile in requestMetrics.writeMetricFiles("fleet_jira_metrics"):
+            print("Metrics written to " + metricFile)
+
+        printFleetSummary(teamJsonObjects, projectTeams, teamIssueCounts, sharedPageWrites)
+        oosla.printRunSummary(writePool, scanStats, None, reminderLedger, list(teamReports.values()), requestMetrics, None, None, None, list(teamHistories.values()) if teamHistories else None, list(teamSnapshots.values()) if teamSnapshots else None)
+    else:
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        print("Invalid input parameters passed , kindly check and rerun ..... exiting ....")
+        print("Script to be run as:")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+        print("      python3 auto_oosla_fleet_reminder_for_jira.py [JIRA Username] [JIRA password] [--max-concurrency N] [--team-workers N] [--renotify-hours N] [--no-ledger] [--legacy-output-files] [--history] [--snapshot]")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+
+if __name__ == "__main__":
+    scriptArgs = sys.argv[1:]
+    main(scriptArgs)
@@ -0,0 +1,326 @@
+import sys
+import os
+import re
+import glob
+import json
+import time
+import signal
+import argparse
+import datetime
+import threading
+import jira_issue_index
+import jira_write_pool
+import auto_oosla_reminder_for_jira as oosla
+import auto_oosla_fleet_reminder_for_jira as fleet
+
+'''
+  Script Name : auto_oosla_reminder_daemon.py
+  Purpose     : Long running scheduler of OOSLA reminders for all the onboarded teams(onboard/*.json)
+                It works as follows:
+                  1. Keeps JIRA HTTP connection pool, local SQLite issue index and onboarding JSON of every team warm across runs
+                     onboarding JSON files are reloaded when they are added, changed or removed, an invalid file keeps the last
+                     valid config of the team
+                  2. Every tick, finds priorities of every team whose cadence has passed since their last scan
+                     e.g. P0 hourly, P1 every 4 hours, P2 and P3 daily, default cadences can be changed using --cadences and per team
+                     using REMINDER_CADENCES in onboarding JSON e.g. {"P0": "30m", "P1": "2h"}
+                  3. Coalesces jobs, all due priorities of a team are checked in one run and a job which became due many times while
+                     other jobs were running is run only once, scans never pile up
+                  4. Soon to be OOSLA JIRAs are reminded by the priority scans, OOSLA JIRAs are reminded only by the weekly breached
+                     digest of every team which checks all the priorities of the team on --digest-day after --digest-hour
+                  5. Last run times are kept in a state file, so a restarted daemon does not scan again before the cadence or send a
+                     second digest on the same day
+'''
+'''
+    Test this script in your test environment before using it in your production environment, make changes if required as per your environment setup etc
+'''
+
+'''
+    Usage:
+       python3 auto_oosla_reminder_daemon.py [JIRA Username] [JIRA password] [--cadences P0=1h,P1=4h,P2=24h,P3=24h]
+                                             [--digest-day tuesday] [--digest-hour N] [--tick-seconds N] [--once]
+                                             [--no-index] [--combined-scan] [--no-pushdown] [--max-concurrency N]
+                                             [--renotify-hours N] [--no-ledger] [--legacy-output-files] [--email-digest] [--digest-comments]
+                                             [--sla-clock] [--history] [--snapshot]
+
+       --cadences        : scan interval of every priority, values are minutes(m), hours(h) or days(d), default is P0=1h,P1=4h,P2=24h,P3=24h
+                           priorities not listed keep their default cadence, priorities without a default are scanned every 24h
+       --digest-day      : day of weekly breached digest which reminds OOSLA JIRAs, default is OOSLA_REMINDER_DAY env variable or tuesday
+       --digest-hour     : local hour of digest day after which the digest is run, default is 9
+       --tick-seconds    : seconds between two checks for due jobs and changed onboarding JSON files, default is 60
+       --once            : run the jobs due right now and exit, e.g. to check a config
+       --no-index        : search JIRA on every scan instead of keeping open issues in local SQLite index(jira_issue_index.db)
+       --combined-scan, --no-pushdown, --max-concurrency, --renotify-hours, --no-ledger, --legacy-output-files,
+       --email-digest, --digest-comments, --sla-clock, --history, --snapshot
+                         : same as auto_oosla_reminder_for_jira.py, --combined-scan and --no-pushdown are used only with --no-index
+                           reminder ledger keeps frequent scans from commenting an unchanged JIRA again, with --no-ledger every scan
+                           of a priority comments again
+
+       report of a priority scan is written to <team>_<priorities>_oosla_report.html/csv/json e.g. myteam_p1_p2_oosla_report.html
+       report of the weekly digest is written to <team>_oosla_report.html/csv/json, same as auto_oosla_reminder_for_jira.py
+       stop the daemon using SIGTERM or Ctrl+C, the running job is completed first
+'''
+
+'''
+    Settings can be changed using below ENV variables
+       OOSLA_DAEMON_STATE_FILE : path of the JSON file with last run times of the jobs, default is auto_oosla_reminder_daemon_state.json
+                                 next to onboard folder
+'''
+
+DEFAULT_CADENCES = "P0=1h,P1=4h,P2=24h,P3=24h"
+DEFAULT_CADENCE = "24h"
+DEFAULT_DIGEST_HOUR = 9
+DEFAULT_TICK_SECONDS = 60
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_oosla_reminder_daemon_state.json")
+CADENCE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([mhd])\s*$", re.IGNORECASE)
+CADENCE_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+WEEK_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+def getStateFile():
+    return os.environ.get("OOSLA_DAEMON_STATE_FILE") or DEFAULT_STATE_FILE
+
+def getTimestamp():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+# cadence like 30m, 4h or 1d in seconds
+def parseCadence(cadenceText):
+    cadenceMatch = CADENCE_PATTERN.match(str(cadenceText))
+    if not cadenceMatch:
+        raise ValueError("invalid cadence " + str(cadenceText) + ", use minutes(m), hours(h) or days(d) e.g. 30m, 4h, 1d")
+    return float(cadenceMatch.group(1)) * CADENCE_UNIT_SECONDS[cadenceMatch.group(2).lower()]
+
+# cadences like P0=1h,P1=4h as {priority: seconds}
+def parseCadences(cadencesText):
+    priorityCadences = {}
+    for cadenceEntry in cadencesText.split(","):
+        if not cadenceEntry.strip():
+            continue
+        jiraPriority, separator, cadenceText = cadenceEntry.partition("=")
+        if not separator:
+            raise ValueError("invalid cadence entry " + cadenceEntry + ", use priority=cadence e.g. P0=1h")
+        priorityCadences[jiraPriority.strip().upper()] = parseCadence(cadenceText)
+    return priorityCadences
+
+def printError(errorMessage):
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+    print(errorMessage)
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+
+# priorities of a team, JIRA_PRIORITY env variable overrides priorities of all the teams same as fleet mode
+def getTeamPriorities(teamName, inputTeamJsonObject, reportError=True):
+    try:
+        return fleet.getTeamPriorities(inputTeamJsonObject)
+    except (KeyError, TypeError, AttributeError) as ex:
+        if reportError:
+            printError("Team input JSON of team " + teamName + " has no valid JIRA_PRIORITIES, skipping team : " + repr(ex))
+        return []
+
+class TeamConfigs:
+    def __init__(self, onboardFolder=fleet.ONBOARD_FOLDER):
+        self.onboardFolder = onboardFolder
+        # team name -> last valid team JSON object and modification time of its onboarding JSON file
+        self.teamJsonObjects = {}
+        self.fileTimes = {}
+
+    # reload onboarding JSON files added or changed since last call and drop removed teams, returns names of changed teams
+    def reloadChangedTeams(self):
+        changedTeams = []
+        seenTeams = set()
+        for teamJsonFile in sorted(glob.glob(os.path.join(self.onboardFolder, "*.json"))):
+            teamName = os.path.splitext(os.path.basename(teamJsonFile))[0]
+            seenTeams.add(teamName)
+            try:
+                fileTime = os.stat(teamJsonFile).st_mtime_ns
+            except OSError:
+                continue
+            if self.fileTimes.get(teamName) == fileTime:
+                continue
+            # file time is recorded even for an invalid file, so that the error is reported once per change
+            self.fileTimes[teamName] = fileTime
+            try:
+                with open(teamJsonFile) as teamJsonContent:
+                    self.teamJsonObjects[teamName] = json.load(teamJsonContent)
+                changedTeams.append(teamName)
+            except ValueError as ex:
+                printError("Team input JSON file " + teamJsonFile + " is not a valid JSON, " + ("keeping last valid config of team " if teamName in self.teamJsonObjects else "skipping team ") + teamName + " : " + str(ex))
+        for removedTeam in set(self.fileTimes) - seenTeams:
+            self.fileTimes.pop(removedTeam)
+            if self.teamJsonObjects.pop(removedTeam, None) is not None:
+                changedTeams.append(removedTeam)
+        return changedTeams
+
+class ReminderScheduler:
+    def __init__(self, priorityCadences, digestDay, digestHour, stateFile=None):
+        self.priorityCadences = priorityCadences
+        self.digestDay = digestDay
+        self.digestHour = digestHour
+        self.stateFile = stateFile or getStateFile()
+        # "<team>:<priority>" -> time of last scan, "<team>:digest" -> date of last weekly digest
+        self.lastRuns = {}
+        if os.path.isfile(self.stateFile):
+            try:
+                with open(self.stateFile) as stateContent:
+                    self.lastRuns = json.load(stateContent)
+            except ValueError as ex:
+                printError("Daemon state file " + self.stateFile + " is not a valid JSON, all the jobs are due : " + str(ex))
+
+    def saveState(self):
+        with open(self.stateFile + ".tmp", "w") as stateContent:
+            json.dump(self.lastRuns, stateContent, indent=2, sort_keys=True)
+        os.replace(self.stateFile + ".tmp", self.stateFile)
+
+    # cadence of a priority from REMINDER_CADENCES of onboarding JSON, --cadences or DEFAULT_CADENCE
+    def getCadenceSeconds(self, teamName, inputTeamJsonObject, jiraPriority):
+        teamCadences = dict((str(cadencePriority).upper(), cadenceText) for cadencePriority, cadenceText in (inputTeamJsonObject.get("REMINDER_CADENCES") or {}).items())
+        if jiraPriority in teamCadences:
+            try:
+                return parseCadence(teamCadences[jiraPriority])
+            except ValueError as ex:
+                printError("REMINDER_CADENCES of team " + teamName + " has " + str(ex) + ", using default cadence of " + jiraPriority)
+        return self.priorityCadences.get(jiraPriority, parseCadence(DEFAULT_CADENCE))
+
+    def isDigestDue(self, teamName, now):
+        return now.strftime("%A").lower() == self.digestDay and now.hour >= self.digestHour and self.lastRuns.get(teamName + ":digest") != now.date().isoformat()
+
+    # one coalesced job per team as (team name, priorities, is digest), digest checks all the priorities of the team
+    def getDueJobs(self, teamJsonObjects, now=None):
+        now = now or datetime.datetime.now()
+        currentTime = now.timestamp()
+        dueJobs = []
+        for teamName, inputTeamJsonObject in sorted(teamJsonObjects.items()):
+            teamPriorities = getTeamPriorities(teamName, inputTeamJsonObject)
+            if not teamPriorities:
+                continue
+            if self.isDigestDue(teamName, now):
+                dueJobs.append((teamName, teamPriorities, True))
+                continue
+            duePriorities = [jiraPriority for jiraPriority in teamPriorities
+                if currentTime - self.lastRuns.get(teamName + ":" + jiraPriority, 0) >= self.getCadenceSeconds(teamName, inputTeamJsonObject, jiraPriority)]
+            if duePriorities:
+                dueJobs.append((teamName, duePriorities, False))
+        return dueJobs
+
+    # jobs are marked as run when they start, so that a failing job is retried only after its cadence
+    def markJobStarted(self, teamName, jiraPriorities, isDigest, now=None):
+        now = now or datetime.datetime.now()
+        for jiraPriority in jiraPriorities:
+            self.lastRuns[teamName + ":" + jiraPriority] = now.timestamp()
+        if isDigest:
+            self.lastRuns[teamName + ":digest"] = now.date().isoformat()
+        self.saveState()
+
+    # seconds until the next priority scan of any team is due, used to print when the daemon is idle
+    def getNextDueSeconds(self, teamJsonObjects):
+        currentTime = time.time()
+        nextDueSeconds = None
+        for teamName, inputTeamJsonObject in teamJsonObjects.items():
+            for jiraPriority in getTeamPriorities(teamName, inputTeamJsonObject, reportError=False):
+                dueSeconds = self.lastRuns.get(teamName + ":" + jiraPriority, 0) + self.getCadenceSeconds(teamName, inputTeamJsonObject, jiraPriority) - currentTime
+                nextDueSeconds = dueSeconds if nextDueSeconds is None else min(nextDueSeconds, dueSeconds)
+        return nextDueSeconds
+
+def getJobReportPrefix(teamName, jiraPriorities, isDigest):
+    if isDigest:
+        return None
+    return teamName + "_" + "_".join(jiraPriority.lower() for jiraPriority in jiraPriorities) + "_oosla_report"
+
+# run one coalesced job, errors are reported and the daemon moves on to the next job
+def runScheduledJob(scheduledJob, teamConfigs, jiraUser, jiraPwd, scriptOptions, issueIndex):
+    teamName, jiraPriorities, isDigest = scheduledJob
+    print("\n" + getTimestamp() + " : running " + ("weekly breached digest" if isDigest else "scan") + " of team " + teamName + " for priorities " + ",".join(jiraPriorities))
+    startTime = time.time()
+    try:
+        oosla.runTeamReminders(teamName, teamConfigs.teamJsonObjects[teamName], jiraPriorities, jiraUser, jiraPwd, scriptOptions, issueIndex, isDigest, getJobReportPrefix(teamName, jiraPriorities, isDigest))
+    except Exception as ex:
+        printError("Job of team " + teamName + " for priorities " + ",".join(jiraPriorities) + " failed, it is retried after its cadence : " + repr(ex))
+        return False
+    print(getTimestamp() + " : job of team " + teamName + " completed in " + str(round(time.time() - startTime, 1)) + " seconds")
+    return True
+
+def runDaemon(jiraUser, jiraPwd, scriptOptions):
+    stopEvent = threading.Event()
+    def requestStop(signalNumber, stackFrame):
+        print(getTimestamp() + " : stop requested, exiting after the running job")
+        stopEvent.set()
+    signal.signal(signal.SIGTERM, requestStop)
+    signal.signal(signal.SIGINT, requestStop)
+
+    teamConfigs = TeamConfigs()
+    scheduler = ReminderScheduler(scriptOptions.priorityCadences, scriptOptions.digestDay, scriptOptions.digestHour)
+    issueIndex = None if scriptOptions.noIndex else jira_issue_index.JiraIssueIndex()
+    print(getTimestamp() + " : OOSLA reminder daemon started, cadences " + ", ".join(jiraPriority + "=" + str(round(cadenceSeconds / 3600, 2)) + "h" for jiraPriority, cadenceSeconds in sorted(scriptOptions.priorityCadences.items()))
+        + ", breached digest on " + scriptOptions.digestDay + " after " + str(scriptOptions.digestHour) + ":00")
+    try:
+        while not stopEvent.is_set():
+            changedTeams = teamConfigs.reloadChangedTeams()
+            if changedTeams:
+                print(getTimestamp() + " : loaded onboarding JSON of teams " + ", ".join(sorted(changedTeams)))
+            dueJobs = scheduler.getDueJobs(teamConfigs.teamJsonObjects)
+            for scheduledJob in dueJobs:
+                if stopEvent.is_set():
+                    break
+                scheduler.markJobStarted(*scheduledJob)
+                runScheduledJob(scheduledJob, teamConfigs, jiraUser, jiraPwd, scriptOptions, issueIndex)
+            if scriptOptions.once:
+                break
+            if dueJobs:
+                nextDueSeconds = scheduler.getNextDueSeconds(teamConfigs.teamJsonObjects)
+                if nextDueSeconds is not None:
+                    print(getTimestamp() + " : next scan is due in " + str(max(0, int(nextDueSeconds))) + " seconds")
+            stopEvent.wait(scriptOptions.tickSeconds)
+    finally:
+        if issueIndex is not None:
+            issueIndex.close()
+    print(getTimestamp() + " : OOSLA reminder daemon stopped")
+
+# split script args into positional args(JIRA user and password) and optional settings
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Schedule OOSLA reminders of all the onboarded teams in a long running process", add_help=False)
+    parser.add_argument('scriptArgs', nargs='*')
+    parser.add_argument('--cadences', dest='cadences', default=DEFAULT_CADENCES, help='Scan interval of every priority e.g. P0=1h,P1=4h,P2=24h,P3=24h')
+    parser.add_argument('--digest-day', dest='digestDay', type=str.lower, choices=WEEK_DAYS, default=oosla.getOoslaReminderDay(), help='Day of weekly breached digest which reminds OOSLA JIRAs')
+    parser.add_argument('--digest-hour', dest='digestHour', type=int, choices=range(24), default=DEFAULT_DIGEST_HOUR, help='Local hour of digest day after which the digest is run')
+    parser.add_argument('--tick-seconds', dest='tickSeconds', type=float, default=DEFAULT_TICK_SECONDS, help='Seconds between two checks for due jobs and changed onboarding JSON files')
+    parser.add_argument('--once', dest='once', action='store_true', help='Run the jobs due right now and exit')
+    parser.add_argument('--no-index', dest='noIndex', action='store_true', help='Search JIRA on every scan instead of keeping open issues in local SQLite index')
+    parser.add_argument('--combined-scan', dest='combinedScan', action='store_true', help='Scan all projects and due priorities of a team using one JIRA query, used with --no-index')
+    parser.add_argument('--no-pushdown', dest='noPushdown', action='store_true', help='Search all open JIRAs instead of adding exception list and SLA age windows to JIRA query')
+    parser.add_argument('--max-concurrency', dest='maxConcurrency', type=int, default=jira_write_pool.DEFAULT_MAX_CONCURRENCY, help='Max number of JIRA comment/watcher calls running at the same time')
+    parser.add_argument('--renotify-hours', dest='renotifyHours', type=int, help='Hours after which an unchanged JIRA ticket is reminded again')
+    parser.add_argument('--no-ledger', dest='noLedger', action='store_true', help='Add reminders and watchers on every run without checking reminder ledger')
+    parser.add_argument('--legacy-output-files', dest='legacyOutputFiles', action='store_true', help='Also write one HTML output file per project and priority')
+    parser.add_argument('--email-digest', dest='emailDigest', action='store_true', help='Email one digest per assignee and one to email_dl of the team instead of commenting on every JIRA')
+    parser.add_argument('--digest-comments', dest='digestComments', action='store_true', help='With --email-digest, also comment on JIRAs whose SLA state changed since the last run')
+    parser.add_argument('--sla-clock', dest='slaClock', action='store_true', help='Count SLA age only in SLA_ACTIVE_STATUSES of the team using cached JIRA changelogs')
+    parser.add_argument('--history', dest='history', action='store_true', help='Record daily and weekly OOSLA counts of the teams for trend reports')
+    parser.add_argument('--snapshot', dest='snapshot', action='store_true', help='Save checked JIRAs of every job in gzip JSON lines snapshots for SLA table simulations')
+    # settings of auto_oosla_reminder_for_jira.py which the daemon does not use, index is passed to every job when it is kept warm
+    parser.set_defaults(trace=False, profile=False, useIndex=False, fullResync=False)
+    scriptOptions = parser.parse_args(scriptArgs)
+    try:
+        scriptOptions.priorityCadences = parseCadences(DEFAULT_CADENCES)
+        scriptOptions.priorityCadences.update(parseCadences(scriptOptions.cadences))
+    except ValueError as ex:
+        parser.error(str(ex))
+    return scriptOptions
+
+def validateScriptArgs(scriptArgs):
+    if scriptArgs and len(scriptArgs) == 2:
+        return "valid"
+    else:
+        return
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    if validateScriptArgs(scriptOptions.scriptArgs):
+        runDaemon(scriptOptions.scriptArgs[0], scriptOptions.scriptArgs[1], scriptOptions)
+    else:
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        print("Invalid input parameters passed , kindly check and rerun ..... exiting ....")
+        print("Script to be run as:")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+        print("      python3 auto_oosla_reminder_daemon.py [JIRA Username] [JIRA password] [--cadences P0=1h,P1=4h,P2=24h,P3=24h] [--digest-day tuesday] [--digest-hour N] [--tick-seconds N] [--once] [--no-index] [--combined-scan] [--no-pushdown] [--max-concurrency N] [--renotify-hours N] [--no-ledger] [--legacy-output-files] [--email-digest] [--digest-comments] [--sla-clock] [--history] [--snapshot]")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+
+if __name__ == "__main__":
+    scriptArgs = sys.argv[1:]
+    main(scriptArgs)
@@ -1,9 +1,30 @@
 import sys
 import os
 import json
-import requests
 import shutil
 import datetime
+import argparse
+try:
+    import resource
+except ImportError:
+    # resource module is not available on Windows
+    resource = None
+import jira_http_client
+import jira_search
+import jira_issue_index
+import jira_issue_record
+import jira_jql_pushdown
+import jira_oosla_digest
+import jira_oosla_history
+import jira_oosla_report
+import jira_request_metrics
+import jira_scan_snapshot
+import jira_reminder_ledger
+import jira_reminder_plan
+import jira_sla_clock
+import jira_sla_engine
+import jira_trace
+import jira_write_pool
 
 '''
   Script Name : auto_oosla_reminder_for_jira.py
@@ -13,8 +34,11 @@ import datetime
                   2. Parses scan results to list all JIRAs with priority P0, P1 and P2 at the moment
                   3. Finds JIRA defect Key/ID, JIRA creation date for every JIRA issue found in scan result to compute OOSLA JIRA tickets
                   4. Adds comments to all OOSLA JIRA tickets and to all JIRA tickets approaching to OOSLA
-                  5. Stores all OOSLA JIRA tickets along with priority and JIRA assignee in a output files as well for any further use to generate reports etc
+                  5. Stores all OOSLA JIRA tickets along with priority and JIRA assignee in HTML, CSV and JSON report files of the team
+                     for any further use to generate reports etc, per project and priority output files are available using --legacy-output-files
                   6. Provides a way to handle priority SLA values for non security and security JIRA types
+                  7. Optionally records daily and weekly counts of ok, soon to be OOSLA and OOSLA JIRAs of the team for trend reports
+                  8. Optionally writes the comments and watchers to a plan file instead of adding them, see apply_reminder_plan.py
   Author      : Vivek Dubey(https://github.com/vivekdubeyvkd)
 '''
 '''
@@ -24,6 +48,7 @@ import datetime
 '''
    pre-reqsuisites:
        1. Python3
+       2. jira_*.py helper modules from this repo kept in the same folder as this script
        3. Install Python3 requests module, you can below one of the below commands
           python3 -m pip install requests
           or
@@ -36,12 +61,59 @@ import datetime
 
 ''' 
     Usage:
-       python3 auto_oosla_reminder_for_jira.py [Team Name] [JIRA Username] [JIRA password]
+       python3 auto_oosla_reminder_for_jira.py [Team Name] [JIRA Username] [JIRA password] [--max-concurrency N] [--combined-scan]
+                                               [--use-index] [--full-resync] [--renotify-hours N] [--no-ledger] [--legacy-output-files]
+                                               [--no-pushdown] [--trace] [--profile] [--email-digest] [--digest-comments]
+                                               [--sla-clock] [--history] [--snapshot] [--plan]
+
+       --max-concurrency : max number of JIRA comment/watcher calls running at the same time, default is 8
+                           actual concurrency is adjusted automatically below this value when JIRA throttles or slows down
+       --combined-scan   : scan all JIRA_PROJECTS and JIRA_PRIORITIES of the team using one JIRA query instead of one query
+                           per project and priority, output files are same as the default mode
+       --use-index       : keep open issues in a local SQLite index(jira_issue_index.db), first run scans all open issues
+                           and later runs only search issues updated since the last run
+       --full-resync     : rebuild the local SQLite index with a full scan, implies --use-index
+       --renotify-hours  : an unchanged JIRA ticket is reminded again only after these many hours, default is 168
+                           or REMINDER_RENOTIFY_HOURS of onboarding JSON, a ticket moving from soon to be OOSLA to OOSLA is reminded right away
+       --no-ledger       : add reminder comments and watchers on every run without checking reminder ledger(jira_reminder_ledger.db)
+       --legacy-output-files : also write one HTML table file per project and priority(<team>_<project>_<priority>_output.html)
+       --no-pushdown     : search all open JIRAs of the team, by default exception_jira_list and SLA age windows of every priority
+                           and issue type group are added to JIRA query so that JIRAs which can not get a reminder in this run are
+                           not downloaded, client side checks run in both cases, not used with --use-index as index keeps all open JIRAs
+       --trace           : write time spent in every phase of the run(JQL build, search paging, filter/dedup, date parsing, SLA classification,
+                           comment and watcher writes, report I/O) per project and priority to <team>_trace.json in Chrome trace event
+                           format, open it in chrome://tracing or https://ui.perfetto.dev
+       --profile         : run under cProfile and write hot functions sorted by own and cumulative time to <team>_profile.txt,
+                           raw profile data is written to <team>_profile.prof
+       --email-digest    : do not comment on every JIRA, instead email one digest per assignee with their OOSLA and soon to be OOSLA JIRAs
+                           and one digest with all the JIRAs to email_dl of onboarding JSON, see jira_oosla_digest.py for SMTP settings
+       --digest-comments : with --email-digest, also add a reminder comment and watchers on JIRAs whose SLA state changed since the
+                           last run(new JIRAs or soon to be OOSLA JIRAs which became OOSLA), needs the reminder ledger
+       --sla-clock       : SLA age of a JIRA is the time it spent in SLA_ACTIVE_STATUSES of onboarding JSON(default Open, In Progress
+                           and Reopened) instead of the time since it was created, status changes are read from JIRA changelogs
+                           which are cached in jira_changelog_cache.db and fetched again only for JIRAs updated since cached
+       --history         : record counts of ok, soon to be OOSLA and OOSLA JIRAs per project, priority, assignee and issue type in
+                           jira_oosla_history.db with daily and weekly rollups, see query_oosla_history.py to print trends,
+                           counts need every open JIRA so JQL pushdown is off with --history, use it with --use-index to keep runs cheap
+       --snapshot        : save every checked JIRA with its SLA age and state in <team>_scan_snapshot_<time>.jsonl.gz(gzip JSON lines)
+                           in JIRA_SNAPSHOT_DIR env variable folder or current folder, see simulate_sla_tables.py to try SLA table
+                           changes against snapshots, JQL pushdown is off with --snapshot same as --history
+       --plan            : dry run, write every reminder comment and watcher addition due in this run to <team>_reminder_plan.jsonl
+                           without any write in JIRA, reminder ledger is only read, identical writes are planned once
+                           see apply_reminder_plan.py to add them in JIRA later, with --email-digest digest emails are not sent
+
+       OOSLA JIRAs are reminded once a week on Tuesday, set OOSLA_REMINDER_DAY env variable e.g. monday to use another day
+       auto_oosla_reminder_daemon.py runs this check on per priority cadences in a long running process
+       OOSLA and soon to be OOSLA JIRAs are listed in <team>_oosla_report.html, <team>_oosla_report.csv and <team>_oosla_report.json
+       per endpoint metrics of the JIRA calls are written to <team>_jira_metrics.prom(Prometheus) and <team>_jira_metrics.json
+       in JIRA_METRICS_DIR env variable folder or current folder
 '''  
 
 # update your JIRA server(https://jira.com/) or API URL(https://jira.com/rest/api/2) as per your JIRA instance setup
 JIRA_ROOT_API_URL = 'https://jira.com/rest/api/2'
 JIRA_API_URL = JIRA_ROOT_API_URL + '/search'
+# replace https://jira.com and add jira server instance URL as per your JIRA instance
+JIRA_BROWSE_URL = 'https://jira.com/browse/'
 
 # define a priority list and SLA values for non security JIRA types
 # correct the values as per your SLA
@@ -64,9 +136,25 @@ SEC_OOSLA_TO_PRIORITY_DICT = {
 # define security jira types as per your JIRA setup
 SECURITY_ISSUE_TYPE_LIST = ['Security Defect', "Attribution Defect", "Privacy"]
 
+# JIRA fields read by this script, only these fields are requested in JIRA search
+# update customfield_123 as per the env custom field of your JIRA instance
+# a team can use its own list by adding "SEARCH_FIELDS" in onboarding JSON
+DEFAULT_SEARCH_FIELDS = ["summary", "created", "issuetype", "assignee", "priority", "environment", "customfield_123", "project", "watchers"]
+
+# updated field is added for the active SLA clock, its changelog cache is keyed by it
+def getSearchFields(inputTeamJsonObject, slaClock=None):
+    searchFields = inputTeamJsonObject.get("SEARCH_FIELDS") or DEFAULT_SEARCH_FIELDS
+    if slaClock is not None and "updated" not in searchFields:
+        return list(searchFields) + ["updated"]
+    return searchFields
+
+# SLA table with SLA values, reminder start and output file lead windows, a team can override them using "SLA_OVERRIDES" in onboarding JSON
+def getTeamSlaTable(inputTeamJsonObject):
+    return jira_sla_engine.buildSlaTable(NONSEC_OOSLA_TO_PRIORITY_DICT, SEC_OOSLA_TO_PRIORITY_DICT, inputTeamJsonObject.get("SLA_OVERRIDES"))
+
 def call_jira_api(requestType, apiURL, headers, payloadData, jiraUser, jiraPwd):
     try:
-        r = requests.request(requestType, url = apiURL, params = payloadData,  auth=(jiraUser, jiraPwd))
+        r = jira_http_client.jiraRequest(requestType, apiURL, params = payloadData, auth=(jiraUser, jiraPwd), headers = headers)
         jsonData = r.json()
         if "errors" in jsonData:
             print(jsonData['errors'])
@@ -77,7 +165,13 @@ def call_jira_api(requestType, apiURL, headers, payloadData, jiraUser, jiraPwd):
 
 def call_jira_post_api(apiURL, payloadData, jiraUser, jiraPwd):
     try:
-        r = requests.post(url = apiURL, json = payloadData,  auth=(jiraUser, jiraPwd))
+        r = jira_http_client.jiraRequest('POST', apiURL, jsonPayload = payloadData, auth=(jiraUser, jiraPwd))
+        # some calls e.g. add watcher return 204 with no content
+        if not r.content:
+            if r.ok:
+                return {}
+            print("JIRA call " + apiURL + " failed with status " + str(r.status_code))
+            return
         jsonData = r.json()
         if "errors" in jsonData:
             print(jsonData['errors'])
@@ -93,7 +187,8 @@ def updateJiraComment(jiraComment, jiraIssue, jiraUser, jiraPwd):
         "type":"mention",
         "body": jiraComment
     }
-    call_jira_post_api(apiURL, jsonPayload, jiraUser, jiraPwd)
+    with jira_trace.traceSpan("comment write", "write", key=jiraIssue):
+        return call_jira_post_api(apiURL, jsonPayload, jiraUser, jiraPwd)
 
 def getJiraPrioritySearchString(inputJiraPrioritytring):
     if inputJiraPrioritytring.lower() == "p0":
@@ -115,24 +210,22 @@ def parseAndGetDateObject(jiraCreationDate):
     jiraCreationDate = datetime.datetime(int(dateValues[0]), int(dateValues[1]), int(dateValues[2]), int(dateValues[3]), int(dateValues[4]), int(dateValues[5]))
     return jiraCreationDate
 
-# validate priority from ENV var and then add OOSLA reminder in the JIRA ticket
-def validatePriorityFromEnvAndAddOoslaReminder(jiraKey, jiraComment, jiraPriority, jiraUser, jiraPwd):
+# OOSLA reminder is added only for the priority in JIRA_PRIORITY ENV variable when it is set
+def isPriorityFromEnv(jiraPriority):
     # read ENV variable named JIRA_PRIORITY and get the value
     readJiraPriorityFromEnv = os.environ.get('JIRA_PRIORITY')
     #print("readJiraPriorityFromEnv ", readJiraPriorityFromEnv)
-    if readJiraPriorityFromEnv:
-        if readJiraPriorityFromEnv.lower() == jiraPriority.lower():
-            print(jiraComment)
-            updateJiraComment(jiraComment, jiraKey, jiraUser, jiraPwd)
-        else:
-            pass
-            #print("No need to send reminder")
-    else:
+    return not readJiraPriorityFromEnv or readJiraPriorityFromEnv.lower() == jiraPriority.lower()
+
+# validate priority from ENV var and then add OOSLA reminder in the JIRA ticket
+def validatePriorityFromEnvAndAddOoslaReminder(jiraKey, jiraComment, jiraPriority, jiraUser, jiraPwd):
+    if isPriorityFromEnv(jiraPriority):
         print(jiraComment)
-        updateJiraComment(jiraComment, jiraKey, jiraUser, jiraPwd)
+        return updateJiraComment(jiraComment, jiraKey, jiraUser, jiraPwd)
 
-# create and return OOSLA comment
-def getOoslaJiraComment(inputOoslaTime, issueType, jiraPriority, ooslaMsgtype):
+# create and return OOSLA comment, team name is read from inputTeamName env variable when it is not passed
+def getOoslaJiraComment(inputOoslaTime, issueType, jiraPriority, ooslaMsgtype, inputTeamName=None):
+    inputTeamName = inputTeamName or os.environ.get('inputTeamName', "")
     if inputOoslaTime > 48:
         inputOoslaTime = inputOoslaTime / 24
         inputOoslaTime = str(int(inputOoslaTime)) + " days(approx)"
@@ -143,7 +236,7 @@ def getOoslaJiraComment(inputOoslaTime, issueType, jiraPriority, ooslaMsgtype):
         jiraComment = "[Auto OOSLA Reminder]\nThis " + jiraPriority + " JIRA will be in OOSLA in the next " + inputOoslaTime + " , kindly check and update the current status"
         if issueType in SECURITY_ISSUE_TYPE_LIST:
             # check for JIRA project starting with JIRAPROJECTSTARTINGSTRING and custom comment message based on the project name
-            if "JIRAPROJECTSTARTINGSTRING" in os.environ.get('inputTeamName'):
+            if "JIRAPROJECTSTARTINGSTRING" in inputTeamName:
                 jiraComment = "[Auto OOSLA Reminder]\nThis " + jiraPriority + " JIRA is going to be in OOSLA in the next " + inputOoslaTime + " , kindly check and take immediate action to close the JIRA ticket to avoid it going into OOSLA state\nFor any assistance/help, please reach out to #ask-sbseg-security or check with [~averma5]"
             else:
                 jiraComment = "[Auto OOSLA Reminder]\nThis " + jiraPriority + " JIRA is going to be in OOSLA in the next " + inputOoslaTime + " , kindly check and take immediate action to close the JIRA ticket to avoid it going into OOSLA state\nFor any assistance/help, please reach out to security team as mentioned in the JIRA"   
@@ -151,7 +244,7 @@ def getOoslaJiraComment(inputOoslaTime, issueType, jiraPriority, ooslaMsgtype):
         jiraComment = "[Auto OOSLA Reminder]\nThis " + jiraPriority + " JIRA is OOSLA for " + inputOoslaTime + " , kindly check and update the current status"
         if issueType in SECURITY_ISSUE_TYPE_LIST:
             # check for JIRA project starting with JIRAPROJECTSTARTINGSTRING and custom comment message based on the project name
-            if "JIRAPROJECTSTARTINGSTRING" in os.environ.get('inputTeamName'):
+            if "JIRAPROJECTSTARTINGSTRING" in inputTeamName:
                 jiraComment = "[Auto OOSLA Reminder]\nThis " + jiraPriority + " JIRA is OOSLA now for " + inputOoslaTime + " , kindly check and provide immediate update/plan for taking this to closure at the earliest\nFor any assistance/help, please reach out to #ask-sbseg-security or check with [~averma5]" 
             else:
                 jiraComment = "[Auto OOSLA Reminder]\nThis " + jiraPriority + " JIRA is OOSLA now for " + inputOoslaTime + " , kindly check and provide immediate update/plan for taking this to closure at the earliest\nFor any assistance/help, please reach out to security team as mentioned in the JIRA"    
@@ -159,20 +252,45 @@ def getOoslaJiraComment(inputOoslaTime, issueType, jiraPriority, ooslaMsgtype):
         pass
     return jiraComment
 
-# generic function to handle notification for any priority of JIRA
-def checkAndAddOOSLAReminder(issueObject, jiraAge, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT):
-    jiraKey = issueObject["key"]
-    print("\nJIRA ID : ", jiraKey)
+# OOSLA JIRAs are reminded once a week, on Tuesday or on the day set in OOSLA_REMINDER_DAY env variable e.g. monday
+DEFAULT_OOSLA_REMINDER_DAY = "tuesday"
+
+def getOoslaReminderDay():
+    return (os.environ.get("OOSLA_REMINDER_DAY") or DEFAULT_OOSLA_REMINDER_DAY).strip().lower()
+
+def isOoslaReminderDay():
+    return datetime.datetime.today().strftime('%A').lower() == getOoslaReminderDay()
+
+# OOSLA reminders are sent when forced by caller(e.g. weekly digest job of the daemon) or on OOSLA reminder day
+def getBreachedReminderFlag(isBreachedReminderDay=None):
+    if isBreachedReminderDay is None:
+        return isOoslaReminderDay()
+    return isBreachedReminderDay
+
+# get OOSLA message type i.e. SLA state of a JIRA
+def getOoslaState(jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT):
+    if jiraAge <= OOSLA_TO_PRIORITY_DICT[jiraPriority]:
+        return "soonToBeOosla"
+    return "oosla"
+
+# OOSLA reminder comment of a JIRA based on its age and SLA of its priority
+def getOoslaReminderComment(issueObject, jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT, inputTeamName=None):
+    return getOoslaReminderCommentOfType(issueObject.issueType, jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT, inputTeamName)
+
+# same as getOoslaReminderComment using issue type only, used to render planned comments again at apply time
+def getOoslaReminderCommentOfType(issueType, jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT, inputTeamName=None):
     if jiraAge <= OOSLA_TO_PRIORITY_DICT[jiraPriority]:
         ooslaTime = OOSLA_TO_PRIORITY_DICT[jiraPriority] - jiraAge
-        jiraComment = getOoslaJiraComment(ooslaTime, issueObject["fields"]["issuetype"]["name"], jiraPriority, "soonToBeOosla")
-        validatePriorityFromEnvAndAddOoslaReminder(jiraKey, jiraComment, jiraPriority, jiraUser, jiraPwd)
-    elif jiraAge > OOSLA_TO_PRIORITY_DICT[jiraPriority]:
-        ooslaTime = jiraAge - OOSLA_TO_PRIORITY_DICT[jiraPriority]
-        jiraComment = getOoslaJiraComment(ooslaTime, issueObject["fields"]["issuetype"]["name"], jiraPriority, "oosla")
-        validatePriorityFromEnvAndAddOoslaReminder(jiraKey, jiraComment, jiraPriority, jiraUser, jiraPwd)
-    else:
-        pass
+        return getOoslaJiraComment(ooslaTime, issueType, jiraPriority, "soonToBeOosla", inputTeamName)
+    ooslaTime = jiraAge - OOSLA_TO_PRIORITY_DICT[jiraPriority]
+    return getOoslaJiraComment(ooslaTime, issueType, jiraPriority, "oosla", inputTeamName)
+
+# generic function to handle notification for any priority of JIRA
+def checkAndAddOOSLAReminder(issueObject, jiraAge, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, inputTeamName=None):
+    jiraKey = issueObject.key
+    print("\nJIRA ID : ", jiraKey)
+    jiraComment = getOoslaReminderComment(issueObject, jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT, inputTeamName)
+    return validatePriorityFromEnvAndAddOoslaReminder(jiraKey, jiraComment, jiraPriority, jiraUser, jiraPwd)
 
 # funtion check and remove file
 def checkAndCleanFileOrDir(inputFilePath):
@@ -184,14 +302,71 @@ def checkAndCleanFileOrDir(inputFilePath):
     else:
         pass
 
-def addWatchersInJira(watcherList, jiraIssue, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT):
+def addWatcherInJira(apiURL, watcher, jiraIssue, jiraUser, jiraPwd, reminderLedger=None):
+    with jira_trace.traceSpan("watcher write", "write", key=jiraIssue, watcher=watcher):
+        watcherResponse = call_jira_post_api(apiURL, watcher, jiraUser, jiraPwd)
+    if watcherResponse is not None:
+        print("Added user " + watcher + " as watcher in " + jiraIssue + " JIRA")
+        if reminderLedger:
+            reminderLedger.recordWatcher(jiraIssue, watcher)
+    return watcherResponse
+
+def addWatchersInJira(watcherList, jiraIssue, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool=None, reminderLedger=None):
     apiURL = JIRA_ROOT_API_URL + "/issue/" + jiraIssue + "/watchers"
     for watcher in watcherList:
-        jsonPayload = watcher
-        call_jira_post_api(apiURL, jsonPayload, jiraUser, jiraPwd)
-        print("Added user " + watcher + " as watcher in " + jiraIssue + " JIRA")
+        if writePool:
+            writePool.submit(addWatcherInJira, apiURL, watcher, jiraIssue, jiraUser, jiraPwd, reminderLedger)
+        else:
+            addWatcherInJira(apiURL, watcher, jiraIssue, jiraUser, jiraPwd, reminderLedger)
+
+# add OOSLA comment first and then watchers, watcher calls are queued only after comment is added
+# with reminder ledger, comment is added only if it is due and only watchers not added earlier are added
+def addOOSLAReminderAndThenWatchers(issueObject, jiraAge, jiraPriority, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger=None, reminderBucket=None, inputTeamName=None):
+    if reminderLedger:
+        slaState = getOoslaState(jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT)
+        if reminderLedger.isReminderDue(issueObject.key, slaState, reminderBucket):
+            if checkAndAddOOSLAReminder(issueObject, jiraAge, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, inputTeamName) is not None:
+                reminderLedger.recordReminder(issueObject.key, slaState, reminderBucket)
+            else:
+                reminderLedger.releaseReminder(issueObject.key, reminderBucket)
+        else:
+            print("\nJIRA ID : ", issueObject.key, " already reminded for " + slaState + " state, skipping reminder")
+        reminderLedger.reconcileWatchers(issueObject)
+        watcherList = reminderLedger.getMissingWatchers(issueObject.key, watcherList)
+    else:
+        checkAndAddOOSLAReminder(issueObject, jiraAge, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, inputTeamName)
+    addWatchersInJira(watcherList, issueObject.key, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger)
+
+# send OOSLA reminder and watcher calls using write pool if available else add them one by one
+def addOOSLAReminderAndWatchers(issueObject, jiraAge, jiraPriority, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool=None, reminderLedger=None, reminderBucket=None, inputTeamName=None):
+    if writePool:
+        writePool.submit(addOOSLAReminderAndThenWatchers, issueObject, jiraAge, jiraPriority, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger, reminderBucket, inputTeamName)
+    else:
+        addOOSLAReminderAndThenWatchers(issueObject, jiraAge, jiraPriority, watcherList, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, None, reminderLedger, reminderBucket, inputTeamName)
+
+# add OOSLA comment and watchers which are due to reminder plan instead of adding them in JIRA, reminder ledger is only read
+def planOOSLAReminderAndWatchers(reminderPlan, issueObject, jiraAge, jiraPriority, watcherList, OOSLA_TO_PRIORITY_DICT, reminderLedger=None, reminderBucket=None, inputTeamName=None):
+    slaState = getOoslaState(jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT)
+    if reminderLedger is None or reminderLedger.isReminderDue(issueObject.key, slaState, reminderBucket):
+        if isPriorityFromEnv(jiraPriority):
+            reminderPlan.addReminder(issueObject.key, jiraPriority, slaState, reminderBucket, getOoslaReminderComment(issueObject, jiraAge, jiraPriority, OOSLA_TO_PRIORITY_DICT, inputTeamName),
+                jiraAge, OOSLA_TO_PRIORITY_DICT[jiraPriority], issueObject.issueType)
+    if reminderLedger:
+        reminderLedger.reconcileWatchers(issueObject)
+        watcherList = reminderLedger.getMissingWatchers(issueObject.key, watcherList)
+    reminderPlan.addWatchers(issueObject.key, jiraPriority, watcherList)
+
+# add OOSLA comment and watchers in JIRA, or to reminder plan of a dry run
+# in fleet mode the writes are collected in page writes and merged across the teams sharing the project scan
+def addOrPlanOOSLAReminderAndWatchers(bucketState, issue, jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT, jiraUser, jiraPwd, writePool, reminderLedger):
+    if bucketState["pageWrites"] is not None:
+        bucketState["pageWrites"].addIssue(bucketState, issue, jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT)
+    elif bucketState["reminderPlan"] is not None:
+        planOOSLAReminderAndWatchers(bucketState["reminderPlan"], issue, jiraAgeInHours, jiraPriority, bucketState["jiraWatchersList"], OOSLA_TO_PRIORITY_DICT, reminderLedger, bucketState["reminderBucket"], bucketState["teamName"])
+    else:
+        addOOSLAReminderAndWatchers(issue, jiraAgeInHours, jiraPriority, bucketState["jiraWatchersList"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT, writePool, reminderLedger, bucketState["reminderBucket"], bucketState["teamName"])
 
-def checkOoslaAndWriteToFile(jiraAssignee, jiraIssue, jiraPriority, jiraAgeInHours, jiraCreationDate, inputIssuetype, inputJiraEnv, outputFileObject, OOSLA_TO_PRIORITY_DICT):
+def checkOoslaAndWriteToFile(jiraAssignee, jiraIssue, jiraPriority, jiraAgeInHours, jiraCreationDate, inputIssuetype, inputJiraEnv, outputFileObject, slaState, inReportWindow):
     if jiraAgeInHours > 48:
         jiraAge = str(int(jiraAgeInHours / 24)) + " days"
     else:
@@ -203,70 +378,29 @@ def checkOoslaAndWriteToFile(jiraAssignee, jiraIssue, jiraPriority, jiraAgeInHou
         inputJiraEnv = "Unknown"
 
     # define msg types
-    # replease https://jira.com and add jira server instance URL as per your JIRA instance
-    OOSLA_MSG = "<tr><td><a href=\"https://jira.com/browse/" + jiraIssue + "\">"+ jiraIssue + "</a></td><td>" + inputIssuetype + "</td><td>" +  inputJiraEnv + "</td><td>" +  jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "OOSLA" + "</td><td>" + str(jiraCreationDate) +  "</td><td>"  + jiraAge + "</td></tr>\n"
-    SOON_TO_BE_OOSLA_MSG = "<tr><td><a href=\"https://jira.com/browse/" + jiraIssue + "\">" + jiraIssue + "</a></td><td>" + inputIssuetype + "</td><td>" +  inputJiraEnv  + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Soon to be OOSLA" + "</td><td>" + str(jiraCreationDate) +  "</td><td>" + jiraAge  + "</td></tr>\n"
-    jiraPrioritySLAValue = OOSLA_TO_PRIORITY_DICT[jiraPriority.upper()]
-
-    if jiraPriority.lower() == "p0":
-        if jiraAgeInHours > jiraPrioritySLAValue:
-            outputFileObject.write(OOSLA_MSG)
-        else:
-            #outputFileObject.write(jiraIssue + "," + jiraPriority + "," + jiraAssignee["name" ] + "," + "Soon To be OOSLA" + "," + str(jiraAge) + "\n")
-            if jiraAgeInHours > 36 and jiraAgeInHours < jiraPrioritySLAValue:
-                outputFileObject.write(SOON_TO_BE_OOSLA_MSG)
-    elif jiraPriority.lower() == "p1":
-        if jiraAgeInHours > jiraPrioritySLAValue:
-            outputFileObject.write(OOSLA_MSG)
-            #outputFileObject.write("<tr><td>" + jiraIssue + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Y" + "</td><td>" + str(jiraCreationDate) +  "</td><td>" + jiraAge + "</td></tr>\n")
-        elif jiraAgeInHours > (jiraPrioritySLAValue - 48) and jiraAgeInHours < jiraPrioritySLAValue:
-            outputFileObject.write(SOON_TO_BE_OOSLA_MSG)
-            #outputFileObject.write("<tr><td>" + jiraIssue + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Soon To be OOSLA"  + str(jiraCreationDate) +  "</td><td>" + "</td><td>" + jiraAge + "</td></tr>\n")
-        else:
-            pass
-    elif jiraPriority.lower() == "p2":
-        if jiraAgeInHours > jiraPrioritySLAValue:
-            outputFileObject.write(OOSLA_MSG)
-            #outputFileObject.write("<tr><td>" + jiraIssue + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Y" + "</td><td>" + str(jiraCreationDate) +  "</td><td>" + jiraAge + "</td></tr>\n")
-        elif jiraAgeInHours > (jiraPrioritySLAValue - 144) and jiraAgeInHours < jiraPrioritySLAValue:
-            outputFileObject.write(SOON_TO_BE_OOSLA_MSG)
-            #outputFileObject.write("<tr><td>" + jiraIssue + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Soon To be OOSLA"  + str(jiraCreationDate) +  "</td><td>" + "</td><td>" + jiraAge + "</td></tr>\n")
-        else:
-            pass
-    elif jiraPriority.lower() == "p3":
-        if jiraAgeInHours > jiraPrioritySLAValue:
-            outputFileObject.write(OOSLA_MSG)
-            #outputFileObject.write("<tr><td>" + jiraIssue + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Y" + "</td><td>" + str(jiraCreationDate) +  "</td><td>" + jiraAge + "</td></tr>\n")
-        elif jiraAgeInHours >  (jiraPrioritySLAValue - 250) and jiraAgeInHours <  jiraPrioritySLAValue:
-            outputFileObject.write(SOON_TO_BE_OOSLA_MSG)
-            #outputFileObject.write("<tr><td>" + jiraIssue + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Soon To be OOSLA"  + str(jiraCreationDate) +  "</td><td>" + "</td><td>" + jiraAge + "</td></tr>\n")
-        else:
-            pass
+    OOSLA_MSG = "<tr><td><a href=\"" + JIRA_BROWSE_URL + jiraIssue + "\">"+ jiraIssue + "</a></td><td>" + inputIssuetype + "</td><td>" +  inputJiraEnv + "</td><td>" +  jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "OOSLA" + "</td><td>" + str(jiraCreationDate) +  "</td><td>"  + jiraAge + "</td></tr>\n"
+    SOON_TO_BE_OOSLA_MSG = "<tr><td><a href=\"" + JIRA_BROWSE_URL + jiraIssue + "\">" + jiraIssue + "</a></td><td>" + inputIssuetype + "</td><td>" +  inputJiraEnv  + "</td><td>" + jiraPriority + "</td><td>" + jiraAssignee + "</td><td>" + "Soon to be OOSLA" + "</td><td>" + str(jiraCreationDate) +  "</td><td>" + jiraAge  + "</td></tr>\n"
+    if slaState == jira_sla_engine.STATE_OOSLA:
+        outputFileObject.write(OOSLA_MSG)
+    elif slaState == jira_sla_engine.STATE_SOON_TO_BE_OOSLA and inReportWindow:
+        outputFileObject.write(SOON_TO_BE_OOSLA_MSG)
     else:
         pass
 
-def writeToOutputFile(issueData, jiraPriority, jiraAgeInHours, jiraCreationDate, inputIssueType, outputFileObject, OOSLA_TO_PRIORITY_DICT):
-    jiraAssignee = issueData["fields"]["assignee"]
-    jiraIssue = issueData["key"]
+# get assignee name and environment of a JIRA as listed in output files
+# environment is read from customfield_123 or environment field when the issue record is built, see jira_issue_record.py
+def getJiraAssigneeAndEnv(issueData):
+    return issueData.getAssigneeName(), issueData.environment
 
-    # handling a customfield named customfield_123 is the custom field for env used in your JIRA tickets
-    if "customfield_123" in issueData["fields"]:
-        if issueData["fields"]["customfield_123"] != None:
-            jiraEnv = issueData["fields"]["customfield_123"][0]["value"]
-        else:
-           jiraEnv = "Unknown"
-    elif "environment" in issueData["fields"]:
-        #print(issueData)
-        jiraEnv = issueData["fields"]["environment"]
-    else:
-        jiraEnv = "Unknown"
+def writeToOutputFile(issueData, jiraPriority, jiraAgeInHours, jiraCreationDate, inputIssueType, outputFileObject, slaState, inReportWindow):
+    jiraAssignee, jiraEnv = getJiraAssigneeAndEnv(issueData)
+    checkOoslaAndWriteToFile(jiraAssignee, issueData.key, jiraPriority, jiraAgeInHours, jiraCreationDate, inputIssueType, jiraEnv, outputFileObject, slaState, inReportWindow)
 
-    if jiraAssignee != None:
-        #outputFileObject.write(jiraIssue + "," + jiraPriority + "," + jiraAssignee["name" ] + "," + "Y" + "," + str(jiraAgeInHours) + "\n")
-        checkOoslaAndWriteToFile(jiraAssignee["name"], jiraIssue, jiraPriority, jiraAgeInHours, jiraCreationDate, inputIssueType, jiraEnv, outputFileObject, OOSLA_TO_PRIORITY_DICT)
-    else:
-        #outputFileObject.write(jiraIssue + "," + jiraPriority + "," + "Unassigned" + "," + "Y" + "," + str(jiraAgeInHours) + "\n")
-        checkOoslaAndWriteToFile("Unassigned", jiraIssue, jiraPriority, jiraAgeInHours, jiraCreationDate, inputIssueType, jiraEnv, outputFileObject, OOSLA_TO_PRIORITY_DICT)
+# add a listed JIRA to consolidated report of the team, only OOSLA JIRAs and soon to be OOSLA JIRAs close to SLA breach are listed
+def addToOoslaReport(ooslaReport, issueData, jiraProject, jiraPriority, jiraAgeInHours, inputIssueType, slaState, inReportWindow):
+    if slaState == jira_sla_engine.STATE_OOSLA or (slaState == jira_sla_engine.STATE_SOON_TO_BE_OOSLA and inReportWindow):
+        jiraAssignee, jiraEnv = getJiraAssigneeAndEnv(issueData)
+        ooslaReport.addRow(issueData.key, jiraProject, inputIssueType, jiraEnv or "Unknown", jiraPriority, jiraAssignee, slaState, str(issueData.created), jiraAgeInHours)
 
 def checkAndRemoveEmptyFile(inputFilePath):
     if os.stat(inputFilePath).st_size == 0:  
@@ -274,175 +408,329 @@ def checkAndRemoveEmptyFile(inputFilePath):
     else:
         pass    
 
-def get_all_open_jiras_in_last12_months(jiraProject, jiraPriority, inputTeamJsonObject, inputTeamName, jiraUser, jiraPwd):
-    # temp JIRA issue list
-    jiraIssueCheckList = []
+# build JQL query to find open JIRAs of last 12 months for input projects and priority search strings
+def getOpenJiraQueryString(jiraProjects, jiraPrioritySearchStrings, jiraIssueType):
+    if len(jiraProjects) == 1:
+        projectClause = "project = " + jiraProjects[0]
+    else:
+        projectClause = "project in (" + ",".join(jiraProjects) + ")"
+    priorityClause = "priority in (" + ",".join("\"" + prioritySearchString + "\"" for prioritySearchString in jiraPrioritySearchStrings) + ")"
+    if jiraIssueType:
+        queryString = projectClause + " AND issuetype in (" + ",".join(jiraIssueType) + ") AND status in (Open, \"In Progress\") AND " + priorityClause + " AND created >= -365d"
+    else:    
+        queryString = projectClause + " AND status in (Open, \"In Progress\") AND " + priorityClause + " AND created >= -365d"
+    return queryString
+
+# search pages of open JIRAs query narrowed using JQL pushdown clause, JIRAs which can not get a reminder in this run are not fetched
+# plain query is used when pushdown is off or when JIRA rejects the narrowed query e.g. a key of exception_jira_list does not exist
+def iterOpenJiraPages(queryString, pushdownClause, jiraUser, jiraPwd, scanStats, searchFields, jqlPushdown=True):
+    if not jqlPushdown:
+        yield from jira_search.iterJiraSearchPages(JIRA_API_URL, queryString, (jiraUser, jiraPwd), scanStats = scanStats, searchFields = searchFields, issueFactory = jira_issue_record.IssueRecord.fromIssueDict)
+        return
+    fetchedIssues = 0
+    if pushdownClause is not None:
+        pushdownQuery = queryString + " AND " + pushdownClause
+        pushdownPages = jira_search.iterJiraSearchPages(JIRA_API_URL, pushdownQuery, (jiraUser, jiraPwd), scanStats = scanStats, searchFields = searchFields, issueFactory = jira_issue_record.IssueRecord.fromIssueDict)
+        try:
+            firstPage = next(pushdownPages)
+        except RuntimeError as ex:
+            print("Pushdown JIRA query failed, searching all open JIRAs of the query instead : " + str(ex))
+            yield from jira_search.iterJiraSearchPages(JIRA_API_URL, queryString, (jiraUser, jiraPwd), scanStats = scanStats, searchFields = searchFields, issueFactory = jira_issue_record.IssueRecord.fromIssueDict)
+            return
+        print("Pushdown JIRA Query: " + pushdownQuery + "\n")
+        fetchedIssues += len(firstPage)
+        yield firstPage
+        for pageIssues in pushdownPages:
+            fetchedIssues += len(pageIssues)
+            yield pageIssues
+    else:
+        print("No JIRA of this query can get a reminder in this run, search skipped")
+    # count of the plain query tells how many JIRAs were not fetched because of pushdown
+    openTotal = jira_search.fetchSearchTotal(JIRA_API_URL, queryString, (jiraUser, jiraPwd))
+    pushdownRemoved = max(0, openTotal - fetchedIssues)
+    print("JQL pushdown removed " + str(pushdownRemoved) + " of " + str(openTotal) + " open JIRAs from the search")
+    if scanStats is not None:
+        scanStats["pushdownRemoved"] = scanStats.get("pushdownRemoved", 0) + pushdownRemoved
+        scanStats["pushdownCountRequests"] = scanStats.get("pushdownCountRequests", 0) + 1
+
+def getPushdownClause(inputTeamJsonObject, jiraPriorities, isBreachedReminderDay=None, slaClock=None):
+    return jira_jql_pushdown.compilePushdownClause(getTeamSlaTable(inputTeamJsonObject), [(jiraPriority, getJiraPrioritySearchString(jiraPriority)) for jiraPriority in jiraPriorities], inputTeamJsonObject["JIRA_TYPE"], SECURITY_ISSUE_TYPE_LIST, inputTeamJsonObject["exception_jira_list"], getBreachedReminderFlag(isBreachedReminderDay), slaClock is not None)
+
+# stopScan is checked before every page, once it returns True the remaining pages are not checked and no more writes are queued
+def get_all_open_jiras_in_last12_months(jiraProject, jiraPriority, inputTeamJsonObject, inputTeamName, jiraUser, jiraPwd, writePool=None, scanStats=None, reminderLedger=None, ooslaReport=None, legacyOutputFile=True, jqlPushdown=True, isBreachedReminderDay=None, ooslaDigest=None, slaClock=None, ooslaHistory=None, scanSnapshot=None, reminderPlan=None, stopScan=None):
     # get JIRA priority search string in JIRA query format
     jiraPrioritySearchString = getJiraPrioritySearchString(jiraPriority)
-    # read watchers
-    jiraWatchersList = inputTeamJsonObject["watchers"]
-    # read jira issuetype
-    jiraIssueType = inputTeamJsonObject["JIRA_TYPE"]
-    # read exception issue list
-    exceptionIssueList = inputTeamJsonObject["exception_jira_list"]
-    # security and bug kind of jira issue types
-    nonSecJiraTypeList = ["Bug", "Task"]
     # JIRA query to find open JIRAs
-    if jiraIssueType:
-        queryString = "project = " + jiraProject + " AND issuetype in (" + ",".join(jiraIssueType) + ") AND status in (Open, \"In Progress\") AND priority in (\"" + jiraPrioritySearchString + "\") AND created >= -365d"
-    else:    
-        queryString = "project = " + jiraProject + " AND status in (Open, \"In Progress\") AND priority in (\"" + jiraPrioritySearchString + "\") AND created >= -365d"
-    headers = {
-        "Accept": "application/json"
-    }
+    with jira_trace.traceSpan("JQL build", "scan", project=jiraProject, priority=jiraPriority):
+        queryString = getOpenJiraQueryString([jiraProject], [jiraPrioritySearchString], inputTeamJsonObject["JIRA_TYPE"])
+        # exception list and SLA age windows as JQL, client side checks still run on every JIRA
+        pushdownClause = getPushdownClause(inputTeamJsonObject, [jiraPriority], isBreachedReminderDay, slaClock)
     print("\nInput JIRA Query: " + queryString + "\n")
-    startAt = 0
-    total = 1
-    maxResults = 100
-    allJiraJsonData = []
-    query = {
-        'jql': queryString,
-        'startAt' : startAt,
-        'maxResults': maxResults
-    }
-    while startAt <= total:
-        jsonData = call_jira_api('GET', JIRA_API_URL, headers, query, jiraUser, jiraPwd)
-        allJiraJsonData += jsonData['issues']
-        startAt += maxResults
-        total = jsonData['total']
-
+    projectScanStats = {}
+    bucketState = openJiraBucket(jiraProject, jiraPriority, inputTeamJsonObject, inputTeamName, ooslaReport, legacyOutputFile, isBreachedReminderDay, ooslaDigest, slaClock, ooslaHistory, scanSnapshot, reminderPlan)
+    # fetch first page to get total and then rest of the pages concurrently, every page is checked as soon as it is received
+    searchPages = iterOpenJiraPages(queryString, pushdownClause, jiraUser, jiraPwd, projectScanStats, getSearchFields(inputTeamJsonObject, slaClock), jqlPushdown)
+    for pageIssues in jira_trace.tracePages(searchPages, "search page wait", project=jiraProject, priority=jiraPriority):
+        if stopScan is not None and stopScan():
+            print("Scan of project " + jiraProject + " priority " + jiraPriority + " stopped, remaining pages are not checked")
+            break
+        processJiraBucketPage(bucketState, pageIssues, jiraUser, jiraPwd, writePool, reminderLedger)
+    closeJiraBucket(bucketState)
+    jira_search.printScanStats(projectScanStats)
+    if scanStats is not None:
+        jira_search.mergeScanStats(scanStats, projectScanStats)
+
+# get project key of an issue in the same format as used in JIRA_PROJECTS of onboarding JSON
+def getIssueProjectBucket(issue, jiraProjects):
+    for jiraProject in jiraProjects:
+        if jiraProject.upper() in (str(issue.projectKey).upper(), str(issue.projectName).upper()):
+            return jiraProject
+    return None
+
+# get priority like P0, P1 etc from JIRA priority name like "P0: Immediate"
+def getIssuePriorityBucket(issue, jiraPriorities):
+    for jiraPriority in jiraPriorities:
+        if issue.priority == getJiraPrioritySearchString(jiraPriority):
+            return jiraPriority
+    return None
+
+# scan all projects and priorities of a team using one JIRA query and then process results project and priority wise
+def get_all_open_jiras_with_combined_scan(jiraProjects, jiraPriorities, inputTeamJsonObject, inputTeamName, jiraUser, jiraPwd, writePool=None, scanStats=None, reminderLedger=None, ooslaReport=None, legacyOutputFile=True, jqlPushdown=True, isBreachedReminderDay=None, ooslaDigest=None, slaClock=None, ooslaHistory=None, scanSnapshot=None, reminderPlan=None):
+    jiraPrioritySearchStrings = [getJiraPrioritySearchString(jiraPriority) for jiraPriority in jiraPriorities]
+    with jira_trace.traceSpan("JQL build", "scan"):
+        queryString = getOpenJiraQueryString(jiraProjects, jiraPrioritySearchStrings, inputTeamJsonObject["JIRA_TYPE"])
+        pushdownClause = getPushdownClause(inputTeamJsonObject, jiraPriorities, isBreachedReminderDay, slaClock)
+    print("\nInput JIRA Query: " + queryString + "\n")
+    bucketStates = {}
+    bucketIssueCounts = {}
+    for jiraProject in jiraProjects:
+        for jiraPriority in jiraPriorities:
+            bucketStates[(jiraProject, jiraPriority)] = openJiraBucket(jiraProject, jiraPriority, inputTeamJsonObject, inputTeamName, ooslaReport, legacyOutputFile, isBreachedReminderDay, ooslaDigest, slaClock, ooslaHistory, scanSnapshot, reminderPlan)
+            bucketIssueCounts[(jiraProject, jiraPriority)] = 0
+
+    combinedScanStats = {}
+    searchPages = iterOpenJiraPages(queryString, pushdownClause, jiraUser, jiraPwd, combinedScanStats, getSearchFields(inputTeamJsonObject, slaClock), jqlPushdown)
+    for pageIssues in jira_trace.tracePages(searchPages, "search page wait"):
+        # split page project and priority wise and check every part right away
+        bucketedPageIssues = {}
+        for issue in pageIssues:
+            issueBucket = (getIssueProjectBucket(issue, jiraProjects), getIssuePriorityBucket(issue, jiraPriorities))
+            if issueBucket in bucketStates:
+                bucketedPageIssues.setdefault(issueBucket, []).append(issue)
+        for issueBucket, bucketIssues in bucketedPageIssues.items():
+            bucketIssueCounts[issueBucket] += len(bucketIssues)
+            processJiraBucketPage(bucketStates[issueBucket], bucketIssues, jiraUser, jiraPwd, writePool, reminderLedger)
+
+    for jiraProject in jiraProjects:
+        for jiraPriority in jiraPriorities:
+            closeJiraBucket(bucketStates[(jiraProject, jiraPriority)])
+
+    # requests which one scan per project and priority would have needed, at least one request per scan even if it is empty
+    pageSize = combinedScanStats.get("pageSize", jira_search.getSearchPageSize())
+    perBucketRequests = sum(max(1, -(-bucketIssueCount // pageSize)) for bucketIssueCount in bucketIssueCounts.values())
+    # maxResults=0 count request of JQL pushdown is a request of the combined scan too
+    combinedRequests = combinedScanStats.get("requests", 0) + combinedScanStats.get("pushdownCountRequests", 0)
+    jira_search.printScanStats(combinedScanStats)
+    print("Combined scan used " + str(combinedRequests) + " search and count requests instead of " + str(perBucketRequests) + ", saved " + str(perBucketRequests - combinedRequests) + " requests")
+    if scanStats is not None:
+        jira_search.mergeScanStats(scanStats, combinedScanStats)
+        scanStats["requestsSaved"] = scanStats.get("requestsSaved", 0) + perBucketRequests - combinedRequests
+
+# return state used to check OOSLA for pages of open JIRAs of a project and priority
+# listed JIRAs are added to ooslaReport and also written to per project and priority output file when legacyOutputFile is set
+# with ooslaDigest, JIRAs needing a reminder are added to the email digest instead of getting a reminder comment
+# with slaClock, SLA age is the time spent in active statuses instead of the time since creation
+# with ooslaHistory and scanSnapshot, every checked JIRA is counted in OOSLA history and saved in scan snapshot including the ones which are not listed
+# with reminderPlan, due comments and watchers are added to the plan instead of JIRA
+def openJiraBucket(jiraProject, jiraPriority, inputTeamJsonObject, inputTeamName, ooslaReport=None, legacyOutputFile=True, isBreachedReminderDay=None, ooslaDigest=None, slaClock=None, ooslaHistory=None, scanSnapshot=None, reminderPlan=None, pageWrites=None):
     # output file priority wise
     outputFile = inputTeamName + "_" + jiraProject + "_" + jiraPriority.lower() + "_output.html"
 
     # check and remove output files
     checkAndCleanFileOrDir(outputFile)
 
-    # open output files for writing
-    outputTextFileContent = open(outputFile, "a")
-
-    for issue in allJiraJsonData:
-        # set OOSLA_TO_PRIORITY_DICT to point to default dict with defect priorities
-        OOSLA_TO_PRIORITY_DICT = NONSEC_OOSLA_TO_PRIORITY_DICT 
-
-        # if jira id is in exception list, then do noting and check next JIRA ticket
-        if issue["key"] in exceptionIssueList:
-            continue
-
-        # store and check to filter out duplicate JIRA
-        if issue["key"] in jiraIssueCheckList:
-            continue
-        else:    
-            jiraIssueCheckList.append(issue["key"])
-
-        # define variables    
-        jiraSummary = issue["fields"]["summary"]
-        jiraCreatedDate = issue["fields"]["created"]
-        currentDate = datetime.datetime.now()
-        jiraCreationDate = parseAndGetDateObject(jiraCreatedDate)
-        #jiraAgeInHours = abs(jiraCreationDate - currentDate).total_seconds() / 3600 - 13.5
-        jiraAgeInHours = abs(jiraCreationDate - currentDate).total_seconds() / 3600 + 8
-        #print(issue["key"], jiraSummary, jiraCreatedDate, jiraAgeInHours)
-        issueType = issue["fields"]["issuetype"]["name"]
-        #print(issue)
-
-
-
-        # check issue type and age
-        # list security and bug kind of JIRAs for last 1 year and others till last 6 months
-        if issueType not in SECURITY_ISSUE_TYPE_LIST and issueType not in nonSecJiraTypeList:
-            # if other kind of jira age is less than 6 months that is 4380 hours, then do nothing and check next JIRA ticket
-            if jiraAgeInHours < 4380:
-                #print("No need to do anything for this JIRA ", issueType, issue["key"], jiraAgeInHours)
-                continue
+    slaTable = getTeamSlaTable(inputTeamJsonObject)
+    if ooslaHistory is not None:
+        ooslaHistory.addBucket(jiraProject, jiraPriority)
+    return {
+        # team name is passed to reminder comments, teams can be processed in parallel in fleet mode
+        "teamName": inputTeamName,
+        "jiraProject": jiraProject,
+        "jiraPriority": jiraPriority,
+        # get JIRA priority search string in JIRA query format
+        "jiraPrioritySearchString": getJiraPrioritySearchString(jiraPriority),
+        # read watchers
+        "jiraWatchersList": inputTeamJsonObject["watchers"],
+        # read exception issue list
+        "exceptionIssueList": set(inputTeamJsonObject["exception_jira_list"]),
+        # reminders are recorded in ledger per output bucket
+        "reminderBucket": jiraProject + "_" + jiraPriority.upper(),
+        # keys of JIRAs already checked, used to filter out duplicate JIRA across pages
+        "jiraIssueCheckList": set(),
+        # SLA table of the team and SLA dicts for security and non security JIRAs derived from it
+        "slaTable": slaTable,
+        "slaDicts": {
+            jira_sla_engine.SLA_GROUP_NONSECURITY: jira_sla_engine.getSlaDict(slaTable, jira_sla_engine.SLA_GROUP_NONSECURITY),
+            jira_sla_engine.SLA_GROUP_SECURITY: jira_sla_engine.getSlaDict(slaTable, jira_sla_engine.SLA_GROUP_SECURITY)
+        },
+        "ooslaReport": ooslaReport,
+        "ooslaDigest": ooslaDigest,
+        "slaClock": slaClock,
+        "ooslaHistory": ooslaHistory,
+        "scanSnapshot": scanSnapshot,
+        # intended comments and watchers of a dry run(--plan), nothing is written in JIRA when it is set
+        "reminderPlan": reminderPlan,
+        # writes of the teams sharing a fleet project scan(see auto_oosla_fleet_reminder_for_jira.py), queued once per JIRA
+        "pageWrites": pageWrites,
+        # OOSLA JIRAs are reminded and reported once a week only
+        "isBreachedReminderDay": getBreachedReminderFlag(isBreachedReminderDay),
+        "outputFile": outputFile,
+        # open output files for writing
+        "outputTextFileContent": open(outputFile, "a") if legacyOutputFile else None
+    }
 
-        # set OOSLA_TO_PRIORITY_DICT as applicable to security JIRAs that is unchanged and is like earlier time
-        if issueType in SECURITY_ISSUE_TYPE_LIST:
-            OOSLA_TO_PRIORITY_DICT = SEC_OOSLA_TO_PRIORITY_DICT
-
-        # call update JIRA comment function to add custom comments
-        if "P0" in jiraPrioritySearchString:
-            jiraPriority = "P0"
-            # start sending OOSLA reminder if it is open after 6 hours from time of creation
-            if jiraAgeInHours > OOSLA_TO_PRIORITY_DICT["P0"]:
-                today = datetime.datetime.today().strftime('%A')
-                if today.lower() == 'tuesday':
-                    checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT)
-                else:
-                    pass       
-            elif jiraAgeInHours > 6 and jiraAgeInHours < OOSLA_TO_PRIORITY_DICT["P0"]:
-                checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT)                  
-                #checkAndAddOOSLAReminderForP0(issue["key"], jiraAgeInHours, jiraUser, jiraPwd)
-            else:
-                pass
-        elif "P1" in jiraPrioritySearchString:
-            jiraPriority = "P1"
-            # start sending OOSLA reminder if it is open after 4 days from date of creation
-            if jiraAgeInHours > OOSLA_TO_PRIORITY_DICT["P1"]:
-                today = datetime.datetime.today().strftime('%A')
-                if today.lower() == 'tuesday':
-                    checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT)
-                else:
-                    pass
-            elif jiraAgeInHours > 48 and jiraAgeInHours < OOSLA_TO_PRIORITY_DICT["P1"]:
-                checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT)       
-            else:
-                pass
-        elif "P2" in jiraPrioritySearchString:
-            jiraPriority = "P2"
-            customAgeLimit = 168
-            if issueType in SECURITY_ISSUE_TYPE_LIST:
-                customAgeLimit = 480
-            # start sending OOSLA reminder if it is open after 10 days from date of creation
-            if jiraAgeInHours > OOSLA_TO_PRIORITY_DICT["P2"]:
-                today = datetime.datetime.today().strftime('%A')
-                if today.lower() == 'tuesday':
-                    checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT)
-                else:
-                    pass               
-            elif jiraAgeInHours > customAgeLimit and jiraAgeInHours < OOSLA_TO_PRIORITY_DICT["P2"]:
-                checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT) 
-            else:
-                pass
-        elif "P3" in jiraPrioritySearchString:
-            jiraPriority = "P3"
-            customAgeLimit = 480
-            if issueType in SECURITY_ISSUE_TYPE_LIST:
-                customAgeLimit = 1800      
-            # start sending OOSLA reminder if it is open after 60 days from date of creation
-            if jiraAgeInHours > OOSLA_TO_PRIORITY_DICT["P3"]:
-                today = datetime.datetime.today().strftime('%A')
-                if today.lower() == 'tuesday':
-                    checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                    writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT)
-                else:
-                    pass               
-            elif jiraAgeInHours > customAgeLimit and jiraAgeInHours < OOSLA_TO_PRIORITY_DICT["P3"]:
-                checkAndAddOOSLAReminder(issue, jiraAgeInHours, jiraPriority, jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                addWatchersInJira(jiraWatchersList, issue["key"], jiraUser, jiraPwd, OOSLA_TO_PRIORITY_DICT)
-                writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), jiraCreatedDate, issueType, outputTextFileContent, OOSLA_TO_PRIORITY_DICT) 
+def closeJiraBucket(bucketState):
+    if bucketState["outputTextFileContent"] is None:
+        return
+    with jira_trace.traceSpan("report write", "report", project=bucketState["jiraProject"], priority=bucketState["jiraPriority"]):
+        # close open output files
+        bucketState["outputTextFileContent"].close()
+
+        # check and remove empty outfil with records
+        checkAndRemoveEmptyFile(bucketState["outputFile"])
+
+# check OOSLA for a page of open JIRAs of a project and priority, add reminders and write to output file
+def processJiraBucketPage(bucketState, pageIssues, jiraUser, jiraPwd, writePool=None, reminderLedger=None):
+    jiraPriority = bucketState["jiraPriority"].upper()
+    exceptionIssueList = bucketState["exceptionIssueList"]
+    reminderBucket = bucketState["reminderBucket"]
+    jiraIssueCheckList = bucketState["jiraIssueCheckList"]
+    outputTextFileContent = bucketState["outputTextFileContent"]
+    ooslaReport = bucketState["ooslaReport"]
+    ooslaDigest = bucketState["ooslaDigest"]
+    slaDicts = bucketState["slaDicts"]
+
+    # if jira id is in exception list or is a duplicate JIRA, then do noting for it
+    with jira_trace.traceSpan("filter and dedup", "page", project=bucketState["jiraProject"], priority=jiraPriority, issues=len(pageIssues)):
+        checkIssues = []
+        for issue in pageIssues:
+            if issue.key in exceptionIssueList or issue.key in jiraIssueCheckList:
+                continue
+            jiraIssueCheckList.add(issue.key)
+            checkIssues.append(issue)
+
+    # classify all the JIRAs of the page as ok, soon to be OOSLA or OOSLA using SLA table
+    issueTypes = [issue.issueType for issue in checkIssues]
+    slaClock = bucketState["slaClock"]
+    if slaClock is None:
+        ageInHours, slaGroups, slaStates, reportFlags = jira_sla_engine.classifyIssues(bucketState["slaTable"], jiraPriority, [issue.created for issue in checkIssues], issueTypes, SECURITY_ISSUE_TYPE_LIST)
+    else:
+        # SLA age from changelogs, only changelogs of JIRAs updated since last run are fetched
+        with jira_trace.traceSpan("SLA clock", "classify", priority=jiraPriority, issues=len(checkIssues)):
+            slaAgeInHours = slaClock.getSlaAgesInHours(checkIssues)
+        ageInHours, slaGroups, slaStates, reportFlags = jira_sla_engine.classifyIssueAges(bucketState["slaTable"], jiraPriority, slaAgeInHours, issueTypes, SECURITY_ISSUE_TYPE_LIST)
+    if bucketState["ooslaHistory"] is not None:
+        bucketState["ooslaHistory"].addIssues(bucketState["jiraProject"], jiraPriority, checkIssues, issueTypes, slaStates)
+    if bucketState["scanSnapshot"] is not None:
+        bucketState["scanSnapshot"].addIssues(bucketState["jiraProject"], jiraPriority, checkIssues, issueTypes, slaGroups, ageInHours, slaStates)
+    isBreachedReminderDay = bucketState["isBreachedReminderDay"]
+
+    # reminder and watcher calls are only queued here, the calls are traced on write pool threads
+    with jira_trace.traceSpan("queue writes/report rows", "page", project=bucketState["jiraProject"], priority=jiraPriority, issues=len(checkIssues)):
+        for issue, jiraAgeInHours, issueType, slaGroup, slaState, inReportWindow in zip(checkIssues, ageInHours, issueTypes, slaGroups, slaStates, reportFlags):
+            if slaState == jira_sla_engine.STATE_OK:
+                continue
+            if slaState == jira_sla_engine.STATE_OOSLA and not isBreachedReminderDay:
+                continue
+            # call update JIRA comment function to add custom comments
+            OOSLA_TO_PRIORITY_DICT = slaDicts[slaGroup]
+            if ooslaDigest is None:
+                addOrPlanOOSLAReminderAndWatchers(bucketState, issue, jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT, jiraUser, jiraPwd, writePool, reminderLedger)
             else:
-                pass
-        else:
-            pass
-
-    # close open output files
-    outputTextFileContent.close()
-
-    # check and remove empty outfil with records
-    checkAndRemoveEmptyFile(outputFile) 
+                ooslaDigest.addIssue(issue, bucketState["jiraProject"], issueType, jiraPriority, slaState, jiraAgeInHours)
+                # in digest mode only JIRA tickets whose SLA state changed since the last run get a comment
+                if ooslaDigest.commentChangedIssues and reminderLedger is not None and reminderLedger.hasStateChanged(issue.key, slaState, reminderBucket):
+                    ooslaDigest.stats["changedIssuesCommented"] += 1
+                    addOrPlanOOSLAReminderAndWatchers(bucketState, issue, jiraAgeInHours, jiraPriority, OOSLA_TO_PRIORITY_DICT, jiraUser, jiraPwd, writePool, reminderLedger)
+            if ooslaReport is not None:
+                addToOoslaReport(ooslaReport, issue, bucketState["jiraProject"], jiraPriority, jiraAgeInHours, issueType, slaState, inReportWindow)
+            if outputTextFileContent is not None:
+                writeToOutputFile(issue, jiraPriority, int(jiraAgeInHours), issue.created, issueType, outputTextFileContent, slaState, inReportWindow)
+
+# peak resident memory of this process in MB
+def getPeakMemoryUsage():
+    if resource is None:
+        return None
+    peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    if sys.platform == "darwin":
+        return peakMemory / (1024 * 1024)
+    return peakMemory / 1024
+
+def printRunSummary(writePool=None, scanStats=None, issueIndex=None, reminderLedger=None, ooslaReports=None, requestMetrics=None, tracer=None, ooslaDigests=None, slaClock=None, ooslaHistories=None, scanSnapshots=None, reminderPlans=None):
+    print("\n++++++++++++++++++++++++++++++++++++ RUN SUMMARY ++++++++++++++++++++++++++++++++++++")
+    peakMemory = getPeakMemoryUsage()
+    if peakMemory is not None:
+        print("Peak memory usage        : " + str(round(peakMemory, 1)) + " MB")
+    if scanStats:
+        print("JIRA search requests     : " + str(scanStats.get("requests", 0)) + " (issues received: " + str(scanStats.get("issues", 0)) + ")")
+        print("JIRA search bytes        : " + jira_search.formatByteCount(scanStats.get("bytesReceived", 0)) + " received, " + jira_search.formatByteCount(scanStats.get("bytesDecoded", 0)) + " decoded")
+        if "requestsSaved" in scanStats:
+            print("Search requests saved    : " + str(scanStats["requestsSaved"]) + " by combined scan")
+        if "pushdownRemoved" in scanStats:
+            print("JQL pushdown removed     : " + str(scanStats["pushdownRemoved"]) + " JIRAs from search (count requests: " + str(scanStats["pushdownCountRequests"]) + ")")
+    jira_http_client.printConnectionStats()
+    if requestMetrics:
+        requestMetrics.printStats()
+    if writePool:
+        writePool.printStats()
+    if issueIndex:
+        issueIndex.printStats()
+    if reminderLedger:
+        reminderLedger.printStats()
+    if slaClock:
+        slaClock.printStats()
+    for ooslaReport in ooslaReports or []:
+        ooslaReport.printSummary()
+    for ooslaDigest in ooslaDigests or []:
+        ooslaDigest.printSummary()
+    for ooslaHistory in ooslaHistories or []:
+        ooslaHistory.printSummary()
+    for scanSnapshot in scanSnapshots or []:
+        scanSnapshot.printSummary()
+    for reminderPlan in reminderPlans or []:
+        reminderPlan.printSummary()
+    if tracer:
+        jira_trace.printSpanTotals(tracer)
+    print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+
+# re-notify interval from script option, onboarding JSON("REMINDER_RENOTIFY_HOURS") or default value
+def getRenotifyHours(scriptOptions, inputTeamJsonObject):
+    if scriptOptions.renotifyHours is not None:
+        return scriptOptions.renotifyHours
+    return inputTeamJsonObject.get("REMINDER_RENOTIFY_HOURS", jira_reminder_ledger.DEFAULT_RENOTIFY_HOURS)
+
+# split script args into positional args(team name, JIRA user and password) and optional settings
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Add OOSLA reminders in JIRA tickets of a team", add_help=False)
+    parser.add_argument('scriptArgs', nargs='*')
+    parser.add_argument('--max-concurrency', dest='maxConcurrency', type=int, default=jira_write_pool.DEFAULT_MAX_CONCURRENCY, help='Max number of JIRA comment/watcher calls running at the same time')
+    parser.add_argument('--combined-scan', dest='combinedScan', action='store_true', help='Scan all projects and priorities of the team using one JIRA query')
+    parser.add_argument('--use-index', dest='useIndex', action='store_true', help='Keep open issues in local SQLite index and search only issues updated since last run')
+    parser.add_argument('--full-resync', dest='fullResync', action='store_true', help='Rebuild local SQLite index with a full scan, implies --use-index')
+    parser.add_argument('--renotify-hours', dest='renotifyHours', type=int, help='Hours after which an unchanged JIRA ticket is reminded again')
+    parser.add_argument('--no-ledger', dest='noLedger', action='store_true', help='Add reminders and watchers on every run without checking reminder ledger')
+    parser.add_argument('--legacy-output-files', dest='legacyOutputFiles', action='store_true', help='Also write one HTML output file per project and priority')
+    parser.add_argument('--no-pushdown', dest='noPushdown', action='store_true', help='Search all open JIRAs instead of adding exception list and SLA age windows to JIRA query')
+    parser.add_argument('--trace', dest='trace', action='store_true', help='Write timings of run phases per project and priority as Chrome trace events')
+    parser.add_argument('--profile', dest='profile', action='store_true', help='Run under cProfile and write hot functions report')
+    parser.add_argument('--email-digest', dest='emailDigest', action='store_true', help='Email one digest per assignee and one to email_dl of the team instead of commenting on every JIRA')
+    parser.add_argument('--digest-comments', dest='digestComments', action='store_true', help='With --email-digest, also comment on JIRAs whose SLA state changed since the last run')
+    parser.add_argument('--sla-clock', dest='slaClock', action='store_true', help='Count SLA age only in SLA_ACTIVE_STATUSES of the team using cached JIRA changelogs')
+    parser.add_argument('--history', dest='history', action='store_true', help='Record daily and weekly OOSLA counts of the team for trend reports')
+    parser.add_argument('--snapshot', dest='snapshot', action='store_true', help='Save checked JIRAs with SLA ages in a gzip JSON lines snapshot for SLA table simulations')
+    parser.add_argument('--plan', dest='plan', action='store_true', help='Write due comments and watchers to a plan file without any write in JIRA, see apply_reminder_plan.py')
+    return parser.parse_args(scriptArgs)
 
 def validateScriptArgs(scriptArgs):
     if scriptArgs and len(scriptArgs) == 3:
@@ -451,6 +739,15 @@ def validateScriptArgs(scriptArgs):
         return
 
 def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    if scriptOptions.profile and validateScriptArgs(scriptOptions.scriptArgs):
+        # hot functions report is written once the run is complete
+        return jira_trace.profileCall(scriptOptions.scriptArgs[0] + "_profile", runReminders, scriptOptions)
+    return runReminders(scriptOptions)
+
+# check OOSLA of all projects and priorities of the team, add reminders and write reports
+def runReminders(scriptOptions):
+    scriptArgs = scriptOptions.scriptArgs
     if validateScriptArgs(scriptArgs):
         inputTeamName = scriptArgs[0]
         jiraUser = scriptArgs[1]
@@ -480,21 +777,132 @@ def main(scriptArgs):
         #inputJiraWatchers = inputTeamJsonObject["watchers"]
         # read jira issuetype
         #inputJiraIssueType = inputTeamJsonObject["JIRA_TYPE"]
-        # get all the open jiras based on input project and inpur jira priority
-        for inputJiraProject in inputTeamJsonObject["JIRA_PROJECTS"]:
-            if readJiraPriorityFromEnv:
-                get_all_open_jiras_in_last12_months(inputJiraProject, readJiraPriorityFromEnv.upper(), inputTeamJsonObject, inputTeamName, jiraUser, jiraPwd)    
-            else:
-                for inpurJiraPriority in inputTeamJsonObject["JIRA_PRIORITIES"]:
-                    get_all_open_jiras_in_last12_months(inputJiraProject, inpurJiraPriority, inputTeamJsonObject, inputTeamName, jiraUser, jiraPwd)        
+        # check only the priority from ENV variable if set else all the priorities of the team
+        if readJiraPriorityFromEnv:
+            inputJiraPriorities = [readJiraPriorityFromEnv.upper()]
+        else:
+            inputJiraPriorities = inputTeamJsonObject["JIRA_PRIORITIES"]
+        # dry run, comments and watchers are written to a plan file which is applied later by apply_reminder_plan.py
+        reminderPlan = None
+        if scriptOptions.plan:
+            reminderPlan = jira_reminder_plan.ReminderPlan(inputTeamName, not scriptOptions.noLedger, getRenotifyHours(scriptOptions, inputTeamJsonObject))
+        runTeamReminders(inputTeamName, inputTeamJsonObject, inputJiraPriorities, jiraUser, jiraPwd, scriptOptions, reminderPlan=reminderPlan)
     else:
         print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
         print("Invalid input parameters passed , kindly check and rerun ..... exiting ....") 
         print("Script to be run as:")
         print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
-        print("      python3 auto_oosla_reminder_for_jira.py [Team Name] [JIRA Username] [JIRA password]")
+        print("      python3 auto_oosla_reminder_for_jira.py [Team Name] [JIRA Username] [JIRA password] [--max-concurrency N] [--combined-scan] [--use-index] [--full-resync] [--renotify-hours N] [--no-ledger] [--legacy-output-files] [--no-pushdown] [--trace] [--profile] [--email-digest] [--digest-comments] [--sla-clock] [--history] [--snapshot] [--plan]")
         print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++") 
 
+# check OOSLA of input priorities of all projects of a team, add reminders and write reports
+# a long running caller(auto_oosla_reminder_daemon.py) passes its open issue index, which is synced but not closed here,
+# forces OOSLA reminders on or off using isBreachedReminderDay and writes report of the checked priorities to reportPrefix
+# with reminderPlan, comments and watchers are written to the plan and nothing is written in JIRA
+def runTeamReminders(inputTeamName, inputTeamJsonObject, inputJiraPriorities, jiraUser, jiraPwd, scriptOptions, issueIndex=None, isBreachedReminderDay=None, reportPrefix=None, reminderPlan=None):
+    # spans of run phases, recorded only with --trace
+    if scriptOptions.trace:
+        jira_trace.startTracing()
+    # per endpoint metrics of all the JIRA calls of this run
+    requestMetrics = jira_request_metrics.JiraRequestMetrics({"script": "auto_oosla_reminder_for_jira", "team": inputTeamName}).start()
+    # bounded pool for JIRA comment and watcher calls
+    writePool = jira_write_pool.AdaptiveWritePool(scriptOptions.maxConcurrency)
+    # search stats of all the scans of this run
+    scanStats = {}
+    # ledger of reminders and watchers already added, so that unchanged JIRA tickets are not commented again
+    reminderLedger = None
+    if not scriptOptions.noLedger:
+        reminderLedger = jira_reminder_ledger.JiraReminderLedger(renotifyHours = getRenotifyHours(scriptOptions, inputTeamJsonObject))
+    # consolidated HTML, CSV and JSON report of the team
+    ooslaReport = jira_oosla_report.OoslaReport(inputTeamName, JIRA_BROWSE_URL)
+    # email digest of the team, replaces per JIRA reminder comments
+    ooslaDigest = None
+    if scriptOptions.emailDigest:
+        ooslaDigest = jira_oosla_digest.OoslaDigest(inputTeamName, JIRA_BROWSE_URL, inputTeamJsonObject.get("email_dl"), scriptOptions.digestComments)
+        if scriptOptions.digestComments and reminderLedger is None:
+            print("Reminder ledger is off, so SLA state changes are not known and no JIRA gets a comment with --digest-comments")
+    # SLA age from time spent in active statuses, changelogs are cached across runs
+    slaClock = None
+    if scriptOptions.slaClock:
+        slaClock = jira_sla_clock.JiraSlaClock(JIRA_API_URL, (jiraUser, jiraPwd), jira_sla_clock.getTeamActiveStatuses(inputTeamJsonObject))
+    # daily and weekly counts and snapshot of all the checked JIRAs, JQL pushdown would leave out JIRAs which are not reminded in this run
+    ooslaHistory = None
+    scanSnapshot = None
+    jqlPushdown = not scriptOptions.noPushdown
+    if scriptOptions.history:
+        ooslaHistory = jira_oosla_history.OoslaHistory(inputTeamName)
+        jqlPushdown = False
+    if scriptOptions.snapshot:
+        scanSnapshot = jira_scan_snapshot.ScanSnapshot(inputTeamName, getTeamSlaTable(inputTeamJsonObject), slaClock is not None)
+        jqlPushdown = False
+    if issueIndex is not None or scriptOptions.useIndex or scriptOptions.fullResync:
+        # sync local index of every project with JIRA and then check open jiras using index
+        ownIssueIndex = issueIndex is None
+        if ownIssueIndex:
+            issueIndex = jira_issue_index.JiraIssueIndex()
+        for inputJiraProject in inputTeamJsonObject["JIRA_PROJECTS"]:
+            with jira_trace.traceSpan("index sync", "scan", project=inputJiraProject):
+                projectScanStats = issueIndex.syncProject(inputJiraProject, JIRA_API_URL, (jiraUser, jiraPwd), getSearchFields(inputTeamJsonObject, slaClock), scriptOptions.fullResync)
+            jira_search.mergeScanStats(scanStats, projectScanStats)
+            for inpurJiraPriority in inputJiraPriorities:
+                with jira_trace.traceSpan("bucket check", "bucket", project=inputJiraProject, priority=inpurJiraPriority):
+                    bucketState = openJiraBucket(inputJiraProject, inpurJiraPriority, inputTeamJsonObject, inputTeamName, ooslaReport, scriptOptions.legacyOutputFiles, isBreachedReminderDay, ooslaDigest, slaClock, ooslaHistory, scanSnapshot, reminderPlan)
+                    indexPages = issueIndex.iterOpenIssuePages(inputJiraProject, getJiraPrioritySearchString(inpurJiraPriority), inputTeamJsonObject["JIRA_TYPE"], issueFactory = jira_issue_record.IssueRecord.fromIssueDict)
+                    for indexedJiras in jira_trace.tracePages(indexPages, "index page read", "scan", project=inputJiraProject, priority=inpurJiraPriority):
+                        processJiraBucketPage(bucketState, indexedJiras, jiraUser, jiraPwd, writePool, reminderLedger)
+                    closeJiraBucket(bucketState)
+        if ownIssueIndex:
+            issueIndex.close()
+    elif scriptOptions.combinedScan:
+        # get all the open jiras of all input projects and priorities using one JIRA query
+        with jira_trace.traceSpan("combined scan", "bucket"):
+            get_all_open_jiras_with_combined_scan(inputTeamJsonObject["JIRA_PROJECTS"], inputJiraPriorities, inputTeamJsonObject, inputTeamName, jiraUser, jiraPwd, writePool, scanStats, reminderLedger, ooslaReport, scriptOptions.legacyOutputFiles, jqlPushdown, isBreachedReminderDay, ooslaDigest, slaClock, ooslaHistory, scanSnapshot, reminderPlan)
+    else:
+        # get all the open jiras based on input project and inpur jira priority
+        for inputJiraProject in inputTeamJsonObject["JIRA_PROJECTS"]:
+            for inpurJiraPriority in inputJiraPriorities:
+                with jira_trace.traceSpan("bucket scan", "bucket", project=inputJiraProject, priority=inpurJiraPriority):
+                    get_all_open_jiras_in_last12_months(inputJiraProject, inpurJiraPriority, inputTeamJsonObject, inputTeamName, jiraUser, jiraPwd, writePool, scanStats, reminderLedger, ooslaReport, scriptOptions.legacyOutputFiles, jqlPushdown, isBreachedReminderDay, ooslaDigest, slaClock, ooslaHistory, scanSnapshot, reminderPlan)
+
+    # wait for all the queued JIRA comment and watcher calls
+    with jira_trace.traceSpan("write pool drain", "write"):
+        writePool.close()
+    if reminderLedger:
+        reminderLedger.close()
+    if slaClock:
+        slaClock.close()
+    requestMetrics.stop()
+    if reminderPlan:
+        print("Plan written to " + reminderPlan.close() + ", use apply_reminder_plan.py to add the planned comments and watchers in JIRA")
+
+    # send digest emails once all the JIRAs of the run are known
+    if ooslaDigest and reminderPlan:
+        print("Digest emails are not sent with --plan")
+    elif ooslaDigest:
+        with jira_trace.traceSpan("digest send", "report"):
+            ooslaDigest.sendMessages()
+
+    if ooslaHistory:
+        with jira_trace.traceSpan("history write", "report"):
+            ooslaHistory.recordRun()
+    if scanSnapshot:
+        print("Snapshot written to " + scanSnapshot.close())
+
+    # write consolidated report of the team
+    with jira_trace.traceSpan("report write", "report"):
+        reportFiles = ooslaReport.writeReports(reportPrefix)
+    for reportFile in reportFiles:
+        print("Report written to " + reportFile)
+    for metricFile in requestMetrics.writeMetricFiles(inputTeamName + "_jira_metrics"):
+        print("Metrics written to " + metricFile)
+    tracer = jira_trace.stopTracing(inputTeamName + "_trace.json")
+    if tracer:
+        print("Trace written to " + inputTeamName + "_trace.json")
+
+    # print run summary
+    printRunSummary(writePool, scanStats, issueIndex, reminderLedger, [ooslaReport], requestMetrics, tracer, [ooslaDigest] if ooslaDigest else None, slaClock, [ooslaHistory] if ooslaHistory else None, [scanSnapshot] if scanSnapshot else None, [reminderPlan] if reminderPlan else None)
+    return ooslaReport
+
 if __name__ == "__main__":
     scriptArgs = sys.argv[1:]
     main(scriptArgs)
@@ -0,0 +1,357 @@
+import sys
+import os
+import time
+import socket
+import signal
+import argparse
+import datetime
+import threading
+import subprocess
+import jira_oosla_report
+import jira_reminder_ledger
+import jira_sla_clock
+import jira_work_queue
+import jira_write_pool
+import auto_oosla_reminder_for_jira as oosla
+import auto_oosla_fleet_reminder_for_jira as fleet
+
+'''
+  Script Name : auto_oosla_reminder_workers.py
+  Purpose     : Runs OOSLA reminders of the onboarded teams as (team, project, priority) scan units spread over any number of
+                worker processes on one or more hosts, used when one process checking all the teams is too slow e.g. the weekly
+                breached sweep
+                It works as follows:
+                  1. coordinator puts one unit per team, project and priority on the SQLite work queue(jira_work_queue.py) along
+                     with onboarding JSON of the teams, run settings and whether OOSLA JIRAs are reminded in this run
+                  2. worker processes claim units with a lease, renew the lease while a unit runs and store its report rows in the queue
+                     a unit whose worker crashed is claimed again once its lease expires, a failed unit is retried with backoff
+                     a worker which lost the lease of its unit stops the unit scan at the next page and drops its queued JIRA writes
+                  3. All the workers share one reminder ledger and claim a reminder in the ledger before adding the comment, so a
+                     unit run again after a crash or by two workers at once does not add a reminder twice
+                  4. coordinator waits until every unit is done or failed, merges report rows of the units of every team and writes
+                     <team>_oosla_report.html, <team>_oosla_report.csv and <team>_oosla_report.json same as auto_oosla_reminder_for_jira.py
+'''
+'''
+    Test this script in your test environment before using it in your production environment, make changes if required as per your environment setup etc
+'''
+
+'''
+    Usage:
+       python3 auto_oosla_reminder_workers.py coordinator [JIRA Username] [JIRA password] [--teams team1,team2] [--workers N]
+                                                          [--lease-seconds N] [--max-attempts N] [--poll-seconds N] [--no-pushdown]
+                                                          [--renotify-hours N] [--no-ledger] [--sla-clock] [--max-concurrency N]
+       python3 auto_oosla_reminder_workers.py worker [JIRA Username] [JIRA password] [--run-id ID] [--lease-seconds N]
+                                                     [--poll-seconds N] [--wait-for-runs] [--max-concurrency N]
+
+       --teams           : comma separated teams of onboard folder, default is all the onboarded teams
+       --workers         : number of worker processes started by coordinator on this host, default is 0 i.e. workers are started
+                           separately, output of a local worker is written to oosla_worker_<n>.log, a crashed local worker is restarted
+       --lease-seconds   : seconds a claimed unit stays leased without a renewal, default is 300, a worker renews it every third of it
+       --max-attempts    : claims of a unit before it is marked failed, default is 3
+       --poll-seconds    : seconds between two checks of the queue, default is 5
+       --run-id          : worker only claims units of this run and exits once the run is complete, default is units of any run
+       --wait-for-runs   : worker keeps waiting for new runs instead of exiting once no unit is pending or running
+       --no-pushdown, --renotify-hours, --no-ledger, --sla-clock, --max-concurrency
+                         : same as auto_oosla_reminder_for_jira.py, --max-concurrency applies to every worker
+
+       Workers on several hosts need the same JIRA_WORK_QUEUE_FILE(default jira_work_queue.db) and JIRA_REMINDER_LEDGER_FILE
+       (default jira_reminder_ledger.db) on a shared file system with working file locks, a worker with its own ledger file
+       can add a reminder which another worker already added
+       JIRA_PRIORITY env variable limits the run to one priority for all the teams, same as auto_oosla_reminder_for_jira.py
+'''
+
+DEFAULT_POLL_SECONDS = 5
+WORKER_LOG_FILE = "oosla_worker_%d.log"
+SCRIPT_MODES = ["coordinator", "worker"]
+
+def getTimestamp():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def printError(errorMessage):
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+    print(errorMessage)
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+
+def getWorkerId():
+    return socket.gethostname() + ":" + str(os.getpid())
+
+# onboarding JSON of teams listed in --teams or of all the onboarded teams
+def loadRunTeams(scriptOptions):
+    teamJsonObjects = fleet.loadOnboardedTeams()
+    if scriptOptions.teams:
+        teamNames = [teamName.strip() for teamName in scriptOptions.teams.split(",") if teamName.strip()]
+        for teamName in teamNames:
+            if teamName not in teamJsonObjects:
+                printError("Team input JSON file " + os.path.join(fleet.ONBOARD_FOLDER, teamName + ".json") + " not found or not valid, skipping team " + teamName)
+        teamJsonObjects = dict((teamName, teamJsonObjects[teamName]) for teamName in teamNames if teamName in teamJsonObjects)
+    return teamJsonObjects
+
+# (team, project, priority) of every scan unit of the teams
+def getUnitSpecs(teamJsonObjects):
+    return [(teamName, jiraProject, jiraPriority) for teamName, inputTeamJsonObject in sorted(teamJsonObjects.items())
+        for jiraProject in inputTeamJsonObject["JIRA_PROJECTS"] for jiraPriority in fleet.getTeamPriorities(inputTeamJsonObject)]
+
+# renews the lease of a running unit from its own thread and queue connection until the unit is over
+# once the lease is lost queued JIRA writes of the unit are dropped, the unit scan stops at the next page using leaseLost
+class LeaseKeeper:
+    def __init__(self, queueFile, claimedUnit, workerId, writePool=None):
+        self.queueFile = queueFile
+        self.claimedUnit = claimedUnit
+        self.workerId = workerId
+        self.writePool = writePool
+        self.stopEvent = threading.Event()
+        self.leaseLost = False
+        self.thread = threading.Thread(target=self.renewLeases, name="lease-keeper", daemon=True)
+
+    def renewLeases(self):
+        workQueue = jira_work_queue.JiraWorkQueue(self.queueFile)
+        try:
+            while not self.stopEvent.wait(self.claimedUnit["leaseSeconds"] / 3):
+                if not workQueue.renewLease(self.claimedUnit, self.workerId):
+                    # another worker claimed the unit, reminders stay single as they are claimed in the shared ledger
+                    printError("Lease of unit " + str(self.claimedUnit["unitId"]) + " was lost, its scan is stopped, queued JIRA writes are dropped and its results will not be stored")
+                    self.leaseLost = True
+                    if self.writePool:
+                        self.writePool.cancel()
+                    return
+        finally:
+            workQueue.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopEvent.set()
+        self.thread.join()
+
+# check one (team, project, priority) unit, add reminders and return report rows and stats of the unit
+# lease of the unit is renewed while it runs, the scan and its JIRA writes stop once the lease is lost
+def runUnit(claimedUnit, queueRun, jiraUser, jiraPwd, workerId, maxConcurrency, queueFile):
+    teamName = claimedUnit["team"]
+    inputTeamJsonObject = queueRun["teams"][teamName]
+    runSettings = queueRun["settings"]
+    writePool = jira_write_pool.AdaptiveWritePool(maxConcurrency)
+    reminderLedger = None
+    if not runSettings["noLedger"]:
+        renotifyHours = oosla.getRenotifyHours(argparse.Namespace(renotifyHours=runSettings["renotifyHours"]), inputTeamJsonObject)
+        reminderLedger = jira_reminder_ledger.JiraReminderLedger(renotifyHours = renotifyHours, claimOwner = workerId + "/unit-" + str(claimedUnit["unitId"]) + "/attempt-" + str(claimedUnit["attempt"]))
+    slaClock = None
+    if runSettings["slaClock"]:
+        slaClock = jira_sla_clock.JiraSlaClock(oosla.JIRA_API_URL, (jiraUser, jiraPwd), jira_sla_clock.getTeamActiveStatuses(inputTeamJsonObject))
+    ooslaReport = jira_oosla_report.OoslaReport(teamName, oosla.JIRA_BROWSE_URL)
+    scanStats = {}
+    with LeaseKeeper(queueFile, claimedUnit, workerId, writePool) as leaseKeeper:
+        try:
+            oosla.get_all_open_jiras_in_last12_months(claimedUnit["project"], claimedUnit["priority"], inputTeamJsonObject, teamName, jiraUser, jiraPwd, writePool, scanStats, reminderLedger, ooslaReport,
+                False, not runSettings["noPushdown"], runSettings["isBreachedReminderDay"], None, slaClock, stopScan = lambda: leaseKeeper.leaseLost)
+        finally:
+            # queued comment and watcher calls of the unit are done before the unit is completed, lease is renewed meanwhile
+            writePool.close()
+            if reminderLedger:
+                reminderLedger.close()
+            if slaClock:
+                slaClock.close()
+    return {
+        "rows": ooslaReport.rows,
+        "issues": scanStats.get("issues", 0),
+        "searchRequests": scanStats.get("requests", 0),
+        "writeTasks": writePool.stats["tasks"],
+        "writeFailed": writePool.stats["failed"],
+        "remindersAdded": reminderLedger.stats["remindersRecorded"] if reminderLedger else None
+    }
+
+def runWorker(jiraUser, jiraPwd, scriptOptions):
+    stopEvent = threading.Event()
+    def requestStop(signalNumber, stackFrame):
+        print(getTimestamp() + " : stop requested, exiting after the running unit")
+        stopEvent.set()
+    signal.signal(signal.SIGTERM, requestStop)
+    signal.signal(signal.SIGINT, requestStop)
+
+    workerId = getWorkerId()
+    workQueue = jira_work_queue.JiraWorkQueue()
+    queueRuns = {}
+    unitCounts = {"done": 0, "failed": 0}
+    print(getTimestamp() + " : worker " + workerId + " started, queue " + workQueue.queueFile + ", reminder ledger " + jira_reminder_ledger.getLedgerFile())
+    try:
+        while not stopEvent.is_set():
+            claimedUnit = workQueue.claimUnit(workerId, scriptOptions.leaseSeconds, scriptOptions.runId)
+            if claimedUnit is None:
+                if not scriptOptions.waitForRuns and not workQueue.isRunOpen(scriptOptions.runId):
+                    break
+                stopEvent.wait(scriptOptions.pollSeconds)
+                continue
+            if claimedUnit["runId"] not in queueRuns:
+                queueRuns[claimedUnit["runId"]] = workQueue.getRun(claimedUnit["runId"])
+            queueRun = queueRuns[claimedUnit["runId"]]
+            unitName = claimedUnit["team"] + " " + claimedUnit["project"] + " " + claimedUnit["priority"]
+            print("\n" + getTimestamp() + " : unit " + str(claimedUnit["unitId"]) + " (" + unitName + ") attempt " + str(claimedUnit["attempt"]) + " of run " + claimedUnit["runId"])
+            startTime = time.time()
+            try:
+                unitResult = runUnit(claimedUnit, queueRun, jiraUser, jiraPwd, workerId, scriptOptions.maxConcurrency, workQueue.queueFile)
+            except Exception as ex:
+                printError("Unit " + str(claimedUnit["unitId"]) + " (" + unitName + ") failed : " + repr(ex))
+                workQueue.failUnit(claimedUnit, workerId, repr(ex), queueRun["maxAttempts"])
+                unitCounts["failed"] += 1
+                continue
+            if workQueue.completeUnit(claimedUnit, workerId, unitResult):
+                print(getTimestamp() + " : unit " + str(claimedUnit["unitId"]) + " (" + unitName + ") done in " + str(round(time.time() - startTime, 1)) + " seconds, " + str(len(unitResult["rows"])) + " JIRAs listed")
+                unitCounts["done"] += 1
+            else:
+                printError("Unit " + str(claimedUnit["unitId"]) + " (" + unitName + ") was claimed by another worker, results of this attempt are dropped")
+    finally:
+        workQueue.close()
+    print(getTimestamp() + " : worker " + workerId + " stopped, " + str(unitCounts["done"]) + " units done, " + str(unitCounts["failed"]) + " failed")
+
+# worker processes on this host, started by coordinator with --workers
+class LocalWorkers:
+    def __init__(self, workerCount, jiraUser, jiraPwd, runId, scriptOptions):
+        self.workerArgs = [sys.executable, os.path.abspath(__file__), "worker", jiraUser, jiraPwd, "--run-id", runId, "--lease-seconds", str(scriptOptions.leaseSeconds),
+            "--poll-seconds", str(scriptOptions.pollSeconds), "--max-concurrency", str(scriptOptions.maxConcurrency)]
+        self.processes = [None] * workerCount
+        self.logFiles = [None] * workerCount
+        # a worker failing at start would be restarted forever, restarts are capped
+        self.restartsLeft = workerCount * scriptOptions.maxAttempts
+        for workerIndex in range(workerCount):
+            self.startWorker(workerIndex)
+
+    def startWorker(self, workerIndex):
+        if self.logFiles[workerIndex] is None:
+            self.logFiles[workerIndex] = open(WORKER_LOG_FILE % (workerIndex + 1), "w")
+        self.processes[workerIndex] = subprocess.Popen(self.workerArgs, stdout=self.logFiles[workerIndex], stderr=subprocess.STDOUT)
+
+    # restart workers which exited while the run is still open
+    def restartExitedWorkers(self):
+        for workerIndex, workerProcess in enumerate(self.processes):
+            exitCode = workerProcess.poll()
+            if exitCode is None or self.restartsLeft <= 0:
+                continue
+            print(getTimestamp() + " : local worker " + str(workerIndex + 1) + " exited with " + str(exitCode) + ", restarting it")
+            self.restartsLeft -= 1
+            self.startWorker(workerIndex)
+
+    def close(self):
+        for workerProcess in self.processes:
+            if workerProcess.poll() is None:
+                workerProcess.terminate()
+        for workerProcess in self.processes:
+            workerProcess.wait()
+        for logFile in self.logFiles:
+            logFile.close()
+
+# merge report rows of done units into one report per team
+def mergeUnitReports(teamNames, runUnits):
+    teamReports = dict((teamName, jira_oosla_report.OoslaReport(teamName, oosla.JIRA_BROWSE_URL)) for teamName in teamNames)
+    for runUnit in runUnits:
+        if runUnit["state"] == jira_work_queue.UNIT_DONE:
+            for reportRow in runUnit["result"]["rows"]:
+                teamReports[runUnit["team"]].addRow(*reportRow)
+    return teamReports
+
+def printCoordinatorSummary(runId, runUnits, startTime):
+    print("\n++++++++++++++++++++++++++++++++++++ RUN SUMMARY ++++++++++++++++++++++++++++++++++++")
+    doneUnits = [runUnit for runUnit in runUnits if runUnit["state"] == jira_work_queue.UNIT_DONE]
+    print("Work queue run           : " + runId + " in " + str(round(time.time() - startTime, 1)) + " seconds")
+    print("Units                    : " + str(len(doneUnits)) + " done, " + str(len(runUnits) - len(doneUnits)) + " failed, " + str(sum(1 for runUnit in runUnits if runUnit["attempts"] > 1)) + " needed more than one attempt")
+    print("JIRAs checked            : " + str(sum(runUnit["result"]["issues"] for runUnit in doneUnits)) + " in " + str(sum(runUnit["result"]["searchRequests"] for runUnit in doneUnits)) + " search requests")
+    print("JIRA write tasks         : " + str(sum(runUnit["result"]["writeTasks"] for runUnit in doneUnits)) + " (failed: " + str(sum(runUnit["result"]["writeFailed"] for runUnit in doneUnits)) + ")")
+    remindersAdded = [runUnit["result"]["remindersAdded"] for runUnit in doneUnits if runUnit["result"]["remindersAdded"] is not None]
+    if remindersAdded:
+        print("Reminders added          : " + str(sum(remindersAdded)))
+    print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+
+def runCoordinator(jiraUser, jiraPwd, scriptOptions):
+    teamJsonObjects = loadRunTeams(scriptOptions)
+    if not teamJsonObjects:
+        printError("No valid team input JSON file found in " + fleet.ONBOARD_FOLDER + " folder, kindly check and rerun ..... exiting ....")
+        sys.exit(1)
+    startTime = time.time()
+    workQueue = jira_work_queue.JiraWorkQueue()
+    runSettings = {
+        "noPushdown": scriptOptions.noPushdown,
+        "noLedger": scriptOptions.noLedger,
+        "renotifyHours": scriptOptions.renotifyHours,
+        "slaClock": scriptOptions.slaClock,
+        # decided once, so that all the workers of a run agree even if the run crosses midnight
+        "isBreachedReminderDay": oosla.getBreachedReminderFlag()
+    }
+    unitSpecs = getUnitSpecs(teamJsonObjects)
+    runId = workQueue.createRun(teamJsonObjects, unitSpecs, runSettings, scriptOptions.maxAttempts)
+    print(getTimestamp() + " : run " + runId + " queued with " + str(len(unitSpecs)) + " units of teams " + ", ".join(sorted(teamJsonObjects)) + " in " + workQueue.queueFile)
+    localWorkers = LocalWorkers(scriptOptions.workers, jiraUser, jiraPwd, runId, scriptOptions) if scriptOptions.workers > 0 else None
+    try:
+        lastUnitCounts = None
+        while True:
+            unitCounts = workQueue.getUnitCounts(runId)
+            if unitCounts != lastUnitCounts:
+                print(getTimestamp() + " : " + ", ".join(str(unitCounts[unitState]) + " " + unitState for unitState in jira_work_queue.UNIT_STATES))
+                lastUnitCounts = unitCounts
+            if not workQueue.isRunOpen(runId):
+                break
+            if localWorkers:
+                localWorkers.restartExitedWorkers()
+            time.sleep(scriptOptions.pollSeconds)
+    finally:
+        if localWorkers:
+            localWorkers.close()
+    runUnits = workQueue.getRunUnits(runId)
+    workQueue.close()
+
+    teamReports = mergeUnitReports(teamJsonObjects, runUnits)
+    for teamReport in teamReports.values():
+        for reportFile in teamReport.writeReports():
+            print("Report written to " + reportFile)
+    printCoordinatorSummary(runId, runUnits, startTime)
+    for teamReport in teamReports.values():
+        teamReport.printSummary()
+    failedUnits = [runUnit for runUnit in runUnits if runUnit["state"] == jira_work_queue.UNIT_FAILED]
+    if failedUnits:
+        printError(str(len(failedUnits)) + " units failed, reports do not list their JIRAs :\n" + "\n".join(
+            "  " + runUnit["team"] + " " + runUnit["project"] + " " + runUnit["priority"] + " after " + str(runUnit["attempts"]) + " attempts : " + str(runUnit["lastError"]) for runUnit in failedUnits))
+        sys.exit(1)
+
+# split script args into positional args(mode, JIRA user and password) and optional settings
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Run OOSLA reminders of the onboarded teams on a work queue shared by worker processes", add_help=False)
+    parser.add_argument('scriptArgs', nargs='*')
+    parser.add_argument('--teams', dest='teams', help='Comma separated teams of onboard folder, default is all the onboarded teams')
+    parser.add_argument('--workers', dest='workers', type=int, default=0, help='Number of worker processes started by coordinator on this host')
+    parser.add_argument('--lease-seconds', dest='leaseSeconds', type=int, default=jira_work_queue.DEFAULT_LEASE_SECONDS, help='Seconds a claimed unit stays leased without a renewal')
+    parser.add_argument('--max-attempts', dest='maxAttempts', type=int, default=jira_work_queue.DEFAULT_MAX_ATTEMPTS, help='Claims of a unit before it is marked failed')
+    parser.add_argument('--poll-seconds', dest='pollSeconds', type=float, default=DEFAULT_POLL_SECONDS, help='Seconds between two checks of the queue')
+    parser.add_argument('--run-id', dest='runId', help='Worker only claims units of this run')
+    parser.add_argument('--wait-for-runs', dest='waitForRuns', action='store_true', help='Worker keeps waiting for new runs')
+    parser.add_argument('--no-pushdown', dest='noPushdown', action='store_true', help='Search all open JIRAs instead of adding exception list and SLA age windows to JIRA query')
+    parser.add_argument('--renotify-hours', dest='renotifyHours', type=int, help='Hours after which an unchanged JIRA ticket is reminded again')
+    parser.add_argument('--no-ledger', dest='noLedger', action='store_true', help='Add reminders and watchers on every run without checking reminder ledger')
+    parser.add_argument('--sla-clock', dest='slaClock', action='store_true', help='Count SLA age only in SLA_ACTIVE_STATUSES of the team using cached JIRA changelogs')
+    parser.add_argument('--max-concurrency', dest='maxConcurrency', type=int, default=jira_write_pool.DEFAULT_MAX_CONCURRENCY, help='Max number of JIRA comment/watcher calls running at the same time in a worker')
+    return parser.parse_args(scriptArgs)
+
+def validateScriptArgs(scriptArgs):
+    if scriptArgs and len(scriptArgs) == 3 and scriptArgs[0] in SCRIPT_MODES:
+        return "valid"
+    else:
+        return
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    if validateScriptArgs(scriptOptions.scriptArgs):
+        scriptMode, jiraUser, jiraPwd = scriptOptions.scriptArgs
+        if scriptMode == "coordinator":
+            runCoordinator(jiraUser, jiraPwd, scriptOptions)
+        else:
+            runWorker(jiraUser, jiraPwd, scriptOptions)
+    else:
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        print("Invalid input parameters passed , kindly check and rerun ..... exiting ....")
+        print("Script to be run as:")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+        print("      python3 auto_oosla_reminder_workers.py coordinator [JIRA Username] [JIRA password] [--teams team1,team2] [--workers N] [--lease-seconds N] [--max-attempts N] [--poll-seconds N] [--no-pushdown] [--renotify-hours N] [--no-ledger] [--sla-clock] [--max-concurrency N]")
+        print("      python3 auto_oosla_reminder_workers.py worker [JIRA Username] [JIRA password] [--run-id ID] [--lease-seconds N] [--poll-seconds N] [--wait-for-runs] [--max-concurrency N]")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+
+if __name__ == "__main__":
+    scriptArgs = sys.argv[1:]
+    main(scriptArgs)
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import urllib.request
+
+BENCHMARK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_FOLDER, ".."))
+
+'''
+  Script Name : bench_end_to_end.py
+  Purpose     : End to end benchmark of auto_oosla_reminder_for_jira.py and close_jiras_using_jira_query.py against the local
+                fake JIRA server(fake_jira_server.py)
+                It works as follows:
+                  1. For every issue count, starts the fake JIRA server in its own process with that many synthetic issues
+                  2. Runs every scenario in its own process, so that peak RSS is of the scenario only
+                       reminder : auto_oosla_reminder_for_jira.main for a team onboarded with all the fake projects
+                       digest   : same as reminder with --email-digest, emails go to an in process fake SMTP server(fake_smtp_server.py)
+                       close    : close_jiras_using_jira_query.findAndCloseJiraTickets for all open issues of first fake project
+                     output of the scripts is discarded, report and ledger files are written to a temp folder
+                  3. Prints wall time, requests served by the fake server per endpoint, emails sent and peak RSS of every scenario
+                  4. Fails when any search page(same JQL, fields, startAt and maxResults) was fetched more than once
+
+    Usage:
+       python3 benchmarks/bench_end_to_end.py [--sizes 1000,10000,100000] [--scenarios reminder,digest,close] [--projects N]
+                                              [--latency-ms N] [--throttle-rate R] [--error-rate R] [--max-concurrency N]
+'''
+
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_SCENARIOS = "reminder,close"
+BENCH_TEAM_NAME = "benchteam"
+
+def getPeakRssMB():
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peakRss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def writeTeamJsonFile(workFolder, projectCount):
+    import fake_jira_server
+    os.makedirs(os.path.join(workFolder, "onboard"), exist_ok=True)
+    teamJsonObject = {
+        "JIRA_PROJECTS": fake_jira_server.getProjectKeys(projectCount),
+        "JIRA_TYPE": ["\"Security Defect\"", "Privacy", "Bug"],
+        "JIRA_PRIORITIES": ["P0", "P1", "P2", "P3"],
+        "watchers": ["user1", "user2"],
+        "email_dl": ["bench@email.com"],
+        "exception_jira_list": []
+    }
+    with open(os.path.join(workFolder, "onboard", BENCH_TEAM_NAME + ".json"), "w") as teamJsonFile:
+        json.dump(teamJsonObject, teamJsonFile, indent=4)
+
+def runReminderScenario(jiraURL, workFolder, scriptOptions):
+    import auto_oosla_reminder_for_jira
+    writeTeamJsonFile(workFolder, scriptOptions.projectCount)
+    os.environ["JIRA_REMINDER_LEDGER_FILE"] = os.path.join(workFolder, "jira_reminder_ledger.db")
+    auto_oosla_reminder_for_jira.JIRA_ROOT_API_URL = jiraURL + "/rest/api/2"
+    auto_oosla_reminder_for_jira.JIRA_API_URL = jiraURL + "/rest/api/2/search"
+    auto_oosla_reminder_for_jira.main([BENCH_TEAM_NAME, "benchuser", "benchpassword", "--max-concurrency", str(scriptOptions.maxConcurrency)])
+
+def runDigestScenario(jiraURL, workFolder, scriptOptions):
+    import auto_oosla_reminder_for_jira
+    import fake_smtp_server
+    smtpServer = fake_smtp_server.FakeSmtpServer().startInBackground()
+    try:
+        writeTeamJsonFile(workFolder, scriptOptions.projectCount)
+        os.environ["JIRA_REMINDER_LEDGER_FILE"] = os.path.join(workFolder, "jira_reminder_ledger.db")
+        os.environ["DIGEST_SMTP_HOST"] = "127.0.0.1"
+        os.environ["DIGEST_SMTP_PORT"] = str(smtpServer.server_address[1])
+        auto_oosla_reminder_for_jira.JIRA_ROOT_API_URL = jiraURL + "/rest/api/2"
+        auto_oosla_reminder_for_jira.JIRA_API_URL = jiraURL + "/rest/api/2/search"
+        auto_oosla_reminder_for_jira.main([BENCH_TEAM_NAME, "benchuser", "benchpassword", "--max-concurrency", str(scriptOptions.maxConcurrency), "--email-digest"])
+        return {"emails": len(smtpServer.getMessages())}
+    finally:
+        smtpServer.shutdown()
+        smtpServer.server_close()
+
+def runCloseScenario(jiraURL, workFolder, scriptOptions):
+    import close_jiras_using_jira_query
+    close_jiras_using_jira_query.findAndCloseJiraTickets({
+        "jira_query": "project = BENCH1 AND status in (Open, \"In Progress\")",
+        "jira_user": "benchuser",
+        "jira_user_password": "benchpassword",
+        "action_type": "close",
+        "jira_server": jiraURL,
+        "max_workers": scriptOptions.maxConcurrency,
+        "journal": os.path.join(workFolder, "close_jiras_journal_bench.jsonl")
+    })
+
+SCENARIOS = {
+    "reminder": runReminderScenario,
+    "digest": runDigestScenario,
+    "close": runCloseScenario
+}
+
+# runs in the scenario process, prints wall time and peak RSS as JSON
+def runScenario(scriptOptions):
+    with tempfile.TemporaryDirectory() as workFolder:
+        os.chdir(workFolder)
+        startTime = time.perf_counter()
+        with open(os.devnull, "w") as devNull, contextlib.redirect_stdout(devNull):
+            scenarioResult = SCENARIOS[scriptOptions.runScenario](scriptOptions.jiraURL, workFolder, scriptOptions) or {}
+        scenarioResult["wallSeconds"] = time.perf_counter() - startTime
+    scenarioResult["peakRssMB"] = getPeakRssMB()
+    print(json.dumps(scenarioResult))
+
+def getFakeServerStats(jiraURL):
+    with urllib.request.urlopen(jiraURL + "/_fake/stats") as statsResponse:
+        return json.loads(statsResponse.read())
+
+# every scenario is a separate run, pages fetched by an earlier scenario are not duplicates
+def resetFakeServerPages(jiraURL):
+    with urllib.request.urlopen(urllib.request.Request(jiraURL + "/_fake/reset-pages", data=b"", method="POST")):
+        pass
+
+def startFakeServer(issueCount, scriptOptions):
+    serverArgs = [sys.executable, os.path.join(BENCHMARK_FOLDER, "fake_jira_server.py"), "--issues", str(issueCount), "--projects", str(scriptOptions.projectCount),
+        "--latency-ms", str(scriptOptions.latencyMs), "--throttle-rate", str(scriptOptions.throttleRate), "--error-rate", str(scriptOptions.errorRate)]
+    serverProcess = subprocess.Popen(serverArgs, stdout=subprocess.PIPE, text=True)
+    listeningLine = serverProcess.stdout.readline()
+    if not listeningLine.startswith("listening on "):
+        serverProcess.kill()
+        raise RuntimeError("fake JIRA server did not start : " + listeningLine)
+    return serverProcess, "http://127.0.0.1:" + listeningLine.split()[-1]
+
+def getRequestCountsDelta(statsBefore, statsAfter):
+    return dict((endpointName, requestCount - statsBefore["requests"].get(endpointName, 0)) for endpointName, requestCount in sorted(statsAfter["requests"].items()) if requestCount - statsBefore["requests"].get(endpointName, 0))
+
+def runBenchmark(scriptOptions):
+    duplicatePageFetches = 0
+    for issueCount in [int(sizeText) for sizeText in scriptOptions.sizes.split(",")]:
+        serverProcess, jiraURL = startFakeServer(issueCount, scriptOptions)
+        try:
+            for scenarioName in scriptOptions.scenarios.split(","):
+                resetFakeServerPages(jiraURL)
+                statsBefore = getFakeServerStats(jiraURL)
+                scenarioArgs = [sys.executable, os.path.abspath(__file__), "--run-scenario", scenarioName, "--jira-url", jiraURL, "--projects", str(scriptOptions.projectCount), "--max-concurrency", str(scriptOptions.maxConcurrency)]
+                scenarioResult = json.loads(subprocess.run(scenarioArgs, stdout=subprocess.PIPE, text=True, check=True).stdout.strip().splitlines()[-1])
+                statsAfter = getFakeServerStats(jiraURL)
+                requestCounts = getRequestCountsDelta(statsBefore, statsAfter)
+                scenarioDuplicates = statsAfter["duplicatePageFetches"] - statsBefore["duplicatePageFetches"]
+                duplicatePageFetches += scenarioDuplicates
+                print((scenarioName + " " + str(issueCount) + " issues").ljust(25) + ": " + str(round(scenarioResult["wallSeconds"], 2)) + " seconds, "
+                    + str(sum(requestCounts.values())) + " requests (" + ", ".join(endpointName + " " + str(requestCount) for endpointName, requestCount in requestCounts.items()) + "), "
+                    + ("emails " + str(scenarioResult["emails"]) + ", " if "emails" in scenarioResult else "")
+                    + "peak RSS " + str(scenarioResult["peakRssMB"]) + " MB, duplicate pages " + str(scenarioDuplicates), flush=True)
+        finally:
+            serverProcess.kill()
+            serverProcess.wait()
+    if duplicatePageFetches:
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        print(str(duplicatePageFetches) + " search pages were fetched more than once")
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        sys.exit(1)
+
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="End to end benchmark against local fake JIRA server")
+    parser.add_argument('--sizes', dest='sizes', default=DEFAULT_SIZES, help='Comma separated issue counts')
+    parser.add_argument('--scenarios', dest='scenarios', default=DEFAULT_SCENARIOS, help='Comma separated scenarios, ' + "/".join(SCENARIOS))
+    parser.add_argument('--projects', dest='projectCount', type=int, default=2, help='Number of fake JIRA projects')
+    parser.add_argument('--latency-ms', dest='latencyMs', type=float, default=0, help='Latency added by fake server to every call')
+    parser.add_argument('--throttle-rate', dest='throttleRate', type=float, default=0, help='Ratio of calls throttled with 429 by fake server')
+    parser.add_argument('--error-rate', dest='errorRate', type=float, default=0, help='Ratio of write calls failed with 500 by fake server')
+    parser.add_argument('--max-concurrency', dest='maxConcurrency', type=int, default=8, help='Max concurrent write calls of the scripts')
+    # used by the benchmark to run one scenario in its own process
+    parser.add_argument('--run-scenario', dest='runScenario', choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument('--jira-url', dest='jiraURL', help=argparse.SUPPRESS)
+    return parser.parse_args(scriptArgs)
+
+if __name__ == "__main__":
+    scriptOptions = parseScriptOptions(sys.argv[1:])
+    if scriptOptions.runScenario:
+        runScenario(scriptOptions)
+    else:
+        runBenchmark(scriptOptions)
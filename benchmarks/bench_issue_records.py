@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+BENCHMARK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_FOLDER, ".."))
+import fake_jira_server
+import jira_search
+import jira_issue_record
+import auto_oosla_reminder_for_jira
+
+'''
+  Script Name : bench_issue_records.py
+  Purpose     : Memory comparison of JIRA search results kept as nested dicts and as IssueRecord objects
+                It works as follows:
+                  1. Generates synthetic issues using fake_jira_server.py and renders them as JIRA search response pages with
+                     the fields asked by auto_oosla_reminder_for_jira.py
+                  2. Decodes all the pages and keeps all the issues, once with json.loads(nested dicts of every page) and once
+                     with incremental decoding into IssueRecord objects
+                  3. Prints decode time, memory held by the kept issues and peak memory while decoding for both the ways
+                     memory is measured with tracemalloc, page texts are created before tracing starts and are not counted
+
+    Usage:
+       python3 benchmarks/bench_issue_records.py [number of issues, default 100000]
+'''
+
+DEFAULT_ISSUE_COUNT = 100000
+PAGE_SIZE = 100
+
+def getSearchResponseTexts(issueCount):
+    searchFields = set(auto_oosla_reminder_for_jira.DEFAULT_SEARCH_FIELDS)
+    issues = fake_jira_server.generateIssues(issueCount, 2)
+    responseTexts = []
+    for startAt in range(0, issueCount, PAGE_SIZE):
+        pageIssues = [{"key": issue["key"], "fields": dict((fieldName, fieldValue) for fieldName, fieldValue in issue["fields"].items() if fieldName in searchFields)} for issue in issues[startAt:startAt + PAGE_SIZE]]
+        responseTexts.append(json.dumps({"startAt": startAt, "maxResults": PAGE_SIZE, "total": issueCount, "issues": pageIssues}))
+    return responseTexts
+
+def decodeAsDicts(responseText):
+    return json.loads(responseText)["issues"]
+
+def decodeAsRecords(responseText):
+    return jira_search.decodeSearchPage(responseText, jira_issue_record.IssueRecord.fromIssueDict)["issues"]
+
+def measureDecode(responseTexts, decodePage):
+    tracemalloc.start()
+    startTime = time.perf_counter()
+    keptIssues = []
+    for responseText in responseTexts:
+        keptIssues.extend(decodePage(responseText))
+    decodeSeconds = time.perf_counter() - startTime
+    heldBytes, peakBytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(keptIssues), decodeSeconds, heldBytes, peakBytes
+
+def main(issueCount):
+    responseTexts = getSearchResponseTexts(issueCount)
+    print("Search responses".ljust(25) + ": " + str(len(responseTexts)) + " pages, " + jira_search.formatByteCount(sum(len(responseText) for responseText in responseTexts)))
+    results = {}
+    for decodeName, decodePage in [("nested dicts", decodeAsDicts), ("IssueRecord", decodeAsRecords)]:
+        keptCount, decodeSeconds, heldBytes, peakBytes = measureDecode(responseTexts, decodePage)
+        results[decodeName] = heldBytes
+        print(decodeName.ljust(25) + ": " + str(keptCount) + " issues in " + str(round(decodeSeconds, 2)) + " seconds, held " + jira_search.formatByteCount(heldBytes)
+            + " (" + str(heldBytes // max(1, keptCount)) + " bytes per issue), peak " + jira_search.formatByteCount(peakBytes))
+    print("Memory saved".ljust(25) + ": " + str(round(100 - results["IssueRecord"] * 100 / max(1, results["nested dicts"]), 1)) + "%")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ISSUE_COUNT)
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import jira_oosla_report
+
+'''
+  Script Name : bench_oosla_report.py
+  Purpose     : Micro-benchmark of the consolidated OOSLA report renderer
+                It works as follows:
+                  1. Adds synthetic rows with random priority, assignee, environment and age to a report
+                  2. Writes HTML, CSV and JSON reports to a temp folder and prints time taken to add and to render the rows
+
+    Usage:
+       python3 benchmarks/bench_oosla_report.py [number of rows, default 100000]
+'''
+
+PRIORITIES = ["P0", "P1", "P2", "P3"]
+ISSUE_TYPES = ["Bug", "Task", "Security Defect", "Privacy"]
+ENVIRONMENTS = ["Prod", "Stage", "Unknown"]
+STATES = ["oosla", "soonToBeOosla"]
+
+def main(rowCount):
+    random.seed(42)
+    assignees = ["user" + str(userIndex) for userIndex in range(500)] + ["Unassigned"]
+    ooslaReport = jira_oosla_report.OoslaReport("bench", "https://jira.com/browse/")
+    startTime = time.perf_counter()
+    for rowIndex in range(rowCount):
+        ooslaReport.addRow("BENCH-" + str(rowIndex), "BENCH", random.choice(ISSUE_TYPES), random.choice(ENVIRONMENTS), random.choice(PRIORITIES), random.choice(assignees), random.choice(STATES), "2024-01-31T10:20:30.000+0000", random.uniform(0, 8760))
+    addSeconds = time.perf_counter() - startTime
+    with tempfile.TemporaryDirectory() as reportFolder:
+        startTime = time.perf_counter()
+        reportFiles = ooslaReport.writeReports(os.path.join(reportFolder, "bench_oosla_report"))
+        renderSeconds = time.perf_counter() - startTime
+        reportBytes = sum(os.path.getsize(reportFile) for reportFile in reportFiles)
+    print("Report rows              : " + str(rowCount))
+    print("Rows added in            : " + str(round(addSeconds, 3)) + " seconds (includes random row generation)")
+    print("HTML, CSV, JSON written  : " + str(round(renderSeconds, 3)) + " seconds, " + str(round(reportBytes / (1024 * 1024), 1)) + " MB")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import random
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import jira_sla_engine
+import auto_oosla_reminder_for_jira
+
+'''
+  Script Name : bench_sla_engine.py
+  Purpose     : Micro-benchmark comparing table driven SLA classification with the earlier per-issue path
+                It works as follows:
+                  1. Generates synthetic issues with random priority, issue type and created timestamp
+                  2. Classifies them one by one using parseAndGetDateObject and P0-P3 if/elif checks as done earlier
+                  3. Classifies them page by page using jira_sla_engine and prints time taken by both
+
+    Usage:
+       python3 benchmarks/bench_sla_engine.py [number of issues, default 100000]
+'''
+
+PAGE_SIZE = 100
+ISSUE_TYPES = ["Bug", "Task", "Story", "Security Defect", "Privacy"]
+PRIORITIES = ["P0", "P1", "P2", "P3"]
+# lead windows hard coded in the earlier P0-P3 checks, security value is used for security JIRAs
+LEGACY_REMINDER_START_HOURS = { "P0": (6, 6), "P1": (48, 48), "P2": (168, 480), "P3": (480, 1800) }
+
+def generateIssues(issueCount):
+    random.seed(42)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    issues = []
+    for issueIndex in range(issueCount):
+        created = now - datetime.timedelta(hours=random.uniform(0, 8760))
+        issues.append({
+            "key": "BENCH-" + str(issueIndex),
+            "priority": random.choice(PRIORITIES),
+            "fields": {
+                "created": created.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+                "issuetype": { "name": random.choice(ISSUE_TYPES) }
+            }
+        })
+    return issues
+
+# per-issue classification as done by the script before SLA table
+def classifyLegacy(issues):
+    states = []
+    for issue in issues:
+        jiraPriority = issue["priority"]
+        jiraCreationDate = auto_oosla_reminder_for_jira.parseAndGetDateObject(issue["fields"]["created"])
+        jiraAgeInHours = abs(jiraCreationDate - datetime.datetime.now()).total_seconds() / 3600 + 8
+        issueType = issue["fields"]["issuetype"]["name"]
+        if issueType not in auto_oosla_reminder_for_jira.SECURITY_ISSUE_TYPE_LIST and issueType not in ["Bug", "Task"] and jiraAgeInHours < 4380:
+            states.append("ok")
+            continue
+        isSecurity = issueType in auto_oosla_reminder_for_jira.SECURITY_ISSUE_TYPE_LIST
+        OOSLA_TO_PRIORITY_DICT = auto_oosla_reminder_for_jira.SEC_OOSLA_TO_PRIORITY_DICT if isSecurity else auto_oosla_reminder_for_jira.NONSEC_OOSLA_TO_PRIORITY_DICT
+        if jiraAgeInHours > OOSLA_TO_PRIORITY_DICT[jiraPriority]:
+            states.append("oosla")
+        elif jiraAgeInHours > LEGACY_REMINDER_START_HOURS[jiraPriority][isSecurity] and jiraAgeInHours < OOSLA_TO_PRIORITY_DICT[jiraPriority]:
+            states.append("soonToBeOosla")
+        else:
+            states.append("ok")
+    return states
+
+# page wise classification using SLA table, issues are grouped by priority as done by the output buckets
+def classifyWithEngine(issues):
+    slaTable = jira_sla_engine.buildSlaTable(auto_oosla_reminder_for_jira.NONSEC_OOSLA_TO_PRIORITY_DICT, auto_oosla_reminder_for_jira.SEC_OOSLA_TO_PRIORITY_DICT)
+    stateCount = 0
+    for jiraPriority in PRIORITIES:
+        priorityIssues = [issue for issue in issues if issue["priority"] == jiraPriority]
+        for pageStart in range(0, len(priorityIssues), PAGE_SIZE):
+            pageIssues = priorityIssues[pageStart:pageStart + PAGE_SIZE]
+            states = jira_sla_engine.classifyIssues(slaTable, jiraPriority, [issue["fields"]["created"] for issue in pageIssues], [issue["fields"]["issuetype"]["name"] for issue in pageIssues], auto_oosla_reminder_for_jira.SECURITY_ISSUE_TYPE_LIST)[2]
+            stateCount += len(states)
+    return stateCount
+
+def main(issueCount):
+    issues = generateIssues(issueCount)
+    startTime = time.perf_counter()
+    classifyLegacy(issues)
+    legacySeconds = time.perf_counter() - startTime
+    startTime = time.perf_counter()
+    classifyWithEngine(issues)
+    engineSeconds = time.perf_counter() - startTime
+    print("Issues classified        : " + str(issueCount))
+    print("Per-issue path           : " + str(round(legacySeconds, 3)) + " seconds")
+    print("SLA table engine         : " + str(round(engineSeconds, 3)) + " seconds")
+    print("Speedup                  : " + str(round(legacySeconds / engineSeconds, 2)) + "x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
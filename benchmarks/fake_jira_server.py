@@ -0,0 +1,461 @@
+import re
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import functools
+import datetime
+import threading
+import collections
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+'''
+  Script Name : fake_jira_server.py
+  Purpose     : Local stand-in for JIRA REST API v2 used by benchmarks, never use it as a real JIRA
+                It works as follows:
+                  1. Generates synthetic open issues across projects, priorities, issue types, assignees and creation dates
+                     some of the issues spent a while in a paused status(Blocked, Waiting for customer), their status changes
+                     are returned in changelog of search results with expand=changelog
+                  2. Serves the endpoints used by the scripts of this repo:
+                       GET  /rest/api/2/serverInfo
+                       GET  /rest/api/2/search                     (JQL clauses used by the scripts with AND, OR and parentheses, startAt/maxResults paging, total, fields, expand=changelog)
+                       POST /rest/api/2/issue/{key}/comment
+                       POST /rest/api/2/issue/{key}/watchers
+                       GET  /rest/api/2/issue/{key}/transitions   (expand=transitions.fields)
+                       POST /rest/api/2/issue/{key}/transitions
+                  3. Adds configurable latency, server errors on write calls and 429 throttling with Retry-After on all calls
+                  4. Counts requests per endpoint, search pages fetched more than once(same JQL, startAt and maxResults) and
+                     comments per issue
+                     counters are served as JSON on GET /_fake/stats, POST /_fake/reset-pages forgets fetched pages so that
+                     another run of a script against the same server is not counted as duplicate fetches
+                  5. Sends every response using one socket write, so that Nagle/delayed ACK does not add latency to small responses
+
+    Usage:
+       python3 benchmarks/fake_jira_server.py [--issues N] [--projects N] [--port N] [--latency-ms N] [--jitter-ms N]
+                                              [--error-rate R] [--throttle-rate R] [--retry-after N] [--max-results N]
+       prints "listening on <port>" once ready, --port 0 picks a free port
+'''
+
+PRIORITY_NAMES = ["P0: Immediate", "P1: High", "P2: Medium", "P3: Low"]
+ISSUE_TYPES = ["Bug", "Task", "Story", "Security Defect", "Privacy"]
+OPEN_STATUSES = ["Open", "In Progress"]
+ENVIRONMENTS = ["Prod", "Stage", "QA"]
+PAUSED_STATUSES = ["Blocked", "Waiting for customer"]
+# ratio of issues which spent a while in a paused status
+PAUSED_ISSUE_RATE = 0.4
+DEFAULT_MAX_RESULTS = 100
+# issues are created within these many days before now, some of them fall outside the 12 months window of the scripts
+CREATED_WITHIN_DAYS = 400
+JIRA_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.000+0000"
+ISSUE_PATH_PATTERN = re.compile(r"^/rest/api/2/issue/([^/]+)/(comment|watchers|transitions)$")
+JQL_TOKEN_PATTERN = re.compile(r'\s*(?:(?P<paren>[()])|(?P<joiner>AND|OR)\b|(?P<field>\w+)\s*(?P<operator>not\s+in\b|in\b|>=|<=|!=|=)\s*(?P<value>\([^)]*\)|"[^"]*"|[^\s()]+))\s*', re.IGNORECASE)
+CLOSE_TRANSITION = {"id": "31", "name": "Close Issue", "to": {"name": "Closed"}, "fields": {"resolution": {"required": True, "name": "Resolution"}, "fixVersions": {"required": False, "name": "Fix Version/s"}}}
+START_TRANSITION = {"id": "11", "name": "Start Progress", "to": {"name": "In Progress"}, "fields": {}}
+
+def getProjectKeys(projectCount):
+    return ["BENCH" + str(projectIndex + 1) for projectIndex in range(projectCount)]
+
+# synthetic open issues, same seed gives same issues
+def generateIssues(issueCount, projectCount, seed=42):
+    randomGenerator = random.Random(seed)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    projectKeys = getProjectKeys(projectCount)
+    assignees = ["user" + str(userIndex) for userIndex in range(200)]
+    issues = []
+    for issueIndex in range(issueCount):
+        projectKey = projectKeys[issueIndex % projectCount]
+        created = (now - datetime.timedelta(hours=randomGenerator.uniform(0, CREATED_WITHIN_DAYS * 24))).strftime(JIRA_TIMESTAMP_FORMAT)
+        assignee = randomGenerator.choice(assignees)
+        issues.append({
+            "key": projectKey + "-" + str(issueIndex + 1),
+            "fields": {
+                "summary": "Synthetic issue " + str(issueIndex + 1),
+                "created": created,
+                "updated": created,
+                "status": {"name": randomGenerator.choice(OPEN_STATUSES)},
+                "issuetype": {"name": randomGenerator.choice(ISSUE_TYPES)},
+                "priority": {"name": randomGenerator.choice(PRIORITY_NAMES)},
+                "project": {"key": projectKey, "name": projectKey},
+                "assignee": None if randomGenerator.random() < 0.1 else {"name": assignee, "emailAddress": assignee + "@example.com"},
+                "environment": randomGenerator.choice(ENVIRONMENTS),
+                "customfield_123": None,
+                "watchers": {"watchCount": 0, "isWatching": False}
+            }
+        })
+    addChangelogs(issues, now, seed)
+    return issues
+
+def getChangelogHistory(historyId, changeTime, fromStatus, toStatus):
+    return {"id": str(historyId), "created": changeTime.strftime(JIRA_TIMESTAMP_FORMAT), "items": [{"field": "status", "fromString": fromStatus, "toString": toStatus}]}
+
+# status changes of issues, a paused issue went from Open to a paused status and later to its current status
+# a separate random generator keeps other fields same as before changelogs were added
+def addChangelogs(issues, now, seed):
+    randomGenerator = random.Random(seed + 1)
+    historyId = 0
+    for issue in issues:
+        issueFields = issue["fields"]
+        changelogHistories = []
+        if randomGenerator.random() < PAUSED_ISSUE_RATE:
+            createdTime = datetime.datetime.strptime(issueFields["created"], "%Y-%m-%dT%H:%M:%S.%f%z")
+            issueHours = (now - createdTime).total_seconds() / 3600
+            pauseStart = createdTime + datetime.timedelta(hours=randomGenerator.uniform(0, issueHours / 2))
+            pauseEnd = pauseStart + datetime.timedelta(hours=randomGenerator.uniform(0, issueHours / 2))
+            pausedStatus = randomGenerator.choice(PAUSED_STATUSES)
+            changelogHistories.append(getChangelogHistory(historyId + 1, pauseStart, "Open", pausedStatus))
+            changelogHistories.append(getChangelogHistory(historyId + 2, pauseEnd, pausedStatus, issueFields["status"]["name"]))
+            historyId += 2
+            issueFields["updated"] = pauseEnd.strftime(JIRA_TIMESTAMP_FORMAT)
+        issue["changelog"] = {"startAt": 0, "maxResults": len(changelogHistories), "total": len(changelogHistories), "histories": changelogHistories}
+
+# split JQL values like (Open, "In Progress") into plain values
+def parseJqlValues(valueText):
+    valueText = valueText.strip()
+    if valueText.startswith("(") and valueText.endswith(")"):
+        valueText = valueText[1:-1]
+    return [value.strip().strip("\"") for value in re.findall(r'"[^"]*"|[^,]+', valueText) if value.strip()]
+
+def getFieldValue(issue, fieldName):
+    if fieldName == "key":
+        return issue["key"]
+    fieldValue = issue["fields"].get(fieldName)
+    if isinstance(fieldValue, dict):
+        return fieldValue.get("key") if fieldName == "project" else fieldValue.get("name")
+    return fieldValue
+
+# relative(-365d, -4h) or absolute("2024/01/31 10:20") JQL date as timezone aware datetime
+def parseJqlDate(dateText):
+    dateText = dateText.strip().strip("\"")
+    relativeMatch = re.match(r"^-(\d+)([dhm])$", dateText)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if relativeMatch:
+        unitHours = {"d": 24, "h": 1, "m": 1 / 60}[relativeMatch.group(2)]
+        return now - datetime.timedelta(hours=int(relativeMatch.group(1)) * unitHours)
+    for dateFormat in ("%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M", "%Y/%m/%d", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(dateText, dateFormat).replace(tzinfo=datetime.timezone.utc)
+        except ValueError:
+            pass
+    raise ValueError("unsupported JQL date " + dateText)
+
+# issue timestamps are parsed once, every search with a date clause checks all the issues
+@functools.lru_cache(maxsize=None)
+def parseJiraTimestamp(jiraTimestamp):
+    return datetime.datetime.strptime(jiraTimestamp, "%Y-%m-%dT%H:%M:%S.%f%z")
+
+# predicate of a single JQL clause like project = X, status in (A, "B") or created >= -365d
+def compileJqlClause(fieldName, operator, valueText):
+    fieldName, operator = fieldName.lower(), re.sub(r"\s+", " ", operator.lower())
+    if fieldName in ("created", "updated") and operator in (">=", "<="):
+        dateLimit = parseJqlDate(valueText)
+        if operator == ">=":
+            return lambda issue: parseJiraTimestamp(issue["fields"][fieldName]) >= dateLimit
+        return lambda issue: parseJiraTimestamp(issue["fields"][fieldName]) <= dateLimit
+    jqlValues = set(value.lower() for value in parseJqlValues(valueText))
+    if operator in ("in", "="):
+        return lambda issue: str(getFieldValue(issue, fieldName)).lower() in jqlValues
+    if operator in ("not in", "!="):
+        return lambda issue: str(getFieldValue(issue, fieldName)).lower() not in jqlValues
+    raise ValueError("unsupported JQL operator " + operator + " for field " + fieldName)
+
+# split JQL into "(", ")", "AND", "OR" and (field, operator, value) clause tokens
+def tokenizeJql(jqlQuery):
+    jqlTokens = []
+    position = 0
+    while position < len(jqlQuery):
+        tokenMatch = JQL_TOKEN_PATTERN.match(jqlQuery, position)
+        if not tokenMatch or tokenMatch.end() == position:
+            if jqlQuery[position:].strip():
+                raise ValueError("unsupported JQL near " + jqlQuery[position:position + 40])
+            break
+        if tokenMatch.group("paren"):
+            jqlTokens.append(tokenMatch.group("paren"))
+        elif tokenMatch.group("joiner"):
+            jqlTokens.append(tokenMatch.group("joiner").upper())
+        else:
+            jqlTokens.append((tokenMatch.group("field"), tokenMatch.group("operator"), tokenMatch.group("value")))
+        position = tokenMatch.end()
+    return jqlTokens
+
+# compile JQL made of clauses, AND, OR and parentheses into one predicate, AND binds tighter than OR
+# raises ValueError for unsupported JQL
+def compileJql(jqlQuery):
+    jqlTokens = tokenizeJql(re.split(r"\s+ORDER\s+BY\s+", jqlQuery, flags=re.IGNORECASE)[0])
+    tokenIndex = [0]
+
+    def peekToken():
+        return jqlTokens[tokenIndex[0]] if tokenIndex[0] < len(jqlTokens) else None
+
+    def takeToken():
+        jqlToken = peekToken()
+        tokenIndex[0] += 1
+        return jqlToken
+
+    def parseOperand():
+        jqlToken = takeToken()
+        if jqlToken == "(":
+            predicate = parseOr()
+            if takeToken() != ")":
+                raise ValueError("unbalanced parentheses in JQL " + jqlQuery)
+            return predicate
+        if isinstance(jqlToken, tuple):
+            return compileJqlClause(*jqlToken)
+        raise ValueError("unexpected " + str(jqlToken) + " in JQL " + jqlQuery)
+
+    def parseAnd():
+        predicates = [parseOperand()]
+        while peekToken() == "AND":
+            takeToken()
+            predicates.append(parseOperand())
+        return predicates[0] if len(predicates) == 1 else lambda issue: all(predicate(issue) for predicate in predicates)
+
+    def parseOr():
+        predicates = [parseAnd()]
+        while peekToken() == "OR":
+            takeToken()
+            predicates.append(parseAnd())
+        return predicates[0] if len(predicates) == 1 else lambda issue: any(predicate(issue) for predicate in predicates)
+
+    predicate = parseOr()
+    if peekToken() is not None:
+        raise ValueError("unexpected " + str(peekToken()) + " in JQL " + jqlQuery)
+    return predicate
+
+class FakeJiraState:
+    def __init__(self, issues, latencySeconds=0, jitterSeconds=0, errorRate=0, throttleRate=0, retryAfterSeconds=0, maxResults=DEFAULT_MAX_RESULTS, seed=42):
+        self.issues = issues
+        self.issuesByKey = dict((issue["key"], issue) for issue in issues)
+        self.latencySeconds = latencySeconds
+        self.jitterSeconds = jitterSeconds
+        self.errorRate = errorRate
+        self.throttleRate = throttleRate
+        self.retryAfterSeconds = retryAfterSeconds
+        self.maxResults = maxResults
+        self.randomGenerator = random.Random(seed)
+        self.lock = threading.Lock()
+        # matching issues per JQL, dropped whenever an issue changes
+        self.searchCache = {}
+        self.requestCounts = collections.Counter()
+        self.statusCounts = collections.Counter()
+        self.pageFetchCounts = collections.Counter()
+        self.duplicatePageFetches = 0
+        # comments added per issue, more than one comment on an issue in a run is a duplicate reminder
+        self.commentCounts = collections.Counter()
+
+    def countRequest(self, endpointName):
+        with self.lock:
+            self.requestCounts[endpointName] += 1
+
+    def getMatchingIssues(self, jqlQuery):
+        with self.lock:
+            matchingIssues = self.searchCache.get(jqlQuery)
+        if matchingIssues is None:
+            predicate = compileJql(jqlQuery)
+            matchingIssues = [issue for issue in self.issues if predicate(issue)]
+            with self.lock:
+                self.searchCache[jqlQuery] = matchingIssues
+        return matchingIssues
+
+    def recordPageFetch(self, jqlQuery, fieldNames, startAt, maxResults):
+        with self.lock:
+            pageKey = (jqlQuery, fieldNames, startAt, maxResults)
+            self.pageFetchCounts[pageKey] += 1
+            if self.pageFetchCounts[pageKey] > 1:
+                self.duplicatePageFetches += 1
+
+    def resetPageFetches(self):
+        with self.lock:
+            self.pageFetchCounts.clear()
+
+    def recordComment(self, issueKey):
+        with self.lock:
+            self.commentCounts[issueKey] += 1
+            return sum(self.commentCounts.values())
+
+    def closeIssue(self, issueKey):
+        with self.lock:
+            self.issuesByKey[issueKey]["fields"]["status"] = {"name": "Closed"}
+            self.searchCache.clear()
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "requests": dict(self.requestCounts),
+                "statusCodes": dict((str(statusCode), statusCount) for statusCode, statusCount in self.statusCounts.items()),
+                "searchPages": len(self.pageFetchCounts),
+                "duplicatePageFetches": self.duplicatePageFetches,
+                "commentedIssues": len(self.commentCounts),
+                "duplicateComments": sum(commentCount - 1 for commentCount in self.commentCounts.values())
+            }
+
+# issue as returned by search, changelog is returned only when expanded
+def getIssueResponse(issue, requestedFields, withChangelog):
+    issueResponse = {"key": issue["key"], "fields": issue["fields"]}
+    if requestedFields is not None:
+        issueResponse["fields"] = dict((fieldName, fieldValue) for fieldName, fieldValue in issue["fields"].items() if fieldName in requestedFields)
+    if withChangelog:
+        issueResponse["changelog"] = issue["changelog"]
+    return issueResponse
+
+class FakeJiraHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # status line, headers and body in one write
+    def sendResponse(self, statusCode, responseObject=None, extraHeaders=None):
+        responseBody = b"" if responseObject is None else json.dumps(responseObject, separators=(",", ":")).encode()
+        headerLines = ["HTTP/1.1 " + str(statusCode) + " " + self.responses.get(statusCode, ("",))[0], "Content-Type: application/json;charset=UTF-8"]
+        if responseBody and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            responseBody = gzip.compress(responseBody, compresslevel=1)
+            headerLines.append("Content-Encoding: gzip")
+        headerLines.append("Content-Length: " + str(len(responseBody)))
+        for headerName, headerValue in (extraHeaders or {}).items():
+            headerLines.append(headerName + ": " + str(headerValue))
+        self.wfile.write(("\r\n".join(headerLines) + "\r\n\r\n").encode() + responseBody)
+        self.wfile.flush()
+        with self.server.fakeState.lock:
+            self.server.fakeState.statusCounts[statusCode] += 1
+
+    def readRequestJson(self):
+        contentLength = int(self.headers.get("Content-Length") or 0)
+        requestBody = self.rfile.read(contentLength) if contentLength else b""
+        try:
+            return json.loads(requestBody or b"{}")
+        except ValueError:
+            return None
+
+    # latency, throttling and server errors, returns True when a fault response was sent
+    def injectFaults(self, isWriteCall):
+        fakeState = self.server.fakeState
+        if fakeState.latencySeconds or fakeState.jitterSeconds:
+            time.sleep(fakeState.latencySeconds + fakeState.randomGenerator.uniform(0, fakeState.jitterSeconds))
+        if fakeState.throttleRate and fakeState.randomGenerator.random() < fakeState.throttleRate:
+            self.sendResponse(429, {"errorMessages": ["Rate limit exceeded"]}, {"Retry-After": fakeState.retryAfterSeconds})
+            return True
+        if isWriteCall and fakeState.errorRate and fakeState.randomGenerator.random() < fakeState.errorRate:
+            self.sendResponse(500, {"errorMessages": ["Injected server error"]})
+            return True
+        return False
+
+    def do_GET(self):
+        fakeState = self.server.fakeState
+        parsedURL = urlparse(self.path)
+        queryParams = dict((paramName, paramValues[0]) for paramName, paramValues in parse_qs(parsedURL.query).items())
+        if parsedURL.path == "/_fake/stats":
+            return self.sendResponse(200, fakeState.getStats())
+        if parsedURL.path == "/rest/api/2/serverInfo":
+            fakeState.countRequest("serverInfo")
+            return self.sendResponse(200, {"baseUrl": "http://" + self.headers.get("Host", ""), "version": "9.0.0", "versionNumbers": [9, 0, 0], "deploymentType": "Server", "serverTitle": "Fake JIRA"})
+        if parsedURL.path == "/rest/api/2/search":
+            fakeState.countRequest("search")
+            if self.injectFaults(False):
+                return
+            return self.sendSearchPage(queryParams)
+        issueMatch = ISSUE_PATH_PATTERN.match(parsedURL.path)
+        if issueMatch and issueMatch.group(2) == "transitions":
+            fakeState.countRequest("transitions")
+            if self.injectFaults(False):
+                return
+            issue = fakeState.issuesByKey.get(issueMatch.group(1))
+            if issue is None:
+                return self.sendResponse(404, {"errorMessages": ["Issue does not exist"]})
+            availableTransitions = [] if issue["fields"]["status"]["name"] == "Closed" else [START_TRANSITION, CLOSE_TRANSITION]
+            return self.sendResponse(200, {"transitions": availableTransitions})
+        self.sendResponse(404, {"errorMessages": ["Unknown endpoint " + parsedURL.path]})
+
+    def sendSearchPage(self, queryParams):
+        fakeState = self.server.fakeState
+        jqlQuery = queryParams.get("jql", "")
+        try:
+            matchingIssues = fakeState.getMatchingIssues(jqlQuery)
+        except ValueError as ex:
+            return self.sendResponse(400, {"errorMessages": [str(ex)]})
+        startAt = int(queryParams.get("startAt", 0))
+        maxResults = min(int(queryParams.get("maxResults", fakeState.maxResults)), fakeState.maxResults)
+        fieldNames = queryParams.get("fields")
+        fakeState.recordPageFetch(jqlQuery, fieldNames, startAt, maxResults)
+        pageIssues = matchingIssues[startAt:startAt + maxResults]
+        requestedFields = set(fieldNames.split(",")) if fieldNames else None
+        withChangelog = "changelog" in (queryParams.get("expand") or "").split(",")
+        pageIssues = [getIssueResponse(issue, requestedFields, withChangelog) for issue in pageIssues]
+        self.sendResponse(200, {"startAt": startAt, "maxResults": maxResults, "total": len(matchingIssues), "issues": pageIssues})
+
+    def do_POST(self):
+        fakeState = self.server.fakeState
+        requestJson = self.readRequestJson()
+        if urlparse(self.path).path == "/_fake/reset-pages":
+            fakeState.resetPageFetches()
+            return self.sendResponse(204)
+        issueMatch = ISSUE_PATH_PATTERN.match(urlparse(self.path).path)
+        if not issueMatch:
+            return self.sendResponse(404, {"errorMessages": ["Unknown endpoint " + self.path]})
+        issueKey, endpointName = issueMatch.group(1), issueMatch.group(2)
+        fakeState.countRequest(endpointName if endpointName != "transitions" else "transition")
+        if self.injectFaults(True):
+            return
+        issue = fakeState.issuesByKey.get(issueKey)
+        if issue is None:
+            return self.sendResponse(404, {"errorMessages": ["Issue does not exist"]})
+        if requestJson is None:
+            return self.sendResponse(400, {"errorMessages": ["Invalid JSON"]})
+        if endpointName == "comment":
+            return self.sendResponse(201, {"id": str(fakeState.recordComment(issueKey)), "body": requestJson.get("body")})
+        if endpointName == "watchers":
+            return self.sendResponse(204)
+        transitionID = str((requestJson.get("transition") or {}).get("id"))
+        if issue["fields"]["status"]["name"] == "Closed" or transitionID not in (START_TRANSITION["id"], CLOSE_TRANSITION["id"]):
+            return self.sendResponse(400, {"errorMessages": ["Transition " + transitionID + " is not valid for " + issueKey]})
+        if transitionID == CLOSE_TRANSITION["id"]:
+            if not (requestJson.get("fields") or {}).get("resolution"):
+                return self.sendResponse(400, {"errors": {"resolution": "Resolution is required."}})
+            fakeState.closeIssue(issueKey)
+        self.sendResponse(204)
+
+    def log_message(self, *args):
+        pass
+
+class FakeJiraServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # many keep-alive connections are opened at the same time by the scripts
+    request_queue_size = 128
+
+    def __init__(self, fakeState, port=0):
+        super().__init__(("127.0.0.1", port), FakeJiraHandler)
+        self.fakeState = fakeState
+
+    def getBaseURL(self):
+        return "http://127.0.0.1:" + str(self.server_port)
+
+    # serve requests from a daemon thread, used when the fake server runs in the same process as the code under test
+    def startInBackground(self):
+        serverThread = threading.Thread(target=self.serve_forever, name="fake-jira", daemon=True)
+        serverThread.start()
+        return self
+
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Local fake JIRA server for benchmarks")
+    parser.add_argument('--issues', dest='issueCount', type=int, default=1000, help='Number of synthetic open issues')
+    parser.add_argument('--projects', dest='projectCount', type=int, default=2, help='Number of projects(BENCH1, BENCH2, ..)')
+    parser.add_argument('--port', dest='port', type=int, default=0, help='Port to listen on, 0 picks a free port')
+    parser.add_argument('--latency-ms', dest='latencyMs', type=float, default=0, help='Latency added to every call in milliseconds')
+    parser.add_argument('--jitter-ms', dest='jitterMs', type=float, default=0, help='Random extra latency up to these many milliseconds')
+    parser.add_argument('--error-rate', dest='errorRate', type=float, default=0, help='Ratio of write calls failed with 500')
+    parser.add_argument('--throttle-rate', dest='throttleRate', type=float, default=0, help='Ratio of calls throttled with 429')
+    parser.add_argument('--retry-after', dest='retryAfter', type=int, default=0, help='Retry-After seconds sent with 429')
+    parser.add_argument('--max-results', dest='maxResults', type=int, default=DEFAULT_MAX_RESULTS, help='Max page size allowed by search')
+    return parser.parse_args(scriptArgs)
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    fakeState = FakeJiraState(generateIssues(scriptOptions.issueCount, scriptOptions.projectCount), scriptOptions.latencyMs / 1000, scriptOptions.jitterMs / 1000, scriptOptions.errorRate, scriptOptions.throttleRate, scriptOptions.retryAfter, scriptOptions.maxResults)
+    fakeServer = FakeJiraServer(fakeState, scriptOptions.port)
+    print("listening on " + str(fakeServer.server_port), flush=True)
+    try:
+        fakeServer.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
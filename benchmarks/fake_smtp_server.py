@@ -0,0 +1,127 @@
+import os
+import sys
+import argparse
+import threading
+import socketserver
+from email import message_from_bytes, policy
+
+'''
+  Script Name : fake_smtp_server.py
+  Purpose     : Local stand-in for an SMTP server used to check digest emails of jira_oosla_digest.py, never use it as a real mail server
+                It works as follows:
+                  1. Accepts SMTP sessions on 127.0.0.1(HELO/EHLO, MAIL FROM, RCPT TO, DATA, RSET, NOOP, QUIT), no auth and no TLS
+                  2. Keeps every received message with its envelope sender and recipients, messages are never delivered
+                  3. Optionally writes every message as <n>.eml to an outbox folder so that rendered digests can be opened in a mail client
+                  4. Refuses recipients listed with --refuse, used to check that one refused address does not stop the other emails
+
+    Usage:
+       python3 benchmarks/fake_smtp_server.py [--port N] [--outbox FOLDER] [--refuse address1,address2]
+       prints "listening on <port>" once ready, --port 0 picks a free port
+       use DIGEST_SMTP_HOST=127.0.0.1 and DIGEST_SMTP_PORT=<port> with auto_oosla_reminder_for_jira.py --email-digest
+'''
+
+class FakeSmtpHandler(socketserver.StreamRequestHandler):
+    def sendReply(self, replyLine):
+        self.wfile.write((replyLine + "\r\n").encode())
+
+    def readData(self):
+        dataLines = []
+        while True:
+            dataLine = self.rfile.readline()
+            if not dataLine or dataLine in (b".\r\n", b".\n"):
+                return b"".join(dataLines)
+            # remove dot stuffing of lines starting with a dot
+            dataLines.append(dataLine[1:] if dataLine.startswith(b"..") else dataLine)
+
+    def handle(self):
+        fakeServer = self.server
+        mailFrom, rcptTo = None, []
+        self.sendReply("220 fake-smtp ready")
+        while True:
+            commandLine = self.rfile.readline()
+            if not commandLine:
+                return
+            command = commandLine.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.sendReply("250 fake-smtp" if verb == "HELO" else "250-fake-smtp\r\n250 8BITMIME")
+            elif verb == "MAIL":
+                mailFrom, rcptTo = command.partition(":")[2].strip().strip("<>"), []
+                self.sendReply("250 OK")
+            elif verb == "RCPT":
+                recipient = command.partition(":")[2].strip().strip("<>")
+                if recipient in fakeServer.refusedAddresses:
+                    self.sendReply("550 mailbox unavailable")
+                else:
+                    rcptTo.append(recipient)
+                    self.sendReply("250 OK")
+            elif verb == "DATA":
+                if not rcptTo:
+                    self.sendReply("503 no valid recipients")
+                    continue
+                self.sendReply("354 end data with <CR><LF>.<CR><LF>")
+                fakeServer.addMessage(mailFrom, rcptTo, self.readData())
+                mailFrom, rcptTo = None, []
+                self.sendReply("250 OK queued")
+            elif verb == "RSET":
+                mailFrom, rcptTo = None, []
+                self.sendReply("250 OK")
+            elif verb == "NOOP":
+                self.sendReply("250 OK")
+            elif verb == "QUIT":
+                self.sendReply("221 bye")
+                return
+            else:
+                self.sendReply("502 command not implemented")
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, outboxFolder=None, refusedAddresses=None):
+        super().__init__(("127.0.0.1", port), FakeSmtpHandler)
+        self.outboxFolder = outboxFolder
+        self.refusedAddresses = set(refusedAddresses or [])
+        # (envelope sender, envelope recipients, parsed message) of every received message
+        self.messages = []
+        self.lock = threading.Lock()
+        if outboxFolder:
+            os.makedirs(outboxFolder, exist_ok=True)
+
+    def addMessage(self, mailFrom, rcptTo, messageBytes):
+        receivedMessage = message_from_bytes(messageBytes, policy=policy.default)
+        with self.lock:
+            self.messages.append((mailFrom, list(rcptTo), receivedMessage))
+            messageNumber = len(self.messages)
+        if self.outboxFolder:
+            with open(os.path.join(self.outboxFolder, str(messageNumber) + ".eml"), "wb") as emlFile:
+                emlFile.write(messageBytes)
+
+    def getMessages(self):
+        with self.lock:
+            return list(self.messages)
+
+    # serve sessions from a daemon thread, used when the fake server runs in the same process as the code under test
+    def startInBackground(self):
+        serverThread = threading.Thread(target=self.serve_forever, name="fake-smtp", daemon=True)
+        serverThread.start()
+        return self
+
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Local fake SMTP server for digest emails")
+    parser.add_argument('--port', dest='port', type=int, default=0, help='Port to listen on, 0 picks a free port')
+    parser.add_argument('--outbox', dest='outboxFolder', help='Folder where every received message is written as <n>.eml')
+    parser.add_argument('--refuse', dest='refusedAddresses', default="", help='Comma separated recipient addresses refused with 550')
+    return parser.parse_args(scriptArgs)
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    fakeServer = FakeSmtpServer(scriptOptions.port, scriptOptions.outboxFolder, [address.strip() for address in scriptOptions.refusedAddresses.split(",") if address.strip()])
+    print("listening on " + str(fakeServer.server_address[1]), flush=True)
+    try:
+        fakeServer.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
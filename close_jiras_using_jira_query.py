@@ -1,6 +1,13 @@
 from jira import JIRA
 import argparse
 import os
+import time
+import jira_http_client
+import jira_search
+import jira_bulk_close
+import jira_close_journal
+import jira_request_metrics
+import jira_write_pool
 
 '''
   Script Name  : close_jiras_using_jira_query.py
@@ -26,30 +33,87 @@ import os
 
          pip3 install jira
          python3 -m pip install jira
+    3. jira_*.py helper modules from this repo kept in the same folder as this script
 '''
 
 '''
     usage: 
     
-    python3 close_jiras_using_jira_query.py --jira_query JIRA_QUERY 
+    python3 close_jiras_using_jira_query.py [--jira_query JIRA_QUERY]
                                             --jira_user JIRA_USER 
                                             --jira_user_password JIRA_USER_PASSWORD 
                                             [--action_type ACTION_TYPE]
+                                            [--jira_server JIRA_SERVER]
+                                            [--max_workers MAX_WORKERS]
+                                            [--journal JOURNAL]
+                                            [--resume JOURNAL]
     ACTION_TYPE allowed values: dryrun or close, dryrun is default action type                                            
+    JIRA_SERVER is JIRA instance URL e.g. https://jira.abc.com, default is JIRA_SERVER_URL env variable or https://jira.abc.com
+    MAX_WORKERS is max number of JIRA tickets closed at the same time, default is 8
+                actual concurrency is adjusted automatically below this value when JIRA throttles or slows down
+    --journal   : journal file recording JIRA query, JIRAs found and every JIRA closed, default is close_jiras_journal_<date_time>.jsonl
+    --resume    : continue from journal of an earlier run, JIRA query is read from the journal when --jira_query is not passed
+                  JIRAs found by the earlier run are used without a second search and the JIRAs already closed are skipped
+                  e.g. review JIRAs of a dryrun run and then close them using
+                       --action_type close --resume close_jiras_journal_<date_time>.jsonl
+    JIRA_QUERY is required unless --resume is passed
+    per endpoint metrics of the JIRA calls are written to close_jiras_jira_metrics.prom(Prometheus) and close_jiras_jira_metrics.json
+    in JIRA_METRICS_DIR env variable folder or current folder
 '''
 
-def closeJIRA(jira, issue, transitionID, fields):
-    jira.transition_issue(issue, transitionID, fields=fields)
-
+# Your JIRA instance URL e.g. https://jira.abc.com, can be changed using --jira_server or JIRA_SERVER_URL env variable
+DEFAULT_JIRA_SERVER_URL = 'https://jira.abc.com'
+
+# The transition for 'closed' may vary based on the workflow
+# You should adjust it as per your workflow, transitions are tried in this order and matched by transition or target status name
+CLOSE_TRANSITION_NAMES = ['Closed', 'Integration']
+
+# Create fields dictionary for additional fields
+# you might need to change these fields attributes as per your workflow
+# only the fields present on the screen of the close transition are sent
+CLOSE_FIELDS = {
+    'resolution': {
+        'name': 'Obsolete',
+    },
+    'fixVersions': [
+        {
+            'name': 'NotNeeded'
+        }
+    ]
+}
+
+def getJiraServerURL(inputDict):
+    return (inputDict.get("jira_server") or os.environ.get("JIRA_SERVER_URL") or DEFAULT_JIRA_SERVER_URL).rstrip('/')
+
+def getDefaultJournalFile():
+    return "close_jiras_journal_" + time.strftime("%Y%m%d_%H%M%S") + ".jsonl"
+
+# inputDict built by other callers can leave out journal and max_workers, same defaults as command line are used then
 def findAndCloseJiraTickets(inputDict):
-    # Your JIRA instance URL e.g. https://jira.abc.com
-    jira_options = {'server': 'https://jira.abc.com'}
+    # read journal of earlier run when resuming
+    journalState = None
+    if inputDict.get("resume"):
+        journalState = jira_close_journal.loadJournal(inputDict["resume"])
+        if inputDict.get("jira_query") and journalState["jira_query"] and inputDict["jira_query"] != journalState["jira_query"]:
+            print("Input JIRA query differs from JIRA query of journal " + inputDict["resume"] + ", using JIRA query of the journal : " + journalState["jira_query"])
+        inputDict["jira_query"] = journalState["jira_query"] or inputDict.get("jira_query")
+    inputDict["journal"] = inputDict.get("journal") or inputDict.get("resume") or getDefaultJournalFile()
+    journal = jira_close_journal.CloseJournal(inputDict["journal"])
+    if journalState is None:
+        journal.recordQuery(inputDict["jira_query"], inputDict["action_type"])
+
+    jiraServerURL = getJiraServerURL(inputDict)
+    jira_options = {'server': jiraServerURL}
 
     # Initializing connection using your JIRA account
-    jira = JIRA(options=jira_options, basic_auth=(inputDict["jira_user"], inputDict["jira_user_password"]))
+    jira = JIRA(options=jira_options, basic_auth=(inputDict["jira_user"], inputDict["jira_user_password"]), timeout=jira_http_client.getRequestTimeout(), max_retries=jira_http_client.getHttpClientSetting("maxRetries"))
+
+    # use pooled keep-alive connections of shared HTTP client for all the calls made by jira module
+    # responses are passed to write pool as well, so that it slows down when JIRA throttles transitions
+    jira_http_client.attachJiraHttpClient(jira._session, notifyListeners=True)
 
-    # Get all the open issues
-    open_issues = jira.search_issues(inputDict["jira_query"])
+    # per endpoint metrics of all the JIRA calls of this run
+    requestMetrics = jira_request_metrics.JiraRequestMetrics({"script": "close_jiras_using_jira_query", "action_type": inputDict["action_type"]}).start()
 
     # check action type and print the message
     if inputDict["action_type"] == "close":
@@ -57,49 +121,42 @@ def findAndCloseJiraTickets(inputDict):
     else:
         print("\nAs action type is dryrun, so script will just print the JIRA ticket IDs as per input JIRA query\n")
 
-    # Loop over open issues and transition them to 'closed' status
-    # The transition id for 'closed' may vary based on the workflow
-    # You should adjust it as per your workflow
-    transitionID = 'Closed'  # transition id for "Close"
+    bulkCloseEngine = jira_bulk_close.BulkCloseEngine(jira, CLOSE_TRANSITION_NAMES, CLOSE_FIELDS, inputDict.get("max_workers", jira_write_pool.DEFAULT_MAX_CONCURRENCY))
+    if journalState and journalState["issues"] is not None:
+        # JIRAs found by earlier run, JIRAs already closed by earlier runs are skipped
+        print("Using " + str(len(journalState["issues"])) + " JIRA tickets found by earlier run from journal " + inputDict["resume"] + ", skipping JIRA search")
+        open_issues = bulkCloseEngine.addJournalIssues(journalState["issues"], journalState["closedKeys"])
+    else:
+        # Get all the issues of the JIRA query, all the pages are fetched before closing any issue
+        print("JIRA query : " + inputDict["jira_query"])
+        scanStats = {}
+        open_issues = bulkCloseEngine.searchIssues(jiraServerURL + '/rest/api/2/search', inputDict["jira_query"], (inputDict["jira_user"], inputDict["jira_user_password"]), scanStats)
+        journal.recordFoundIssues(open_issues)
+        jira_search.printScanStats(scanStats)
+        if journalState:
+            open_issues = bulkCloseEngine.skipClosedIssues(open_issues, journalState["closedKeys"])
     for issue in open_issues:
-        print(issue.key)
+        print(issue["key"])
+
+    # close issues concurrently using cached transition of every project, issue type and status, every closed issue is journaled
+    writePool = None
+    try:
         if inputDict["action_type"] == "close":
-            try:
-                # Create fields dictionary for additional fields
-                # you might need to change these fields attributes as per your workflow
-                fields={
-                    'resolution': {
-                        'name': 'Obsolete',
-                    },
-                    'fixVersions': [
-                        {
-                            'name': 'NotNeeded'
-                        }
-                    ]
-                }
-                closeJIRA(jira, issue, transitionID, fields)    
-            except:
-                # Create fields dictionary for additional fields
-                # you might need to change these fields attributes as per your workflow
-                # You should adjust it as per your workflow
-                fields={
-                    'resolution': {
-                        'name': 'Obsolete',
-                    }
-                }
-                try:
-                    try:
-                        closeJIRA(jira, issue, transitionID, fields)
-                    except:
-                        # you might need to change these fields attributes as per your workflow
-                        # You should adjust it as per your workflow
-                        fields = {}
-                        closeJIRA(jira, issue, transitionID, fields)     
-                except:
-                    # you might need to change transitionID values as per your workflow
-                    # You should adjust it as per your workflow
-                    transitionID = 'Integration'  # transition id for "Close"
-                    closeJIRA(jira, issue, transitionID, fields)
+            writePool = bulkCloseEngine.closeIssues(open_issues, journal.recordClosed)
+    finally:
+        journal.close()
+        requestMetrics.stop()
+
+    # print close summary and HTTP connection details
+    print("")
+    bulkCloseEngine.printSummary()
+    if writePool:
+        writePool.printStats()
+    jira_http_client.printConnectionStats()
+    requestMetrics.printStats()
+    for metricFile in requestMetrics.writeMetricFiles("close_jiras_jira_metrics"):
+        print("Metrics written to " + metricFile)
+    print("Journal written to " + inputDict["journal"] + ", use --resume " + inputDict["journal"] + " to continue from this run")
 
 def validateInputs(inputDict):
     if inputDict["action_type"] != "dryrun" and inputDict["action_type"] != "close":
@@ -107,6 +164,16 @@ def validateInputs(inputDict):
         print("Invalid input action_type value " + inputDict["action_type"] + ", allowed values are dryrun||close, please check and rerun exiting ....")
         print("++++++++++++++++ ERROR ++++++++++++++++++++")
         return False
+    if inputDict.get("resume") and not jira_close_journal.isJournalFile(inputDict["resume"]):
+        print("++++++++++++++++ ERROR ++++++++++++++++++++")
+        print("Journal file " + inputDict["resume"] + " passed using --resume not found, please check and rerun exiting ....")
+        print("++++++++++++++++ ERROR ++++++++++++++++++++")
+        return False
+    if not inputDict.get("resume") and not inputDict.get("jira_query"):
+        print("++++++++++++++++ ERROR ++++++++++++++++++++")
+        print("--jira_query is required unless --resume is passed, please check and rerun exiting ....")
+        print("++++++++++++++++ ERROR ++++++++++++++++++++")
+        return False
     return True    
 
 def main():
@@ -114,23 +181,41 @@ def main():
     parser = argparse.ArgumentParser(description="List GitHub Repos")
 
     # Add the arguments
-    parser.add_argument('--jira_query', type=str, nargs=1, help='JIRA Query to List JIRA tickets to be closed', required=True)
+    parser.add_argument('--jira_query', type=str, nargs=1, help='JIRA Query to List JIRA tickets to be closed, required unless --resume is passed', required=False)
     parser.add_argument('--jira_user', type=str, nargs=1, help='JIRA User Name', required=True)
     parser.add_argument('--jira_user_password', type=str, nargs=1, help='JIRA User Password', required=True)
     parser.add_argument('--action_type', type=str, nargs=1, help='Action to be performed e.g. by default it is dryrun, close', required=False)
+    parser.add_argument('--jira_server', type=str, nargs=1, help='JIRA instance URL e.g. https://jira.abc.com', required=False)
+    parser.add_argument('--max_workers', type=int, nargs=1, help='Max number of JIRA tickets closed at the same time', required=False)
+    parser.add_argument('--journal', type=str, nargs=1, help='Journal file recording JIRA tickets found and closed', required=False)
+    parser.add_argument('--resume', type=str, nargs=1, help='Journal file of an earlier dryrun or close run to continue from', required=False)
 
     # Execute the parse_args() method
     args = parser.parse_args()
 
     # create dict with input to be used for authorization and calling Code Analysis Service for exper AI reviews
     inputDict = {}
-    inputDict["jira_query"] = ''.join(args.jira_query)
+    if args.jira_query != None:
+        inputDict["jira_query"] = ''.join(args.jira_query)
     inputDict["jira_user"] = ''.join(args.jira_user)
     inputDict["jira_user_password"] = ''.join(args.jira_user_password)
     if args.action_type == None:
         inputDict["action_type"] = "dryrun"
     else:    
         inputDict["action_type"] = ''.join(args.action_type)
+    if args.jira_server != None:
+        inputDict["jira_server"] = ''.join(args.jira_server)
+    if args.max_workers == None:
+        inputDict["max_workers"] = jira_write_pool.DEFAULT_MAX_CONCURRENCY
+    else:
+        inputDict["max_workers"] = args.max_workers[0]
+    if args.resume != None:
+        inputDict["resume"] = ''.join(args.resume)
+    # resumed run keeps writing to the journal it continues from unless another journal is passed
+    if args.journal != None:
+        inputDict["journal"] = ''.join(args.journal)
+    else:
+        inputDict["journal"] = inputDict.get("resume") or getDefaultJournalFile()
     
     # validate input action type    
     if validateInputs(inputDict):
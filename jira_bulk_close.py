@@ -0,0 +1,135 @@
+import time
+import threading
+import jira_search
+import jira_write_pool
+
+'''
+  Module Name : jira_bulk_close.py
+  Purpose     : Bulk close engine used by close_jiras_using_jira_query.py
+                It works as follows:
+                  1. Pages through every result of the input JIRA query asking only for status, issue type and project
+                     all the pages are fetched before any JIRA is closed, closing JIRAs while paging would shift the later pages
+                  2. Resolves the close transition ID and the fields accepted by its screen once for every (project, issue type, status)
+                     and caches it, so a JIRA is closed with a single call
+                  3. Runs transitions concurrently using the adaptive write pool
+                  4. Counts closed, skipped(no close transition or required field without value) and failed JIRAs
+'''
+
+# fields requested in search, transitions depend only on these fields
+CLOSE_SEARCH_FIELDS = ["status", "issuetype", "project"]
+
+# cache key of transitions of an issue
+def getTransitionCacheKey(issue):
+    issueFields = issue["fields"]
+    return ((issueFields.get("project") or {}).get("key"), (issueFields.get("issuetype") or {}).get("name"), (issueFields.get("status") or {}).get("name"))
+
+class BulkCloseEngine:
+    def __init__(self, jira, transitionNames, closeFields, maxConcurrency=jira_write_pool.DEFAULT_MAX_CONCURRENCY):
+        self.jira = jira
+        # transition names in order of preference, a transition matches by its name or by name of its target status
+        self.transitionNames = [transitionName.lower() for transitionName in transitionNames]
+        self.closeFields = closeFields
+        self.maxConcurrency = maxConcurrency
+        self.transitionCache = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            "found": 0,
+            "alreadyClosed": 0,
+            "closed": 0,
+            "skipped": 0,
+            "failed": 0,
+            "transitionLookups": 0
+        }
+        self.startTime = time.monotonic()
+        self.endTime = None
+
+    # issues loaded from journal of an earlier run
+    def addJournalIssues(self, issues, closedKeys):
+        self.stats["found"] += len(issues)
+        return self.skipClosedIssues(issues, closedKeys)
+
+    # leave out issues closed by earlier runs of a journal
+    def skipClosedIssues(self, issues, closedKeys):
+        pendingIssues = [issue for issue in issues if issue["key"] not in closedKeys]
+        self.stats["alreadyClosed"] += len(issues) - len(pendingIssues)
+        return pendingIssues
+
+    # all issues of the JIRA query with status, issue type and project fields
+    def searchIssues(self, searchURL, jiraQuery, auth, scanStats=None):
+        foundIssues = []
+        for pageIssues in jira_search.iterJiraSearchPages(searchURL, jiraQuery, auth, scanStats = scanStats, searchFields = CLOSE_SEARCH_FIELDS):
+            foundIssues.extend(pageIssues)
+        self.stats["found"] += len(foundIssues)
+        return foundIssues
+
+    # pick close transition from transitions of an issue and the close fields present on its screen
+    # returns (transition ID, transition name, fields) or (None, reason) when issue can not be closed
+    def selectCloseTransition(self, availableTransitions):
+        for transitionName in self.transitionNames:
+            for transition in availableTransitions:
+                if transitionName not in (str(transition.get("name")).lower(), str((transition.get("to") or {}).get("name")).lower()):
+                    continue
+                screenFields = transition.get("fields") or {}
+                transitionFields = dict((fieldName, fieldValue) for fieldName, fieldValue in self.closeFields.items() if fieldName in screenFields)
+                missingFields = [fieldName for fieldName, fieldMeta in screenFields.items() if fieldMeta.get("required") and not fieldMeta.get("hasDefaultValue") and fieldName not in transitionFields]
+                if missingFields:
+                    return None, "transition " + str(transition.get("name")) + " needs values for " + ",".join(missingFields)
+                return (transition["id"], transition.get("name"), transitionFields), None
+        return None, "no " + "/".join(self.transitionNames) + " transition available"
+
+    # close transition of an issue, looked up once per (project, issue type, status)
+    def getCloseTransition(self, issue):
+        cacheKey = getTransitionCacheKey(issue)
+        if cacheKey not in self.transitionCache:
+            self.stats["transitionLookups"] += 1
+            availableTransitions = self.jira.transitions(issue["key"], expand="transitions.fields")
+            self.transitionCache[cacheKey] = self.selectCloseTransition(availableTransitions)
+        return self.transitionCache[cacheKey]
+
+    def incrementStat(self, statName):
+        with self.lock:
+            self.stats[statName] += 1
+
+    def closeIssue(self, issueKey, closeTransition, onClosed=None):
+        transitionID, transitionName, transitionFields = closeTransition
+        try:
+            self.jira.transition_issue(issueKey, transitionID, fields=transitionFields)
+        except Exception as ex:
+            print("Failed to close " + issueKey + " using transition " + str(transitionName) + " : " + str(ex))
+            self.incrementStat("failed")
+            return
+        print("Closed " + issueKey + " using transition " + str(transitionName))
+        self.incrementStat("closed")
+        if onClosed:
+            onClosed(issueKey)
+
+    # close issues using write pool, onClosed is called with issue key of every closed issue
+    def closeIssues(self, issues, onClosed=None):
+        writePool = jira_write_pool.AdaptiveWritePool(self.maxConcurrency)
+        try:
+            for issue in issues:
+                try:
+                    closeTransition, skipReason = self.getCloseTransition(issue)
+                except Exception as ex:
+                    closeTransition, skipReason = None, "transition lookup failed : " + str(ex)
+                if closeTransition is None:
+                    print("Skipped " + issue["key"] + " : " + skipReason)
+                    self.incrementStat("skipped")
+                    continue
+                writePool.submit(self.closeIssue, issue["key"], closeTransition, onClosed)
+        finally:
+            writePool.close()
+            self.endTime = time.monotonic()
+        return writePool
+
+    def printSummary(self):
+        elapsedSeconds = (self.endTime or time.monotonic()) - self.startTime
+        processedIssues = self.stats["closed"] + self.stats["skipped"] + self.stats["failed"]
+        print("JIRAs found              : " + str(self.stats["found"]))
+        if self.stats["alreadyClosed"]:
+            print("JIRAs closed earlier     : " + str(self.stats["alreadyClosed"]) + " (from journal)")
+        print("JIRAs closed             : " + str(self.stats["closed"]))
+        print("JIRAs skipped            : " + str(self.stats["skipped"]))
+        print("JIRAs failed             : " + str(self.stats["failed"]))
+        print("Transition lookups       : " + str(self.stats["transitionLookups"]) + " (one per project, issue type and status)")
+        print("Close throughput         : " + str(round(processedIssues / elapsedSeconds, 2) if elapsedSeconds > 0 else 0) + " issues/second in " + str(round(elapsedSeconds, 2)) + " seconds")
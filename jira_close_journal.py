@@ -0,0 +1,86 @@
+import os
+import json
+import threading
+
+'''
+  Module Name : jira_close_journal.py
+  Purpose     : Append only journal of a bulk close run, used to resume a run which stopped partway through
+                It works as follows:
+                  1. Records the JIRA query and action type of the run as first line
+                  2. Records all the JIRAs found by the query once the search is complete, followed by a search done line
+                  3. Records every JIRA key as soon as it is closed, every line is flushed right away
+                  4. Loads a journal of an earlier dryrun or close run, so that a close run can skip the search and the JIRAs
+                     already closed
+    Every line is a JSON object with an "event" field:
+       {"event": "query", "jira_query": "...", "action_type": "dryrun"}
+       {"event": "found", "key": "ABC-1", "fields": {"status": .., "issuetype": .., "project": ..}}
+       {"event": "searchDone", "total": 1}
+       {"event": "closed", "key": "ABC-1"}
+'''
+
+class CloseJournal:
+    def __init__(self, journalFile):
+        self.journalFile = journalFile
+        # closed keys are recorded from write pool threads
+        self.lock = threading.Lock()
+        # start on a new line if the run writing this journal was killed in the middle of a line
+        needsNewLine = False
+        if os.path.isfile(journalFile) and os.path.getsize(journalFile) > 0:
+            with open(journalFile, "rb") as journalContent:
+                journalContent.seek(-1, os.SEEK_END)
+                needsNewLine = journalContent.read(1) != b"\n"
+        self.journalContent = open(journalFile, "a")
+        if needsNewLine:
+            self.journalContent.write("\n")
+
+    def writeEvent(self, journalEvent):
+        with self.lock:
+            self.journalContent.write(json.dumps(journalEvent, separators=(",", ":")) + "\n")
+            self.journalContent.flush()
+
+    def recordQuery(self, jiraQuery, actionType):
+        self.writeEvent({"event": "query", "jira_query": jiraQuery, "action_type": actionType})
+
+    def recordFoundIssues(self, issues):
+        with self.lock:
+            for issue in issues:
+                self.journalContent.write(json.dumps({"event": "found", "key": issue["key"], "fields": issue["fields"]}, separators=(",", ":")) + "\n")
+            self.journalContent.write(json.dumps({"event": "searchDone", "total": len(issues)}) + "\n")
+            self.journalContent.flush()
+
+    def recordClosed(self, issueKey):
+        self.writeEvent({"event": "closed", "key": issueKey})
+
+    def close(self):
+        with self.lock:
+            self.journalContent.close()
+
+# read a journal, returns dict with jira_query, found issues(None when search was not complete) and closed keys
+def loadJournal(journalFile):
+    journalState = {
+        "jira_query": None,
+        "issues": None,
+        "closedKeys": set()
+    }
+    # a found batch cut short by a killed run is written again by the resumed run, so found issues are kept by key
+    foundIssues = {}
+    with open(journalFile) as journalContent:
+        for journalLine in journalContent:
+            try:
+                journalEvent = json.loads(journalLine)
+            except ValueError:
+                # last line can be partly written when the run was killed
+                continue
+            eventName = journalEvent.get("event")
+            if eventName == "query":
+                journalState["jira_query"] = journalEvent.get("jira_query")
+            elif eventName == "found":
+                foundIssues[journalEvent["key"]] = {"key": journalEvent["key"], "fields": journalEvent.get("fields") or {}}
+            elif eventName == "searchDone":
+                journalState["issues"] = list(foundIssues.values())
+            elif eventName == "closed":
+                journalState["closedKeys"].add(journalEvent["key"])
+    return journalState
+
+def isJournalFile(journalFile):
+    return bool(journalFile) and os.path.isfile(journalFile)
@@ -0,0 +1,252 @@
+import os
+import time
+import threading
+import email.utils
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+'''
+  Module Name : jira_http_client.py
+  Purpose     : Shared HTTP client layer used by all the JIRA utilities in this repo
+                It works as follows:
+                  1. Keeps one requests session with keep-alive connection pooling for the whole run
+                  2. Retries throttled/unavailable responses(429, 502, 503, 504) and connection errors with exponential backoff
+                     non idempotent requests(e.g. POST comment or watcher) are retried only when JIRA did not process them for sure,
+                     i.e. on 429/503 and failures to open the connection(connect timeout, refused, name resolution)
+                     a 502/504, read timeout or a connection aborted/reset after the request was sent(e.g. stale keep-alive
+                     connection) can come after the write was applied, so these are not retried
+                  3. Honors the Retry-After header sent by JIRA when it throttles the caller
+                  4. Counts how many TCP/TLS connections were opened and how many requests reused an open connection
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_HTTP_POOL_SIZE        : max number of keep-alive connections kept per JIRA host
+       JIRA_HTTP_CONNECT_TIMEOUT  : TCP connect timeout in seconds
+       JIRA_HTTP_READ_TIMEOUT     : read timeout in seconds
+       JIRA_HTTP_MAX_RETRIES      : max number of retries for a single request
+       JIRA_HTTP_BACKOFF_SECONDS  : base backoff in seconds, doubled on every retry
+       JIRA_HTTP_MAX_BACKOFF      : upper limit in seconds for a single backoff/Retry-After wait
+'''
+
+DEFAULT_POOL_SIZE = 20
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_SECONDS = 1
+DEFAULT_MAX_BACKOFF = 120
+
+# response status codes which are safe to retry
+RETRY_STATUS_CODES = [429, 502, 503, 504]
+# methods which can be sent again without changing the result
+IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS"]
+# response status codes which mean the request was rejected before JIRA processed it, safe to retry for any method
+NOT_PROCESSED_STATUS_CODES = [429, 503]
+
+# connection statistics shared by all the pools created by this module
+CONNECTION_STATS = {
+    "opened": 0,
+    "requests": 0,
+    "retries": 0,
+    "throttled": 0
+}
+CONNECTION_STATS_LOCK = threading.Lock()
+
+# client settings and shared session
+HTTP_CLIENT_SETTINGS = {}
+SHARED_SESSION = None
+SHARED_SESSION_LOCK = threading.RLock()
+
+# functions called with (method, url, response, elapsedSeconds) after every request, response is None for connection errors
+RESPONSE_LISTENERS = []
+
+def incrementConnectionStat(statName, value=1):
+    with CONNECTION_STATS_LOCK:
+        CONNECTION_STATS[statName] += value
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        incrementConnectionStat("opened")
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        incrementConnectionStat("requests")
+        return super().urlopen(*args, **kwargs)
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        incrementConnectionStat("opened")
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        incrementConnectionStat("requests")
+        return super().urlopen(*args, **kwargs)
+
+class CountingHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool
+        }
+
+def readIntFromEnv(envName, defaultValue):
+    envValue = os.environ.get(envName)
+    if envValue:
+        try:
+            return int(envValue)
+        except ValueError:
+            print("Invalid value " + envValue + " for ENV variable " + envName + ", using default value " + str(defaultValue))
+    return defaultValue
+
+# configure pool size, timeouts and retries, values not passed are read from ENV variables or defaults
+def configureJiraHttpClient(poolSize=None, connectTimeout=None, readTimeout=None, maxRetries=None, backoffSeconds=None, maxBackoff=None):
+    global SHARED_SESSION
+    HTTP_CLIENT_SETTINGS["poolSize"] = poolSize or readIntFromEnv("JIRA_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)
+    HTTP_CLIENT_SETTINGS["connectTimeout"] = connectTimeout or readIntFromEnv("JIRA_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)
+    HTTP_CLIENT_SETTINGS["readTimeout"] = readTimeout or readIntFromEnv("JIRA_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)
+    HTTP_CLIENT_SETTINGS["maxRetries"] = maxRetries if maxRetries is not None else readIntFromEnv("JIRA_HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES)
+    HTTP_CLIENT_SETTINGS["backoffSeconds"] = backoffSeconds if backoffSeconds is not None else readIntFromEnv("JIRA_HTTP_BACKOFF_SECONDS", DEFAULT_BACKOFF_SECONDS)
+    HTTP_CLIENT_SETTINGS["maxBackoff"] = maxBackoff or readIntFromEnv("JIRA_HTTP_MAX_BACKOFF", DEFAULT_MAX_BACKOFF)
+    # drop the old session so that new settings are used for the next request
+    with SHARED_SESSION_LOCK:
+        if SHARED_SESSION:
+            SHARED_SESSION.close()
+        SHARED_SESSION = None
+
+def getHttpClientSetting(settingName):
+    if not HTTP_CLIENT_SETTINGS:
+        configureJiraHttpClient()
+    return HTTP_CLIENT_SETTINGS[settingName]
+
+def getRequestTimeout():
+    return (getHttpClientSetting("connectTimeout"), getHttpClientSetting("readTimeout"))
+
+def notifyResponseListeners(method, url, response, elapsedSeconds):
+    for listener in RESPONSE_LISTENERS:
+        try:
+            listener(method, url, response, elapsedSeconds)
+        except Exception as ex:
+            print(ex)
+
+def registerResponseListener(listener):
+    if listener not in RESPONSE_LISTENERS:
+        RESPONSE_LISTENERS.append(listener)
+
+def unregisterResponseListener(listener):
+    if listener in RESPONSE_LISTENERS:
+        RESPONSE_LISTENERS.remove(listener)
+
+# requests response hook, passes responses of a session not using jiraRequest(e.g. session of jira python module) to listeners
+def notifyListenersFromResponseHook(response, *args, **kwargs):
+    notifyResponseListeners(response.request.method, response.url, response, response.elapsed.total_seconds())
+
+# mount pooled and counting adapters on a session, used for our own session and for the session of jira python module
+# notifyListeners adds a response hook so that listeners also see calls made directly using the session
+def attachJiraHttpClient(session, notifyListeners=False):
+    poolSize = getHttpClientSetting("poolSize")
+    adapter = CountingHTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if notifyListeners and notifyListenersFromResponseHook not in session.hooks["response"]:
+        session.hooks["response"].append(notifyListenersFromResponseHook)
+    return session
+
+def getJiraSession():
+    global SHARED_SESSION
+    with SHARED_SESSION_LOCK:
+        if SHARED_SESSION is None:
+            SHARED_SESSION = attachJiraHttpClient(requests.Session())
+        return SHARED_SESSION
+
+# read Retry-After header which can be either seconds or a HTTP date
+def getRetryAfterSeconds(response):
+    retryAfter = response.headers.get("Retry-After")
+    if not retryAfter:
+        return None
+    try:
+        return max(0, float(retryAfter))
+    except ValueError:
+        pass
+    try:
+        retryAfterDate = email.utils.parsedate_to_datetime(retryAfter)
+        return max(0, retryAfterDate.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def getBackoffSeconds(retryCount, response):
+    backoffSeconds = None
+    if response is not None:
+        backoffSeconds = getRetryAfterSeconds(response)
+    if backoffSeconds is None:
+        backoffSeconds = getHttpClientSetting("backoffSeconds") * (2 ** retryCount)
+    return min(backoffSeconds, getHttpClientSetting("maxBackoff"))
+
+# request failed while opening the connection, so nothing was sent to JIRA
+# requests.ConnectionError also covers a connection aborted or reset after the request was sent, those are not connect failures
+def isConnectFailure(ex):
+    if isinstance(ex, requests.ConnectTimeout):
+        return True
+    if not isinstance(ex, requests.ConnectionError) or not ex.args:
+        return False
+    failureReason = ex.args[0]
+    if isinstance(failureReason, MaxRetryError):
+        failureReason = failureReason.reason
+    return isinstance(failureReason, NewConnectionError)
+
+def isAnyRequestError(ex):
+    return True
+
+# status codes a request of this method is retried on and check of the connection/timeout errors it is retried on
+# a write is retried only if it was surely not applied
+def getRetryPolicy(method):
+    if method.upper() in IDEMPOTENT_METHODS:
+        return RETRY_STATUS_CODES, isAnyRequestError
+    return NOT_PROCESSED_STATUS_CODES, isConnectFailure
+
+# send a request using shared session, retry on throttling, server unavailability and connection errors
+def jiraRequest(method, url, params=None, jsonPayload=None, auth=None, headers=None):
+    session = getJiraSession()
+    maxRetries = getHttpClientSetting("maxRetries")
+    retryStatusCodes, isRetryableError = getRetryPolicy(method)
+    retryCount = 0
+    while True:
+        response = None
+        startTime = time.monotonic()
+        try:
+            response = session.request(method, url, params=params, json=jsonPayload, auth=auth, headers=headers, timeout=getRequestTimeout())
+            notifyResponseListeners(method, url, response, time.monotonic() - startTime)
+            if response.status_code not in retryStatusCodes:
+                return response
+            if response.status_code == 429:
+                incrementConnectionStat("throttled")
+            if retryCount >= maxRetries:
+                return response
+        except (requests.ConnectionError, requests.Timeout) as ex:
+            notifyResponseListeners(method, url, None, time.monotonic() - startTime)
+            if retryCount >= maxRetries or not isRetryableError(ex):
+                raise
+        backoffSeconds = getBackoffSeconds(retryCount, response)
+        retryCount += 1
+        incrementConnectionStat("retries")
+        time.sleep(backoffSeconds)
+
+def getConnectionStats():
+    with CONNECTION_STATS_LOCK:
+        connectionStats = dict(CONNECTION_STATS)
+    connectionStats["reused"] = max(0, connectionStats["requests"] - connectionStats["opened"])
+    return connectionStats
+
+def resetConnectionStats():
+    with CONNECTION_STATS_LOCK:
+        for statName in CONNECTION_STATS:
+            CONNECTION_STATS[statName] = 0
+
+def printConnectionStats():
+    connectionStats = getConnectionStats()
+    print("HTTP requests sent       : " + str(connectionStats["requests"]))
+    print("HTTP connections opened  : " + str(connectionStats["opened"]))
+    print("HTTP connections reused  : " + str(connectionStats["reused"]))
+    print("HTTP retries             : " + str(connectionStats["retries"]) + " (throttled: " + str(connectionStats["throttled"]) + ")")
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import sqlite3
+import datetime
+import jira_http_client
+import jira_search
+
+'''
+  Module Name : jira_issue_index.py
+  Purpose     : Local SQLite index of open JIRA issues to avoid rescanning a full year of issues on every run
+                It works as follows:
+                  1. First run(or --full-resync) scans all open issues of last 12 months of a project and stores the fields used by the scripts
+                  2. Later runs only search issues of the project updated since last run(high-water mark) and upsert/remove them in index
+                     high-water mark is the latest "updated" timestamp returned by JIRA, it is used in JQL as the wall time of its
+                     own UTC offset(the JIRA user timezone), so clock and timezone of this host do not matter
+                  3. A cheap reconciliation search, asking only for issue keys, removes index entries of issues closed/deleted/moved
+                     without a visible update and fetches open issues missing in index, it runs once every JIRA_INDEX_RECONCILE_HOURS
+                  4. OOSLA checks and reports are then done using issues read from the index
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_ISSUE_INDEX_FILE        : path of SQLite index file, default is jira_issue_index.db next to onboard folder
+       JIRA_INDEX_OVERLAP_MINUTES   : minutes subtracted from high-water mark for next delta search, covers updates which
+                                      reach JIRA search a little after later updates e.g. slow reindex
+       JIRA_INDEX_RECONCILE_HOURS   : hours between two reconciliation searches of a project, 0 reconciles on every delta sync
+'''
+
+DEFAULT_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jira_issue_index.db")
+DEFAULT_OVERLAP_MINUTES = 60
+DEFAULT_RECONCILE_HOURS = 24
+# JQL date format, minutes are the finest precision JQL dates support
+JQL_DATE_FORMAT = "%Y/%m/%d %H:%M"
+# statuses treated as open, same as status clause of the OOSLA JIRA query
+OPEN_STATUS_LIST = ["Open", "In Progress"]
+# issues created before these many days are not kept in index
+INDEX_WINDOW_DAYS = 365
+# fields needed by index itself on top of fields used by the scripts
+INDEX_FIELDS = ["status", "updated", "created", "priority", "issuetype", "project"]
+# max number of issue keys in one "key in (...)" JQL query
+KEY_BATCH_SIZE = 100
+
+def getIndexFile():
+    return os.environ.get("JIRA_ISSUE_INDEX_FILE") or DEFAULT_INDEX_FILE
+
+# parse JIRA timestamp like 2024-01-31T10:20:30.000+0000 as timezone aware datetime
+def parseJiraTimestamp(jiraTimestamp):
+    return datetime.datetime.strptime(jiraTimestamp, "%Y-%m-%dT%H:%M:%S.%f%z")
+
+# latest of "updated" timestamps of the issues and the current high-water mark, issues without updated field are skipped
+def getLatestUpdated(issues, latestUpdated=None):
+    for issue in issues:
+        issueUpdated = issue["fields"].get("updated")
+        if issueUpdated and (latestUpdated is None or parseJiraTimestamp(issueUpdated) > parseJiraTimestamp(latestUpdated)):
+            latestUpdated = issueUpdated
+    return latestUpdated
+
+# JQL date of delta search for a high-water mark, JIRA returns timestamps in the timezone of the JIRA user which is also the
+# timezone JQL dates are read in, so wall time of the timestamp in its own offset is used
+# marks saved by older versions are JQL dates of local run time which are used as they are
+def getDeltaQueryDate(highWaterMark, overlapMinutes):
+    try:
+        updatedTime = parseJiraTimestamp(highWaterMark)
+    except ValueError:
+        return highWaterMark
+    return (updatedTime - datetime.timedelta(minutes=overlapMinutes)).strftime(JQL_DATE_FORMAT)
+
+class JiraIssueIndex:
+    def __init__(self, indexFile=None):
+        self.indexFile = indexFile or getIndexFile()
+        self.connection = sqlite3.connect(self.indexFile)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS issues (issue_key TEXT PRIMARY KEY, project TEXT, priority TEXT, issuetype TEXT, status TEXT, created TEXT, updated TEXT, fields_json TEXT)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS issues_project_priority ON issues (project, priority)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS sync_state (project TEXT PRIMARY KEY, high_water_mark TEXT, last_full_sync TEXT)")
+        # column added after the first version of the index file
+        if "last_reconcile" not in [row[1] for row in self.connection.execute("PRAGMA table_info(sync_state)")]:
+            self.connection.execute("ALTER TABLE sync_state ADD COLUMN last_reconcile REAL")
+        self.connection.commit()
+        self.stats = {
+            "fullSyncs": 0,
+            "deltaSyncs": 0,
+            "upserted": 0,
+            "removed": 0,
+            "reconciled": 0
+        }
+
+    def close(self):
+        self.connection.close()
+
+    def getHighWaterMark(self, jiraProject):
+        row = self.connection.execute("SELECT high_water_mark FROM sync_state WHERE project = ?", (jiraProject,)).fetchone()
+        return row[0] if row else None
+
+    # a full sync also counts as reconciliation of the project
+    def setHighWaterMark(self, jiraProject, highWaterMark, fullSync, reconciled):
+        if fullSync:
+            self.connection.execute("INSERT OR REPLACE INTO sync_state (project, high_water_mark, last_full_sync, last_reconcile) VALUES (?, ?, ?, ?)", (jiraProject, highWaterMark, datetime.datetime.now().isoformat(), time.time()))
+        elif reconciled:
+            self.connection.execute("UPDATE sync_state SET high_water_mark = ?, last_reconcile = ? WHERE project = ?", (highWaterMark, time.time(), jiraProject))
+        else:
+            self.connection.execute("UPDATE sync_state SET high_water_mark = ? WHERE project = ?", (highWaterMark, jiraProject))
+
+    def isReconcileDue(self, jiraProject):
+        reconcileHours = jira_http_client.readIntFromEnv("JIRA_INDEX_RECONCILE_HOURS", DEFAULT_RECONCILE_HOURS)
+        row = self.connection.execute("SELECT last_reconcile FROM sync_state WHERE project = ?", (jiraProject,)).fetchone()
+        return not row or row[0] is None or time.time() - row[0] >= reconcileHours * 3600
+
+    # open issue of last 12 months is kept in index, any other issue is removed
+    def isIndexable(self, issue, oldestCreationDate):
+        issueFields = issue["fields"]
+        if (issueFields.get("status") or {}).get("name") not in OPEN_STATUS_LIST:
+            return False
+        return parseJiraTimestamp(issueFields["created"]) >= oldestCreationDate
+
+    def upsertIssues(self, jiraProject, issues):
+        oldestCreationDate = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=INDEX_WINDOW_DAYS)
+        for issue in issues:
+            issueFields = issue["fields"]
+            if self.isIndexable(issue, oldestCreationDate):
+                self.connection.execute("INSERT OR REPLACE INTO issues (issue_key, project, priority, issuetype, status, created, updated, fields_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+                    issue["key"],
+                    jiraProject,
+                    (issueFields.get("priority") or {}).get("name"),
+                    (issueFields.get("issuetype") or {}).get("name"),
+                    issueFields["status"]["name"],
+                    issueFields["created"],
+                    issueFields.get("updated"),
+                    json.dumps(issueFields, separators=(",", ":"))
+                ))
+                self.stats["upserted"] += 1
+            else:
+                self.removeIssues([issue["key"]])
+
+    def removeIssues(self, issueKeys):
+        for issueKey in issueKeys:
+            removedRows = self.connection.execute("DELETE FROM issues WHERE issue_key = ?", (issueKey,)).rowcount
+            self.stats["removed"] += removedRows
+
+    # sync index of a project with JIRA, full scan for first run or when fullResync is passed else delta scan
+    # a project whose full scan found no issue has no high-water mark and gets a full scan again, which is as cheap as a delta scan
+    def syncProject(self, jiraProject, searchURL, auth, searchFields, fullResync=False):
+        indexSearchFields = list(dict.fromkeys(list(searchFields) + INDEX_FIELDS))
+        overlapMinutes = jira_http_client.readIntFromEnv("JIRA_INDEX_OVERLAP_MINUTES", DEFAULT_OVERLAP_MINUTES)
+        highWaterMark = None if fullResync else self.getHighWaterMark(jiraProject)
+        nextHighWaterMark = highWaterMark
+        reconciled = False
+        openIssuesQuery = "project = " + jiraProject + " AND status in (" + ",".join("\"" + openStatus + "\"" for openStatus in OPEN_STATUS_LIST) + ") AND created >= -" + str(INDEX_WINDOW_DAYS) + "d"
+        scanStats = {}
+        if highWaterMark is None:
+            print("\nFull index sync for project " + jiraProject + " : " + openIssuesQuery)
+            self.connection.execute("DELETE FROM issues WHERE project = ?", (jiraProject,))
+            for pageIssues in jira_search.iterJiraSearchPages(searchURL, openIssuesQuery, auth, scanStats = scanStats, searchFields = indexSearchFields):
+                nextHighWaterMark = getLatestUpdated(pageIssues, nextHighWaterMark)
+                self.upsertIssues(jiraProject, pageIssues)
+            self.stats["fullSyncs"] += 1
+        else:
+            deltaQueryDate = getDeltaQueryDate(highWaterMark, overlapMinutes)
+            deltaQuery = "project = " + jiraProject + " AND updated >= \"" + deltaQueryDate + "\""
+            print("\nDelta index sync for project " + jiraProject + " : " + deltaQuery)
+            # a mark saved by an older version is replaced by the latest updated timestamp returned by JIRA
+            if deltaQueryDate == highWaterMark:
+                nextHighWaterMark = None
+            for pageIssues in jira_search.iterJiraSearchPages(searchURL, deltaQuery, auth, scanStats = scanStats, searchFields = indexSearchFields):
+                nextHighWaterMark = getLatestUpdated(pageIssues, nextHighWaterMark)
+                self.upsertIssues(jiraProject, pageIssues)
+            if self.isReconcileDue(jiraProject):
+                self.reconcileProject(jiraProject, openIssuesQuery, searchURL, auth, indexSearchFields, scanStats)
+                reconciled = True
+            nextHighWaterMark = nextHighWaterMark or highWaterMark
+            self.stats["deltaSyncs"] += 1
+        self.setHighWaterMark(jiraProject, nextHighWaterMark, highWaterMark is None, reconciled)
+        self.connection.commit()
+        jira_search.printScanStats(scanStats)
+        return scanStats
+
+    # compare open issue keys in JIRA with index, remove closed/deleted issues and fetch open issues missing in index
+    def reconcileProject(self, jiraProject, openIssuesQuery, searchURL, auth, indexSearchFields, scanStats):
+        openIssueKeys = set()
+        for pageIssues in jira_search.iterJiraSearchPages(searchURL, openIssuesQuery, auth, scanStats = scanStats, searchFields = ["key"]):
+            openIssueKeys.update(issue["key"] for issue in pageIssues)
+        indexedIssueKeys = set(row[0] for row in self.connection.execute("SELECT issue_key FROM issues WHERE project = ?", (jiraProject,)))
+        staleIssueKeys = indexedIssueKeys - openIssueKeys
+        self.removeIssues(staleIssueKeys)
+        missingIssueKeys = sorted(openIssueKeys - indexedIssueKeys)
+        for batchStart in range(0, len(missingIssueKeys), KEY_BATCH_SIZE):
+            keyQuery = "key in (" + ",".join(missingIssueKeys[batchStart:batchStart + KEY_BATCH_SIZE]) + ")"
+            for pageIssues in jira_search.iterJiraSearchPages(searchURL, keyQuery, auth, scanStats = scanStats, searchFields = indexSearchFields):
+                self.upsertIssues(jiraProject, pageIssues)
+        self.stats["reconciled"] += len(staleIssueKeys) + len(missingIssueKeys)
+
+    # yield pages of indexed issues of a project and priority in the same format as JIRA search results
+    # or as objects built by issueFactory(e.g. IssueRecord.fromIssueDict) when it is passed
+    def iterOpenIssuePages(self, jiraProject, jiraPriorityName, jiraIssueTypes=None, pageSize=None, issueFactory=None):
+        pageSize = pageSize or jira_search.getSearchPageSize()
+        oldestCreationDate = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=INDEX_WINDOW_DAYS)
+        # issue types in onboarding JSON are JQL values, e.g. "\"Security Defect\""
+        issueTypeNames = set(issueType.strip("\"") for issueType in (jiraIssueTypes or []))
+        indexCursor = self.connection.execute("SELECT issue_key, issuetype, created, fields_json FROM issues WHERE project = ? AND priority = ? ORDER BY issue_key", (jiraProject, jiraPriorityName))
+        while True:
+            indexRows = indexCursor.fetchmany(pageSize)
+            if not indexRows:
+                return
+            indexedIssues = []
+            for issueKey, issueType, created, fieldsJson in indexRows:
+                if issueTypeNames and issueType not in issueTypeNames:
+                    continue
+                if parseJiraTimestamp(created) < oldestCreationDate:
+                    continue
+                indexedIssue = {"key": issueKey, "fields": json.loads(fieldsJson)}
+                indexedIssues.append(issueFactory(indexedIssue) if issueFactory else indexedIssue)
+            yield indexedIssues
+
+    def printStats(self):
+        print("Issue index              : " + str(self.stats["fullSyncs"]) + " full syncs, " + str(self.stats["deltaSyncs"]) + " delta syncs, " + str(self.stats["upserted"]) + " upserted, " + str(self.stats["removed"]) + " removed, " + str(self.stats["reconciled"]) + " reconciled")
@@ -0,0 +1,88 @@
+import sys
+
+'''
+  Module Name : jira_issue_record.py
+  Purpose     : Compact record of a JIRA issue holding only the fields read by the OOSLA reminder scripts
+                It works as follows:
+                  1. IssueRecord keeps key, project, issue type, priority, created, updated, assignee(name and email), environment and watchers of an issue
+                     in __slots__ attributes instead of the nested dicts returned by JIRA search
+                  2. Values repeated across issues(project, issue type, priority, assignee, environment) are interned, so all the
+                     records share one string object per distinct value
+                  3. jira_search decodes search responses one issue at a time and passes every issue to fromIssueDict, so nested
+                     dicts of an issue are dropped as soon as its record is built and a full page of dicts is never kept
+'''
+
+# environment of an issue when neither customfield_123 nor environment has a value
+UNKNOWN_ENVIRONMENT = "Unknown"
+UNASSIGNED = "Unassigned"
+
+def internValue(fieldValue):
+    if isinstance(fieldValue, str):
+        return sys.intern(fieldValue)
+    return fieldValue
+
+def getNamedField(issueFields, fieldName, nameKey="name"):
+    namedField = issueFields.get(fieldName)
+    if not isinstance(namedField, dict):
+        return None
+    return internValue(namedField.get(nameKey))
+
+# environment as listed in output files, customfield_123 is the custom field for env used in your JIRA tickets
+def getIssueEnvironment(issueFields):
+    if "customfield_123" in issueFields:
+        if issueFields["customfield_123"] != None:
+            return internValue(issueFields["customfield_123"][0]["value"])
+        return UNKNOWN_ENVIRONMENT
+    elif "environment" in issueFields:
+        return internValue(issueFields["environment"])
+    return UNKNOWN_ENVIRONMENT
+
+class IssueRecord:
+    __slots__ = ("key", "projectKey", "projectName", "issueType", "priority", "created", "updated", "assignee", "assigneeEmail", "environment", "watchCount", "watcherNames")
+
+    def __init__(self, key, projectKey, projectName, issueType, priority, created, assignee, environment, watchCount=None, watcherNames=None, assigneeEmail=None, updated=None):
+        self.key = key
+        self.projectKey = projectKey
+        self.projectName = projectName
+        self.issueType = issueType
+        self.priority = priority
+        self.created = created
+        # updated is None unless it is asked in search fields, changelog cache of jira_sla_clock.py is keyed by it
+        self.updated = updated
+        self.assignee = assignee
+        # emailAddress of assignee field, JIRA can leave it out depending on user privacy settings
+        self.assigneeEmail = assigneeEmail
+        self.environment = environment
+        # watchCount is None when watchers field was not returned, watcherNames only when watchers list was expanded
+        self.watchCount = watchCount
+        self.watcherNames = watcherNames
+
+    @classmethod
+    def fromIssueDict(cls, issue):
+        issueFields = issue.get("fields") or {}
+        watchCount, watcherNames = None, None
+        watchersField = issueFields.get("watchers")
+        if isinstance(watchersField, dict):
+            watchCount = watchersField.get("watchCount")
+            if isinstance(watchersField.get("watchers"), list):
+                watcherNames = frozenset(internValue(watcher.get("name")) for watcher in watchersField["watchers"] if watcher.get("name"))
+        return cls(
+            issue["key"],
+            getNamedField(issueFields, "project", "key"),
+            getNamedField(issueFields, "project"),
+            getNamedField(issueFields, "issuetype"),
+            getNamedField(issueFields, "priority"),
+            issueFields.get("created"),
+            getNamedField(issueFields, "assignee"),
+            getIssueEnvironment(issueFields),
+            watchCount,
+            watcherNames,
+            getNamedField(issueFields, "assignee", "emailAddress"),
+            issueFields.get("updated")
+        )
+
+    def getAssigneeName(self):
+        return self.assignee if self.assignee is not None else UNASSIGNED
+
+    def __repr__(self):
+        return "IssueRecord(" + self.key + ", " + str(self.issueType) + ", " + str(self.priority) + ", " + str(self.created) + ")"
@@ -0,0 +1,102 @@
+import jira_sla_engine
+
+'''
+  Module Name : jira_jql_pushdown.py
+  Purpose     : Compiles onboarding JSON rules and SLA table into JQL clauses, so that JIRAs which can never get a reminder
+                in this run are not downloaded at all
+                It works as follows:
+                  1. exception_jira_list becomes key not in (...), at most MAX_PUSHDOWN_KEYS keys are pushed down to keep the
+                     search URL short
+                  2. For every priority and issue type group a minimum age is derived from the SLA table
+                       security and Bug/Task JIRAs : reminderStartHours(or slaHours when it is lower) of the priority
+                       other non security JIRAs    : OTHER_ISSUE_TYPE_MIN_AGE_HOURS, same as SLA classification
+                     and on days other than the OOSLA reminder day a maximum age of slaHours, OOSLA JIRAs are skipped on those days
+                  3. Age windows become created <= -Nh / created >= -Nh clauses per issue type group and are OR-ed per priority
+                     windows are widened by PUSHDOWN_MARGIN_HOURS, JIRAs age while a scan runs and JIRA clock can differ
+                  4. Client side checks are not changed, they still run on every JIRA returned by the narrowed query
+                  5. With the active SLA clock(jira_sla_clock.py) SLA age of a JIRA can be lower than its age from created,
+                     so only the minimum age is pushed down, a JIRA is never younger by SLA clock than by created
+'''
+
+# JIRAs age while a scan runs, so age windows are widened by this margin
+PUSHDOWN_MARGIN_HOURS = 1
+# max number of exception keys pushed down, remaining keys are skipped by client side check only
+MAX_PUSHDOWN_KEYS = 200
+
+def quoteJqlValue(jqlValue):
+    return "\"" + jqlValue.replace("\\", "\\\\").replace("\"", "\\\"") + "\""
+
+# issue type names from JIRA_TYPE of onboarding JSON, which can have JQL quotes e.g. "\"Security Defect\""
+def getIssueTypeNames(jiraIssueTypes):
+    return [issueType.strip().strip("\"") for issueType in jiraIssueTypes or []]
+
+# split issue types into SLA groups, returns list of (issue type names, minimum age column rule) per group
+# with no team issue types, last group is every issue type not listed in other groups
+def getIssueTypeGroups(issueTypeNames, securityIssueTypeList):
+    alwaysCheckedTypes = [issueType for issueType in jira_sla_engine.ALWAYS_CHECKED_ISSUE_TYPE_LIST if issueType not in securityIssueTypeList]
+    if not issueTypeNames:
+        return [
+            ("in", list(securityIssueTypeList), jira_sla_engine.SLA_GROUP_SECURITY, False),
+            ("in", alwaysCheckedTypes, jira_sla_engine.SLA_GROUP_NONSECURITY, False),
+            ("not in", list(securityIssueTypeList) + alwaysCheckedTypes, jira_sla_engine.SLA_GROUP_NONSECURITY, True)
+        ]
+    return [
+        ("in", [issueType for issueType in issueTypeNames if issueType in securityIssueTypeList], jira_sla_engine.SLA_GROUP_SECURITY, False),
+        ("in", [issueType for issueType in issueTypeNames if issueType not in securityIssueTypeList and issueType in alwaysCheckedTypes], jira_sla_engine.SLA_GROUP_NONSECURITY, False),
+        ("in", [issueType for issueType in issueTypeNames if issueType not in securityIssueTypeList and issueType not in alwaysCheckedTypes], jira_sla_engine.SLA_GROUP_NONSECURITY, True)
+    ]
+
+# (minimum age, maximum age or None) in hours of JIRAs which can get a reminder, None when no JIRA of the group can
+def getReminderAgeWindow(slaRow, isOtherIssueType, isBreachedReminderDay, activeSlaClock=False):
+    minAgeHours = min(slaRow["reminderStartHours"], slaRow["slaHours"])
+    if isOtherIssueType:
+        minAgeHours = max(minAgeHours, jira_sla_engine.OTHER_ISSUE_TYPE_MIN_AGE_HOURS)
+    maxAgeHours = None if isBreachedReminderDay or activeSlaClock else slaRow["slaHours"]
+    if maxAgeHours is not None and minAgeHours >= maxAgeHours:
+        return None
+    return minAgeHours, maxAgeHours
+
+def getAgeWindowClause(minAgeHours, maxAgeHours):
+    ageClauses = []
+    if minAgeHours - PUSHDOWN_MARGIN_HOURS > 0:
+        ageClauses.append("created <= -" + str(int(minAgeHours - PUSHDOWN_MARGIN_HOURS)) + "h")
+    if maxAgeHours is not None:
+        ageClauses.append("created >= -" + str(int(maxAgeHours + PUSHDOWN_MARGIN_HOURS + 0.999)) + "h")
+    return " AND ".join(ageClauses)
+
+# OR-ed age windows of issue type groups for one priority, None when no JIRA of the priority can get a reminder
+def compilePriorityClause(slaTable, jiraPriority, issueTypeNames, securityIssueTypeList, isBreachedReminderDay, activeSlaClock=False):
+    groupClauses = []
+    for typeOperator, groupIssueTypes, slaGroup, isOtherIssueType in getIssueTypeGroups(issueTypeNames, securityIssueTypeList):
+        if typeOperator == "in" and not groupIssueTypes:
+            continue
+        ageWindow = getReminderAgeWindow(slaTable[(jiraPriority.upper(), slaGroup)], isOtherIssueType, isBreachedReminderDay, activeSlaClock)
+        if ageWindow is None:
+            continue
+        groupClause = "issuetype " + typeOperator + " (" + ",".join(quoteJqlValue(issueType) for issueType in groupIssueTypes) + ")"
+        ageClause = getAgeWindowClause(*ageWindow)
+        groupClauses.append("(" + groupClause + (" AND " + ageClause if ageClause else "") + ")")
+    if not groupClauses:
+        return None
+    return "(" + " OR ".join(groupClauses) + ")"
+
+# clause appended with AND to the open JIRAs query of the input priorities, priorities are (priority, JIRA priority name) pairs
+# returns None when no JIRA of these priorities can get a reminder in this run, empty string when nothing can be pushed down
+def compilePushdownClause(slaTable, priorities, jiraIssueTypes, securityIssueTypeList, exceptionKeys, isBreachedReminderDay, activeSlaClock=False):
+    issueTypeNames = getIssueTypeNames(jiraIssueTypes)
+    priorityClauses = []
+    for jiraPriority, prioritySearchString in priorities:
+        priorityClause = compilePriorityClause(slaTable, jiraPriority, issueTypeNames, securityIssueTypeList, isBreachedReminderDay, activeSlaClock)
+        if priorityClause is None:
+            continue
+        if len(priorities) > 1:
+            priorityClause = "(priority = " + quoteJqlValue(prioritySearchString) + " AND " + priorityClause + ")"
+        priorityClauses.append(priorityClause)
+    if not priorityClauses:
+        return None
+    pushdownClauses = []
+    exceptionKeys = sorted(exceptionKeys or [])[:MAX_PUSHDOWN_KEYS]
+    if exceptionKeys:
+        pushdownClauses.append("key not in (" + ",".join(exceptionKeys) + ")")
+    pushdownClauses.append(priorityClauses[0] if len(priorityClauses) == 1 else "(" + " OR ".join(priorityClauses) + ")")
+    return " AND ".join(pushdownClauses)
@@ -0,0 +1,187 @@
+import os
+import html
+import smtplib
+import collections
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+import jira_http_client
+import jira_oosla_report
+
+'''
+  Module Name : jira_oosla_digest.py
+  Purpose     : Email digest of OOSLA and soon to be OOSLA JIRAs, used instead of one reminder comment per JIRA ticket
+                It works as follows:
+                  1. Collects every JIRA which would get a reminder comment in this run, grouped per assignee
+                  2. Renders one message per assignee with the JIRAs assigned to them and one team message with all the JIRAs
+                     for the addresses in email_dl of onboarding JSON, messages have a plain text and an HTML part
+                  3. Assignee address is emailAddress of assignee field in JIRA search results, or <assignee name>@DIGEST_EMAIL_DOMAIN
+                     when JIRA does not return it, unassigned JIRAs and assignees without an address are only in the team message
+                  4. Sends all the messages over one SMTP connection, a refused recipient is reported and the rest are still sent
+                  5. With commentChangedIssues, a reminder comment is added only on JIRA tickets whose SLA state changed since the
+                     last run as recorded in reminder ledger, all other JIRA writes are replaced by the digest
+'''
+
+'''
+    Settings can be changed using below ENV variables
+       DIGEST_SMTP_HOST     : SMTP server host, default is localhost
+       DIGEST_SMTP_PORT     : SMTP server port, default is 25
+       DIGEST_SMTP_USER     : SMTP user, login is skipped when not set
+       DIGEST_SMTP_PASSWORD : SMTP password
+       DIGEST_SMTP_STARTTLS : set to 1 to upgrade SMTP connection with STARTTLS
+       DIGEST_FROM_ADDRESS  : sender address of the digest messages, default is oosla-reminder@localhost
+       DIGEST_EMAIL_DOMAIN  : domain used to build assignee address from assignee name when JIRA does not return emailAddress
+'''
+
+DEFAULT_SMTP_HOST = "localhost"
+DEFAULT_SMTP_PORT = 25
+DEFAULT_FROM_ADDRESS = "oosla-reminder@localhost"
+SUBJECT_PREFIX = "[OOSLA digest] "
+DIGEST_COLUMNS = ["JIRA", "Type", "Env", "Priority", "Assignee", "State", "Created", "Age"]
+
+def getDigestFromAddress():
+    return os.environ.get("DIGEST_FROM_ADDRESS") or DEFAULT_FROM_ADDRESS
+
+# email address of an assignee, None when it is not known
+def getAssigneeAddress(issueRecord):
+    if issueRecord.assigneeEmail:
+        return issueRecord.assigneeEmail
+    emailDomain = os.environ.get("DIGEST_EMAIL_DOMAIN")
+    if issueRecord.assignee and emailDomain:
+        return issueRecord.assignee + "@" + emailDomain.lstrip("@")
+    return None
+
+def getStateCounts(digestRows):
+    stateCounts = collections.Counter(row[6] for row in digestRows)
+    return ", ".join(str(stateCounts[slaState]) + " " + jira_oosla_report.STATE_LABELS[slaState] for slaState in jira_oosla_report.STATE_LABELS if stateCounts[slaState])
+
+class OoslaDigest:
+    def __init__(self, teamName, browseURL, teamAddresses=None, commentChangedIssues=False):
+        self.teamName = teamName
+        self.browseURL = browseURL
+        self.teamAddresses = [teamAddress.strip() for teamAddress in teamAddresses or [] if teamAddress and teamAddress.strip()]
+        # add a reminder comment only on JIRA tickets whose SLA state changed since the last run
+        self.commentChangedIssues = commentChangedIssues
+        # rows use the same columns as jira_oosla_report.REPORT_COLUMNS
+        self.rows = []
+        self.assigneeAddresses = {}
+        self.stats = {
+            "messagesSent": 0,
+            "messagesFailed": 0,
+            "changedIssuesCommented": 0
+        }
+
+    def addIssue(self, issueRecord, jiraProject, issueType, jiraPriority, slaState, jiraAgeInHours):
+        jiraAssignee = issueRecord.getAssigneeName()
+        self.rows.append((issueRecord.key, jiraProject, issueType, issueRecord.environment or "Unknown", jiraPriority, jiraAssignee, slaState, str(issueRecord.created), int(jiraAgeInHours)))
+        assigneeAddress = getAssigneeAddress(issueRecord)
+        if assigneeAddress:
+            self.assigneeAddresses[jiraAssignee] = assigneeAddress
+
+    # highest priority first and oldest JIRA first within a priority, same order as OOSLA report
+    def getSortedRows(self, digestRows):
+        return sorted(digestRows, key=lambda row: (row[4], -row[8], row[0]))
+
+    def renderText(self, heading, digestRows):
+        textLines = [heading, ""]
+        for issueKey, jiraProject, issueType, jiraEnv, jiraPriority, jiraAssignee, slaState, createdDate, jiraAgeInHours in digestRows:
+            textLines.append(jiraPriority + "  " + jira_oosla_report.STATE_LABELS[slaState].ljust(16) + "  " + jira_oosla_report.formatJiraAge(jiraAgeInHours).rjust(9)
+                + "  " + self.browseURL + issueKey + "  " + issueType + ", " + jiraEnv + ", " + jiraAssignee)
+        return "\n".join(textLines) + "\n"
+
+    def renderHtml(self, heading, digestRows):
+        htmlLines = [
+            "<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"></head>\n<body>\n",
+            "<h3>" + html.escape(heading) + "</h3>\n",
+            "<table border=\"1\"><tr>" + "".join("<th>" + columnName + "</th>" for columnName in DIGEST_COLUMNS) + "</tr>\n"
+        ]
+        for issueKey, jiraProject, issueType, jiraEnv, jiraPriority, jiraAssignee, slaState, createdDate, jiraAgeInHours in digestRows:
+            htmlLines.append(jira_oosla_report.HTML_ROW_TEMPLATE % (self.browseURL, issueKey, issueKey, html.escape(issueType), html.escape(jiraEnv), jiraPriority, html.escape(jiraAssignee),
+                jira_oosla_report.STATE_LABELS[slaState], createdDate, jira_oosla_report.formatJiraAge(jiraAgeInHours)))
+        htmlLines.append("</table>\n</body>\n</html>\n")
+        return "".join(htmlLines)
+
+    def renderMessage(self, fromAddress, toAddresses, subject, heading, digestRows):
+        sortedRows = self.getSortedRows(digestRows)
+        digestMessage = EmailMessage()
+        digestMessage["Subject"] = SUBJECT_PREFIX + subject
+        digestMessage["From"] = fromAddress
+        digestMessage["To"] = ", ".join(toAddresses)
+        digestMessage["Date"] = formatdate(localtime=True)
+        digestMessage["Message-ID"] = make_msgid("oosla-digest")
+        digestMessage.set_content(self.renderText(heading, sortedRows))
+        digestMessage.add_alternative(self.renderHtml(heading, sortedRows), subtype="html")
+        return digestMessage
+
+    # one message per assignee with a known address and one team message for email_dl with all the JIRAs
+    def getMessages(self, fromAddress=None):
+        fromAddress = fromAddress or getDigestFromAddress()
+        assigneeRows = collections.defaultdict(list)
+        for row in self.rows:
+            assigneeRows[row[5]].append(row)
+        digestMessages = []
+        for jiraAssignee, digestRows in sorted(assigneeRows.items()):
+            assigneeAddress = self.assigneeAddresses.get(jiraAssignee)
+            if not assigneeAddress:
+                continue
+            heading = str(len(digestRows)) + " JIRAs of team " + self.teamName + " assigned to you need attention: " + getStateCounts(digestRows)
+            digestMessages.append(self.renderMessage(fromAddress, [assigneeAddress], self.teamName + ": " + getStateCounts(digestRows) + " JIRAs assigned to you", heading, digestRows))
+        if self.teamAddresses and self.rows:
+            heading = str(len(self.rows)) + " JIRAs of team " + self.teamName + " need attention: " + getStateCounts(self.rows)
+            digestMessages.append(self.renderMessage(fromAddress, self.teamAddresses, self.teamName + ": " + getStateCounts(self.rows) + " JIRAs", heading, self.rows))
+        return digestMessages
+
+    def sendMessages(self):
+        digestMessages = self.getMessages()
+        sendStats = sendDigestMessages(digestMessages)
+        self.stats["messagesSent"] += sendStats["sent"]
+        self.stats["messagesFailed"] += sendStats["failed"]
+        return sendStats
+
+    def printSummary(self):
+        print("OOSLA digest " + self.teamName.ljust(12) + ": " + str(len(self.rows)) + " JIRAs, " + str(self.stats["messagesSent"]) + " emails sent, " + str(self.stats["messagesFailed"]) + " failed, "
+            + str(self.stats["changedIssuesCommented"]) + " changed JIRAs commented")
+
+def openSmtpConnection():
+    smtpConnection = smtplib.SMTP(os.environ.get("DIGEST_SMTP_HOST") or DEFAULT_SMTP_HOST, jira_http_client.readIntFromEnv("DIGEST_SMTP_PORT", DEFAULT_SMTP_PORT), timeout=jira_http_client.getRequestTimeout()[1])
+    if os.environ.get("DIGEST_SMTP_STARTTLS") == "1":
+        smtpConnection.starttls()
+    if os.environ.get("DIGEST_SMTP_USER"):
+        smtpConnection.login(os.environ["DIGEST_SMTP_USER"], os.environ.get("DIGEST_SMTP_PASSWORD", ""))
+    return smtpConnection
+
+# send messages over one SMTP connection, returns number of messages sent and failed
+def sendDigestMessages(digestMessages):
+    sendStats = {"sent": 0, "failed": 0}
+    if not digestMessages:
+        return sendStats
+    try:
+        smtpConnection = openSmtpConnection()
+    except (OSError, smtplib.SMTPException) as ex:
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        print("Failed to connect to SMTP server, " + str(len(digestMessages)) + " digest emails not sent : " + repr(ex))
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        sendStats["failed"] = len(digestMessages)
+        return sendStats
+    try:
+        for messageIndex, digestMessage in enumerate(digestMessages):
+            try:
+                smtpConnection.send_message(digestMessage)
+                sendStats["sent"] += 1
+            except smtplib.SMTPRecipientsRefused as ex:
+                print("Digest email to " + digestMessage["To"] + " was refused by SMTP server : " + str(ex.recipients))
+                sendStats["failed"] += 1
+            except smtplib.SMTPResponseException as ex:
+                print("Digest email to " + digestMessage["To"] + " failed with SMTP error " + str(ex.smtp_code) + " : " + str(ex.smtp_error))
+                sendStats["failed"] += 1
+            except (smtplib.SMTPServerDisconnected, OSError) as ex:
+                # connection is lost, remaining messages can not be sent
+                print("SMTP connection lost, " + str(len(digestMessages) - messageIndex) + " digest emails not sent : " + repr(ex))
+                sendStats["failed"] += len(digestMessages) - messageIndex
+                break
+    finally:
+        try:
+            smtpConnection.quit()
+        except (OSError, smtplib.SMTPException):
+            pass
+    print("Digest emails sent       : " + str(sendStats["sent"]) + " of " + str(len(digestMessages)))
+    return sendStats
@@ -0,0 +1,157 @@
+import os
+import time
+import sqlite3
+import datetime
+import threading
+import collections
+import jira_sla_engine
+
+'''
+  Module Name : jira_oosla_history.py
+  Purpose     : Pre-aggregated history of OOSLA counts, used for trend reports without searching JIRA again
+                It works as follows:
+                  1. While a run checks JIRAs, counts every checked JIRA per (project, priority, assignee, issue type, SLA state)
+                     SLA state is ok, soonToBeOosla or oosla as classified by jira_sla_engine.py
+                  2. At the end of the run the counts of every checked (project, priority) bucket replace the counts of the same
+                     bucket for the day in daily_counts table, i.e. the day keeps the counts of its last run
+                  3. weekly_counts table is rolled up from daily_counts of the ISO week, count is the one of the last recorded day
+                     of the week and peak_count is the highest daily count of the week of that one row
+                     peaks of a trend are not sums of peak_count, rows peak on different days, the weekly peak of every trend
+                     group is the highest of the group's daily totals and is computed from daily_counts at query time
+                  4. Both tables are keyed by team and period first, so a trend of a team for a date range is one index range scan
+                     see query_oosla_history.py for the query CLI
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_OOSLA_HISTORY_FILE : path of SQLite history file, default is jira_oosla_history.db next to onboard folder
+'''
+
+DEFAULT_HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jira_oosla_history.db")
+SLA_STATES = [jira_sla_engine.STATE_OK, jira_sla_engine.STATE_SOON_TO_BE_OOSLA, jira_sla_engine.STATE_OOSLA]
+# dimension columns of count tables, in the order used by queries
+DIMENSION_COLUMNS = ["project", "priority", "assignee", "issue_type", "sla_state"]
+PERIOD_TABLES = {
+    "daily": "daily_counts",
+    "weekly": "weekly_counts"
+}
+
+def getHistoryFile():
+    return os.environ.get("JIRA_OOSLA_HISTORY_FILE") or DEFAULT_HISTORY_FILE
+
+def getDayName(runDate):
+    return runDate.isoformat()
+
+# ISO week e.g. 2026-W42
+def getWeekName(runDate):
+    isoYear, isoWeek, isoWeekDay = runDate.isocalendar()
+    return "%04d-W%02d" % (isoYear, isoWeek)
+
+# first and last day of the ISO week of a date
+def getWeekDays(runDate):
+    weekStart = runDate - datetime.timedelta(days=runDate.isoweekday() - 1)
+    return getDayName(weekStart), getDayName(weekStart + datetime.timedelta(days=6))
+
+# first and last day of an ISO week name e.g. 2026-W42
+def getWeekNameDays(weekName):
+    isoYear, isoWeek = weekName.split("-W")
+    return getWeekDays(datetime.date.fromisocalendar(int(isoYear), int(isoWeek), 1))
+
+def openHistoryDatabase(historyFile=None):
+    connection = sqlite3.connect(historyFile or getHistoryFile(), check_same_thread=False)
+    connection.execute("CREATE TABLE IF NOT EXISTS history_runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, team TEXT, recorded_at REAL, day TEXT, buckets INTEGER, issues INTEGER)")
+    for periodTable in PERIOD_TABLES.values():
+        countColumns = "count INTEGER, peak_count INTEGER" if periodTable == PERIOD_TABLES["weekly"] else "count INTEGER"
+        connection.execute("CREATE TABLE IF NOT EXISTS " + periodTable + " (team TEXT, period TEXT, project TEXT, priority TEXT, assignee TEXT, issue_type TEXT, sla_state TEXT, " + countColumns
+            + ", PRIMARY KEY (team, period, project, priority, assignee, issue_type, sla_state)) WITHOUT ROWID")
+    connection.commit()
+    return connection
+
+class OoslaHistory:
+    def __init__(self, teamName, historyFile=None):
+        self.teamName = teamName
+        self.historyFile = historyFile or getHistoryFile()
+        # (project, priority) buckets checked in this run, a checked bucket without JIRAs clears the counts of the day
+        self.checkedBuckets = set()
+        self.counts = collections.Counter()
+        # pages of a team are checked on team pool threads in fleet mode
+        self.lock = threading.Lock()
+        self.stats = {
+            "issues": 0,
+            "countRows": 0,
+            "day": None
+        }
+
+    def addBucket(self, jiraProject, jiraPriority):
+        with self.lock:
+            self.checkedBuckets.add((jiraProject, jiraPriority.upper()))
+
+    # count a page of classified JIRAs of a bucket, issues are IssueRecord objects
+    def addIssues(self, jiraProject, jiraPriority, issues, issueTypes, slaStates):
+        pageCounts = collections.Counter((jiraProject, jiraPriority.upper(), issue.getAssigneeName(), str(issueType), slaState) for issue, issueType, slaState in zip(issues, issueTypes, slaStates))
+        with self.lock:
+            self.counts.update(pageCounts)
+            self.stats["issues"] += len(issues)
+
+    # replace counts of the checked buckets for the day of the run and roll them up into the week
+    def recordRun(self, runDate=None):
+        runDate = runDate or datetime.date.today()
+        dayName = getDayName(runDate)
+        weekName = getWeekName(runDate)
+        weekStart, weekEnd = getWeekDays(runDate)
+        connection = openHistoryDatabase(self.historyFile)
+        try:
+            with self.lock:
+                for jiraProject, jiraPriority in sorted(self.checkedBuckets):
+                    connection.execute("DELETE FROM daily_counts WHERE team = ? AND period = ? AND project = ? AND priority = ?", (self.teamName, dayName, jiraProject, jiraPriority))
+                connection.executemany("INSERT INTO daily_counts (team, period, project, priority, assignee, issue_type, sla_state, count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(self.teamName, dayName) + countKey + (count,) for countKey, count in sorted(self.counts.items())])
+                for jiraProject, jiraPriority in sorted(self.checkedBuckets):
+                    bucketParams = (self.teamName, weekName, jiraProject, jiraPriority)
+                    connection.execute("DELETE FROM weekly_counts WHERE team = ? AND period = ? AND project = ? AND priority = ?", bucketParams)
+                    # count of a dimension missing on the last recorded day of the week is 0, its peak stays
+                    connection.execute("INSERT INTO weekly_counts (team, period, project, priority, assignee, issue_type, sla_state, count, peak_count)"
+                        + " SELECT team, ?, project, priority, assignee, issue_type, sla_state, SUM(CASE WHEN period = lastDay THEN count ELSE 0 END), MAX(count)"
+                        + " FROM daily_counts, (SELECT MAX(period) AS lastDay FROM daily_counts WHERE team = ? AND period BETWEEN ? AND ? AND project = ? AND priority = ?)"
+                        + " WHERE team = ? AND period BETWEEN ? AND ? AND project = ? AND priority = ? GROUP BY team, project, priority, assignee, issue_type, sla_state",
+                        (weekName,) + (self.teamName, weekStart, weekEnd, jiraProject, jiraPriority) * 2)
+                connection.execute("INSERT INTO history_runs (team, recorded_at, day, buckets, issues) VALUES (?, ?, ?, ?, ?)", (self.teamName, time.time(), dayName, len(self.checkedBuckets), self.stats["issues"]))
+                connection.commit()
+                self.stats["countRows"] = len(self.counts)
+                self.stats["day"] = dayName
+        finally:
+            connection.close()
+
+    def printSummary(self):
+        print("OOSLA history " + self.teamName.ljust(11) + ": " + str(self.stats["issues"]) + " JIRAs of " + str(len(self.checkedBuckets)) + " buckets as " + str(self.stats["countRows"]) + " counts for " + str(self.stats["day"]))
+
+# trend series of a team as [(period, group value, count)], filters are {dimension column: value}
+# weekly peak of a group is the highest daily total of the group in the week, read from daily_counts
+def queryTrend(connection, teamName, periodName="daily", fromPeriod=None, toPeriod=None, groupBy=None, dimensionFilters=None, usePeak=False):
+    if groupBy is not None and groupBy not in DIMENSION_COLUMNS:
+        raise ValueError("Unknown group by column " + groupBy + ", use one of " + ", ".join(DIMENSION_COLUMNS))
+    if usePeak and periodName == "weekly":
+        fromDay = getWeekNameDays(fromPeriod)[0] if fromPeriod else None
+        toDay = getWeekNameDays(toPeriod)[1] if toPeriod else None
+        weekPeaks = {}
+        for dayName, groupValue, dayCount in queryTrend(connection, teamName, "daily", fromDay, toDay, groupBy, dimensionFilters):
+            weekKey = (getWeekName(datetime.date.fromisoformat(dayName)), groupValue)
+            weekPeaks[weekKey] = max(weekPeaks.get(weekKey, 0), dayCount)
+        return [weekKey + (peakCount,) for weekKey, peakCount in sorted(weekPeaks.items(), key=lambda weekPeak: (weekPeak[0][0], str(weekPeak[0][1])))]
+    whereClauses = ["team = ?"]
+    queryParams = [teamName]
+    if fromPeriod:
+        whereClauses.append("period >= ?")
+        queryParams.append(fromPeriod)
+    if toPeriod:
+        whereClauses.append("period <= ?")
+        queryParams.append(toPeriod)
+    for dimensionColumn, dimensionValue in sorted((dimensionFilters or {}).items()):
+        if dimensionColumn not in DIMENSION_COLUMNS:
+            raise ValueError("Unknown filter column " + dimensionColumn + ", use one of " + ", ".join(DIMENSION_COLUMNS))
+        whereClauses.append(dimensionColumn + " = ?")
+        queryParams.append(dimensionValue)
+    groupColumn = groupBy or "''"
+    trendQuery = ("SELECT period, " + groupColumn + ", SUM(count) FROM " + PERIOD_TABLES[periodName] + " WHERE " + " AND ".join(whereClauses)
+        + " GROUP BY period, " + groupColumn + " ORDER BY period, " + groupColumn)
+    return connection.execute(trendQuery, queryParams).fetchall()
@@ -0,0 +1,128 @@
+import sys
+import json
+import html
+import collections
+from operator import itemgetter
+
+'''
+  Module Name : jira_oosla_report.py
+  Purpose     : Consolidated OOSLA report of a team in HTML, CSV and JSON formats
+                It works as follows:
+                  1. Collects one compact row(tuple) for every OOSLA and soon to be OOSLA JIRA listed by the scripts
+                  2. Keeps summary counts per priority, SLA state, assignee and environment while rows are added
+                  3. Sorts rows once by priority and age and renders every output format in a single buffered write
+                     repeated values like assignee, environment and age are escaped/formatted once and reused
+                     <team>_oosla_report.html : complete HTML document with summary tables and all the JIRAs
+                     <team>_oosla_report.csv  : one line per JIRA
+                     <team>_oosla_report.json : summary counts, column names and one row(list) per JIRA
+'''
+
+# row columns, rows are kept as tuples in this order
+REPORT_COLUMNS = ["key", "project", "issuetype", "environment", "priority", "assignee", "state", "created", "age_hours"]
+STATE_LABELS = {
+    "oosla": "OOSLA",
+    "soonToBeOosla": "Soon to be OOSLA"
+}
+SUMMARY_NAMES = ["priority", "state", "assignee", "environment"]
+HTML_ROW_TEMPLATE = "<tr><td><a href=\"%s%s\">%s</a></td><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>\n"
+# issue key, SLA state and created timestamp never need CSV quoting
+CSV_ROW_TEMPLATE = "%s,%s,%s,%s,%s,%s,%s,%s,%d\r\n"
+
+# age in days when older than 48 hours else in hours, same as legacy output files
+def formatJiraAge(jiraAgeInHours):
+    if jiraAgeInHours > 48:
+        return str(int(jiraAgeInHours / 24)) + " days"
+    return str(int(jiraAgeInHours)) + " hours"
+
+# quote CSV value the same way as csv module does with default settings
+def getCsvValue(value):
+    if any(specialChar in value for specialChar in ",\"\r\n"):
+        return "\"" + value.replace("\"", "\"\"") + "\""
+    return value
+
+# dict like cache which computes value of a missing key using input function
+class ValueCache(dict):
+    def __init__(self, valueFunction):
+        self.valueFunction = valueFunction
+
+    def __missing__(self, key):
+        value = self[key] = self.valueFunction(key)
+        return value
+
+def renderSummaryTable(summaryName, summaryCounts):
+    tableLines = ["<h3>By " + summaryName + "</h3>\n<table border=\"1\"><tr><th>" + summaryName + "</th><th>JIRAs</th></tr>\n"]
+    for summaryValue, summaryCount in summaryCounts.most_common():
+        tableLines.append("<tr><td>" + html.escape(summaryValue) + "</td><td>" + str(summaryCount) + "</td></tr>\n")
+    tableLines.append("</table>\n")
+    return "".join(tableLines)
+
+class OoslaReport:
+    def __init__(self, teamName, browseURL):
+        self.teamName = teamName
+        self.browseURL = browseURL
+        self.rows = []
+        self.summaryCounts = dict((summaryName, collections.Counter()) for summaryName in SUMMARY_NAMES)
+
+    # add a listed JIRA, repeated values like priority, assignee etc are interned so that rows share them
+    def addRow(self, issueKey, jiraProject, issueType, jiraEnv, jiraPriority, jiraAssignee, slaState, createdDate, jiraAgeInHours):
+        intern = sys.intern
+        row = (issueKey, intern(jiraProject), intern(issueType), intern(jiraEnv), intern(jiraPriority), intern(jiraAssignee), slaState, createdDate, int(jiraAgeInHours))
+        self.rows.append(row)
+        self.summaryCounts["priority"][row[4]] += 1
+        self.summaryCounts["state"][STATE_LABELS[slaState]] += 1
+        self.summaryCounts["assignee"][row[5]] += 1
+        self.summaryCounts["environment"][row[3]] += 1
+
+    # highest priority first and oldest JIRA first within a priority, stable sorts on one column are faster than a tuple key
+    def getSortedRows(self):
+        sortedRows = sorted(self.rows, key=itemgetter(0))
+        sortedRows.sort(key=itemgetter(8), reverse=True)
+        sortedRows.sort(key=itemgetter(4))
+        return sortedRows
+
+    def renderHtml(self, sortedRows):
+        escape = ValueCache(html.escape)
+        jiraAges = ValueCache(formatJiraAge)
+        browseURL = self.browseURL
+        htmlLines = [
+            "<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>OOSLA report - " + escape[self.teamName] + "</title></head>\n<body>\n",
+            "<h2>OOSLA report - " + escape[self.teamName] + " (" + str(len(sortedRows)) + " JIRAs)</h2>\n"
+        ]
+        for summaryName in SUMMARY_NAMES:
+            htmlLines.append(renderSummaryTable(summaryName, self.summaryCounts[summaryName]))
+        htmlLines.append("<h3>JIRAs</h3>\n<table border=\"1\"><tr><th>JIRA</th><th>Type</th><th>Env</th><th>Priority</th><th>Assignee</th><th>State</th><th>Created</th><th>Age</th></tr>\n")
+        htmlLines.extend([HTML_ROW_TEMPLATE % (browseURL, issueKey, issueKey, escape[issueType], escape[jiraEnv], jiraPriority, escape[jiraAssignee], STATE_LABELS[slaState], createdDate, jiraAges[jiraAgeInHours])
+            for issueKey, jiraProject, issueType, jiraEnv, jiraPriority, jiraAssignee, slaState, createdDate, jiraAgeInHours in sortedRows])
+        htmlLines.append("</table>\n</body>\n</html>\n")
+        return "".join(htmlLines)
+
+    def renderCsv(self, sortedRows):
+        csvValues = ValueCache(getCsvValue)
+        csvLines = [",".join(REPORT_COLUMNS) + "\r\n"]
+        csvLines.extend([CSV_ROW_TEMPLATE % (issueKey, csvValues[jiraProject], csvValues[issueType], csvValues[jiraEnv], csvValues[jiraPriority], csvValues[jiraAssignee], slaState, createdDate, jiraAgeInHours)
+            for issueKey, jiraProject, issueType, jiraEnv, jiraPriority, jiraAssignee, slaState, createdDate, jiraAgeInHours in sortedRows])
+        return "".join(csvLines)
+
+    def renderJson(self, sortedRows):
+        return json.dumps({
+            "team": self.teamName,
+            "total": len(sortedRows),
+            "summary": dict((summaryName, dict(self.summaryCounts[summaryName].most_common())) for summaryName in SUMMARY_NAMES),
+            "columns": REPORT_COLUMNS,
+            "rows": sortedRows
+        }, separators=(",", ":"))
+
+    # write HTML, CSV and JSON reports, returns list of files written
+    def writeReports(self, outputPrefix=None):
+        outputPrefix = outputPrefix or self.teamName + "_oosla_report"
+        sortedRows = self.getSortedRows()
+        with open(outputPrefix + ".html", "w", encoding="utf-8") as htmlContent:
+            htmlContent.write(self.renderHtml(sortedRows))
+        with open(outputPrefix + ".csv", "w", newline="", encoding="utf-8") as csvContent:
+            csvContent.write(self.renderCsv(sortedRows))
+        with open(outputPrefix + ".json", "w", encoding="utf-8") as jsonContent:
+            jsonContent.write(self.renderJson(sortedRows))
+        return [outputPrefix + ".html", outputPrefix + ".csv", outputPrefix + ".json"]
+
+    def printSummary(self):
+        print("OOSLA report " + self.teamName.ljust(12) + ": " + str(len(self.rows)) + " JIRAs, " + ", ".join(summaryValue + " " + str(summaryCount) for summaryValue, summaryCount in sorted(self.summaryCounts["priority"].items())))
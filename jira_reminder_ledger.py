@@ -0,0 +1,159 @@
+import os
+import time
+import sqlite3
+import threading
+
+'''
+  Module Name : jira_reminder_ledger.py
+  Purpose     : Persistent ledger of OOSLA reminders and watchers already added in JIRA tickets
+                It works as follows:
+                  1. Records SLA state(soonToBeOosla/oosla) and time of the last reminder comment for every (issue key, bucket)
+                     bucket is the output bucket of the issue i.e. <project>_<priority>
+                  2. A new reminder comment is due only when SLA state or bucket changed or re-notify interval has passed
+                     interval is shortened by a grace period, a reminder is recorded once its comment is added and the next run
+                     checks it before adding the comment, so a weekly run would otherwise fall a few seconds short of 168 hours
+                  3. Records watchers added by the script in every issue, these watchers are never added again
+                  4. Reconciles recorded watchers with watchers field in JIRA search results
+                  5. With a claim owner(worker processes of auto_oosla_reminder_workers.py sharing one ledger file), a due reminder is
+                     claimed in the same transaction that checks it, so only one process comments, the claim is replaced by the
+                     reminder once the comment is added or dropped when the comment fails
+                     a claim left by a crashed worker counts as a reminder sent at claim time, as it is not known whether the
+                     comment was added, so a reminder can be delayed until the re-notify interval but is never added twice
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_REMINDER_LEDGER_FILE : path of SQLite ledger file, default is jira_reminder_ledger.db next to onboard folder
+'''
+
+DEFAULT_LEDGER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jira_reminder_ledger.db")
+DEFAULT_RENOTIFY_HOURS = 168
+# a reminder is due again this many seconds before re-notify interval has passed, covers runs starting a little earlier
+# than the run which added the reminder e.g. weekly OOSLA reminder day runs with default 168 hours
+# grace is at most a tenth of the interval, so short intervals still skip reminders
+RENOTIFY_GRACE_SECONDS = 6 * 3600
+# seconds a ledger call waits for another process holding the ledger file lock
+LEDGER_BUSY_TIMEOUT_SECONDS = 60
+
+def getLedgerFile():
+    return os.environ.get("JIRA_REMINDER_LEDGER_FILE") or DEFAULT_LEDGER_FILE
+
+# watcher names from watchers field of JIRA search results, issueObject is an IssueRecord(see jira_issue_record.py)
+# JIRA usually returns only watchCount in search results, names are present only when watchers list is expanded
+def getWatcherNamesFromIssue(issueObject):
+    return issueObject.watcherNames, issueObject.watchCount
+
+class JiraReminderLedger:
+    def __init__(self, ledgerFile=None, renotifyHours=DEFAULT_RENOTIFY_HOURS, claimOwner=None):
+        self.ledgerFile = ledgerFile or getLedgerFile()
+        self.renotifyHours = renotifyHours
+        # set when several processes share the ledger file, due reminders are then claimed before the comment is added
+        self.claimOwner = claimOwner
+        # ledger is used from write pool threads as well
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.ledgerFile, check_same_thread=False, timeout=LEDGER_BUSY_TIMEOUT_SECONDS)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS reminders (issue_key TEXT, bucket TEXT, sla_state TEXT, reminded_at REAL, PRIMARY KEY (issue_key, bucket))")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS watchers (issue_key TEXT, watcher TEXT, added_at REAL, PRIMARY KEY (issue_key, watcher))")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS reminder_claims (issue_key TEXT, bucket TEXT, sla_state TEXT, claim_owner TEXT, claimed_at REAL, PRIMARY KEY (issue_key, bucket))")
+        self.connection.commit()
+        self.stats = {
+            "remindersSkipped": 0,
+            "remindersRecorded": 0,
+            "watchersSkipped": 0,
+            "watchersRecorded": 0,
+            "remindersClaimedElsewhere": 0
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+    # reminder(or claim) recorded in ledger row is for the same SLA state and was added within re-notify interval
+    def isRecentReminder(self, reminderRow, slaState):
+        renotifySeconds = self.renotifyHours * 3600
+        return reminderRow is not None and reminderRow[0] == slaState and time.time() - reminderRow[1] < renotifySeconds - min(RENOTIFY_GRACE_SECONDS, renotifySeconds / 10)
+
+    def isReminderDue(self, issueKey, slaState, bucket):
+        if self.claimOwner is not None:
+            return self.claimReminder(issueKey, slaState, bucket)
+        with self.lock:
+            row = self.connection.execute("SELECT sla_state, reminded_at FROM reminders WHERE issue_key = ? AND bucket = ?", (issueKey, bucket)).fetchone()
+            if self.isRecentReminder(row, slaState):
+                self.stats["remindersSkipped"] += 1
+                return False
+            return True
+
+    # check and claim a due reminder in one write transaction, False when it is not due or another claim is not expired
+    def claimReminder(self, issueKey, slaState, bucket):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute("SELECT sla_state, reminded_at FROM reminders WHERE issue_key = ? AND bucket = ?", (issueKey, bucket)).fetchone()
+                if self.isRecentReminder(row, slaState):
+                    self.stats["remindersSkipped"] += 1
+                    return False
+                claimRow = self.connection.execute("SELECT sla_state, claimed_at FROM reminder_claims WHERE issue_key = ? AND bucket = ?", (issueKey, bucket)).fetchone()
+                if self.isRecentReminder(claimRow, slaState):
+                    self.stats["remindersClaimedElsewhere"] += 1
+                    return False
+                self.connection.execute("INSERT OR REPLACE INTO reminder_claims (issue_key, bucket, sla_state, claim_owner, claimed_at) VALUES (?, ?, ?, ?, ?)", (issueKey, bucket, slaState, self.claimOwner, time.time()))
+                return True
+            finally:
+                self.connection.commit()
+
+    # drop claim of a reminder whose comment could not be added, so that a later run can add it
+    def releaseReminder(self, issueKey, bucket):
+        if self.claimOwner is None:
+            return
+        with self.lock:
+            self.connection.execute("DELETE FROM reminder_claims WHERE issue_key = ? AND bucket = ? AND claim_owner = ?", (issueKey, bucket, self.claimOwner))
+            self.connection.commit()
+
+    # SLA state of the issue is not the one recorded with its last reminder, e.g. soon to be OOSLA JIRA became OOSLA or a new JIRA
+    def hasStateChanged(self, issueKey, slaState, bucket):
+        with self.lock:
+            row = self.connection.execute("SELECT sla_state FROM reminders WHERE issue_key = ? AND bucket = ?", (issueKey, bucket)).fetchone()
+            return row is None or row[0] != slaState
+
+    def recordReminder(self, issueKey, slaState, bucket):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO reminders (issue_key, bucket, sla_state, reminded_at) VALUES (?, ?, ?, ?)", (issueKey, bucket, slaState, time.time()))
+            if self.claimOwner is not None:
+                self.connection.execute("DELETE FROM reminder_claims WHERE issue_key = ? AND bucket = ?", (issueKey, bucket))
+            self.connection.commit()
+            self.stats["remindersRecorded"] += 1
+
+    # sync recorded watchers of an issue with watchers field from JIRA search results
+    def reconcileWatchers(self, issueObject):
+        watcherNames, watchCount = getWatcherNamesFromIssue(issueObject)
+        with self.lock:
+            if watcherNames is not None:
+                # watcher names are known, record existing ones and forget the ones removed from JIRA ticket
+                recordedWatchers = set(row[0] for row in self.connection.execute("SELECT watcher FROM watchers WHERE issue_key = ?", (issueObject.key,)))
+                for removedWatcher in recordedWatchers - watcherNames:
+                    self.connection.execute("DELETE FROM watchers WHERE issue_key = ? AND watcher = ?", (issueObject.key, removedWatcher))
+                for existingWatcher in watcherNames - recordedWatchers:
+                    self.connection.execute("INSERT OR REPLACE INTO watchers (issue_key, watcher, added_at) VALUES (?, ?, ?)", (issueObject.key, existingWatcher, time.time()))
+            elif watchCount == 0:
+                # nobody is watching the JIRA ticket any more, so recorded watchers are stale
+                self.connection.execute("DELETE FROM watchers WHERE issue_key = ?", (issueObject.key,))
+            self.connection.commit()
+
+    # watchers of input list which are not added in the JIRA ticket yet
+    def getMissingWatchers(self, issueKey, watcherList):
+        with self.lock:
+            recordedWatchers = set(row[0] for row in self.connection.execute("SELECT watcher FROM watchers WHERE issue_key = ?", (issueKey,)))
+            missingWatchers = [watcher for watcher in watcherList if watcher not in recordedWatchers]
+            self.stats["watchersSkipped"] += len(watcherList) - len(missingWatchers)
+            return missingWatchers
+
+    def recordWatcher(self, issueKey, watcher):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO watchers (issue_key, watcher, added_at) VALUES (?, ?, ?)", (issueKey, watcher, time.time()))
+            self.connection.commit()
+            self.stats["watchersRecorded"] += 1
+
+    def printStats(self):
+        print("Reminder ledger          : " + str(self.stats["remindersRecorded"]) + " reminders added, " + str(self.stats["remindersSkipped"]) + " skipped, " + str(self.stats["watchersRecorded"]) + " watchers added, " + str(self.stats["watchersSkipped"]) + " skipped"
+            + (", " + str(self.stats["remindersClaimedElsewhere"]) + " claimed by other workers" if self.claimOwner is not None else ""))
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import jira_sla_engine
+
+'''
+  Module Name : jira_reminder_plan.py
+  Purpose     : Plan file of the OOSLA reminder comments and watcher additions of a run, written by OOSLA reminder runs with --plan
+                without any write in JIRA and executed later by apply_reminder_plan.py
+                It works as follows:
+                  1. First line is a header with team name, plan time and reminder ledger settings of the run
+                  2. Every intended write is one line, a comment with its SLA state and ledger bucket or one watcher of a JIRA
+                     a comment keeps the JIRA age and SLA hours at plan time, so apply renders it again with the age at apply time,
+                     body is the comment as it was at plan time for reviewing the plan
+                  3. Every entry has an id derived from the write itself, (action, JIRA key, bucket, SLA state) of a comment and
+                     (action, JIRA key, watcher) of a watcher, so the same reminder gets the same id in any plan and is written
+                     to a plan only once
+                  4. A plan is written to <file>.part and renamed once the run is complete, so a partial plan of a crashed run
+                     is never applied
+                  5. Applied entry ids are appended to <plan file>.applied journal as soon as the write is done, a re-run of apply
+                     skips them
+    Every entry line is a JSON object with an "action" field:
+       {"id": "..", "action": "comment", "key": "ABC-1", "priority": "P1", "state": "oosla", "bucket": "ABC_P1", "body": "..",
+        "ageHours": 530.5, "slaHours": 480, "issueType": "Bug"}
+       {"id": "..", "action": "watcher", "key": "ABC-1", "priority": "P1", "watcher": "user1"}
+'''
+
+PLAN_VERSION = 1
+PLAN_FILE_SUFFIX = "_reminder_plan.jsonl"
+APPLIED_FILE_SUFFIX = ".applied"
+ACTION_COMMENT = "comment"
+ACTION_WATCHER = "watcher"
+# OOSLA JIRAs are applied before soon to be OOSLA JIRAs of the same priority
+STATE_APPLY_ORDER = {
+    jira_sla_engine.STATE_OOSLA: 0,
+    jira_sla_engine.STATE_SOON_TO_BE_OOSLA: 1
+}
+
+def getPlanFile(teamName):
+    return teamName + PLAN_FILE_SUFFIX
+
+def getAppliedFile(planFile):
+    return planFile + APPLIED_FILE_SUFFIX
+
+# id of a write, same for the same reminder or watcher of any plan, comment body is left out as it changes with JIRA age
+def getEntryId(planEntry):
+    if planEntry["action"] == ACTION_COMMENT:
+        writeValues = [planEntry["action"], planEntry["key"], planEntry["bucket"], planEntry["state"]]
+    else:
+        writeValues = [planEntry["action"], planEntry["key"], planEntry["watcher"]]
+    return hashlib.sha1(json.dumps(writeValues).encode("utf-8")).hexdigest()[:20]
+
+class ReminderPlan:
+    def __init__(self, teamName, useLedger=True, renotifyHours=None, planFile=None):
+        self.teamName = teamName
+        self.planFile = planFile or getPlanFile(teamName)
+        # entries can be added from more than one scan thread
+        self.lock = threading.Lock()
+        self.entryIds = set()
+        self.stats = {
+            "comments": 0,
+            "watchers": 0,
+            "duplicates": 0
+        }
+        self.planStream = open(self.planFile + ".part", "w")
+        self.writeLine({"plan": PLAN_VERSION, "team": teamName, "plannedAt": time.time(), "ledger": useLedger, "renotifyHours": renotifyHours})
+
+    def writeLine(self, lineValue):
+        self.planStream.write(json.dumps(lineValue, separators=(",", ":")) + "\n")
+
+    def addEntry(self, planEntry):
+        planEntry["id"] = getEntryId(planEntry)
+        with self.lock:
+            if planEntry["id"] in self.entryIds:
+                self.stats["duplicates"] += 1
+                return
+            self.entryIds.add(planEntry["id"])
+            self.writeLine(planEntry)
+            self.stats["comments" if planEntry["action"] == ACTION_COMMENT else "watchers"] += 1
+
+    # JIRA age, SLA hours and issue type are kept to render the comment again at apply time
+    def addReminder(self, issueKey, jiraPriority, slaState, reminderBucket, jiraComment, ageHours=None, slaHours=None, issueType=None):
+        planEntry = {"action": ACTION_COMMENT, "key": issueKey, "priority": jiraPriority, "state": slaState, "bucket": reminderBucket, "body": jiraComment}
+        if ageHours is not None:
+            planEntry.update({"ageHours": round(ageHours, 3), "slaHours": slaHours, "issueType": issueType})
+        self.addEntry(planEntry)
+
+    def addWatchers(self, issueKey, jiraPriority, watcherList):
+        for watcher in watcherList:
+            self.addEntry({"action": ACTION_WATCHER, "key": issueKey, "priority": jiraPriority, "watcher": watcher})
+
+    # complete the plan, returns plan file
+    def close(self):
+        with self.lock:
+            self.planStream.close()
+            os.replace(self.planFile + ".part", self.planFile)
+        return self.planFile
+
+    def printSummary(self):
+        print("Reminder plan " + self.teamName.ljust(11) + ": " + str(self.stats["comments"]) + " comments, " + str(self.stats["watchers"]) + " watchers in " + self.planFile
+            + " (" + str(self.stats["duplicates"]) + " duplicate writes removed)")
+
+# read a plan file, returns header dict and list of entries
+def loadPlan(planFile):
+    with open(planFile) as planContent:
+        planHeader = json.loads(planContent.readline())
+        if planHeader.get("plan") != PLAN_VERSION:
+            raise ValueError(planFile + " is not a version " + str(PLAN_VERSION) + " reminder plan")
+        return planHeader, [json.loads(planLine) for planLine in planContent if planLine.strip()]
+
+# group entries per JIRA as [(JIRA key, comment entries, watcher entries)], entries already applied and identical writes are left out
+# JIRAs are ordered by priority and SLA state, so P0 and OOSLA JIRAs are applied first when JIRA throttles the writes
+def getApplyBatches(planEntries, appliedIds):
+    issueBatches = {}
+    skipStats = {
+        "applied": 0,
+        "duplicates": 0
+    }
+    seenIds = set()
+    for planEntry in planEntries:
+        if planEntry["id"] in appliedIds:
+            skipStats["applied"] += 1
+            continue
+        if planEntry["id"] in seenIds:
+            skipStats["duplicates"] += 1
+            continue
+        seenIds.add(planEntry["id"])
+        issueBatch = issueBatches.setdefault(planEntry["key"], (planEntry["key"], [], []))
+        issueBatch[1 if planEntry["action"] == ACTION_COMMENT else 2].append(planEntry)
+    def getBatchOrder(issueBatch):
+        issueKey, commentEntries, watcherEntries = issueBatch
+        firstEntry = (commentEntries or watcherEntries)[0]
+        return (firstEntry["priority"], min([STATE_APPLY_ORDER.get(commentEntry["state"], 2) for commentEntry in commentEntries] or [2]), issueKey)
+    return sorted(issueBatches.values(), key=getBatchOrder), skipStats
+
+# append only journal of applied entry ids of a plan
+class AppliedJournal:
+    def __init__(self, appliedFile):
+        self.appliedFile = appliedFile
+        # entries are applied from write pool threads
+        self.lock = threading.Lock()
+        # start on a new line if the apply run writing this journal was killed in the middle of a line
+        needsNewLine = False
+        if os.path.isfile(appliedFile) and os.path.getsize(appliedFile) > 0:
+            with open(appliedFile, "rb") as appliedContent:
+                appliedContent.seek(-1, os.SEEK_END)
+                needsNewLine = appliedContent.read(1) != b"\n"
+        self.appliedContent = open(appliedFile, "a")
+        if needsNewLine:
+            self.appliedContent.write("\n")
+
+    def recordApplied(self, planEntry):
+        with self.lock:
+            self.appliedContent.write(json.dumps({"id": planEntry["id"], "key": planEntry["key"], "action": planEntry["action"], "appliedAt": time.time()}, separators=(",", ":")) + "\n")
+            self.appliedContent.flush()
+
+    def close(self):
+        with self.lock:
+            self.appliedContent.close()
+
+# ids of entries applied by earlier apply runs of a plan
+def loadAppliedIds(appliedFile):
+    appliedIds = set()
+    if not os.path.isfile(appliedFile):
+        return appliedIds
+    with open(appliedFile) as appliedContent:
+        for appliedLine in appliedContent:
+            try:
+                appliedIds.add(json.loads(appliedLine)["id"])
+            except (ValueError, KeyError):
+                # last line can be partly written when the apply run was killed
+                continue
+    return appliedIds
@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import time
+import bisect
+import threading
+import collections
+from urllib.parse import urlparse
+import jira_http_client
+import jira_search
+
+'''
+  Module Name : jira_request_metrics.py
+  Purpose     : Per endpoint metrics of all the JIRA calls made during a run
+                It works as follows:
+                  1. Listens to every response of the shared HTTP client, including calls made by jira python module when its
+                     session is attached with notifyListeners, retries are counted as separate calls
+                  2. Maps the call URL to a logical endpoint(search, comment, watchers, transition, other)
+                  3. Keeps call count, latency histogram, bytes sent and received and status code breakdown per endpoint
+                     connection errors and timeouts are counted with status "error"
+                  4. Writes the metrics at the end of the run as
+                       <prefix>.prom : Prometheus text format, can be picked up by node_exporter textfile collector
+                       <prefix>.json : JSON summary with the same numbers and latency percentiles estimated from the histogram
+'''
+
+'''
+    Settings can be changed using below ENV variables
+       JIRA_METRICS_DIR : folder where metric files are written, default is current folder
+'''
+
+# upper bounds in seconds of latency histogram buckets, last bucket is +Inf
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+ENDPOINT_PATTERNS = [
+    ("search", re.compile(r"/search$")),
+    ("comment", re.compile(r"/issue/[^/]+/comment$")),
+    ("watchers", re.compile(r"/issue/[^/]+/watchers$")),
+    ("transition", re.compile(r"/issue/[^/]+/transitions$")),
+    ("changelog", re.compile(r"/issue/[^/]+/changelog$"))
+]
+LATENCY_PERCENTILES = [50, 90, 99]
+
+def getMetricsFolder():
+    return os.environ.get("JIRA_METRICS_DIR") or ""
+
+# logical endpoint of a JIRA call URL
+def getEndpointName(url):
+    urlPath = urlparse(url).path.rstrip("/")
+    for endpointName, endpointPattern in ENDPOINT_PATTERNS:
+        if endpointPattern.search(urlPath):
+            return endpointName
+    return "other"
+
+def getRequestBodySize(response):
+    requestBody = getattr(response.request, "body", None)
+    if requestBody is None:
+        return 0
+    if isinstance(requestBody, str):
+        return len(requestBody.encode())
+    try:
+        return len(requestBody)
+    except TypeError:
+        # streamed bodies have no length
+        return 0
+
+# bytes received over the wire, decoded body size when JIRA does not send Content-Length
+def getResponseBodySize(response):
+    contentLength = response.headers.get("Content-Length")
+    if contentLength and contentLength.isdigit():
+        return int(contentLength)
+    return len(response.content or b"")
+
+def escapeLabelValue(labelValue):
+    return str(labelValue).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def formatLabels(metricLabels):
+    return "{" + ",".join(labelName + "=\"" + escapeLabelValue(labelValue) + "\"" for labelName, labelValue in metricLabels.items()) + "}"
+
+def newEndpointMetrics():
+    return {
+        "requests": 0,
+        "latencySum": 0.0,
+        "latencyBuckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "bytesSent": 0,
+        "bytesReceived": 0,
+        "statusCodes": collections.Counter()
+    }
+
+# latency below which the input percent of calls completed, upper bound of the histogram bucket holding that call
+def estimateLatencyPercentile(latencyBuckets, requestCount, percent):
+    if not requestCount:
+        return None
+    targetCount = requestCount * percent / 100
+    cumulativeCount = 0
+    for bucketIndex, bucketCount in enumerate(latencyBuckets):
+        cumulativeCount += bucketCount
+        if cumulativeCount >= targetCount:
+            return LATENCY_BUCKETS[bucketIndex] if bucketIndex < len(LATENCY_BUCKETS) else "+Inf"
+    return "+Inf"
+
+class JiraRequestMetrics:
+    def __init__(self, metricLabels=None):
+        # constant labels added to every Prometheus sample e.g. script and team name
+        self.metricLabels = dict(metricLabels or {})
+        self.endpointMetrics = collections.defaultdict(newEndpointMetrics)
+        self.lock = threading.Lock()
+        self.startTime = time.time()
+        self.endTime = None
+
+    def start(self):
+        jira_http_client.registerResponseListener(self.observeResponse)
+        return self
+
+    def stop(self):
+        jira_http_client.unregisterResponseListener(self.observeResponse)
+        self.endTime = time.time()
+
+    # response listener for the shared HTTP client, response is None for connection errors and timeouts
+    def observeResponse(self, method, url, response, elapsedSeconds):
+        endpointName = getEndpointName(url)
+        if response is None:
+            statusCode, bytesSent, bytesReceived = "error", 0, 0
+        else:
+            statusCode, bytesSent, bytesReceived = str(response.status_code), getRequestBodySize(response), getResponseBodySize(response)
+        bucketIndex = bisect.bisect_left(LATENCY_BUCKETS, elapsedSeconds)
+        with self.lock:
+            endpointMetrics = self.endpointMetrics[endpointName]
+            endpointMetrics["requests"] += 1
+            endpointMetrics["latencySum"] += elapsedSeconds
+            endpointMetrics["latencyBuckets"][bucketIndex] += 1
+            endpointMetrics["bytesSent"] += bytesSent
+            endpointMetrics["bytesReceived"] += bytesReceived
+            endpointMetrics["statusCodes"][statusCode] += 1
+
+    def getSortedEndpoints(self):
+        with self.lock:
+            return sorted((endpointName, dict(endpointMetrics, latencyBuckets=list(endpointMetrics["latencyBuckets"]), statusCodes=collections.Counter(endpointMetrics["statusCodes"])))
+                for endpointName, endpointMetrics in self.endpointMetrics.items())
+
+    def renderPrometheus(self):
+        sortedEndpoints = self.getSortedEndpoints()
+        metricLines = [
+            "# HELP jira_client_requests_total JIRA calls made by the run per endpoint and response status",
+            "# TYPE jira_client_requests_total counter"
+        ]
+        for endpointName, endpointMetrics in sortedEndpoints:
+            for statusCode, statusCount in sorted(endpointMetrics["statusCodes"].items()):
+                metricLines.append("jira_client_requests_total" + formatLabels(dict(self.metricLabels, endpoint=endpointName, status=statusCode)) + " " + str(statusCount))
+        metricLines.extend([
+            "# HELP jira_client_request_duration_seconds Latency of JIRA calls made by the run per endpoint",
+            "# TYPE jira_client_request_duration_seconds histogram"
+        ])
+        for endpointName, endpointMetrics in sortedEndpoints:
+            cumulativeCount = 0
+            for bucketIndex, bucketCount in enumerate(endpointMetrics["latencyBuckets"]):
+                cumulativeCount += bucketCount
+                bucketBound = repr(float(LATENCY_BUCKETS[bucketIndex])) if bucketIndex < len(LATENCY_BUCKETS) else "+Inf"
+                metricLines.append("jira_client_request_duration_seconds_bucket" + formatLabels(dict(self.metricLabels, endpoint=endpointName, le=bucketBound)) + " " + str(cumulativeCount))
+            endpointLabels = formatLabels(dict(self.metricLabels, endpoint=endpointName))
+            metricLines.append("jira_client_request_duration_seconds_sum" + endpointLabels + " " + repr(round(endpointMetrics["latencySum"], 6)))
+            metricLines.append("jira_client_request_duration_seconds_count" + endpointLabels + " " + str(endpointMetrics["requests"]))
+        for metricName, statName, metricHelp in [("jira_client_request_bytes_total", "bytesSent", "Request body bytes sent to JIRA per endpoint"), ("jira_client_response_bytes_total", "bytesReceived", "Response body bytes received from JIRA per endpoint")]:
+            metricLines.extend(["# HELP " + metricName + " " + metricHelp, "# TYPE " + metricName + " counter"])
+            for endpointName, endpointMetrics in sortedEndpoints:
+                metricLines.append(metricName + formatLabels(dict(self.metricLabels, endpoint=endpointName)) + " " + str(endpointMetrics[statName]))
+        metricLines.extend([
+            "# HELP jira_client_run_end_timestamp_seconds Time when the run finished",
+            "# TYPE jira_client_run_end_timestamp_seconds gauge",
+            "jira_client_run_end_timestamp_seconds" + formatLabels(self.metricLabels) + " " + str(int(self.endTime or time.time()))
+        ])
+        return "\n".join(metricLines) + "\n"
+
+    def getSummary(self):
+        endpointSummaries = {}
+        for endpointName, endpointMetrics in self.getSortedEndpoints():
+            requestCount = endpointMetrics["requests"]
+            endpointSummaries[endpointName] = {
+                "requests": requestCount,
+                "statusCodes": dict(sorted(endpointMetrics["statusCodes"].items())),
+                "bytesSent": endpointMetrics["bytesSent"],
+                "bytesReceived": endpointMetrics["bytesReceived"],
+                "latencySeconds": {
+                    "sum": round(endpointMetrics["latencySum"], 6),
+                    "mean": round(endpointMetrics["latencySum"] / requestCount, 6) if requestCount else None
+                },
+                "latencyHistogram": dict(zip([str(bucketBound) for bucketBound in LATENCY_BUCKETS] + ["+Inf"], endpointMetrics["latencyBuckets"]))
+            }
+            for percent in LATENCY_PERCENTILES:
+                endpointSummaries[endpointName]["latencySeconds"]["p" + str(percent)] = estimateLatencyPercentile(endpointMetrics["latencyBuckets"], requestCount, percent)
+        return {
+            "labels": self.metricLabels,
+            "startTime": int(self.startTime),
+            "endTime": int(self.endTime or time.time()),
+            "endpoints": endpointSummaries
+        }
+
+    # write Prometheus and JSON files, Prometheus file is renamed into place so that a collector never reads a partial file
+    def writeMetricFiles(self, outputPrefix):
+        outputPrefix = os.path.join(getMetricsFolder(), outputPrefix)
+        with open(outputPrefix + ".prom.tmp", "w") as promContent:
+            promContent.write(self.renderPrometheus())
+        os.replace(outputPrefix + ".prom.tmp", outputPrefix + ".prom")
+        with open(outputPrefix + ".json", "w") as jsonContent:
+            json.dump(self.getSummary(), jsonContent, indent=2)
+        return [outputPrefix + ".prom", outputPrefix + ".json"]
+
+    def printStats(self):
+        for endpointName, endpointSummary in self.getSummary()["endpoints"].items():
+            latencySeconds = endpointSummary["latencySeconds"]
+            print(("JIRA " + endpointName + " calls").ljust(25) + ": " + str(endpointSummary["requests"])
+                + " (" + ", ".join(statusCode + ": " + str(statusCount) for statusCode, statusCount in endpointSummary["statusCodes"].items()) + ")"
+                + ", mean " + str(round(latencySeconds["mean"] * 1000, 1)) + " ms, p90 <= " + str(latencySeconds["p90"]) + " s"
+                + ", sent " + jira_search.formatByteCount(endpointSummary["bytesSent"]) + ", received " + jira_search.formatByteCount(endpointSummary["bytesReceived"]))
@@ -0,0 +1,91 @@
+import os
+import gzip
+import json
+import time
+import threading
+
+'''
+  Module Name : jira_scan_snapshot.py
+  Purpose     : Compressed snapshot of the JIRAs checked by a run, used to try SLA table changes offline(see simulate_sla_tables.py)
+                It works as follows:
+                  1. First line is a header with team name, snapshot time, column names and SLA table the run used
+                  2. Every checked JIRA is one line with the columns of SNAPSHOT_COLUMNS as a JSON list, lines are written
+                     to a gzip file while pages are checked, so a snapshot does not keep the JIRAs of the run in memory
+                  3. SLA age is the one the run classified with, i.e. time in active statuses with --sla-clock
+                  4. A snapshot is written to <file>.part and renamed once the run is complete, so a partial snapshot of a crashed
+                     run is never read by the simulator
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_SNAPSHOT_DIR : folder of snapshot files, default is current folder
+'''
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_COLUMNS = ["key", "project", "priority", "issueType", "slaGroup", "assignee", "created", "ageHours", "state"]
+SNAPSHOT_FILE_SUFFIX = "_scan_snapshot_"
+
+def getSnapshotFolder():
+    return os.environ.get("JIRA_SNAPSHOT_DIR") or "."
+
+def getSnapshotFile(teamName, takenAt):
+    return os.path.join(getSnapshotFolder(), teamName + SNAPSHOT_FILE_SUFFIX + time.strftime("%Y%m%dT%H%M%S", time.localtime(takenAt)) + ".jsonl.gz")
+
+# SLA table keys are (priority, SLA group) tuples, JSON keeps it as a list of [priority, SLA group, SLA row]
+def getSlaTableRows(slaTable):
+    return [[jiraPriority, slaGroup, slaRow] for (jiraPriority, slaGroup), slaRow in sorted(slaTable.items())]
+
+def getSlaTableFromRows(slaTableRows):
+    return dict(((jiraPriority, slaGroup), slaRow) for jiraPriority, slaGroup, slaRow in slaTableRows)
+
+class ScanSnapshot:
+    def __init__(self, teamName, slaTable, slaClock=False, snapshotFile=None):
+        self.teamName = teamName
+        self.takenAt = time.time()
+        self.snapshotFile = snapshotFile or getSnapshotFile(teamName, self.takenAt)
+        # pages of a team are checked on team pool threads in fleet mode
+        self.lock = threading.Lock()
+        self.issueCount = 0
+        self.snapshotStream = gzip.open(self.snapshotFile + ".part", "wt", encoding="utf-8")
+        self.writeLine({"snapshot": SNAPSHOT_VERSION, "team": teamName, "takenAt": self.takenAt, "slaClock": slaClock, "columns": SNAPSHOT_COLUMNS, "slaTable": getSlaTableRows(slaTable)})
+
+    def writeLine(self, lineValue):
+        self.snapshotStream.write(json.dumps(lineValue, separators=(",", ":")) + "\n")
+
+    # add a page of classified JIRAs of a bucket, issues are IssueRecord objects
+    def addIssues(self, jiraProject, jiraPriority, issues, issueTypes, slaGroups, ageInHours, slaStates):
+        pageLines = [json.dumps([issue.key, jiraProject, jiraPriority, issueType, slaGroup, issue.getAssigneeName(), issue.created, round(issueAge, 4), slaState], separators=(",", ":"))
+            for issue, issueType, slaGroup, issueAge, slaState in zip(issues, issueTypes, slaGroups, ageInHours, slaStates)]
+        with self.lock:
+            if pageLines:
+                self.snapshotStream.write("\n".join(pageLines) + "\n")
+            self.issueCount += len(pageLines)
+
+    # complete the snapshot, returns snapshot file
+    def close(self):
+        with self.lock:
+            self.snapshotStream.close()
+            os.replace(self.snapshotFile + ".part", self.snapshotFile)
+        return self.snapshotFile
+
+    def printSummary(self):
+        print("Scan snapshot " + self.teamName.ljust(11) + ": " + str(self.issueCount) + " JIRAs in " + self.snapshotFile)
+
+# read a snapshot file, returns header dict and a generator of row value lists in the order of header columns
+def readSnapshot(snapshotFile):
+    snapshotStream = gzip.open(snapshotFile, "rt", encoding="utf-8")
+    snapshotHeader = json.loads(snapshotStream.readline())
+    if snapshotHeader.get("snapshot") != SNAPSHOT_VERSION:
+        snapshotStream.close()
+        raise ValueError(snapshotFile + " is not a version " + str(SNAPSHOT_VERSION) + " scan snapshot")
+    snapshotHeader["slaTable"] = getSlaTableFromRows(snapshotHeader["slaTable"])
+    return snapshotHeader, iterSnapshotRows(snapshotStream)
+
+# lines are decoded in batches as one JSON list, which is much faster than one json.loads per line
+def iterSnapshotRows(snapshotStream, batchLines=10000):
+    with snapshotStream:
+        while True:
+            snapshotLines = snapshotStream.readlines(batchLines * 100)
+            if not snapshotLines:
+                return
+            yield from json.loads("[" + ",".join(snapshotLines) + "]")
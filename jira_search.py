@@ -0,0 +1,197 @@
+import re
+import json
+import concurrent.futures
+import jira_http_client
+import jira_trace
+
+'''
+  Module Name : jira_search.py
+  Purpose     : Paged JIRA issue search used by the JIRA utilities in this repo
+                It works as follows:
+                  1. Fetches first page of /search results to learn total number of issues and page size allowed by JIRA server
+                  2. Fetches all the remaining startAt offsets concurrently using a bounded thread pool
+                  3. Yields every page of issues as soon as it is received, pages can come out of startAt order
+                  4. Asks only for the fields passed by the caller and for gzip compressed responses
+                  5. Fills optional scanStats dict with number of search requests, issues, bytes received and page size used
+                  6. When an issueFactory is passed(e.g. IssueRecord.fromIssueDict), the response is decoded one issue at a time and
+                     every issue is turned into the object built by issueFactory, dicts of a full page are never kept in memory
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_SEARCH_PAGE_SIZE   : number of issues requested per page, JIRA server can cap it with its own maxResults limit
+       JIRA_SEARCH_CONCURRENCY : max number of pages fetched at the same time
+'''
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_SEARCH_CONCURRENCY = 4
+
+def getSearchPageSize():
+    return jira_http_client.readIntFromEnv("JIRA_SEARCH_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+
+def getSearchConcurrency():
+    return max(1, jira_http_client.readIntFromEnv("JIRA_SEARCH_CONCURRENCY", DEFAULT_SEARCH_CONCURRENCY))
+
+SEARCH_REQUEST_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip"
+}
+
+# bytes received over the wire(compressed) and after decoding for a response
+def getResponseSizes(response):
+    decodedBytes = len(response.content)
+    try:
+        wireBytes = response.raw.tell()
+    except (AttributeError, ValueError):
+        wireBytes = 0
+    if not wireBytes:
+        wireBytes = int(response.headers.get("Content-Length") or decodedBytes)
+    return wireBytes, decodedBytes
+
+JSON_DECODER = json.JSONDecoder()
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# decode a JSON value starting at a position, leading whitespace is skipped, returns value and end position
+def decodeJsonValue(responseText, position):
+    return JSON_DECODER.raw_decode(responseText, JSON_WHITESPACE.match(responseText, position).end())
+
+# next non whitespace character and the position after it
+def readJsonToken(responseText, position):
+    position = JSON_WHITESPACE.match(responseText, position).end()
+    if position >= len(responseText):
+        raise ValueError("Unexpected end of JIRA search response")
+    return responseText[position], position + 1
+
+# decode search response object incrementally, issues array is decoded one issue at a time and every issue is passed to issueFactory
+# other top level values(startAt, maxResults, total, errorMessages) are decoded as they are
+def decodeSearchPage(responseText, issueFactory):
+    jsonToken, position = readJsonToken(responseText, 0)
+    if jsonToken != "{":
+        raise ValueError("JIRA search response is not a JSON object")
+    jsonData = {}
+    jsonToken, nextPosition = readJsonToken(responseText, position)
+    if jsonToken == "}":
+        return jsonData
+    while True:
+        name, position = decodeJsonValue(responseText, position)
+        jsonToken, position = readJsonToken(responseText, position)
+        if jsonToken != ":":
+            raise ValueError("Expected : after " + str(name) + " in JIRA search response")
+        if name == "issues":
+            jsonToken, position = readJsonToken(responseText, position)
+            if jsonToken != "[":
+                raise ValueError("issues of JIRA search response is not a list")
+            pageIssues = []
+            jsonToken, nextPosition = readJsonToken(responseText, position)
+            if jsonToken == "]":
+                position = nextPosition
+            else:
+                while True:
+                    issue, position = decodeJsonValue(responseText, position)
+                    pageIssues.append(issueFactory(issue))
+                    jsonToken, position = readJsonToken(responseText, position)
+                    if jsonToken == "]":
+                        break
+                    if jsonToken != ",":
+                        raise ValueError("Expected , or ] in issues of JIRA search response")
+            jsonData[name] = pageIssues
+        else:
+            jsonData[name], position = decodeJsonValue(responseText, position)
+        jsonToken, position = readJsonToken(responseText, position)
+        if jsonToken == "}":
+            return jsonData
+        if jsonToken != ",":
+            raise ValueError("Expected , or } in JIRA search response")
+
+def decodeSearchResponse(response, issueFactory=None):
+    if issueFactory is None:
+        return response.json()
+    # JIRA always sends JSON as UTF-8, response.text would guess the charset from the whole body when it is not in headers
+    return decodeSearchPage(response.content.decode(response.encoding or "utf-8"), issueFactory)
+
+# fetch one page of search results, raise error if JIRA does not return a valid page as remaining pages can not be trusted
+def fetchSearchPage(searchURL, queryParams, auth, startAt, maxResults, issueFactory=None):
+    pageParams = dict(queryParams)
+    pageParams["startAt"] = startAt
+    pageParams["maxResults"] = maxResults
+    with jira_trace.traceSpan("search page fetch", "search", startAt=startAt):
+        response = jira_http_client.jiraRequest('GET', searchURL, params = pageParams, auth = auth, headers = SEARCH_REQUEST_HEADERS)
+    try:
+        with jira_trace.traceSpan("search page decode", "search", startAt=startAt):
+            jsonData = decodeSearchResponse(response, issueFactory)
+    except ValueError:
+        jsonData = None
+    if response.status_code != 200 or not jsonData or "issues" not in jsonData:
+        errorDetails = response.text[:500] if jsonData is None else str(jsonData.get("errorMessages") or jsonData.get("errors") or jsonData)
+        raise RuntimeError("JIRA search failed for startAt " + str(startAt) + " with status " + str(response.status_code) + " : " + errorDetails)
+    wireBytes, decodedBytes = getResponseSizes(response)
+    return jsonData, wireBytes, decodedBytes
+
+# number of issues matching JQL query without fetching any issue
+def fetchSearchTotal(searchURL, jqlQuery, auth):
+    jsonData, wireBytes, decodedBytes = fetchSearchPage(searchURL, {"jql": jqlQuery, "fields": "key"}, auth, 0, 0)
+    return jsonData.get("total", 0)
+
+def addToScanStats(scanStats, fetchedPage):
+    if scanStats is None:
+        return
+    jsonData, wireBytes, decodedBytes = fetchedPage
+    scanStats["requests"] = scanStats.get("requests", 0) + 1
+    scanStats["issues"] = scanStats.get("issues", 0) + len(jsonData["issues"])
+    scanStats["bytesReceived"] = scanStats.get("bytesReceived", 0) + wireBytes
+    scanStats["bytesDecoded"] = scanStats.get("bytesDecoded", 0) + decodedBytes
+
+# add stats of one scan into overall stats of a run
+def mergeScanStats(totalScanStats, scanStats):
+    for statName, statValue in scanStats.items():
+        if statName == "pageSize":
+            totalScanStats[statName] = statValue
+        else:
+            totalScanStats[statName] = totalScanStats.get(statName, 0) + statValue
+
+def formatByteCount(byteCount):
+    if byteCount >= 1024 * 1024:
+        return str(round(byteCount / (1024 * 1024), 2)) + " MB"
+    return str(round(byteCount / 1024, 1)) + " KB"
+
+def printScanStats(scanStats):
+    print("Scan received " + formatByteCount(scanStats.get("bytesReceived", 0)) + " (" + formatByteCount(scanStats.get("bytesDecoded", 0)) + " decoded) for " + str(scanStats.get("issues", 0)) + " issues in " + str(scanStats.get("requests", 0)) + " requests")
+
+# yield list of issues for every page of input JQL query, only listed fields are returned when searchFields is passed
+# issues are dicts as returned by JIRA, or objects built by issueFactory from every issue dict when it is passed
+def iterJiraSearchPages(searchURL, jqlQuery, auth, queryParams=None, pageSize=None, maxParallelPages=None, scanStats=None, searchFields=None, issueFactory=None):
+    queryParams = dict(queryParams or {})
+    queryParams["jql"] = jqlQuery
+    if searchFields:
+        queryParams["fields"] = ",".join(searchFields)
+    pageSize = pageSize or getSearchPageSize()
+    maxParallelPages = maxParallelPages or getSearchConcurrency()
+
+    # first page tells total number of issues and the page size honored by JIRA server
+    firstFetchedPage = fetchSearchPage(searchURL, queryParams, auth, 0, pageSize, issueFactory)
+    firstPage = firstFetchedPage[0]
+    total = firstPage.get("total", len(firstPage["issues"]))
+    serverPageSize = firstPage.get("maxResults") or pageSize
+    pageStep = max(1, min(pageSize, serverPageSize))
+    if scanStats is not None:
+        scanStats["pageSize"] = pageStep
+    addToScanStats(scanStats, firstFetchedPage)
+    yield firstPage["issues"]
+
+    remainingOffsets = iter(range(pageStep, total, pageStep))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=maxParallelPages) as executor:
+        # keep at most maxParallelPages requests in flight so that pages do not pile up faster than they are consumed
+        runningFetches = set()
+        for startAt in remainingOffsets:
+            runningFetches.add(executor.submit(fetchSearchPage, searchURL, queryParams, auth, startAt, pageStep, issueFactory))
+            if len(runningFetches) >= maxParallelPages:
+                break
+        while runningFetches:
+            doneFetches, runningFetches = concurrent.futures.wait(runningFetches, return_when=concurrent.futures.FIRST_COMPLETED)
+            for doneFetch in doneFetches:
+                nextStartAt = next(remainingOffsets, None)
+                if nextStartAt is not None:
+                    runningFetches.add(executor.submit(fetchSearchPage, searchURL, queryParams, auth, nextStartAt, pageStep, issueFactory))
+                fetchedPage = doneFetch.result()
+                addToScanStats(scanStats, fetchedPage)
+                yield fetchedPage[0]["issues"]
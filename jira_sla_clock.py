@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from array import array
+import jira_http_client
+import jira_search
+import jira_sla_engine
+import jira_trace
+
+'''
+  Module Name : jira_sla_clock.py
+  Purpose     : Changelog aware SLA clock, SLA age of a JIRA is the time it spent in active statuses only e.g. time spent
+                in Blocked or Waiting for customer is not counted
+                It works as follows:
+                  1. Status changes of every JIRA are read from its changelog, JIRAs are fetched in batches using
+                     key in (...) searches with expand=changelog asking only for status and updated fields
+                  2. Status changes are kept in a local SQLite cache keyed by issue key and updated timestamp, a JIRA is
+                     fetched again only when its updated timestamp is not the cached one i.e. it changed since it was cached
+                  3. SLA age is the sum of the periods between created, status changes and now during which the JIRA was in one of
+                     the active statuses, a JIRA without any status change was in its current status since it was created
+                  4. JIRA Cloud returns at most 100 changelog entries per issue in search results, remaining entries are read
+                     from /issue/{key}/changelog
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_CHANGELOG_CACHE_FILE : path of SQLite changelog cache file, default is jira_changelog_cache.db next to onboard folder
+       JIRA_CHANGELOG_BATCH_SIZE : max number of JIRAs fetched with expand=changelog in one search request
+
+    A team sets its active statuses using "SLA_ACTIVE_STATUSES" in onboarding JSON e.g.
+       "SLA_ACTIVE_STATUSES": ["Open", "In Progress", "Reopened"]
+'''
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jira_changelog_cache.db")
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_ACTIVE_STATUSES = ["Open", "In Progress", "Reopened"]
+# fields asked along with changelog, status is the current status and updated is the cache key
+CHANGELOG_SEARCH_FIELDS = ["status", "updated"]
+
+def getCacheFile():
+    return os.environ.get("JIRA_CHANGELOG_CACHE_FILE") or DEFAULT_CACHE_FILE
+
+def getBatchSize():
+    return max(1, jira_http_client.readIntFromEnv("JIRA_CHANGELOG_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
+def getTeamActiveStatuses(inputTeamJsonObject):
+    return inputTeamJsonObject.get("SLA_ACTIVE_STATUSES") or DEFAULT_ACTIVE_STATUSES
+
+# status changes of changelog histories as [epoch seconds, from status, to status] sorted by time
+def getStatusChanges(changelogHistories):
+    statusChanges = []
+    for changelogHistory in changelogHistories:
+        for changeItem in changelogHistory.get("items") or []:
+            if changeItem.get("field") == "status":
+                changeEpoch = jira_sla_engine.parseCreatedTimestamps([changelogHistory["created"]])[0]
+                statusChanges.append([changeEpoch, changeItem.get("fromString"), changeItem.get("toString")])
+    statusChanges.sort(key=lambda statusChange: statusChange[0])
+    return statusChanges
+
+# seconds spent in active statuses between created and now, activeStatuses are lower case status names
+def getActiveSeconds(createdEpoch, statusChanges, currentStatus, activeStatuses, nowEpoch):
+    issueStatus = statusChanges[0][1] if statusChanges else currentStatus
+    periodStart = createdEpoch
+    activeSeconds = 0
+    for changeEpoch, fromStatus, toStatus in statusChanges:
+        if str(issueStatus).lower() in activeStatuses:
+            activeSeconds += max(0, changeEpoch - periodStart)
+        issueStatus, periodStart = toStatus, max(periodStart, changeEpoch)
+    if str(issueStatus).lower() in activeStatuses:
+        activeSeconds += max(0, nowEpoch - periodStart)
+    return activeSeconds
+
+class JiraSlaClock:
+    def __init__(self, searchURL, auth, activeStatuses=None, cacheFile=None):
+        self.searchURL = searchURL
+        self.auth = auth
+        self.activeStatuses = set(activeStatus.lower() for activeStatus in activeStatuses or DEFAULT_ACTIVE_STATUSES)
+        self.cacheFile = cacheFile or getCacheFile()
+        # pages can be checked from several threads in fleet mode
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.cacheFile, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS changelogs (issue_key TEXT PRIMARY KEY, updated TEXT, status TEXT, status_changes TEXT)")
+        self.connection.commit()
+        self.stats = {
+            "issues": 0,
+            "cacheHits": 0,
+            "fetched": 0,
+            "requests": 0,
+            "pausedHours": 0
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+    # cached (status, status changes) of the issues whose updated timestamp is the cached one
+    def readCachedChangelogs(self, issues):
+        cachedChangelogs = {}
+        issueKeys = [issue.key for issue in issues]
+        with self.lock:
+            for batchStart in range(0, len(issueKeys), 500):
+                batchKeys = issueKeys[batchStart:batchStart + 500]
+                for issueKey, updated, issueStatus, statusChanges in self.connection.execute("SELECT issue_key, updated, status, status_changes FROM changelogs WHERE issue_key IN (" + ",".join("?" * len(batchKeys)) + ")", batchKeys):
+                    cachedChangelogs[issueKey] = (updated, issueStatus, statusChanges)
+        return dict((issue.key, (cachedChangelogs[issue.key][1], json.loads(cachedChangelogs[issue.key][2]))) for issue in issues
+            if issue.key in cachedChangelogs and issue.updated is not None and cachedChangelogs[issue.key][0] == issue.updated)
+
+    # changelog histories of an issue beyond the ones returned in search results
+    def fetchRemainingHistories(self, issueKey, startAt):
+        changelogURL = self.searchURL.rsplit("/search", 1)[0] + "/issue/" + issueKey + "/changelog"
+        remainingHistories = []
+        while True:
+            response = jira_http_client.jiraRequest('GET', changelogURL, params = {"startAt": startAt, "maxResults": 100}, auth = self.auth)
+            self.stats["requests"] += 1
+            if response.status_code != 200:
+                print("Changelog of " + issueKey + " could not be read beyond " + str(startAt) + " entries, status " + str(response.status_code))
+                return remainingHistories
+            jsonData = response.json()
+            pageHistories = jsonData.get("values") or []
+            remainingHistories.extend(pageHistories)
+            startAt += len(pageHistories)
+            if jsonData.get("isLast", True) or not pageHistories:
+                return remainingHistories
+
+    # fetch changelogs of issues in key in (...) batches and cache them, returns {issue key: (status, status changes)}
+    def fetchChangelogs(self, issueKeys):
+        fetchedChangelogs = {}
+        batchSize = getBatchSize()
+        for batchStart in range(0, len(issueKeys), batchSize):
+            keyQuery = "key in (" + ",".join(issueKeys[batchStart:batchStart + batchSize]) + ")"
+            scanStats = {}
+            with jira_trace.traceSpan("changelog fetch", "search", issues=len(issueKeys[batchStart:batchStart + batchSize])):
+                for pageIssues in jira_search.iterJiraSearchPages(self.searchURL, keyQuery, self.auth, queryParams = {"expand": "changelog"}, pageSize = batchSize, scanStats = scanStats, searchFields = CHANGELOG_SEARCH_FIELDS):
+                    cacheRows = []
+                    for issue in pageIssues:
+                        issueFields = issue.get("fields") or {}
+                        changelog = issue.get("changelog") or {}
+                        changelogHistories = list(changelog.get("histories") or [])
+                        if changelog.get("total", 0) > len(changelogHistories):
+                            changelogHistories.extend(self.fetchRemainingHistories(issue["key"], len(changelogHistories)))
+                        issueStatus = (issueFields.get("status") or {}).get("name")
+                        statusChanges = getStatusChanges(changelogHistories)
+                        fetchedChangelogs[issue["key"]] = (issueStatus, statusChanges)
+                        cacheRows.append((issue["key"], issueFields.get("updated"), issueStatus, json.dumps(statusChanges, separators=(",", ":"))))
+                    with self.lock:
+                        self.connection.executemany("INSERT OR REPLACE INTO changelogs (issue_key, updated, status, status_changes) VALUES (?, ?, ?, ?)", cacheRows)
+                        self.connection.commit()
+            self.stats["requests"] += scanStats.get("requests", 0)
+        self.stats["fetched"] += len(fetchedChangelogs)
+        return fetchedChangelogs
+
+    # SLA ages in hours of a page of issues(IssueRecord objects), only issues not in cache or changed since cached are fetched
+    def getSlaAgesInHours(self, issues, nowEpoch=None):
+        nowEpoch = nowEpoch or time.time()
+        issueChangelogs = self.readCachedChangelogs(issues)
+        self.stats["cacheHits"] += len(issueChangelogs)
+        missingKeys = [issue.key for issue in issues if issue.key not in issueChangelogs]
+        if missingKeys:
+            issueChangelogs.update(self.fetchChangelogs(missingKeys))
+        createdEpochs = jira_sla_engine.parseCreatedTimestamps([issue.created for issue in issues])
+        ageInHours = array('d')
+        for issue, createdEpoch in zip(issues, createdEpochs):
+            # an issue missing in changelog search e.g. moved to another project is aged from created
+            issueStatus, statusChanges = issueChangelogs.get(issue.key, (None, []))
+            if issueStatus is None and not statusChanges:
+                ageInHours.append((nowEpoch - createdEpoch) / 3600)
+                continue
+            activeHours = getActiveSeconds(createdEpoch, statusChanges, issueStatus, self.activeStatuses, nowEpoch) / 3600
+            self.stats["pausedHours"] += (nowEpoch - createdEpoch) / 3600 - activeHours
+            ageInHours.append(activeHours)
+        self.stats["issues"] += len(issues)
+        return ageInHours
+
+    def printStats(self):
+        print("SLA clock                : " + str(self.stats["issues"]) + " JIRAs, " + str(self.stats["cacheHits"]) + " changelogs from cache, " + str(self.stats["fetched"]) + " fetched in "
+            + str(self.stats["requests"]) + " requests, " + str(int(self.stats["pausedHours"])) + " paused hours not counted")
@@ -0,0 +1,127 @@
+import time
+import datetime
+from array import array
+import jira_trace
+
+'''
+  Module Name : jira_sla_engine.py
+  Purpose     : Table driven SLA classification of JIRA issues
+                It works as follows:
+                  1. Builds one SLA table from non security and security SLA dicts, default lead windows and per team overrides
+                  2. Parses timezone aware created timestamps of a whole page of issues at once and computes ages in hours as an array
+                  3. Assigns every issue a state i.e. ok, soonToBeOosla or oosla using the SLA table row of its priority and issue type
+                  4. Marks soonToBeOosla issues which are close enough to SLA breach to be listed in output files
+'''
+
+'''
+   SLA table columns for every priority and issue type group(security/nonsecurity):
+       slaHours           : age in hours after which a JIRA is OOSLA
+       reminderStartHours : age in hours after which soon to be OOSLA reminders start
+       reportLeadHours    : soon to be OOSLA JIRAs are listed in output files only in these many hours before SLA breach
+
+   A team can override any column using "SLA_OVERRIDES" in onboarding JSON e.g.
+       "SLA_OVERRIDES": {
+           "nonsecurity": { "P1": { "slaHours": 200, "reminderStartHours": 72 } },
+           "security": { "P2": { "reportLeadHours": 96 } }
+       }
+'''
+
+STATE_OK = "ok"
+STATE_SOON_TO_BE_OOSLA = "soonToBeOosla"
+STATE_OOSLA = "oosla"
+
+SLA_GROUP_NONSECURITY = "nonsecurity"
+SLA_GROUP_SECURITY = "security"
+
+# soon to be OOSLA reminders start after these many hours from creation
+DEFAULT_REMINDER_START_HOURS = {
+    SLA_GROUP_NONSECURITY: { "P0": 6, "P1": 48, "P2": 168, "P3": 480 },
+    SLA_GROUP_SECURITY: { "P0": 6, "P1": 48, "P2": 480, "P3": 1800 }
+}
+
+# soon to be OOSLA JIRAs are listed in output files only in these many hours before SLA breach
+DEFAULT_REPORT_LEAD_HOURS = { "P0": 4, "P1": 48, "P2": 144, "P3": 250 }
+
+# issue types which are always checked, other non security issue types are checked only after they are 6 months old
+ALWAYS_CHECKED_ISSUE_TYPE_LIST = ["Bug", "Task"]
+OTHER_ISSUE_TYPE_MIN_AGE_HOURS = 4380
+
+# build SLA table as {(priority, slaGroup): {"slaHours": .., "reminderStartHours": .., "reportLeadHours": ..}}
+def buildSlaTable(nonSecSlaDict, secSlaDict, slaOverrides=None):
+    slaTable = {}
+    for slaGroup, slaDict in ((SLA_GROUP_NONSECURITY, nonSecSlaDict), (SLA_GROUP_SECURITY, secSlaDict)):
+        for jiraPriority, slaHours in slaDict.items():
+            slaTable[(jiraPriority, slaGroup)] = {
+                "slaHours": slaHours,
+                "reminderStartHours": DEFAULT_REMINDER_START_HOURS[slaGroup].get(jiraPriority, 0),
+                "reportLeadHours": DEFAULT_REPORT_LEAD_HOURS.get(jiraPriority, 0)
+            }
+    return applySlaOverrides(slaTable, slaOverrides)
+
+# SLA table with overrides in "SLA_OVERRIDES" format applied, input table is not changed
+def applySlaOverrides(slaTable, slaOverrides=None):
+    slaTable = dict((slaKey, dict(slaRow)) for slaKey, slaRow in slaTable.items())
+    for slaGroup, priorityOverrides in (slaOverrides or {}).items():
+        for jiraPriority, columnOverrides in priorityOverrides.items():
+            slaTable.setdefault((jiraPriority.upper(), slaGroup), {"slaHours": 0, "reminderStartHours": 0, "reportLeadHours": 0}).update(columnOverrides)
+    return slaTable
+
+# SLA dict like NONSEC_OOSLA_TO_PRIORITY_DICT for a SLA group, includes team overrides
+def getSlaDict(slaTable, slaGroup):
+    return dict((jiraPriority, slaRow["slaHours"]) for (jiraPriority, rowGroup), slaRow in slaTable.items() if rowGroup == slaGroup)
+
+def getSlaGroup(issueType, securityIssueTypeList):
+    if issueType in securityIssueTypeList:
+        return SLA_GROUP_SECURITY
+    return SLA_GROUP_NONSECURITY
+
+# JIRA timestamp like 2024-01-31T10:20:30.000+0000 in 2024-01-31T10:20:30.000+00:00 format accepted by fromisoformat
+# timestamps ending with Z or already having a +HH:MM offset are returned in the same format
+def getIsoTimestamp(jiraTimestamp):
+    if jiraTimestamp.endswith("Z"):
+        return jiraTimestamp[:-1] + "+00:00"
+    if jiraTimestamp[-5:-4] in ("+", "-") and jiraTimestamp[-4:].isdigit():
+        return jiraTimestamp[:-2] + ":" + jiraTimestamp[-2:]
+    return jiraTimestamp
+
+# created timestamps of a page of issues as epoch seconds
+def parseCreatedTimestamps(createdValues):
+    fromIsoFormat = datetime.datetime.fromisoformat
+    return array('d', [fromIsoFormat(getIsoTimestamp(createdValue)).timestamp() for createdValue in createdValues])
+
+def getAgesInHours(createdEpochs, nowEpoch=None):
+    nowEpoch = nowEpoch or time.time()
+    return array('d', [(nowEpoch - createdEpoch) / 3600 for createdEpoch in createdEpochs])
+
+# classify a page of issues of a priority, returns ages in hours, SLA groups, states and output file flags
+def classifyIssues(slaTable, jiraPriority, createdValues, issueTypes, securityIssueTypeList, nowEpoch=None):
+    with jira_trace.traceSpan("date parsing", "classify", priority=jiraPriority, issues=len(createdValues)):
+        ageInHours = getAgesInHours(parseCreatedTimestamps(createdValues), nowEpoch)
+    with jira_trace.traceSpan("SLA classification", "classify", priority=jiraPriority, issues=len(createdValues)):
+        return classifyIssueAges(slaTable, jiraPriority, ageInHours, issueTypes, securityIssueTypeList)
+
+# classify a page of issues using ages in hours, returns same values as classifyIssues
+def classifyIssueAges(slaTable, jiraPriority, ageInHours, issueTypes, securityIssueTypeList):
+    slaRows = {
+        SLA_GROUP_NONSECURITY: slaTable[(jiraPriority, SLA_GROUP_NONSECURITY)],
+        SLA_GROUP_SECURITY: slaTable[(jiraPriority, SLA_GROUP_SECURITY)]
+    }
+    slaGroups = [getSlaGroup(issueType, securityIssueTypeList) for issueType in issueTypes]
+    states = []
+    reportFlags = []
+    for issueAge, issueType, slaGroup in zip(ageInHours, issueTypes, slaGroups):
+        slaRow = slaRows[slaGroup]
+        slaHours = slaRow["slaHours"]
+        if slaGroup == SLA_GROUP_NONSECURITY and issueType not in ALWAYS_CHECKED_ISSUE_TYPE_LIST and issueAge < OTHER_ISSUE_TYPE_MIN_AGE_HOURS:
+            states.append(STATE_OK)
+            reportFlags.append(False)
+        elif issueAge > slaHours:
+            states.append(STATE_OOSLA)
+            reportFlags.append(True)
+        elif issueAge > slaRow["reminderStartHours"] and issueAge < slaHours:
+            states.append(STATE_SOON_TO_BE_OOSLA)
+            reportFlags.append(issueAge > slaHours - slaRow["reportLeadHours"])
+        else:
+            states.append(STATE_OK)
+            reportFlags.append(False)
+    return ageInHours, slaGroups, states, reportFlags
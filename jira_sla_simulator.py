@@ -0,0 +1,158 @@
+import time
+import collections
+from array import array
+from bisect import bisect_left, bisect_right
+import jira_scan_snapshot
+import jira_sla_engine
+
+'''
+  Module Name : jira_sla_simulator.py
+  Purpose     : What-if evaluation of candidate SLA tables against scan snapshots, without JIRA calls
+                It works as follows:
+                  1. JIRAs of the snapshots are grouped per (team, priority, SLA group) and SLA ages of every group are sorted once
+                  2. State of a JIRA depends only on its age and the SLA row of its group, so for a sorted group every state
+                     is an index range found by binary search on the SLA row thresholds, a table is evaluated per group in
+                     O(log n) instead of once per JIRA
+                  3. Changed JIRAs between the baseline(SLA table the run used) and a candidate table are the overlaps of
+                     their state ranges, so flips and their JIRA keys are read from the sorted group as slices
+                  4. Non security JIRAs of other issue types younger than OTHER_ISSUE_TYPE_MIN_AGE_HOURS are ok with any table
+                     and are counted separately, same as jira_sla_engine.classifyIssueAges
+'''
+
+'''
+   Candidate tables use the "SLA_OVERRIDES" format of onboarding JSON and are applied over the SLA table of every snapshot e.g.
+       {
+           "p1-120h": { "nonsecurity": { "P1": { "slaHours": 120 } }, "security": { "P1": { "slaHours": 120 } } },
+           "p2-longer-lead": { "nonsecurity": { "P2": { "reportLeadHours": 240 } } }
+       }
+'''
+
+BASELINE_TABLE_NAME = "baseline"
+
+# sorted SLA ages and keys of JIRAs of one (team, priority, SLA group)
+class SnapshotGroup:
+    def __init__(self):
+        self.ageRows = []
+        self.fixedOkCount = 0
+        self.ages = None
+        self.keys = None
+
+    def freeze(self):
+        self.ageRows.sort()
+        self.ages = array('d', [issueAge for issueAge, issueKey in self.ageRows])
+        self.keys = [issueKey for issueAge, issueKey in self.ageRows]
+        self.ageRows = None
+
+# state ranges of a sorted group as [(range end, state)] and number of soon to be OOSLA JIRAs listed in reports
+# same conditions as jira_sla_engine.classifyIssueAges: oosla when age > slaHours, soon to be OOSLA when
+# reminderStartHours < age < slaHours and ok otherwise
+def getStateRanges(sortedAges, slaRow):
+    slaHours = slaRow["slaHours"]
+    slaStart = bisect_left(sortedAges, slaHours)
+    ooslaStart = bisect_right(sortedAges, slaHours)
+    soonStart = min(bisect_right(sortedAges, slaRow["reminderStartHours"]), slaStart)
+    listedStart = max(soonStart, bisect_right(sortedAges, slaHours - slaRow["reportLeadHours"]))
+    stateRanges = [(soonStart, jira_sla_engine.STATE_OK), (slaStart, jira_sla_engine.STATE_SOON_TO_BE_OOSLA), (ooslaStart, jira_sla_engine.STATE_OK), (len(sortedAges), jira_sla_engine.STATE_OOSLA)]
+    return stateRanges, max(0, slaStart - listedStart)
+
+# overlaps of two state range lists as [(range start, range end, from state, to state)] with a changed state
+def getStateFlips(fromRanges, toRanges):
+    stateFlips = []
+    rangeStart = 0
+    fromIndex = toIndex = 0
+    while fromIndex < len(fromRanges) and toIndex < len(toRanges):
+        rangeEnd = min(fromRanges[fromIndex][0], toRanges[toIndex][0])
+        if rangeEnd > rangeStart and fromRanges[fromIndex][1] != toRanges[toIndex][1]:
+            stateFlips.append((rangeStart, rangeEnd, fromRanges[fromIndex][1], toRanges[toIndex][1]))
+        rangeStart = max(rangeStart, rangeEnd)
+        if fromRanges[fromIndex][0] == rangeEnd:
+            fromIndex += 1
+        if toRanges[toIndex][0] == rangeEnd:
+            toIndex += 1
+    return stateFlips
+
+class SlaSimulator:
+    def __init__(self):
+        self.groups = collections.defaultdict(SnapshotGroup)
+        # SLA table used by the scan of every team, candidates are applied over it
+        self.teamSlaTables = {}
+        self.snapshotTimes = {}
+        self.stats = {
+            "snapshots": 0,
+            "issues": 0,
+            "loadSeconds": 0,
+            "evaluateSeconds": 0
+        }
+
+    # load snapshots, only the latest snapshot of a team is used, ageToEpoch ages every JIRA to that time
+    def loadSnapshots(self, snapshotFiles, ageToEpoch=None):
+        startTime = time.perf_counter()
+        latestSnapshots = {}
+        for snapshotFile in snapshotFiles:
+            snapshotHeader, snapshotRows = jira_scan_snapshot.readSnapshot(snapshotFile)
+            snapshotRows.close()
+            latestSnapshot = latestSnapshots.get(snapshotHeader["team"])
+            if latestSnapshot is None or latestSnapshot[0] < snapshotHeader["takenAt"]:
+                latestSnapshots[snapshotHeader["team"]] = (snapshotHeader["takenAt"], snapshotFile)
+        for teamName, (takenAt, snapshotFile) in sorted(latestSnapshots.items()):
+            snapshotHeader, snapshotRows = jira_scan_snapshot.readSnapshot(snapshotFile)
+            self.teamSlaTables[teamName] = snapshotHeader["slaTable"]
+            self.snapshotTimes[teamName] = takenAt
+            ageShift = (ageToEpoch - takenAt) / 3600 if ageToEpoch else 0
+            keyIndex, priorityIndex, issueTypeIndex, slaGroupIndex, ageIndex = [snapshotHeader["columns"].index(columnName) for columnName in ["key", "priority", "issueType", "slaGroup", "ageHours"]]
+            for snapshotRow in snapshotRows:
+                issueAge = snapshotRow[ageIndex] + ageShift
+                slaGroup = snapshotRow[slaGroupIndex]
+                snapshotGroup = self.groups[(teamName, snapshotRow[priorityIndex], slaGroup)]
+                if slaGroup == jira_sla_engine.SLA_GROUP_NONSECURITY and snapshotRow[issueTypeIndex] not in jira_sla_engine.ALWAYS_CHECKED_ISSUE_TYPE_LIST and issueAge < jira_sla_engine.OTHER_ISSUE_TYPE_MIN_AGE_HOURS:
+                    snapshotGroup.fixedOkCount += 1
+                else:
+                    snapshotGroup.ageRows.append((issueAge, snapshotRow[keyIndex]))
+                self.stats["issues"] += 1
+            self.stats["snapshots"] += 1
+        for snapshotGroup in self.groups.values():
+            snapshotGroup.freeze()
+        self.stats["loadSeconds"] += time.perf_counter() - startTime
+        return sorted(latestSnapshots.values())
+
+    # counts and flips of every candidate table against baseline, candidateTables is {table name: SLA overrides}
+    # returns {table name: {"counts", "priorityCounts", "listed", "flips", "flipKeys"}} with baseline as first table
+    def evaluateTables(self, candidateTables, maxFlipKeys=10):
+        startTime = time.perf_counter()
+        tableNames = [BASELINE_TABLE_NAME] + [tableName for tableName in candidateTables if tableName != BASELINE_TABLE_NAME]
+        tableResults = dict((tableName, {
+            "counts": collections.Counter(),
+            "priorityCounts": collections.defaultdict(collections.Counter),
+            "listed": 0,
+            "flips": collections.Counter(),
+            "flipKeys": collections.defaultdict(list)
+        }) for tableName in tableNames)
+        candidateSlaTables = dict((teamName, dict((tableName, jira_sla_engine.applySlaOverrides(teamSlaTable, candidateTables.get(tableName))) for tableName in tableNames))
+            for teamName, teamSlaTable in self.teamSlaTables.items())
+        for (teamName, jiraPriority, slaGroup), snapshotGroup in sorted(self.groups.items()):
+            baselineRanges = None
+            for tableName in tableNames:
+                tableResult = tableResults[tableName]
+                slaRow = candidateSlaTables[teamName][tableName].get((jiraPriority, slaGroup))
+                if slaRow is None:
+                    # priority without a SLA row is not checked by the run, it can only come from an edited snapshot
+                    continue
+                stateRanges, listedCount = getStateRanges(snapshotGroup.ages, slaRow)
+                rangeStart = 0
+                for rangeEnd, slaState in stateRanges:
+                    tableResult["counts"][slaState] += max(0, rangeEnd - rangeStart)
+                    tableResult["priorityCounts"][jiraPriority][slaState] += max(0, rangeEnd - rangeStart)
+                    rangeStart = max(rangeStart, rangeEnd)
+                tableResult["counts"][jira_sla_engine.STATE_OK] += snapshotGroup.fixedOkCount
+                tableResult["priorityCounts"][jiraPriority][jira_sla_engine.STATE_OK] += snapshotGroup.fixedOkCount
+                tableResult["listed"] += listedCount
+                if baselineRanges is None:
+                    baselineRanges = stateRanges
+                    continue
+                for flipStart, flipEnd, fromState, toState in getStateFlips(baselineRanges, stateRanges):
+                    tableResult["flips"][(fromState, toState)] += flipEnd - flipStart
+                    flipKeys = tableResult["flipKeys"][(fromState, toState)]
+                    if len(flipKeys) < maxFlipKeys:
+                        flipKeys.extend(snapshotGroup.keys[flipStart:min(flipEnd, flipStart + maxFlipKeys - len(flipKeys))])
+        self.stats["evaluateSeconds"] += time.perf_counter() - startTime
+        return tableResults
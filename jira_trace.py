@@ -0,0 +1,171 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+
+'''
+  Module Name : jira_trace.py
+  Purpose     : Opt-in phase tracing and profiling of a run, used by --trace and --profile options of the scripts
+                It works as follows:
+                  1. traceSpan(name, category, **args) times a phase of the run e.g. JQL build, search paging, SLA classification,
+                     comment and watcher writes, report I/O, spans are recorded only while tracing is started and cost nothing otherwise
+                  2. Spans of all the threads(search pages, write pool) are kept as Chrome trace events of the thread
+                     which ran them and written as a JSON trace file, open it in chrome://tracing or https://ui.perfetto.dev
+                  3. profileCall runs a function under cProfile and writes <prefix>.prof(for pstats/snakeviz) and <prefix>.txt
+                     with hot functions sorted by own time and by cumulative time, threads started while profiling are profiled
+                     too on Python versions before 3.12, later versions allow only one active profiler so only the calling thread
+                     is profiled
+'''
+
+# number of functions listed in each section of profile report
+PROFILE_REPORT_LINES = 40
+# shared no-op span used while tracing is not started
+NO_SPAN = contextlib.nullcontext()
+ACTIVE_TRACER = None
+
+class TraceSpan:
+    __slots__ = ("tracer", "name", "category", "spanArgs", "startNs")
+
+    def __init__(self, tracer, name, category, spanArgs):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.spanArgs = spanArgs
+
+    def __enter__(self):
+        self.startNs = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exceptionInfo):
+        self.tracer.addSpan(self.name, self.category, self.startNs, time.perf_counter_ns(), self.spanArgs)
+        return False
+
+class TraceRecorder:
+    def __init__(self):
+        self.traceEvents = []
+        self.threadNames = {}
+        self.lock = threading.Lock()
+        self.startNs = time.perf_counter_ns()
+        self.processID = os.getpid()
+
+    def addSpan(self, name, category, startNs, endNs, spanArgs):
+        currentThread = threading.current_thread()
+        traceEvent = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (startNs - self.startNs) / 1000,
+            "dur": (endNs - startNs) / 1000,
+            "pid": self.processID,
+            "tid": currentThread.ident
+        }
+        if spanArgs:
+            traceEvent["args"] = spanArgs
+        with self.lock:
+            self.traceEvents.append(traceEvent)
+            self.threadNames[currentThread.ident] = currentThread.name
+
+    # trace events with thread name metadata so that trace viewers label thread rows e.g. jira-write-0
+    def getTraceDocument(self):
+        with self.lock:
+            threadEvents = [{"name": "thread_name", "ph": "M", "pid": self.processID, "tid": threadID, "args": {"name": threadName}} for threadID, threadName in self.threadNames.items()]
+            return {"traceEvents": threadEvents + sorted(self.traceEvents, key=lambda traceEvent: traceEvent["ts"]), "displayTimeUnit": "ms"}
+
+    def writeTrace(self, traceFile):
+        with open(traceFile, "w") as traceContent:
+            json.dump(self.getTraceDocument(), traceContent, separators=(",", ":"))
+
+    # total time and number of spans per span name, used for the run summary
+    def getSpanTotals(self):
+        spanTotals = {}
+        with self.lock:
+            for traceEvent in self.traceEvents:
+                spanTotal = spanTotals.setdefault(traceEvent["name"], [0, 0.0])
+                spanTotal[0] += 1
+                spanTotal[1] += traceEvent["dur"] / 1000000
+        return spanTotals
+
+def startTracing():
+    global ACTIVE_TRACER
+    ACTIVE_TRACER = TraceRecorder()
+    return ACTIVE_TRACER
+
+# write trace file and stop recording spans
+def stopTracing(traceFile):
+    global ACTIVE_TRACER
+    tracer, ACTIVE_TRACER = ACTIVE_TRACER, None
+    if tracer is not None:
+        tracer.writeTrace(traceFile)
+    return tracer
+
+# context manager timing a phase, span args e.g. project and priority are shown with the span in trace viewers
+def traceSpan(name, category="run", **spanArgs):
+    tracer = ACTIVE_TRACER
+    if tracer is None:
+        return NO_SPAN
+    return TraceSpan(tracer, name, category, spanArgs)
+
+# yield pages of a page iterator, time spent waiting for every page is traced as a span
+def tracePages(pageIterator, name, category="search", **spanArgs):
+    if ACTIVE_TRACER is None:
+        yield from pageIterator
+        return
+    pageIterator = iter(pageIterator)
+    while True:
+        with traceSpan(name, category, **spanArgs):
+            pageIssues = next(pageIterator, None)
+        if pageIssues is None:
+            return
+        yield pageIssues
+
+def printSpanTotals(tracer):
+    for spanName, (spanCount, spanSeconds) in sorted(tracer.getSpanTotals().items(), key=lambda spanTotal: spanTotal[1][1], reverse=True):
+        print(spanName.ljust(25) + ": " + str(round(spanSeconds, 3)) + " seconds in " + str(spanCount) + " spans")
+
+# profilers of threads started while profiling, Python 3.12 and later allow one active profiler per process
+def profileNewThreads(threadProfilers):
+    if sys.version_info >= (3, 12):
+        return
+    def startThreadProfiler(*profileArgs):
+        threadProfiler = cProfile.Profile()
+        threadProfilers.append(threadProfiler)
+        # replaces this function as profile function of the thread
+        threadProfiler.enable()
+    threading.setprofile(startThreadProfiler)
+
+def writeProfileReport(profileStats, reportPrefix):
+    profileStats.dump_stats(reportPrefix + ".prof")
+    reportContent = io.StringIO()
+    profileStats.stream = reportContent
+    for sortKey, sectionTitle in [(pstats.SortKey.TIME, "own time"), (pstats.SortKey.CUMULATIVE, "cumulative time")]:
+        reportContent.write("Hot functions by " + sectionTitle + "\n")
+        profileStats.sort_stats(sortKey).print_stats(PROFILE_REPORT_LINES)
+    with open(reportPrefix + ".txt", "w") as reportFile:
+        reportFile.write(reportContent.getvalue())
+    return [reportPrefix + ".txt", reportPrefix + ".prof"]
+
+# run function under cProfile and write hot function report, returns value returned by function
+def profileCall(reportPrefix, function, *args):
+    threadProfilers = []
+    profileNewThreads(threadProfilers)
+    mainProfiler = cProfile.Profile()
+    mainProfiler.enable()
+    try:
+        return function(*args)
+    finally:
+        mainProfiler.disable()
+        threading.setprofile(None)
+        profileStats = pstats.Stats(mainProfiler)
+        for threadProfiler in threadProfilers:
+            try:
+                profileStats.add(threadProfiler)
+            except TypeError:
+                # thread profiler which never recorded a call has no stats
+                pass
+        for reportFile in writeProfileReport(profileStats, reportPrefix):
+            print("Profile written to " + reportFile)
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+
+'''
+  Module Name : jira_work_queue.py
+  Purpose     : SQLite backed work queue of OOSLA scan units shared by the coordinator and worker processes of
+                auto_oosla_reminder_workers.py, the processes can run on one host or on several hosts sharing the queue file
+                It works as follows:
+                  1. A run is created with one unit per (team, project, priority), onboarding JSON of the teams and run settings
+                     are kept with the run, so workers do not need the onboard folder
+                  2. A worker claims the next pending unit with a lease, P0 units first, in a single write transaction so that a
+                     unit is claimed by one worker only, every claim increments the attempt number of the unit
+                  3. The worker renews its lease while the unit runs, completes the unit with its results or fails it with the error
+                     lease renewal, completion and failure are accepted only from the worker holding the current attempt
+                  4. A unit whose lease expired(crashed or stuck worker) is claimed again by another worker, a failed unit is
+                     retried after a backoff, a unit is marked failed once it used max attempts
+                  5. Coordinator reads unit counts per state to wait for the run and merges results of the done units
+'''
+
+'''
+    Settings can be tuned using below ENV variables, default values are used when ENV variable is not set
+       JIRA_WORK_QUEUE_FILE : path of SQLite queue file, default is jira_work_queue.db next to onboard folder
+                              keep it on a file system with working file locks when workers run on several hosts
+'''
+
+DEFAULT_QUEUE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jira_work_queue.db")
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+# backoff before a failed unit is retried, doubled on every attempt
+RETRY_BACKOFF_SECONDS = 30
+# seconds a queue call waits for another process holding the queue file lock
+QUEUE_BUSY_TIMEOUT_SECONDS = 60
+
+UNIT_PENDING = "pending"
+UNIT_RUNNING = "running"
+UNIT_DONE = "done"
+UNIT_FAILED = "failed"
+UNIT_STATES = [UNIT_PENDING, UNIT_RUNNING, UNIT_DONE, UNIT_FAILED]
+
+def getQueueFile():
+    return os.environ.get("JIRA_WORK_QUEUE_FILE") or DEFAULT_QUEUE_FILE
+
+class JiraWorkQueue:
+    def __init__(self, queueFile=None):
+        self.queueFile = queueFile or getQueueFile()
+        # autocommit mode, every write is an explicit BEGIN IMMEDIATE transaction
+        self.connection = sqlite3.connect(self.queueFile, timeout=QUEUE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, created_at REAL, teams_json TEXT, settings_json TEXT, max_attempts INTEGER)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS units (unit_id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, team TEXT, project TEXT, priority TEXT, state TEXT, attempts INTEGER,"
+            + " lease_owner TEXT, lease_expires REAL, available_at REAL, last_error TEXT, result_json TEXT, finished_at REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS units_run_state ON units (run_id, state)")
+
+    def close(self):
+        self.connection.close()
+
+    # create a run with one unit per (team, project, priority) of unitSpecs, returns run id
+    def createRun(self, teamJsonObjects, unitSpecs, runSettings, maxAttempts=DEFAULT_MAX_ATTEMPTS):
+        runId = time.strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        nowEpoch = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute("INSERT INTO runs (run_id, created_at, teams_json, settings_json, max_attempts) VALUES (?, ?, ?, ?, ?)", (runId, nowEpoch, json.dumps(teamJsonObjects), json.dumps(runSettings), maxAttempts))
+            self.connection.executemany("INSERT INTO units (run_id, team, project, priority, state, attempts, available_at) VALUES (?, ?, ?, ?, ?, 0, ?)",
+                [(runId, teamName, jiraProject, jiraPriority, UNIT_PENDING, nowEpoch) for teamName, jiraProject, jiraPriority in unitSpecs])
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return runId
+
+    # run row as dict with teams and settings decoded, None for an unknown run
+    def getRun(self, runId):
+        row = self.connection.execute("SELECT run_id, created_at, teams_json, settings_json, max_attempts FROM runs WHERE run_id = ?", (runId,)).fetchone()
+        if row is None:
+            return None
+        return {"runId": row[0], "createdAt": row[1], "teams": json.loads(row[2]), "settings": json.loads(row[3]), "maxAttempts": row[4]}
+
+    # claim next claimable unit of a run(or of any run), returns unit dict or None
+    # pending units whose backoff is over and running units whose lease expired can be claimed
+    def claimUnit(self, workerId, leaseSeconds=DEFAULT_LEASE_SECONDS, runId=None):
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            nowEpoch = time.time()
+            unitQuery = ("SELECT units.unit_id, units.run_id, units.team, units.project, units.priority, units.state, units.attempts, units.lease_owner, runs.max_attempts FROM units JOIN runs ON units.run_id = runs.run_id"
+                + " WHERE ((units.state = ? AND units.available_at <= ?) OR (units.state = ? AND units.lease_expires < ?))" + (" AND units.run_id = ?" if runId else "")
+                + " ORDER BY runs.created_at, units.priority, units.unit_id")
+            queryParams = [UNIT_PENDING, nowEpoch, UNIT_RUNNING, nowEpoch] + ([runId] if runId else [])
+            for unitId, unitRunId, teamName, jiraProject, jiraPriority, unitState, attempts, leaseOwner, maxAttempts in self.connection.execute(unitQuery, queryParams).fetchall():
+                if unitState == UNIT_RUNNING:
+                    print("Lease of unit " + str(unitId) + " held by " + str(leaseOwner) + " expired")
+                if attempts >= maxAttempts:
+                    self.connection.execute("UPDATE units SET state = ?, lease_owner = NULL, finished_at = ?, last_error = COALESCE(last_error, ?) WHERE unit_id = ?",
+                        (UNIT_FAILED, nowEpoch, "lease expired after " + str(attempts) + " attempts", unitId))
+                    continue
+                self.connection.execute("UPDATE units SET state = ?, attempts = ?, lease_owner = ?, lease_expires = ? WHERE unit_id = ?", (UNIT_RUNNING, attempts + 1, workerId, nowEpoch + leaseSeconds, unitId))
+                self.connection.execute("COMMIT")
+                return {"unitId": unitId, "runId": unitRunId, "team": teamName, "project": jiraProject, "priority": jiraPriority, "attempt": attempts + 1, "leaseSeconds": leaseSeconds}
+            self.connection.execute("COMMIT")
+            return None
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    # update a unit only when workerId still holds the claimed attempt, returns False when the lease was lost
+    def updateClaimedUnit(self, claimedUnit, workerId, setClause, setParams):
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            updatedRows = self.connection.execute("UPDATE units SET " + setClause + " WHERE unit_id = ? AND state = ? AND lease_owner = ? AND attempts = ?",
+                list(setParams) + [claimedUnit["unitId"], UNIT_RUNNING, workerId, claimedUnit["attempt"]]).rowcount
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return updatedRows == 1
+
+    def renewLease(self, claimedUnit, workerId):
+        return self.updateClaimedUnit(claimedUnit, workerId, "lease_expires = ?", [time.time() + claimedUnit["leaseSeconds"]])
+
+    def completeUnit(self, claimedUnit, workerId, unitResult):
+        return self.updateClaimedUnit(claimedUnit, workerId, "state = ?, lease_owner = NULL, result_json = ?, finished_at = ?", [UNIT_DONE, json.dumps(unitResult, separators=(",", ":")), time.time()])
+
+    # failed unit is retried after backoff, or marked failed when it used max attempts
+    def failUnit(self, claimedUnit, workerId, errorText, maxAttempts):
+        if claimedUnit["attempt"] >= maxAttempts:
+            return self.updateClaimedUnit(claimedUnit, workerId, "state = ?, lease_owner = NULL, last_error = ?, finished_at = ?", [UNIT_FAILED, errorText, time.time()])
+        retryAt = time.time() + RETRY_BACKOFF_SECONDS * 2 ** (claimedUnit["attempt"] - 1)
+        return self.updateClaimedUnit(claimedUnit, workerId, "state = ?, lease_owner = NULL, last_error = ?, available_at = ?", [UNIT_PENDING, errorText, retryAt])
+
+    # number of units per state of a run, a run is complete when no unit is pending or running
+    def getUnitCounts(self, runId=None):
+        unitCounts = dict((unitState, 0) for unitState in UNIT_STATES)
+        countQuery = "SELECT state, COUNT(*) FROM units" + (" WHERE run_id = ?" if runId else "") + " GROUP BY state"
+        for unitState, unitCount in self.connection.execute(countQuery, [runId] if runId else []):
+            unitCounts[unitState] = unitCount
+        return unitCounts
+
+    def isRunOpen(self, runId=None):
+        unitCounts = self.getUnitCounts(runId)
+        return unitCounts[UNIT_PENDING] + unitCounts[UNIT_RUNNING] > 0
+
+    # units of a run as dicts, results of done units are decoded
+    def getRunUnits(self, runId):
+        runUnits = []
+        for unitId, teamName, jiraProject, jiraPriority, unitState, attempts, lastError, resultJson in self.connection.execute(
+                "SELECT unit_id, team, project, priority, state, attempts, last_error, result_json FROM units WHERE run_id = ? ORDER BY unit_id", (runId,)):
+            runUnits.append({"unitId": unitId, "team": teamName, "project": jiraProject, "priority": jiraPriority, "state": unitState, "attempts": attempts,
+                "lastError": lastError, "result": json.loads(resultJson) if resultJson else None})
+        return runUnits
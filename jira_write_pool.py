@@ -0,0 +1,177 @@
+import time
+import threading
+import collections
+import jira_http_client
+
+'''
+  Module Name : jira_write_pool.py
+  Purpose     : Bounded worker pool for JIRA write calls(comments, watchers etc) with adaptive concurrency
+                It works as follows:
+                  1. Starts max concurrency worker threads which pick write tasks from a FIFO queue
+                  2. Only allows current concurrency limit number of tasks to run at the same time
+                  3. Adjusts concurrency limit using AIMD i.e. halves it when JIRA returns 429/503 or write latency rises
+                     and grows it again by one slot per healthy window of writes
+                  4. Tasks submitted by a running task are queued after it, so comment and watcher calls of an issue keep their order
+                  5. Blocks the submitting(scan) thread while too many tasks are queued, so queued issues do not pile up in memory
+                  6. A cancelled pool drops its queued tasks and every task submitted later, running tasks are finished
+'''
+
+DEFAULT_MAX_CONCURRENCY = 8
+# max number of queued tasks per worker before submit from a non worker thread waits
+QUEUED_TASKS_PER_WORKER = 50
+# write latency above baseline latency multiplied by this factor is treated as JIRA getting slower
+LATENCY_BACKOFF_FACTOR = 3
+# minimum seconds between two decreases, a burst of 429 responses halves the limit only once
+DECREASE_COOLDOWN_SECONDS = 2
+# weight of the newest sample in smoothed latency
+LATENCY_SMOOTHING = 0.2
+# baseline latency drifts up by this ratio per sample, so that one unusually fast response does not pin it forever
+BASELINE_DRIFT = 0.01
+# response status codes which mean JIRA is overloaded
+OVERLOAD_STATUS_CODES = [429, 503]
+
+class AdaptiveWritePool:
+    def __init__(self, maxConcurrency=DEFAULT_MAX_CONCURRENCY, initialConcurrency=None):
+        self.maxConcurrency = max(1, maxConcurrency)
+        self.concurrencyLimit = float(min(self.maxConcurrency, initialConcurrency or self.maxConcurrency))
+        self.condition = threading.Condition()
+        self.taskQueue = collections.deque()
+        self.runningTasks = 0
+        self.pendingTasks = 0
+        self.smoothedLatency = None
+        self.baselineLatency = None
+        self.lastDecreaseTime = 0
+        self.stats = {
+            "tasks": 0,
+            "failed": 0,
+            "increases": 0,
+            "decreases": 0,
+            "minLimit": int(self.concurrencyLimit),
+            "peakRunning": 0,
+            "discarded": 0
+        }
+        self.maxQueuedTasks = self.maxConcurrency * QUEUED_TASKS_PER_WORKER
+        self.closed = False
+        self.cancelled = False
+        self.workers = []
+        for workerIndex in range(self.maxConcurrency):
+            worker = threading.Thread(target=self.runWorker, name="jira-write-" + str(workerIndex), daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        jira_http_client.registerResponseListener(self.observeResponse)
+
+    # queue a write task, task is called as taskFunction(*args)
+    def submit(self, taskFunction, *args):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("write pool is already closed")
+            # tasks queued by workers are never blocked, workers waiting on each other would deadlock the pool
+            if threading.current_thread() not in self.workers:
+                while not self.cancelled and len(self.taskQueue) >= self.maxQueuedTasks:
+                    self.condition.wait()
+            if self.cancelled:
+                self.stats["discarded"] += 1
+                return
+            self.taskQueue.append((taskFunction, args))
+            self.pendingTasks += 1
+            self.condition.notify_all()
+
+    def runWorker(self):
+        while True:
+            with self.condition:
+                while not self.closed and (not self.taskQueue or self.runningTasks >= int(self.concurrencyLimit)):
+                    self.condition.wait()
+                if self.closed and not self.taskQueue:
+                    return
+                taskFunction, args = self.taskQueue.popleft()
+                self.runningTasks += 1
+                self.stats["peakRunning"] = max(self.stats["peakRunning"], self.runningTasks)
+            try:
+                taskFunction(*args)
+            except Exception as ex:
+                print(ex)
+                with self.condition:
+                    self.stats["failed"] += 1
+            finally:
+                with self.condition:
+                    self.runningTasks -= 1
+                    self.pendingTasks -= 1
+                    self.stats["tasks"] += 1
+                    self.condition.notify_all()
+
+    # response listener for the shared HTTP client, only write calls are used to adjust the limit
+    def observeResponse(self, method, url, response, elapsedSeconds):
+        if method.upper() == "GET":
+            return
+        if response is None or response.status_code in OVERLOAD_STATUS_CODES:
+            self.decreaseLimit()
+            return
+        with self.condition:
+            if self.smoothedLatency is None:
+                self.smoothedLatency = elapsedSeconds
+            else:
+                self.smoothedLatency = (1 - LATENCY_SMOOTHING) * self.smoothedLatency + LATENCY_SMOOTHING * elapsedSeconds
+            if self.baselineLatency is None or self.smoothedLatency < self.baselineLatency:
+                self.baselineLatency = self.smoothedLatency
+            else:
+                self.baselineLatency = self.baselineLatency * (1 + BASELINE_DRIFT)
+            latencyRising = self.smoothedLatency > self.baselineLatency * LATENCY_BACKOFF_FACTOR
+        if latencyRising:
+            self.decreaseLimit()
+        else:
+            self.increaseLimit()
+
+    # additive increase, limit grows by one after a full window of healthy writes
+    def increaseLimit(self):
+        with self.condition:
+            if self.concurrencyLimit >= self.maxConcurrency:
+                return
+            previousLimit = int(self.concurrencyLimit)
+            self.concurrencyLimit = min(self.maxConcurrency, self.concurrencyLimit + 1.0 / self.concurrencyLimit)
+            if int(self.concurrencyLimit) > previousLimit:
+                self.stats["increases"] += 1
+                self.condition.notify_all()
+
+    # multiplicative decrease, limit is halved at most once per cooldown period
+    def decreaseLimit(self):
+        with self.condition:
+            currentTime = time.monotonic()
+            if currentTime - self.lastDecreaseTime < DECREASE_COOLDOWN_SECONDS:
+                return
+            self.lastDecreaseTime = currentTime
+            self.concurrencyLimit = max(1.0, self.concurrencyLimit / 2)
+            # latency measured under the old load is not a valid reference any more
+            self.smoothedLatency = None
+            self.baselineLatency = None
+            self.stats["decreases"] += 1
+            self.stats["minLimit"] = min(self.stats["minLimit"], int(self.concurrencyLimit))
+
+    # wait till all queued tasks and the tasks queued by them are finished
+    def drain(self):
+        with self.condition:
+            while self.pendingTasks > 0:
+                self.condition.wait()
+
+    # drop queued tasks and the tasks submitted from now on, used when the writes must not happen any more
+    # e.g. lease of a worker unit was lost and another worker runs the unit
+    def cancel(self):
+        with self.condition:
+            self.cancelled = True
+            self.stats["discarded"] += len(self.taskQueue)
+            self.pendingTasks -= len(self.taskQueue)
+            self.taskQueue.clear()
+            self.condition.notify_all()
+
+    def close(self):
+        self.drain()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        for worker in self.workers:
+            worker.join()
+        jira_http_client.unregisterResponseListener(self.observeResponse)
+
+    def printStats(self):
+        print("JIRA write tasks         : " + str(self.stats["tasks"]) + " (failed: " + str(self.stats["failed"]) + ")" + (", " + str(self.stats["discarded"]) + " discarded" if self.stats["discarded"] else ""))
+        print("JIRA write concurrency   : max " + str(self.maxConcurrency) + ", current " + str(int(self.concurrencyLimit)) + ", lowest " + str(self.stats["minLimit"]) + ", peak running " + str(self.stats["peakRunning"]))
+        print("JIRA write limit changes : " + str(self.stats["increases"]) + " increases, " + str(self.stats["decreases"]) + " decreases")
@@ -0,0 +1,119 @@
+import sys
+import json
+import time
+import argparse
+import datetime
+import jira_oosla_history
+
+'''
+  Script Name : query_oosla_history.py
+  Purpose     : Prints trend of OOSLA counts of a team from history recorded by OOSLA reminder runs with --history,
+                JIRA is not searched, so a trend is returned in milliseconds
+                It works as follows:
+                  1. Reads daily or weekly counts of the team from the history file(see jira_oosla_history.py) for the last N days
+                  2. Counts are filtered by project, priority, assignee, issue type and SLA state and summed per period and group
+                  3. Trend is printed as a table with one row per period and one column per group value, or as JSON
+'''
+'''
+    Test this script in your test environment before using it in your production environment, make changes if required as per your environment setup etc
+'''
+
+'''
+    Usage:
+       python3 query_oosla_history.py [Team Name] [--weekly] [--days N] [--group-by COLUMN] [--project P] [--priority P1] [--assignee A]
+                                      [--issue-type T] [--state oosla] [--peak] [--json]
+
+       --weekly     : weekly counts(ISO weeks) instead of daily counts
+       --days       : days of history to read, default is 90
+       --group-by   : one of project, priority, assignee, issue_type, sla_state, default is total count only
+       --state      : ok, soonToBeOosla or oosla, default is all the states
+       --peak       : with --weekly, highest daily count of the week(of every group with --group-by) instead of the count of the
+                      last day of the week
+       --json       : print trend as JSON list of {"period", "group", "count"}
+
+       e.g. P1 OOSLA trend of last quarter per week
+       python3 query_oosla_history.py myteam --weekly --days 90 --priority P1 --state oosla
+'''
+
+DEFAULT_DAYS = 90
+
+def getFromPeriod(scriptOptions, today=None):
+    fromDate = (today or datetime.date.today()) - datetime.timedelta(days=scriptOptions.days)
+    if scriptOptions.weekly:
+        return jira_oosla_history.getWeekName(fromDate)
+    return jira_oosla_history.getDayName(fromDate)
+
+def getDimensionFilters(scriptOptions):
+    dimensionFilters = {
+        "project": scriptOptions.project,
+        "priority": scriptOptions.priority.upper() if scriptOptions.priority else None,
+        "assignee": scriptOptions.assignee,
+        "issue_type": scriptOptions.issueType,
+        "sla_state": scriptOptions.state
+    }
+    return dict((dimensionColumn, dimensionValue) for dimensionColumn, dimensionValue in dimensionFilters.items() if dimensionValue is not None)
+
+# one row per period and one column per group value, missing counts are 0
+def printTrendTable(trendRows, groupBy):
+    groupValues = sorted(set(str(groupValue) for period, groupValue, count in trendRows))
+    periodCounts = {}
+    for period, groupValue, count in trendRows:
+        periodCounts.setdefault(period, {})[str(groupValue)] = count
+    columnNames = groupValues if groupBy else ["count"]
+    columnWidth = max([8] + [len(columnName) + 2 for columnName in columnNames])
+    print("Period".ljust(12) + "".join(columnName.rjust(columnWidth) for columnName in columnNames))
+    for period in sorted(periodCounts):
+        print(period.ljust(12) + "".join(str(periodCounts[period].get(groupValue, 0)).rjust(columnWidth) for groupValue in groupValues))
+
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Print trend of OOSLA counts of a team from recorded history", add_help=False)
+    parser.add_argument('scriptArgs', nargs='*')
+    parser.add_argument('--weekly', dest='weekly', action='store_true', help='Weekly counts instead of daily counts')
+    parser.add_argument('--days', dest='days', type=int, default=DEFAULT_DAYS, help='Days of history to read')
+    parser.add_argument('--group-by', dest='groupBy', choices=jira_oosla_history.DIMENSION_COLUMNS, help='Column to split the trend by')
+    parser.add_argument('--project', dest='project', help='Only counts of this JIRA project')
+    parser.add_argument('--priority', dest='priority', help='Only counts of this priority e.g. P1')
+    parser.add_argument('--assignee', dest='assignee', help='Only counts of this assignee')
+    parser.add_argument('--issue-type', dest='issueType', help='Only counts of this issue type')
+    parser.add_argument('--state', dest='state', choices=jira_oosla_history.SLA_STATES, help='Only counts of this SLA state')
+    parser.add_argument('--peak', dest='peak', action='store_true', help='With --weekly, highest daily count of the week')
+    parser.add_argument('--json', dest='json', action='store_true', help='Print trend as JSON')
+    return parser.parse_args(scriptArgs)
+
+def validateScriptArgs(scriptArgs):
+    if scriptArgs and len(scriptArgs) == 1:
+        return "valid"
+    else:
+        return
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    if validateScriptArgs(scriptOptions.scriptArgs):
+        inputTeamName = scriptOptions.scriptArgs[0]
+        startTime = time.perf_counter()
+        connection = jira_oosla_history.openHistoryDatabase()
+        try:
+            trendRows = jira_oosla_history.queryTrend(connection, inputTeamName, "weekly" if scriptOptions.weekly else "daily", getFromPeriod(scriptOptions), None,
+                scriptOptions.groupBy, getDimensionFilters(scriptOptions), scriptOptions.peak)
+        finally:
+            connection.close()
+        queryMillis = (time.perf_counter() - startTime) * 1000
+        if scriptOptions.json:
+            print(json.dumps([{"period": period, "group": groupValue if scriptOptions.groupBy else None, "count": count} for period, groupValue, count in trendRows]))
+            return
+        if not trendRows:
+            print("No OOSLA history of team " + inputTeamName + " in last " + str(scriptOptions.days) + " days, history is recorded by runs with --history")
+            return
+        printTrendTable(trendRows, scriptOptions.groupBy)
+        print("\n" + str(len(trendRows)) + " counts read in " + str(round(queryMillis, 1)) + " ms")
+    else:
+        print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+        print("Invalid input parameters passed , kindly check and rerun ..... exiting ....")
+        print("Script to be run as:")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+        print("      python3 query_oosla_history.py [Team Name] [--weekly] [--days N] [--group-by COLUMN] [--project P] [--priority P1] [--assignee A] [--issue-type T] [--state oosla] [--peak] [--json]")
+        print("++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
+
+if __name__ == "__main__":
+    scriptArgs = sys.argv[1:]
+    main(scriptArgs)
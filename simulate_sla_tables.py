@@ -0,0 +1,137 @@
+import sys
+import json
+import glob
+import time
+import argparse
+import jira_scan_snapshot
+import jira_sla_engine
+import jira_sla_simulator
+
+'''
+  Script Name : simulate_sla_tables.py
+  Purpose     : Shows how many JIRAs would change SLA state with candidate SLA tables before SLA dicts, lead windows or
+                SLA_OVERRIDES are changed, using scan snapshots saved by OOSLA reminder runs with --snapshot, fully offline
+                It works as follows:
+                  1. Loads the latest snapshot of every team from input snapshot files(see jira_scan_snapshot.py)
+                  2. Evaluates SLA table of the snapshot(baseline) and every candidate table in one pass over the sorted SLA ages
+                     of every team, priority and SLA group(see jira_sla_simulator.py)
+                  3. Prints ok, soon to be OOSLA, listed and OOSLA counts of every table and JIRAs whose state changes against baseline
+'''
+'''
+    Test this script in your test environment before using it in your production environment, make changes if required as per your environment setup etc
+'''
+
+'''
+    Usage:
+       python3 simulate_sla_tables.py [snapshot files] [--tables FILE] [--age-to-now] [--flip-keys N] [--by-priority] [--json]
+
+       snapshot files : <team>_scan_snapshot_<time>.jsonl.gz files or glob patterns, default is all the snapshots of JIRA_SNAPSHOT_DIR
+                        env variable folder or current folder, only the latest snapshot of a team is used
+                        a snapshot of an auto_oosla_reminder_daemon.py job only has the priorities of the job
+       --tables       : JSON file of candidate tables as {table name: SLA overrides}, see jira_sla_simulator.py for the format
+                        a candidate is applied over SLA table of every team's snapshot, so it changes all the teams at once
+       --age-to-now   : age JIRAs of the snapshots to now instead of evaluating them as of snapshot time
+       --flip-keys    : JIRA keys listed per state change of a table, default is 5
+       --by-priority  : also print counts of every table per priority
+       --json         : print results as JSON
+
+       e.g. python3 simulate_sla_tables.py myteam_scan_snapshot_*.jsonl.gz --tables candidate_sla_tables.json
+'''
+
+DEFAULT_FLIP_KEYS = 5
+STATE_NAMES = {
+    jira_sla_engine.STATE_OK: "OK",
+    jira_sla_engine.STATE_SOON_TO_BE_OOSLA: "Soon",
+    jira_sla_engine.STATE_OOSLA: "OOSLA"
+}
+
+def getSnapshotFiles(snapshotPatterns):
+    snapshotPatterns = snapshotPatterns or [jira_scan_snapshot.getSnapshotFolder() + "/*" + jira_scan_snapshot.SNAPSHOT_FILE_SUFFIX + "*.jsonl.gz"]
+    snapshotFiles = []
+    for snapshotPattern in snapshotPatterns:
+        snapshotFiles.extend(snapshotFile for snapshotFile in sorted(glob.glob(snapshotPattern)) if snapshotFile not in snapshotFiles)
+    return snapshotFiles
+
+def loadCandidateTables(tablesFile):
+    if not tablesFile:
+        return {}
+    with open(tablesFile) as candidateFile:
+        return json.load(candidateFile)
+
+def getFlipName(stateFlip):
+    return STATE_NAMES[stateFlip[0]] + " -> " + STATE_NAMES[stateFlip[1]]
+
+def printStateCounts(tableResults, byPriority):
+    print("Table".ljust(24) + "".join(columnName.rjust(10) for columnName in ["OK", "Soon", "Listed", "OOSLA", "Changed"]))
+    for tableName, tableResult in tableResults.items():
+        stateCounts = tableResult["counts"]
+        print(tableName[:23].ljust(24) + "".join(str(columnValue).rjust(10) for columnValue in [stateCounts[jira_sla_engine.STATE_OK], stateCounts[jira_sla_engine.STATE_SOON_TO_BE_OOSLA],
+            tableResult["listed"], stateCounts[jira_sla_engine.STATE_OOSLA], sum(tableResult["flips"].values())]))
+        if byPriority:
+            for jiraPriority, priorityCounts in sorted(tableResult["priorityCounts"].items()):
+                print(("  " + jiraPriority).ljust(24) + "".join(str(priorityCounts[slaState]).rjust(10) for slaState in [jira_sla_engine.STATE_OK, jira_sla_engine.STATE_SOON_TO_BE_OOSLA]) + "".rjust(10) + str(priorityCounts[jira_sla_engine.STATE_OOSLA]).rjust(10))
+
+def printStateFlips(tableResults):
+    for tableName, tableResult in tableResults.items():
+        if tableName == jira_sla_simulator.BASELINE_TABLE_NAME:
+            continue
+        print("\n" + tableName + " against " + jira_sla_simulator.BASELINE_TABLE_NAME + " :")
+        if not tableResult["flips"]:
+            print("  no JIRA changes state")
+        for stateFlip, flipCount in sorted(tableResult["flips"].items(), key=lambda flipItem: -flipItem[1]):
+            print("  " + getFlipName(stateFlip).ljust(16) + ": " + str(flipCount) + " JIRAs e.g. " + ", ".join(tableResult["flipKeys"][stateFlip]))
+
+def getJsonResults(tableResults, loadedSnapshots):
+    return {
+        "snapshots": [snapshotFile for takenAt, snapshotFile in loadedSnapshots],
+        "tables": dict((tableName, {
+            "counts": dict(tableResult["counts"]),
+            "priorityCounts": dict((jiraPriority, dict(priorityCounts)) for jiraPriority, priorityCounts in tableResult["priorityCounts"].items()),
+            "listed": tableResult["listed"],
+            "flips": [{"from": stateFlip[0], "to": stateFlip[1], "count": flipCount, "keys": tableResult["flipKeys"][stateFlip]} for stateFlip, flipCount in sorted(tableResult["flips"].items())]
+        }) for tableName, tableResult in tableResults.items())
+    }
+
+def parseScriptOptions(scriptArgs):
+    parser = argparse.ArgumentParser(description="Evaluate candidate SLA tables against scan snapshots without JIRA calls", add_help=False)
+    parser.add_argument('scriptArgs', nargs='*')
+    parser.add_argument('--tables', dest='tables', help='JSON file of candidate tables as {table name: SLA overrides}')
+    parser.add_argument('--age-to-now', dest='ageToNow', action='store_true', help='Age JIRAs of the snapshots to now')
+    parser.add_argument('--flip-keys', dest='flipKeys', type=int, default=DEFAULT_FLIP_KEYS, help='JIRA keys listed per state change of a table')
+    parser.add_argument('--by-priority', dest='byPriority', action='store_true', help='Also print counts of every table per priority')
+    parser.add_argument('--json', dest='json', action='store_true', help='Print results as JSON')
+    return parser.parse_args(scriptArgs)
+
+def printError(errorMessage):
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+    print(errorMessage)
+    print("++++++++++++++++++++++++++++++++++++ ERROR ++++++++++++++++++++++++++++++++++++")
+
+def main(scriptArgs):
+    scriptOptions = parseScriptOptions(scriptArgs)
+    snapshotFiles = getSnapshotFiles(scriptOptions.scriptArgs)
+    if not snapshotFiles:
+        printError("No scan snapshot found, snapshots are saved by OOSLA reminder runs with --snapshot ..... exiting ....")
+        sys.exit(1)
+    try:
+        candidateTables = loadCandidateTables(scriptOptions.tables)
+    except (OSError, ValueError) as ex:
+        printError("Candidate tables file " + str(scriptOptions.tables) + " could not be read : " + str(ex))
+        sys.exit(1)
+    slaSimulator = jira_sla_simulator.SlaSimulator()
+    loadedSnapshots = slaSimulator.loadSnapshots(snapshotFiles, time.time() if scriptOptions.ageToNow else None)
+    tableResults = slaSimulator.evaluateTables(candidateTables, scriptOptions.flipKeys)
+    if scriptOptions.json:
+        print(json.dumps(getJsonResults(tableResults, loadedSnapshots)))
+        return
+    for takenAt, snapshotFile in loadedSnapshots:
+        print("Snapshot " + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(takenAt)) + " : " + snapshotFile)
+    print("")
+    printStateCounts(tableResults, scriptOptions.byPriority)
+    printStateFlips(tableResults)
+    print("\n" + str(slaSimulator.stats["issues"]) + " JIRAs of " + str(slaSimulator.stats["snapshots"]) + " snapshots loaded in " + str(round(slaSimulator.stats["loadSeconds"], 2)) + " seconds, "
+        + str(len(tableResults)) + " tables evaluated in " + str(round(slaSimulator.stats["evaluateSeconds"] * 1000, 1)) + " ms")
+
+if __name__ == "__main__":
+    scriptArgs = sys.argv[1:]
+    main(scriptArgs)
@@ -0,0 +1,31 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+import pytest
+
+# scripts and jira_*.py helper modules are kept in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jira_http_client
+
+# start a HTTP server with the handler class on a free local port, returns base URL of the server
+@pytest.fixture
+def localServer():
+    startedServers = []
+    def startServer(handlerClass):
+        httpServer = ThreadingHTTPServer(("127.0.0.1", 0), handlerClass)
+        threading.Thread(target=httpServer.serve_forever, daemon=True).start()
+        startedServers.append(httpServer)
+        return "http://127.0.0.1:" + str(httpServer.server_address[1])
+    yield startServer
+    for httpServer in startedServers:
+        httpServer.shutdown()
+        httpServer.server_close()
+
+# fast retries and short timeouts for tests, shared session is dropped after the test
+@pytest.fixture
+def fastHttpClient():
+    jira_http_client.configureJiraHttpClient(connectTimeout=1, readTimeout=0.3, maxRetries=2, backoffSeconds=0, maxBackoff=0.01)
+    yield
+    jira_http_client.configureJiraHttpClient()
@@ -0,0 +1,67 @@
+import auto_oosla_fleet_reminder_for_jira as fleet
+import auto_oosla_reminder_for_jira as oosla
+import jira_issue_record
+
+# records queued write tasks instead of running them
+class RecordingWritePool:
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, writeTask, *args):
+        self.tasks.append((writeTask, args))
+
+def getBucketState(teamName, watchers):
+    return {"teamName": teamName, "reminderBucket": "BENCH1_P1", "jiraWatchersList": watchers}
+
+def getIssue(issueKey):
+    return jira_issue_record.IssueRecord.fromIssueDict({"key": issueKey, "fields": {"created": "2026-01-01T00:00:00.000+0000"}})
+
+def test_teams_sharing_a_page_get_one_write_task_per_issue():
+    pageWrites = fleet.SharedPageWrites(["teama", "teamb"])
+    writePool = RecordingWritePool()
+    # team b is done with the page first, reminder of team a(first in onboarding order) is still used
+    for issueKey in ["BENCH1-1", "BENCH1-2"]:
+        pageWrites.addIssue(getBucketState("teamb", ["user2", "user3"]), getIssue(issueKey), 100.0, "P1", {"P1": 72})
+        pageWrites.addIssue(getBucketState("teama", ["user1", "user2"]), getIssue(issueKey), 100.0, "P1", {"P1": 72})
+    pageWrites.submitPageWrites("u", "p", writePool, None)
+    assert [writeTask for writeTask, args in writePool.tasks] == [oosla.addOOSLAReminderAndThenWatchers] * 2
+    assert sorted(args[0].key for writeTask, args in writePool.tasks) == ["BENCH1-1", "BENCH1-2"]
+    for writeTask, args in writePool.tasks:
+        assert args[3] == ["user1", "user2", "user3"]
+        assert args[-1] == "teama"
+    assert pageWrites.stats == {"reminders": 2, "remindersMerged": 2, "watchersMerged": 2}
+
+def test_issue_seen_again_on_a_later_page_is_not_reminded_twice():
+    pageWrites = fleet.SharedPageWrites(["teama", "teamb"])
+    writePool = RecordingWritePool()
+    pageWrites.addIssue(getBucketState("teama", ["user1"]), getIssue("BENCH1-1"), 100.0, "P1", {"P1": 72})
+    pageWrites.submitPageWrites("u", "p", writePool, None)
+    pageWrites.addIssue(getBucketState("teamb", ["user1", "user2"]), getIssue("BENCH1-1"), 100.0, "P1", {"P1": 72})
+    pageWrites.submitPageWrites("u", "p", writePool, None)
+    assert [writeTask for writeTask, args in writePool.tasks] == [oosla.addOOSLAReminderAndThenWatchers, fleet.addSharedWatchers]
+    assert writePool.tasks[1][1][1] == ["user2"]
+    assert pageWrites.stats == {"reminders": 1, "remindersMerged": 1, "watchersMerged": 1}
+
+def test_most_severe_sla_state_of_the_teams_is_reminded():
+    pageWrites = fleet.SharedPageWrites(["teama", "teamb"])
+    writePool = RecordingWritePool()
+    # 100 hours old JIRA is soon to be OOSLA for team a and OOSLA for team b with a shorter SLA override
+    pageWrites.addIssue(getBucketState("teama", ["user1"]), getIssue("BENCH1-1"), 100.0, "P1", {"P1": 120})
+    pageWrites.addIssue(getBucketState("teamb", ["user2"]), getIssue("BENCH1-1"), 100.0, "P1", {"P1": 72})
+    pageWrites.submitPageWrites("u", "p", writePool, None)
+    assert len(writePool.tasks) == 1
+    writeTask, args = writePool.tasks[0]
+    assert args[6] == {"P1": 72}
+    assert args[-1] == "teamb"
+    assert args[3] == ["user1", "user2"]
+
+def test_more_severe_state_on_a_later_page_is_reminded():
+    pageWrites = fleet.SharedPageWrites(["teama", "teamb"])
+    writePool = RecordingWritePool()
+    pageWrites.addIssue(getBucketState("teama", ["user1"]), getIssue("BENCH1-1"), 100.0, "P1", {"P1": 120})
+    pageWrites.submitPageWrites("u", "p", writePool, None)
+    pageWrites.addIssue(getBucketState("teamb", ["user1"]), getIssue("BENCH1-1"), 100.0, "P1", {"P1": 72})
+    pageWrites.submitPageWrites("u", "p", writePool, None)
+    assert [writeTask for writeTask, args in writePool.tasks] == [oosla.addOOSLAReminderAndThenWatchers] * 2
+    assert writePool.tasks[1][1][-1] == "teamb"
+    assert writePool.tasks[1][1][3] == []
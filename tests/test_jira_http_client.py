@@ -0,0 +1,88 @@
+import time
+import collections
+from http.server import BaseHTTPRequestHandler
+import pytest
+import requests
+import jira_http_client
+
+# replies to every request with the status code of the request path e.g. /status/502, /slow sleeps past the read timeout
+# /drop closes the connection after reading the request without any response, like a reset after the write was applied
+class StatusHandler(BaseHTTPRequestHandler):
+    requestCounts = collections.Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def handleRequest(self):
+        StatusHandler.requestCounts[(self.command, self.path)] += 1
+        contentLength = int(self.headers.get("Content-Length") or 0)
+        if contentLength:
+            self.rfile.read(contentLength)
+        if self.path == "/drop":
+            self.close_connection = True
+            return
+        if self.path == "/slow":
+            time.sleep(1)
+            statusCode = 201
+        else:
+            statusCode = int(self.path.rsplit("/", 1)[-1])
+        self.send_response(statusCode)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = handleRequest
+    do_POST = handleRequest
+
+@pytest.fixture
+def statusServer(localServer, fastHttpClient):
+    StatusHandler.requestCounts.clear()
+    return localServer(StatusHandler)
+
+@pytest.mark.parametrize("statusCode", [502, 504])
+def test_post_is_not_retried_when_write_may_be_applied(statusServer, statusCode):
+    response = jira_http_client.jiraRequest("POST", statusServer + "/status/" + str(statusCode), jsonPayload={"body": "reminder"})
+    assert response.status_code == statusCode
+    assert StatusHandler.requestCounts[("POST", "/status/" + str(statusCode))] == 1
+
+@pytest.mark.parametrize("statusCode", [429, 503])
+def test_post_is_retried_when_write_was_rejected(statusServer, statusCode):
+    jira_http_client.jiraRequest("POST", statusServer + "/status/" + str(statusCode), jsonPayload={"body": "reminder"})
+    assert StatusHandler.requestCounts[("POST", "/status/" + str(statusCode))] == 3
+
+@pytest.mark.parametrize("statusCode", [429, 502, 503, 504])
+def test_get_is_retried_on_all_retry_status_codes(statusServer, statusCode):
+    jira_http_client.jiraRequest("GET", statusServer + "/status/" + str(statusCode))
+    assert StatusHandler.requestCounts[("GET", "/status/" + str(statusCode))] == 3
+
+def test_post_is_not_retried_on_read_timeout(statusServer):
+    with pytest.raises(requests.ReadTimeout):
+        jira_http_client.jiraRequest("POST", statusServer + "/slow", jsonPayload={"body": "reminder"})
+    assert StatusHandler.requestCounts[("POST", "/slow")] == 1
+
+def test_get_is_retried_on_read_timeout(statusServer):
+    with pytest.raises(requests.ReadTimeout):
+        jira_http_client.jiraRequest("GET", statusServer + "/slow")
+    assert StatusHandler.requestCounts[("GET", "/slow")] == 3
+
+def test_post_is_retried_on_connect_error(fastHttpClient):
+    attempts = []
+    countAttempt = lambda method, url, response, elapsedSeconds: attempts.append(response)
+    jira_http_client.registerResponseListener(countAttempt)
+    try:
+        with pytest.raises(requests.ConnectionError):
+            # nothing listens on port 1 of localhost, connection is refused before anything is sent
+            jira_http_client.jiraRequest("POST", "http://127.0.0.1:1/comment", jsonPayload={"body": "reminder"})
+    finally:
+        jira_http_client.unregisterResponseListener(countAttempt)
+    assert len(attempts) == 3
+
+def test_post_is_not_retried_when_connection_drops_after_request(statusServer):
+    with pytest.raises(requests.ConnectionError):
+        jira_http_client.jiraRequest("POST", statusServer + "/drop", jsonPayload={"body": "reminder"})
+    assert StatusHandler.requestCounts[("POST", "/drop")] == 1
+
+def test_get_is_retried_when_connection_drops_after_request(statusServer):
+    with pytest.raises(requests.ConnectionError):
+        jira_http_client.jiraRequest("GET", statusServer + "/drop")
+    assert StatusHandler.requestCounts[("GET", "/drop")] == 3
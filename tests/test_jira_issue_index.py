@@ -0,0 +1,83 @@
+import json
+import datetime
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pytest
+import jira_issue_index
+
+# serves /search from a fixed list of issues for any JQL and records the JQL of every request
+class IndexSearchHandler(BaseHTTPRequestHandler):
+    issues = []
+    jqlQueries = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        queryParams = parse_qs(urlparse(self.path).query)
+        startAt = int(queryParams["startAt"][0])
+        maxResults = int(queryParams["maxResults"][0])
+        IndexSearchHandler.jqlQueries.append(queryParams["jql"][0])
+        pageIssues = IndexSearchHandler.issues[startAt:startAt + maxResults] if maxResults else []
+        responseBody = json.dumps({"startAt": startAt, "maxResults": maxResults, "total": len(IndexSearchHandler.issues), "issues": pageIssues}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(responseBody)))
+        self.end_headers()
+        self.wfile.write(responseBody)
+
+def getIssue(issueKey, updated):
+    created = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=10)).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+    return {"key": issueKey, "fields": {"status": {"name": "Open"}, "priority": {"name": "P1"}, "issuetype": {"name": "Bug"}, "created": created, "updated": updated}}
+
+@pytest.fixture
+def searchURL(localServer, fastHttpClient):
+    IndexSearchHandler.jqlQueries = []
+    return localServer(IndexSearchHandler) + "/rest/api/2/search"
+
+@pytest.fixture
+def issueIndex(tmp_path, monkeypatch):
+    monkeypatch.setenv("JIRA_INDEX_OVERLAP_MINUTES", "5")
+    issueIndex = jira_issue_index.JiraIssueIndex(str(tmp_path / "index.db"))
+    yield issueIndex
+    issueIndex.close()
+
+def test_delta_query_date_uses_jira_timezone():
+    assert jira_issue_index.getDeltaQueryDate("2026-10-17T10:20:30.000+0530", 5) == "2026/10/17 10:15"
+    assert jira_issue_index.getDeltaQueryDate("2026-10-17T00:02:00.000-0700", 5) == "2026/10/16 23:57"
+    # mark saved by an older version is already a JQL date
+    assert jira_issue_index.getDeltaQueryDate("2026/10/17 09:00", 5) == "2026/10/17 09:00"
+
+def test_latest_updated_compares_instants():
+    issues = [getIssue("A-1", "2026-10-17T10:00:00.000+0530"), getIssue("A-2", "2026-10-17T05:00:00.000+0000"), {"key": "A-3", "fields": {}}]
+    # 10:00+0530 is 04:30 UTC
+    assert jira_issue_index.getLatestUpdated(issues) == "2026-10-17T05:00:00.000+0000"
+    assert jira_issue_index.getLatestUpdated([], "2026-10-17T05:00:00.000+0000") == "2026-10-17T05:00:00.000+0000"
+
+def test_high_water_mark_is_latest_jira_updated(issueIndex, searchURL):
+    IndexSearchHandler.issues = [getIssue("A-1", "2026-10-17T10:20:30.000+0530"), getIssue("A-2", "2026-10-17T09:00:00.000+0530")]
+    issueIndex.syncProject("A", searchURL, ("u", "p"), [])
+    assert issueIndex.getHighWaterMark("A") == "2026-10-17T10:20:30.000+0530"
+    # delta search starts from the mark in JIRA timezone, a delta search without any issue keeps the mark
+    IndexSearchHandler.issues = []
+    issueIndex.syncProject("A", searchURL, ("u", "p"), [])
+    assert "updated >= \"2026/10/17 10:15\"" in IndexSearchHandler.jqlQueries[-1]
+    assert issueIndex.getHighWaterMark("A") == "2026-10-17T10:20:30.000+0530"
+    IndexSearchHandler.issues = [getIssue("A-1", "2026-10-17T11:00:00.000+0530")]
+    issueIndex.syncProject("A", searchURL, ("u", "p"), [])
+    assert issueIndex.getHighWaterMark("A") == "2026-10-17T11:00:00.000+0530"
+
+def test_reconcile_runs_on_schedule(issueIndex, searchURL, monkeypatch):
+    IndexSearchHandler.issues = [getIssue("A-1", "2026-10-17T10:20:30.000+0530")]
+    issueIndex.syncProject("A", searchURL, ("u", "p"), [])
+    fullSyncRequests = len(IndexSearchHandler.jqlQueries)
+    # full sync counts as reconciliation, next delta sync within the interval does not reconcile
+    issueIndex.syncProject("A", searchURL, ("u", "p"), [])
+    assert not any("status in" in jqlQuery for jqlQuery in IndexSearchHandler.jqlQueries[fullSyncRequests:])
+    assert issueIndex.stats["reconciled"] == 0
+    monkeypatch.setenv("JIRA_INDEX_RECONCILE_HOURS", "0")
+    IndexSearchHandler.issues = [getIssue("A-2", "2026-10-17T10:30:00.000+0530")]
+    issueIndex.syncProject("A", searchURL, ("u", "p"), [])
+    # reconcile found A-1 no longer open and A-2 already indexed by the delta search
+    assert any("status in" in jqlQuery for jqlQuery in IndexSearchHandler.jqlQueries[fullSyncRequests:])
+    assert issueIndex.stats["reconciled"] == 1
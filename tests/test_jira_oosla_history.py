@@ -0,0 +1,31 @@
+import datetime
+import jira_issue_record
+import jira_oosla_history
+
+def getIssues(assignee, issueCount):
+    return [jira_issue_record.IssueRecord.fromIssueDict({"key": "BENCH1-" + str(issueIndex), "fields": {"assignee": {"name": assignee}, "created": "2026-01-01T00:00:00.000+0000"}}) for issueIndex in range(issueCount)]
+
+# record one run of the day with a JIRA count per assignee
+def recordDay(historyFile, runDate, assigneeCounts):
+    ooslaHistory = jira_oosla_history.OoslaHistory("myteam", historyFile)
+    ooslaHistory.addBucket("BENCH1", "P1")
+    for assignee, issueCount in assigneeCounts.items():
+        ooslaHistory.addIssues("BENCH1", "P1", getIssues(assignee, issueCount), ["Bug"] * issueCount, ["oosla"] * issueCount)
+    ooslaHistory.recordRun(runDate)
+
+def test_weekly_peak_is_peak_of_grouped_total(tmp_path):
+    historyFile = str(tmp_path / "history.db")
+    # alice peaks on monday and bob on tuesday, total never goes above 6
+    recordDay(historyFile, datetime.date(2026, 10, 12), {"alice": 5, "bob": 1})
+    recordDay(historyFile, datetime.date(2026, 10, 13), {"alice": 1, "bob": 5})
+    recordDay(historyFile, datetime.date(2026, 10, 14), {"alice": 1, "bob": 1})
+    connection = jira_oosla_history.openHistoryDatabase(historyFile)
+    try:
+        assert jira_oosla_history.queryTrend(connection, "myteam", "weekly") == [("2026-W42", "", 2)]
+        assert jira_oosla_history.queryTrend(connection, "myteam", "weekly", usePeak=True) == [("2026-W42", "", 6)]
+        assert jira_oosla_history.queryTrend(connection, "myteam", "weekly", groupBy="assignee", usePeak=True) == [("2026-W42", "alice", 5), ("2026-W42", "bob", 5)]
+        assert jira_oosla_history.queryTrend(connection, "myteam", "weekly", groupBy="priority", usePeak=True) == [("2026-W42", "P1", 6)]
+        assert jira_oosla_history.queryTrend(connection, "myteam", "weekly", "2026-W43", usePeak=True) == []
+        assert jira_oosla_history.queryTrend(connection, "myteam", "weekly", "2026-W42", "2026-W42", dimensionFilters={"assignee": "bob"}, usePeak=True) == [("2026-W42", "", 5)]
+    finally:
+        connection.close()
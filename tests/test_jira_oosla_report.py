@@ -0,0 +1,18 @@
+import json
+import jira_oosla_report
+
+def test_reports_are_utf8_whatever_the_locale(tmp_path, monkeypatch):
+    # files opened without an encoding get an ASCII locale encoding, as on hosts running with LANG=C
+    def asciiLocaleOpen(fileName, mode="r", **openArgs):
+        openArgs.setdefault("encoding", "ascii")
+        return open(fileName, mode, **openArgs)
+    monkeypatch.setattr(jira_oosla_report, "open", asciiLocaleOpen, raising=False)
+    ooslaReport = jira_oosla_report.OoslaReport("myteam", "https://jira.com/browse/")
+    ooslaReport.addRow("BENCH1-1", "BENCH1", "Bug", "Prod", "P1", "Jürgen Müller", "oosla", "2026-01-01", 100.0)
+    reportFiles = ooslaReport.writeReports(str(tmp_path / "myteam_oosla_report"))
+    # JSON report escapes non ASCII characters
+    for reportFile in reportFiles[:2]:
+        with open(reportFile, encoding="utf-8") as reportContent:
+            assert "Jürgen Müller" in reportContent.read()
+    with open(reportFiles[2], encoding="utf-8") as jsonContent:
+        assert json.load(jsonContent)["rows"][0][5] == "Jürgen Müller"
@@ -0,0 +1,52 @@
+import time
+import pytest
+import jira_reminder_ledger
+
+WEEK_SECONDS = 7 * 24 * 3600
+
+@pytest.fixture
+def clock(monkeypatch):
+    currentTime = [1000000.0]
+    monkeypatch.setattr(time, "time", lambda: currentTime[0])
+    return currentTime
+
+@pytest.fixture(params=[None, "worker-1"])
+def reminderLedger(request, tmp_path):
+    reminderLedger = jira_reminder_ledger.JiraReminderLedger(str(tmp_path / "ledger.db"), claimOwner=request.param)
+    yield reminderLedger
+    reminderLedger.close()
+
+# weekly run checks a reminder before adding its comment, the reminder of last week was recorded after its comment was added
+def test_weekly_reminder_is_due_at_same_offset_next_week(reminderLedger, clock):
+    startTime = clock[0]
+    assert reminderLedger.isReminderDue("BENCH1-1", "oosla", "BENCH1_P1")
+    clock[0] = startTime + 5
+    reminderLedger.recordReminder("BENCH1-1", "oosla", "BENCH1_P1")
+    clock[0] = startTime + 24 * 3600
+    assert not reminderLedger.isReminderDue("BENCH1-1", "oosla", "BENCH1_P1")
+    clock[0] = startTime + WEEK_SECONDS - jira_reminder_ledger.RENOTIFY_GRACE_SECONDS - 60
+    assert not reminderLedger.isReminderDue("BENCH1-1", "oosla", "BENCH1_P1")
+    # next week's run reaches the JIRA at the same offset into the scan, 5 seconds short of 168 hours since the reminder
+    clock[0] = startTime + WEEK_SECONDS
+    assert reminderLedger.isReminderDue("BENCH1-1", "oosla", "BENCH1_P1")
+
+def test_state_change_makes_reminder_due(reminderLedger, clock):
+    reminderLedger.recordReminder("BENCH1-1", "soonToBeOosla", "BENCH1_P1")
+    clock[0] += 3600
+    assert reminderLedger.hasStateChanged("BENCH1-1", "oosla", "BENCH1_P1")
+    assert not reminderLedger.hasStateChanged("BENCH1-1", "soonToBeOosla", "BENCH1_P1")
+    assert not reminderLedger.isReminderDue("BENCH1-1", "soonToBeOosla", "BENCH1_P1")
+    assert reminderLedger.isReminderDue("BENCH1-1", "oosla", "BENCH1_P1")
+    # another bucket e.g. priority changed is due as well
+    assert reminderLedger.isReminderDue("BENCH1-1", "soonToBeOosla", "BENCH1_P0")
+
+def test_short_interval_keeps_skipping_reminders(tmp_path, clock):
+    reminderLedger = jira_reminder_ledger.JiraReminderLedger(str(tmp_path / "ledger.db"), renotifyHours=1)
+    try:
+        reminderLedger.recordReminder("BENCH1-1", "oosla", "BENCH1_P1")
+        clock[0] += 3000
+        assert not reminderLedger.isReminderDue("BENCH1-1", "oosla", "BENCH1_P1")
+        clock[0] += 600
+        assert reminderLedger.isReminderDue("BENCH1-1", "oosla", "BENCH1_P1")
+    finally:
+        reminderLedger.close()
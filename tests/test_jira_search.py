@@ -0,0 +1,68 @@
+import json
+import threading
+import collections
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pytest
+import jira_search
+import jira_issue_record
+
+# serves /search from a fixed list of issues, page size is capped at serverMaxResults like a JIRA server does
+class SearchHandler(BaseHTTPRequestHandler):
+    issueCount = 0
+    serverMaxResults = 50
+    fetchedStartAts = collections.Counter()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        queryParams = parse_qs(urlparse(self.path).query)
+        startAt = int(queryParams["startAt"][0])
+        maxResults = min(int(queryParams["maxResults"][0]), SearchHandler.serverMaxResults)
+        with SearchHandler.lock:
+            SearchHandler.fetchedStartAts[startAt] += 1
+        pageIssues = [{"key": "BENCH1-" + str(issueIndex), "fields": {"created": "2026-01-01T00:00:00.000+0000"}}
+            for issueIndex in range(startAt, min(startAt + maxResults, SearchHandler.issueCount))]
+        responseBody = json.dumps({"startAt": startAt, "maxResults": maxResults, "total": SearchHandler.issueCount, "issues": pageIssues}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(responseBody)))
+        self.end_headers()
+        self.wfile.write(responseBody)
+
+@pytest.fixture
+def searchServer(localServer, fastHttpClient):
+    SearchHandler.fetchedStartAts.clear()
+    return localServer(SearchHandler) + "/rest/api/2/search"
+
+# every page is fetched exactly once and every issue is yielded exactly once, in parallel and sequential paging
+@pytest.mark.parametrize("issueCount, pageSize, serverMaxResults, maxParallelPages", [
+    (0, 50, 50, 4),
+    (7, 50, 50, 4),
+    (200, 50, 50, 4),
+    (201, 50, 50, 4),
+    (249, 50, 50, 1),
+    (1234, 100, 100, 8),
+    # server honors a smaller page size than requested
+    (1001, 100, 40, 8)
+])
+def test_every_page_is_fetched_once(searchServer, issueCount, pageSize, serverMaxResults, maxParallelPages):
+    SearchHandler.issueCount = issueCount
+    SearchHandler.serverMaxResults = serverMaxResults
+    scanStats = {}
+    issueKeys = [issue["key"] for page in jira_search.iterJiraSearchPages(searchServer, "project = BENCH1", ("u", "p"), pageSize=pageSize, maxParallelPages=maxParallelPages, scanStats=scanStats) for issue in page]
+    pageStep = min(pageSize, serverMaxResults)
+    expectedStartAts = [0] + list(range(pageStep, issueCount, pageStep))
+    assert sorted(SearchHandler.fetchedStartAts) == expectedStartAts
+    assert set(SearchHandler.fetchedStartAts.values()) == {1}
+    assert sorted(issueKeys) == sorted("BENCH1-" + str(issueIndex) for issueIndex in range(issueCount))
+    assert scanStats["requests"] == len(expectedStartAts)
+
+def test_issue_factory_pages(searchServer):
+    SearchHandler.issueCount = 120
+    SearchHandler.serverMaxResults = 50
+    pages = list(jira_search.iterJiraSearchPages(searchServer, "project = BENCH1", ("u", "p"), pageSize=50, issueFactory=jira_issue_record.IssueRecord.fromIssueDict))
+    assert [len(page) for page in sorted(pages, key=len, reverse=True)] == [50, 50, 20]
+    assert set(SearchHandler.fetchedStartAts.values()) == {1}
@@ -0,0 +1,20 @@
+import datetime
+import pytest
+import jira_sla_engine
+
+@pytest.mark.parametrize("jiraTimestamp, isoTimestamp", [
+    ("2024-01-31T10:20:30.000Z", "2024-01-31T10:20:30.000+00:00"),
+    ("2024-01-31T10:20:30.000+0000", "2024-01-31T10:20:30.000+00:00"),
+    ("2024-01-31T10:20:30.000+0530", "2024-01-31T10:20:30.000+05:30"),
+    ("2024-01-31T10:20:30.000-0700", "2024-01-31T10:20:30.000-07:00"),
+    # offsets already in +HH:MM format are left as they are
+    ("2024-01-31T10:20:30.000+05:30", "2024-01-31T10:20:30.000+05:30"),
+    ("2024-01-31T10:20:30.000+00:00", "2024-01-31T10:20:30.000+00:00")
+])
+def test_iso_timestamp(jiraTimestamp, isoTimestamp):
+    assert jira_sla_engine.getIsoTimestamp(jiraTimestamp) == isoTimestamp
+
+def test_created_timestamps_of_all_offset_formats():
+    createdEpochs = jira_sla_engine.parseCreatedTimestamps(["2024-01-31T05:00:00.000Z", "2024-01-31T10:30:00.000+0530", "2024-01-31T10:30:00.000+05:30"])
+    expectedEpoch = datetime.datetime(2024, 1, 31, 5, 0, tzinfo=datetime.timezone.utc).timestamp()
+    assert list(createdEpochs) == [expectedEpoch] * 3
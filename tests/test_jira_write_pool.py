@@ -0,0 +1,24 @@
+import threading
+import jira_write_pool
+
+def test_cancel_drops_queued_and_later_tasks():
+    writePool = jira_write_pool.AdaptiveWritePool(1)
+    releaseTask = threading.Event()
+    taskStarted = threading.Event()
+    ranTasks = []
+    def blockingTask():
+        taskStarted.set()
+        releaseTask.wait(5)
+        ranTasks.append("blocking")
+    writePool.submit(blockingTask)
+    taskStarted.wait(5)
+    for taskIndex in range(3):
+        writePool.submit(ranTasks.append, taskIndex)
+    writePool.cancel()
+    writePool.submit(ranTasks.append, "after cancel")
+    releaseTask.set()
+    writePool.close()
+    # running task is finished, queued and later tasks never run
+    assert ranTasks == ["blocking"]
+    assert writePool.stats["tasks"] == 1
+    assert writePool.stats["discarded"] == 4
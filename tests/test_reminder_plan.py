@@ -0,0 +1,39 @@
+import jira_reminder_plan
+import apply_reminder_plan
+
+def getCommentEntry(body, ageHours=None):
+    commentEntry = {"action": "comment", "key": "BENCH1-1", "priority": "P1", "state": "soonToBeOosla", "bucket": "BENCH1_P1", "body": body}
+    if ageHours is not None:
+        commentEntry.update({"ageHours": ageHours, "slaHours": 480, "issueType": "Bug"})
+    return commentEntry
+
+def test_entry_id_does_not_depend_on_comment_body():
+    assert jira_reminder_plan.getEntryId(getCommentEntry("in the next 5 days")) == jira_reminder_plan.getEntryId(getCommentEntry("in the next 4 days"))
+    otherStateEntry = dict(getCommentEntry("is OOSLA"), state="oosla")
+    assert jira_reminder_plan.getEntryId(otherStateEntry) != jira_reminder_plan.getEntryId(getCommentEntry("in the next 5 days"))
+    watcherEntry = {"action": "watcher", "key": "BENCH1-1", "priority": "P1", "watcher": "user1"}
+    assert jira_reminder_plan.getEntryId(watcherEntry) == jira_reminder_plan.getEntryId(dict(watcherEntry, priority="P2"))
+    assert jira_reminder_plan.getEntryId(watcherEntry) != jira_reminder_plan.getEntryId(dict(watcherEntry, watcher="user2"))
+
+def test_same_reminder_is_planned_once(tmp_path):
+    reminderPlan = jira_reminder_plan.ReminderPlan("myteam", planFile=str(tmp_path / "myteam_reminder_plan.jsonl"))
+    reminderPlan.addReminder("BENCH1-1", "P1", "soonToBeOosla", "BENCH1_P1", "in the next 5 days", 360.0, 480, "Bug")
+    reminderPlan.addReminder("BENCH1-1", "P1", "soonToBeOosla", "BENCH1_P1", "in the next 4 days", 384.0, 480, "Bug")
+    planHeader, planEntries = jira_reminder_plan.loadPlan(reminderPlan.close())
+    assert len(planEntries) == 1
+    assert planEntries[0]["ageHours"] == 360.0
+
+def test_planned_comment_is_rendered_with_age_at_apply_time():
+    plannedAt = 1000000.0
+    # 360 hours old at plan time, SLA is 480 hours
+    jiraComment, slaState = apply_reminder_plan.renderPlannedComment(getCommentEntry("planned body", 360.0), plannedAt, "myteam", plannedAt)
+    assert slaState == "soonToBeOosla"
+    assert "in the next 5 days(approx)" in jiraComment
+    jiraComment, slaState = apply_reminder_plan.renderPlannedComment(getCommentEntry("planned body", 360.0), plannedAt, "myteam", plannedAt + 48 * 3600)
+    assert "in the next 3 days(approx)" in jiraComment
+    # breached SLA between plan and apply
+    jiraComment, slaState = apply_reminder_plan.renderPlannedComment(getCommentEntry("planned body", 360.0), plannedAt, "myteam", plannedAt + 200 * 3600)
+    assert slaState == "oosla"
+    assert "is OOSLA for 3 days(approx)" in jiraComment
+    # entries of older plans keep their planned body
+    assert apply_reminder_plan.renderPlannedComment(getCommentEntry("planned body"), plannedAt, "myteam") == ("planned body", "soonToBeOosla")
@@ -0,0 +1,28 @@
+import threading
+import jira_work_queue
+import jira_write_pool
+import auto_oosla_reminder_workers as workers
+
+# work queue whose lease renewals fail as if another worker claimed the unit
+class LostLeaseQueue:
+    def __init__(self, queueFile):
+        pass
+
+    def renewLease(self, claimedUnit, workerId):
+        return False
+
+    def close(self):
+        pass
+
+def test_lost_lease_cancels_queued_writes(monkeypatch):
+    monkeypatch.setattr(jira_work_queue, "JiraWorkQueue", LostLeaseQueue)
+    writePool = jira_write_pool.AdaptiveWritePool(1)
+    releaseTask = threading.Event()
+    writePool.submit(releaseTask.wait, 5)
+    writePool.submit(print, "queued write")
+    with workers.LeaseKeeper("queue.db", {"unitId": 1, "leaseSeconds": 0.03}, "worker-1", writePool) as leaseKeeper:
+        leaseKeeper.thread.join(5)
+        assert leaseKeeper.leaseLost
+    releaseTask.set()
+    writePool.close()
+    assert writePool.stats["discarded"] == 1